@@ -0,0 +1,52 @@
+"""presion_numerica_emergencias
+
+Revision ID: 0b4d8e2f6a91
+Revises: a3e7c9d1b5f2
+Create Date: 2026-10-17 21:03:51.206734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from saas.utils.signos_vitales import separar_presion
+
+
+# revision identifiers, used by Alembic.
+revision = '0b4d8e2f6a91'
+down_revision = 'a3e7c9d1b5f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('emergencias', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('presion_sistolica', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('presion_diastolica', sa.Integer(), nullable=True))
+
+    # Pasar el texto '120/80' a las columnas numéricas
+    conn = op.get_bind()
+    filas = conn.execute(sa.text(
+        "SELECT id, presion_arterial FROM emergencias WHERE presion_arterial IS NOT NULL"
+    )).fetchall()
+    valores = []
+    for id_, texto in filas:
+        sistolica, diastolica = separar_presion(texto)
+        if sistolica is not None:
+            valores.append({'id': id_, 'sistolica': sistolica, 'diastolica': diastolica})
+    if valores:
+        conn.execute(sa.text(
+            "UPDATE emergencias SET presion_sistolica = :sistolica, presion_diastolica = :diastolica "
+            "WHERE id = :id"
+        ), valores)
+
+    with op.batch_alter_table('evoluciones', schema=None) as batch_op:
+        batch_op.create_index('idx_evoluciones_internado_fecha', ['internado_id', 'fecha'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('evoluciones', schema=None) as batch_op:
+        batch_op.drop_index('idx_evoluciones_internado_fecha')
+
+    with op.batch_alter_table('emergencias', schema=None) as batch_op:
+        batch_op.drop_column('presion_diastolica')
+        batch_op.drop_column('presion_sistolica')
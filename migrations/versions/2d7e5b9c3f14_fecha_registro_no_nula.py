@@ -0,0 +1,40 @@
+"""fecha_registro no nula en usuarios y pacientes
+
+Revision ID: 2d7e5b9c3f14
+Revises: d1f6b8a3c9e4
+Create Date: 2026-10-18 09:41:07.512634
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2d7e5b9c3f14'
+down_revision = 'd1f6b8a3c9e4'
+branch_labels = None
+depends_on = None
+
+
+TABLAS = ('usuarios', 'pacientes')
+
+
+def upgrade():
+    # Los listados paginan por keyset sobre (fecha_registro DESC, id DESC) y
+    # el seek (fecha_registro < :f) nunca alcanza las filas con NULL. Las
+    # que no tienen fecha toman la más antigua de la tabla: quedan al final
+    # del listado, ordenadas por id.
+    for tabla in TABLAS:
+        op.execute(
+            f'UPDATE {tabla} SET fecha_registro = COALESCE('
+            f'(SELECT MIN(fecha_registro) FROM {tabla}), CURRENT_TIMESTAMP) '
+            'WHERE fecha_registro IS NULL'
+        )
+        with op.batch_alter_table(tabla, schema=None) as batch_op:
+            batch_op.alter_column('fecha_registro', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    for tabla in TABLAS:
+        with op.batch_alter_table(tabla, schema=None) as batch_op:
+            batch_op.alter_column('fecha_registro', existing_type=sa.DateTime(), nullable=True)
@@ -0,0 +1,33 @@
+"""contadores_orden_laboratorio
+
+Revision ID: 4e8b1c7a2f95
+Revises: 6c2e9a4f1d73
+Create Date: 2026-10-17 22:18:40.663192
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4e8b1c7a2f95'
+down_revision = '6c2e9a4f1d73'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Una fila por año; la crea la primera orden del año partiendo del mayor
+    # número ya usado en los códigos LAB-<año>-*, así que no hace falta
+    # poblarla aquí.
+    op.create_table('contadores_orden_laboratorio',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('anio', sa.Integer(), nullable=False),
+    sa.Column('ultimo_numero', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('anio', name='uq_contadores_orden_laboratorio_anio')
+    )
+
+
+def downgrade():
+    op.drop_table('contadores_orden_laboratorio')
@@ -0,0 +1,57 @@
+"""news2_internados
+
+Revision ID: 6c2e9a4f1d73
+Revises: 0b4d8e2f6a91
+Create Date: 2026-10-17 21:47:26.918350
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from saas.utils.signos_vitales import ESCALAS_NEWS2, news2
+
+
+# revision identifiers, used by Alembic.
+revision = '6c2e9a4f1d73'
+down_revision = '0b4d8e2f6a91'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('internados_registro', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('news2_puntaje', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('news2_maximo', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('news2_fecha', sa.DateTime(), nullable=True))
+        batch_op.create_index('idx_internados_estado_news2', ['estado', 'news2_puntaje'], unique=False)
+
+    # Puntaje inicial de los internados activos: su última evolución con signos
+    conn = op.get_bind()
+    campos = ', '.join(f'e.{campo}' for campo in ESCALAS_NEWS2)
+    filas = conn.execute(sa.text(
+        f"SELECT e.internado_id, e.fecha, {campos} FROM evoluciones e "
+        "JOIN internados_registro i ON i.id = e.internado_id "
+        "WHERE i.estado = 'activo' ORDER BY e.internado_id, e.fecha DESC"
+    )).mappings().fetchall()
+
+    valores = {}
+    for fila in filas:
+        if fila['internado_id'] in valores:
+            continue
+        puntaje, maximo = news2({campo: fila[campo] for campo in ESCALAS_NEWS2})
+        if puntaje is not None:
+            valores[fila['internado_id']] = {'id': fila['internado_id'], 'puntaje': puntaje,
+                                             'maximo': maximo, 'fecha': fila['fecha']}
+    if valores:
+        conn.execute(sa.text(
+            "UPDATE internados_registro SET news2_puntaje = :puntaje, news2_maximo = :maximo, "
+            "news2_fecha = :fecha WHERE id = :id"
+        ), list(valores.values()))
+
+
+def downgrade():
+    with op.batch_alter_table('internados_registro', schema=None) as batch_op:
+        batch_op.drop_index('idx_internados_estado_news2')
+        batch_op.drop_column('news2_fecha')
+        batch_op.drop_column('news2_maximo')
+        batch_op.drop_column('news2_puntaje')
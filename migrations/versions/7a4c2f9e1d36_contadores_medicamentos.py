@@ -0,0 +1,27 @@
+"""indice de contadores de medicamentos
+
+Revision ID: 7a4c2f9e1d36
+Revises: b7e2d9c4a1f6
+Create Date: 2026-10-18 00:27:05.914736
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a4c2f9e1d36'
+down_revision = 'b7e2d9c4a1f6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('medicamentos', schema=None) as batch_op:
+        batch_op.create_index('idx_medicamentos_activo_vencimiento',
+                              ['activo', 'fecha_vencimiento', 'cantidad_stock', 'stock_minimo'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('medicamentos', schema=None) as batch_op:
+        batch_op.drop_index('idx_medicamentos_activo_vencimiento')
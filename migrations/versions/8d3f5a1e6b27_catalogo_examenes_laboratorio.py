@@ -0,0 +1,97 @@
+"""catalogo_examenes_laboratorio
+
+Revision ID: 8d3f5a1e6b27
+Revises: 4e8b1c7a2f95
+Create Date: 2026-10-17 22:55:12.408317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d3f5a1e6b27'
+down_revision = '4e8b1c7a2f95'
+branch_labels = None
+depends_on = None
+
+# (codigo, nombre, categoria, tipo, unidad, ref_min, ref_max) - adultos
+CATALOGO_BASE = [
+    ('HB', 'Hemoglobina', 'Hematología', 'numerico', 'g/dL', 12.0, 16.0),
+    ('HTO', 'Hematocrito', 'Hematología', 'numerico', '%', 36.0, 48.0),
+    ('LEU', 'Leucocitos', 'Hematología', 'numerico', 'x10³/µL', 4.5, 11.0),
+    ('PLT', 'Plaquetas', 'Hematología', 'numerico', 'x10³/µL', 150.0, 450.0),
+    ('GLU', 'Glicemia', 'Química', 'numerico', 'mg/dL', 70.0, 100.0),
+    ('UREA', 'Urea', 'Química', 'numerico', 'mg/dL', 15.0, 45.0),
+    ('CREA', 'Creatinina', 'Química', 'numerico', 'mg/dL', 0.6, 1.2),
+    ('AU', 'Ácido úrico', 'Química', 'numerico', 'mg/dL', 2.5, 7.0),
+    ('COL', 'Colesterol total', 'Química', 'numerico', 'mg/dL', None, 200.0),
+    ('TG', 'Triglicéridos', 'Química', 'numerico', 'mg/dL', None, 150.0),
+    ('TGO', 'TGO (AST)', 'Química', 'numerico', 'U/L', 5.0, 40.0),
+    ('TGP', 'TGP (ALT)', 'Química', 'numerico', 'U/L', 7.0, 56.0),
+    ('NA', 'Sodio', 'Electrolitos', 'numerico', 'mEq/L', 135.0, 145.0),
+    ('K', 'Potasio', 'Electrolitos', 'numerico', 'mEq/L', 3.5, 5.0),
+    ('ORINA', 'Examen de orina', 'Uroanálisis', 'texto', None, None, None),
+    ('HECES', 'Examen de heces', 'Coproanálisis', 'texto', None, None, None),
+    ('VDRL', 'VDRL', 'Serología', 'texto', None, None, None),
+]
+
+
+def upgrade():
+    examenes = op.create_table('examenes_laboratorio',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('codigo', sa.String(length=20), nullable=False),
+    sa.Column('nombre', sa.String(length=100), nullable=False),
+    sa.Column('categoria', sa.String(length=50), nullable=True),
+    sa.Column('tipo', sa.String(length=10), nullable=False),
+    sa.Column('unidad', sa.String(length=20), nullable=True),
+    sa.Column('ref_min', sa.Float(), nullable=True),
+    sa.Column('ref_max', sa.Float(), nullable=True),
+    sa.Column('activo', sa.Boolean(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('codigo')
+    )
+    op.bulk_insert(examenes, [
+        dict(zip(('codigo', 'nombre', 'categoria', 'tipo', 'unidad', 'ref_min', 'ref_max'), fila), activo=True)
+        for fila in CATALOGO_BASE
+    ])
+
+    with op.batch_alter_table('resultados_laboratorio', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('paciente_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('examen_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('fecha', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('valor', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('unidad', sa.String(length=20), nullable=True))
+        batch_op.add_column(sa.Column('ref_min', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('ref_max', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('bandera', sa.String(length=10), nullable=True))
+        batch_op.create_foreign_key('fk_resultados_lab_paciente', 'pacientes', ['paciente_id'], ['id'])
+        batch_op.create_foreign_key('fk_resultados_lab_examen', 'examenes_laboratorio', ['examen_id'], ['id'])
+
+    # Resultados anteriores (texto libre): paciente de la orden y fecha de carga
+    op.execute(
+        "UPDATE resultados_laboratorio SET "
+        "paciente_id = (SELECT o.paciente_id FROM ordenes_laboratorio o WHERE o.id = resultados_laboratorio.orden_id), "
+        "fecha = created_at"
+    )
+
+    with op.batch_alter_table('resultados_laboratorio', schema=None) as batch_op:
+        batch_op.create_index('idx_resultados_lab_paciente_examen_fecha',
+                              ['paciente_id', 'examen_id', 'fecha'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('resultados_laboratorio', schema=None) as batch_op:
+        batch_op.drop_index('idx_resultados_lab_paciente_examen_fecha')
+        batch_op.drop_constraint('fk_resultados_lab_examen', type_='foreignkey')
+        batch_op.drop_constraint('fk_resultados_lab_paciente', type_='foreignkey')
+        batch_op.drop_column('bandera')
+        batch_op.drop_column('ref_max')
+        batch_op.drop_column('ref_min')
+        batch_op.drop_column('unidad')
+        batch_op.drop_column('valor')
+        batch_op.drop_column('fecha')
+        batch_op.drop_column('examen_id')
+        batch_op.drop_column('paciente_id')
+
+    op.drop_table('examenes_laboratorio')
@@ -0,0 +1,67 @@
+"""indices_trigramas_busqueda_pacientes
+
+Revision ID: a3c5e7f9b2d4
+Revises: 569d9341e509
+Create Date: 2026-10-17 09:12:31.418227
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c5e7f9b2d4'
+down_revision = '569d9341e509'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Búsqueda por subcadena de pacientes (ver saas/utils/busqueda.py)
+    bind = op.get_bind()
+
+    if bind.dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.execute('CREATE INDEX IF NOT EXISTS idx_pacientes_nombre_trgm ON pacientes USING gin (nombre gin_trgm_ops)')
+        op.execute('CREATE INDEX IF NOT EXISTS idx_pacientes_apellido_trgm ON pacientes USING gin (apellido gin_trgm_ops)')
+        op.execute('CREATE INDEX IF NOT EXISTS idx_pacientes_cedula_trgm ON pacientes USING gin (cedula gin_trgm_ops)')
+
+    elif bind.dialect.name == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS pacientes_fts USING fts5("
+            "cedula, nombre, apellido, content='pacientes', content_rowid='id', tokenize='trigram')"
+        )
+        op.execute(
+            'CREATE TRIGGER IF NOT EXISTS pacientes_fts_ai AFTER INSERT ON pacientes BEGIN '
+            'INSERT INTO pacientes_fts(rowid, cedula, nombre, apellido) '
+            'VALUES (new.id, new.cedula, new.nombre, new.apellido); END'
+        )
+        op.execute(
+            'CREATE TRIGGER IF NOT EXISTS pacientes_fts_ad AFTER DELETE ON pacientes BEGIN '
+            "INSERT INTO pacientes_fts(pacientes_fts, rowid, cedula, nombre, apellido) "
+            "VALUES ('delete', old.id, old.cedula, old.nombre, old.apellido); END"
+        )
+        op.execute(
+            'CREATE TRIGGER IF NOT EXISTS pacientes_fts_au AFTER UPDATE OF cedula, nombre, apellido ON pacientes BEGIN '
+            "INSERT INTO pacientes_fts(pacientes_fts, rowid, cedula, nombre, apellido) "
+            "VALUES ('delete', old.id, old.cedula, old.nombre, old.apellido); "
+            'INSERT INTO pacientes_fts(rowid, cedula, nombre, apellido) '
+            'VALUES (new.id, new.cedula, new.nombre, new.apellido); END'
+        )
+        # Indexar los pacientes existentes
+        op.execute("INSERT INTO pacientes_fts(pacientes_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    if bind.dialect.name == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS idx_pacientes_cedula_trgm')
+        op.execute('DROP INDEX IF EXISTS idx_pacientes_apellido_trgm')
+        op.execute('DROP INDEX IF EXISTS idx_pacientes_nombre_trgm')
+
+    elif bind.dialect.name == 'sqlite':
+        op.execute('DROP TRIGGER IF EXISTS pacientes_fts_au')
+        op.execute('DROP TRIGGER IF EXISTS pacientes_fts_ad')
+        op.execute('DROP TRIGGER IF EXISTS pacientes_fts_ai')
+        op.execute('DROP TABLE IF EXISTS pacientes_fts')
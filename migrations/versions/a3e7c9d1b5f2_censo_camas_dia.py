@@ -0,0 +1,38 @@
+"""censo_camas_dia
+
+Revision ID: a3e7c9d1b5f2
+Revises: f9d5b2e7a4c8
+Create Date: 2026-10-17 20:12:08.519364
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3e7c9d1b5f2'
+down_revision = 'f9d5b2e7a4c8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('censo_camas_dia',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('fecha', sa.Date(), nullable=False),
+        sa.Column('sala', sa.String(length=50), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.Column('libre', sa.Integer(), nullable=False),
+        sa.Column('ocupada', sa.Integer(), nullable=False),
+        sa.Column('mantenimiento', sa.Integer(), nullable=False),
+        sa.Column('ingresos', sa.Integer(), nullable=False),
+        sa.Column('altas', sa.Integer(), nullable=False),
+        sa.Column('dias_estancia', sa.Float(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('fecha', 'sala', name='uq_censo_camas_dia')
+    )
+
+
+def downgrade():
+    op.drop_table('censo_camas_dia')
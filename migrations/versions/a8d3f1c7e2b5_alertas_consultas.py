@@ -0,0 +1,36 @@
+"""alertas_consultas
+
+Revision ID: a8d3f1c7e2b5
+Revises: f2c6a4e8d1b7
+Create Date: 2026-10-17 15:04:37.226190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8d3f1c7e2b5'
+down_revision = 'f2c6a4e8d1b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Las consultas existentes quedan en 0 hasta correr
+    # scripts/recalcular_alertas_consultas.py
+    with op.batch_alter_table('consultas', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('imc_valor', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('alertas', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('severidad', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.create_index('idx_consultas_severidad_fecha', ['severidad', 'fecha_hora', 'id'], unique=False)
+        batch_op.create_index('idx_consultas_medico_severidad', ['medico_id', 'severidad', 'fecha_hora', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('consultas', schema=None) as batch_op:
+        batch_op.drop_index('idx_consultas_medico_severidad')
+        batch_op.drop_index('idx_consultas_severidad_fecha')
+        batch_op.drop_column('severidad')
+        batch_op.drop_column('alertas')
+        batch_op.drop_column('imc_valor')
@@ -0,0 +1,57 @@
+"""cedula_normalizada
+
+Revision ID: b7d1f3a5c9e2
+Revises: a3c5e7f9b2d4
+Create Date: 2026-10-17 10:02:47.913504
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from saas.utils.cedula import normalizar_cedula
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d1f3a5c9e2'
+down_revision = 'a3c5e7f9b2d4'
+branch_labels = None
+depends_on = None
+
+
+def _backfill(tabla):
+    """Calcular cedula_normalizada para las filas existentes"""
+    bind = op.get_bind()
+    t = sa.table(tabla, sa.column('id'), sa.column('cedula'), sa.column('cedula_normalizada'))
+    filas = bind.execute(sa.select(t.c.id, t.c.cedula).where(t.c.cedula.isnot(None))).fetchall()
+    if filas:
+        bind.execute(
+            t.update().where(t.c.id == sa.bindparam('_id')).values(cedula_normalizada=sa.bindparam('_valor')),
+            [{'_id': fila.id, '_valor': normalizar_cedula(fila.cedula)} for fila in filas]
+        )
+
+
+def upgrade():
+    with op.batch_alter_table('pacientes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('cedula_normalizada', sa.String(length=20), nullable=True))
+
+    with op.batch_alter_table('usuarios', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('cedula_normalizada', sa.String(length=20), nullable=True))
+
+    _backfill('pacientes')
+    _backfill('usuarios')
+
+    # Índices únicos después del backfill (falla si hay cédulas duplicadas
+    # con distinto formato: deben depurarse antes de migrar)
+    op.create_index('ix_pacientes_cedula_normalizada', 'pacientes', ['cedula_normalizada'], unique=True)
+    op.create_index('ix_usuarios_cedula_normalizada', 'usuarios', ['cedula_normalizada'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_usuarios_cedula_normalizada', table_name='usuarios')
+    op.drop_index('ix_pacientes_cedula_normalizada', table_name='pacientes')
+
+    with op.batch_alter_table('usuarios', schema=None) as batch_op:
+        batch_op.drop_column('cedula_normalizada')
+
+    with op.batch_alter_table('pacientes', schema=None) as batch_op:
+        batch_op.drop_column('cedula_normalizada')
@@ -0,0 +1,26 @@
+"""lista de trabajo de laboratorio
+
+Revision ID: b7e2d9c4a1f6
+Revises: 8d3f5a1e6b27
+Create Date: 2026-10-17 23:41:12.508317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2d9c4a1f6'
+down_revision = '8d3f5a1e6b27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('ordenes_laboratorio', schema=None) as batch_op:
+        batch_op.create_index('idx_ordenes_lab_estado_urgente_fecha', ['estado', sa.text('urgente DESC'), 'fecha_orden'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('ordenes_laboratorio', schema=None) as batch_op:
+        batch_op.drop_index('idx_ordenes_lab_estado_urgente_fecha')
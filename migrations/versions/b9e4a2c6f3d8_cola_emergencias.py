@@ -0,0 +1,30 @@
+"""cola_emergencias
+
+Revision ID: b9e4a2c6f3d8
+Revises: a8d3f1c7e2b5
+Create Date: 2026-10-17 16:11:52.730418
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b9e4a2c6f3d8'
+down_revision = 'a8d3f1c7e2b5'
+branch_labels = None
+depends_on = None
+
+ACTIVAS = sa.text("estado IN ('en_triaje', 'en_atencion')")
+
+
+def upgrade():
+    # Índice parcial: solo las filas de la cola activa (los egresos nunca entran)
+    op.create_index('idx_emergencias_cola', 'emergencias', ['estado', 'triage_nivel', 'hora_ingreso'],
+                    unique=False, sqlite_where=ACTIVAS, postgresql_where=ACTIVAS)
+    op.create_index('idx_emergencias_ingreso_id', 'emergencias', ['hora_ingreso', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_emergencias_ingreso_id', table_name='emergencias')
+    op.drop_index('idx_emergencias_cola', table_name='emergencias')
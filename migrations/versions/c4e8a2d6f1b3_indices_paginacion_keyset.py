@@ -0,0 +1,39 @@
+"""indices_paginacion_keyset
+
+Revision ID: c4e8a2d6f1b3
+Revises: b7d1f3a5c9e2
+Create Date: 2026-10-17 09:12:40.118245
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8a2d6f1b3'
+down_revision = 'b7d1f3a5c9e2'
+branch_labels = None
+depends_on = None
+
+
+INDICES = [
+    ('idx_usuarios_registro_id', 'usuarios', ['fecha_registro', 'id']),
+    ('idx_pacientes_registro_id', 'pacientes', ['fecha_registro', 'id']),
+    ('idx_citas_fecha_id', 'citas', ['fecha_hora', 'id']),
+    ('idx_medicamentos_nombre_id', 'medicamentos', ['nombre', 'id']),
+    ('idx_consultas_fecha_id', 'consultas', ['fecha_hora', 'id']),
+    ('idx_internados_ingreso_id', 'internados_registro', ['fecha_ingreso', 'id']),
+    ('idx_ordenes_lab_fecha_id', 'ordenes_laboratorio', ['fecha_orden', 'id']),
+]
+
+
+def upgrade():
+    # Índices (columna de orden, id) para la paginación por keyset:
+    # cada página es un index seek + LIMIT, sin OFFSET
+    for nombre, tabla, columnas in INDICES:
+        op.create_index(nombre, tabla, columnas)
+
+
+def downgrade():
+    for nombre, tabla, _ in INDICES:
+        op.drop_index(nombre, table_name=tabla)
@@ -0,0 +1,113 @@
+"""notas_emergencia
+
+Revision ID: c5a9e3f7d2b1
+Revises: d6b2f8a4c1e7
+Create Date: 2026-10-17 17:24:08.512930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from saas.utils.notas_clinicas import separar_notas, unir_notas
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5a9e3f7d2b1'
+down_revision = 'd6b2f8a4c1e7'
+branch_labels = None
+depends_on = None
+
+TAMANO_LOTE = 500
+
+# Columna de texto acumulado -> tipo de nota
+COLUMNAS_NOTA = {'tratamiento': 'tratamiento', 'observaciones': 'observacion'}
+
+emergencias = sa.table(
+    'emergencias',
+    sa.column('id', sa.Integer), sa.column('tratamiento', sa.Text), sa.column('observaciones', sa.Text),
+    sa.column('hora_ingreso', sa.DateTime), sa.column('hora_atencion', sa.DateTime),
+    sa.column('created_at', sa.DateTime),
+)
+notas = sa.table(
+    'notas_emergencia',
+    sa.column('emergencia_id', sa.Integer), sa.column('tipo', sa.String), sa.column('texto', sa.Text),
+    sa.column('created_at', sa.DateTime),
+)
+
+
+def _separar_texto_acumulado():
+    """Cada tramo '[fecha]\\ntexto' de tratamiento/observaciones pasa a ser una nota"""
+    bind = op.get_bind()
+    ultimo_id = 0
+    while True:
+        filas = bind.execute(
+            sa.select(emergencias).where(
+                emergencias.c.id > ultimo_id,
+                sa.or_(emergencias.c.tratamiento.isnot(None), emergencias.c.observaciones.isnot(None))
+            ).order_by(emergencias.c.id).limit(TAMANO_LOTE)
+        ).fetchall()
+        if not filas:
+            return
+        ultimo_id = filas[-1].id
+
+        nuevas = []
+        for fila in filas:
+            # El primer tramo no tiene marca: se fecha al inicio de la atención
+            fecha_inicial = fila.hora_atencion or fila.created_at or fila.hora_ingreso
+            for columna, tipo in COLUMNAS_NOTA.items():
+                for fecha, texto in separar_notas(getattr(fila, columna), fecha_inicial):
+                    nuevas.append({'emergencia_id': fila.id, 'tipo': tipo, 'texto': texto, 'created_at': fecha})
+        if nuevas:
+            bind.execute(notas.insert(), nuevas)
+        bind.execute(
+            emergencias.update().where(emergencias.c.id.in_([fila.id for fila in filas]))
+            .values(tratamiento=None, observaciones=None)
+        )
+
+
+def _unir_notas():
+    """Reconstruye tratamiento/observaciones desde las notas (los cambios de estado se pierden)"""
+    bind = op.get_bind()
+    acumulado = {}
+    filas = bind.execute(
+        sa.select(notas).where(notas.c.tipo.in_(list(COLUMNAS_NOTA.values())))
+        .order_by(notas.c.emergencia_id, notas.c.created_at)
+    ).fetchall()
+    for fila in filas:
+        acumulado.setdefault((fila.emergencia_id, fila.tipo), []).append((fila.created_at, fila.texto))
+
+    valores = {}
+    for (emergencia_id, tipo), lista in acumulado.items():
+        columna = next(c for c, t in COLUMNAS_NOTA.items() if t == tipo)
+        valores.setdefault(emergencia_id, {'_id': emergencia_id, 'tratamiento': None, 'observaciones': None})
+        valores[emergencia_id][columna] = unir_notas(lista)
+    if valores:
+        bind.execute(
+            emergencias.update().where(emergencias.c.id == sa.bindparam('_id'))
+            .values(tratamiento=sa.bindparam('tratamiento'), observaciones=sa.bindparam('observaciones')),
+            list(valores.values())
+        )
+
+
+def upgrade():
+    op.create_table('notas_emergencia',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('emergencia_id', sa.Integer(), nullable=False),
+        sa.Column('tipo', sa.String(length=20), nullable=False),
+        sa.Column('texto', sa.Text(), nullable=False),
+        sa.Column('usuario_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['emergencia_id'], ['emergencias.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_notas_emergencia_fecha', 'notas_emergencia', ['emergencia_id', 'created_at'], unique=False)
+
+    _separar_texto_acumulado()
+
+
+def downgrade():
+    _unir_notas()
+
+    op.drop_index('idx_notas_emergencia_fecha', table_name='notas_emergencia')
+    op.drop_table('notas_emergencia')
@@ -0,0 +1,31 @@
+"""estadisticas_contadores
+
+Revision ID: d1a7c3e5b9f4
+Revises: c4e8a2d6f1b3
+Create Date: 2026-10-17 11:02:18.530771
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd1a7c3e5b9f4'
+down_revision = 'c4e8a2d6f1b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Contadores del dashboard (saas/utils/estadisticas.py).
+    # Tras aplicar: python scripts/reconciliar_estadisticas.py para cargarlos.
+    op.create_table('estadisticas_contadores',
+    sa.Column('clave', sa.String(length=100), nullable=False),
+    sa.Column('valor', sa.Integer(), nullable=False),
+    sa.Column('actualizado', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('clave')
+    )
+
+
+def downgrade():
+    op.drop_table('estadisticas_contadores')
@@ -0,0 +1,49 @@
+"""movimientos de stock (kardex)
+
+Revision ID: d1f6b8a3c9e4
+Revises: 7a4c2f9e1d36
+Create Date: 2026-10-18 01:12:48.220913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd1f6b8a3c9e4'
+down_revision = '7a4c2f9e1d36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('movimientos_stock',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('medicamento_id', sa.Integer(), nullable=False),
+    sa.Column('tipo', sa.String(length=20), nullable=False),
+    sa.Column('cantidad', sa.Integer(), nullable=False),
+    sa.Column('saldo', sa.Integer(), nullable=False),
+    sa.Column('motivo', sa.String(length=200), nullable=True),
+    sa.Column('usuario_id', sa.Integer(), nullable=True),
+    sa.Column('fecha', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['medicamento_id'], ['medicamentos.id'], ),
+    sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('movimientos_stock', schema=None) as batch_op:
+        batch_op.create_index('idx_movimientos_stock_medicamento_fecha', ['medicamento_id', 'fecha'], unique=False)
+
+    # Saldo inicial: un ajuste por medicamento con el stock actual, para
+    # que la suma del kardex coincida con cantidad_stock
+    op.execute(
+        "INSERT INTO movimientos_stock (medicamento_id, tipo, cantidad, saldo, motivo, fecha) "
+        "SELECT id, 'ajuste', cantidad_stock, cantidad_stock, 'Saldo inicial', CURRENT_TIMESTAMP "
+        "FROM medicamentos WHERE cantidad_stock IS NOT NULL AND cantidad_stock <> 0"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('movimientos_stock', schema=None) as batch_op:
+        batch_op.drop_index('idx_movimientos_stock_medicamento_fecha')
+
+    op.drop_table('movimientos_stock')
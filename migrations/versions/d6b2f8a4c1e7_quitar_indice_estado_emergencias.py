@@ -0,0 +1,27 @@
+"""quitar_indice_estado_emergencias
+
+Revision ID: d6b2f8a4c1e7
+Revises: b9e4a2c6f3d8
+Create Date: 2026-10-17 17:58:31.204716
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd6b2f8a4c1e7'
+down_revision = 'b9e4a2c6f3d8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # ix_emergencias_estado (creado por db.create_all, no por una migración)
+    # empata en costo con el índice parcial idx_emergencias_cola y el
+    # planificador podía elegirlo para la cola activa
+    op.execute('DROP INDEX IF EXISTS ix_emergencias_estado')
+
+
+def downgrade():
+    op.create_index('ix_emergencias_estado', 'emergencias', ['estado'], unique=False)
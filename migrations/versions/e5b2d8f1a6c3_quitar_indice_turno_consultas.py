@@ -0,0 +1,29 @@
+"""quitar_indice_turno_consultas
+
+Revision ID: e5b2d8f1a6c3
+Revises: d1a7c3e5b9f4
+Create Date: 2026-10-17 13:05:44.902315
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b2d8f1a6c3'
+down_revision = 'd1a7c3e5b9f4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 'turno' solo tiene dos valores: el índice simple no filtra casi nada y
+    # el planificador lo preferiría sobre idx_consultas_fecha_turno
+    # (fecha_hora, turno), que resuelve el conteo por día y turno.
+    with op.batch_alter_table('consultas', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_consultas_turno'))
+
+
+def downgrade():
+    with op.batch_alter_table('consultas', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_consultas_turno'), ['turno'], unique=False)
@@ -0,0 +1,38 @@
+"""tiempos_emergencia_dia
+
+Revision ID: e8c4a1f6b3d9
+Revises: c5a9e3f7d2b1
+Create Date: 2026-10-17 18:42:15.337621
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8c4a1f6b3d9'
+down_revision = 'c5a9e3f7d2b1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('tiempos_emergencia_dia',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('fecha', sa.Date(), nullable=False),
+        sa.Column('triage_nivel', sa.Integer(), nullable=False),
+        sa.Column('tipo', sa.String(length=50), nullable=False),
+        sa.Column('hora', sa.Integer(), nullable=False),
+        sa.Column('metrica', sa.String(length=20), nullable=False),
+        sa.Column('cubeta', sa.Integer(), nullable=False),
+        sa.Column('cantidad', sa.Integer(), nullable=False),
+        sa.Column('suma_minutos', sa.Float(), nullable=False),
+        sa.Column('max_minutos', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('fecha', 'triage_nivel', 'tipo', 'hora', 'metrica', 'cubeta',
+                            name='uq_tiempos_emergencia_dia')
+    )
+
+
+def downgrade():
+    op.drop_table('tiempos_emergencia_dia')
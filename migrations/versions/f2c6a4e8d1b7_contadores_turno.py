@@ -0,0 +1,34 @@
+"""contadores_turno
+
+Revision ID: f2c6a4e8d1b7
+Revises: e5b2d8f1a6c3
+Create Date: 2026-10-17 14:22:10.518734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c6a4e8d1b7'
+down_revision = 'e5b2d8f1a6c3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Una fila por (día local, turno); la crea la primera consulta del turno
+    # partiendo del mayor numero_consulta ya registrado, así que no hace falta
+    # poblarla aquí.
+    op.create_table('contadores_turno',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('fecha', sa.Date(), nullable=False),
+    sa.Column('turno', sa.String(length=20), nullable=False),
+    sa.Column('ultimo_numero', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('fecha', 'turno', name='uq_contadores_turno_fecha_turno')
+    )
+
+
+def downgrade():
+    op.drop_table('contadores_turno')
@@ -0,0 +1,29 @@
+"""internado_activo_por_cama
+
+Revision ID: f9d5b2e7a4c8
+Revises: e8c4a1f6b3d9
+Create Date: 2026-10-17 19:30:44.871205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f9d5b2e7a4c8'
+down_revision = 'e8c4a1f6b3d9'
+branch_labels = None
+depends_on = None
+
+ACTIVO = sa.text("estado = 'activo'")
+
+
+def upgrade():
+    # Índice único parcial: como máximo un internado activo por cama
+    # (falla si ya hay camas con dos internados activos: deben depurarse antes)
+    op.create_index('uq_internados_cama_activo', 'internados_registro', ['cama_id'],
+                    unique=True, sqlite_where=ACTIVO, postgresql_where=ACTIVO)
+
+
+def downgrade():
+    op.drop_index('uq_internados_cama_activo', table_name='internados_registro')
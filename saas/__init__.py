@@ -3,22 +3,32 @@ Sistema SaaS - Hospital Tipo 1 Uracoa
 J&S Software Inteligentes
 Desarrollado por: Santos & Team
 """
+import sys
+import click
 from flask import Flask
 from datetime import datetime
 from saas.config import config
 from saas.extensions import db, login_manager, migrate, mail, csrf, cache, compress
 
 
+def _ejecutando_migraciones():
+    """
+    True si la app se carga para un comando 'flask db ...'.
+
+    Flask carga la app antes de saber qué subcomando se ejecuta, así que se
+    mira la línea de comandos. Si create_all corriera antes de 'flask db
+    upgrade', crearía las tablas nuevas y el op.create_table de su
+    migración fallaría con "table already exists".
+    """
+    return click.get_current_context(silent=True) is not None and 'db' in sys.argv[1:]
+
+
 def create_app(config_name='default'):
     """Factory para crear la aplicación Flask"""
     
     app = Flask(__name__)
     app.config.from_object(config[config_name])
     
-    # Configurar caché para rendimiento
-    app.config['CACHE_TYPE'] = 'SimpleCache'  # En producción usar Redis/Memcached
-    app.config['CACHE_DEFAULT_TIMEOUT'] = 300  # 5 minutos
-    
     # Inicializar extensiones
     db.init_app(app)
     login_manager.init_app(app)
@@ -30,6 +40,8 @@ def create_app(config_name='default'):
     
     # Configurar user_loader para Flask-Login
     from saas.models import Usuario
+    from saas.utils import estadisticas  # noqa: F401 (hooks de los contadores del dashboard)
+    from saas.utils import cache_etiquetas  # noqa: F401 (invalidación del caché al confirmar)
     
     @login_manager.user_loader
     def load_user(user_id):
@@ -58,9 +70,10 @@ def create_app(config_name='default'):
     app.register_blueprint(laboratorio_bp, url_prefix='/laboratorio')
     app.register_blueprint(medicamentos_bp, url_prefix='/medicamentos')
     
-    # Crear tablas si no existen
-    with app.app_context():
-        db.create_all()
+    # Crear tablas si no existen (salvo en 'flask db ...': las crea Alembic)
+    if not _ejecutando_migraciones():
+        with app.app_context():
+            db.create_all()
     
     # Context processors
     @app.context_processor
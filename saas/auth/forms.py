@@ -6,6 +6,7 @@ from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, BooleanField, SubmitField, SelectField
 from wtforms.validators import DataRequired, Email, EqualTo, Length, ValidationError
 from saas.models import Usuario
+from saas.utils.cedula import normalizar_cedula
 
 
 class LoginForm(FlaskForm):
@@ -79,7 +80,9 @@ class RegistroForm(FlaskForm):
     
     def validate_cedula(self, cedula):
         """Validar que la cédula no exista"""
-        usuario = Usuario.query.filter_by(cedula=cedula.data).first()
+        usuario = Usuario.query.filter_by(
+            cedula_normalizada=normalizar_cedula(cedula.data)
+        ).first()
         if usuario:
             raise ValidationError('Esta cédula ya está registrada.')
 
@@ -63,6 +63,17 @@ class Config:
     COMPRESS_MIMETYPES = ['text/html', 'text/css', 'text/javascript', 'application/json']
     COMPRESS_LEVEL = 6
     COMPRESS_MIN_SIZE = 500  # Comprimir archivos mayores a 500 bytes
+    
+    # Caché: LRU por proceso (L1) + caché compartido entre workers (L2)
+    CACHE_TYPE = os.environ.get('CACHE_TYPE') or 'saas.utils.cache_dos_niveles.CacheDosNiveles'
+    CACHE_DEFAULT_TIMEOUT = 300  # 5 minutos
+    CACHE_L2 = os.environ.get('CACHE_L2') or 'simple'  # redis, sqlite, filesystem, simple
+    CACHE_REDIS_URL = os.environ.get('REDIS_URL')
+    CACHE_DIR = os.path.join(os.path.dirname(basedir), 'instance', 'cache')
+    CACHE_SQLITE_PATH = os.path.join(os.path.dirname(basedir), 'instance', 'cache.sqlite')
+    CACHE_THRESHOLD = int(os.environ.get('CACHE_THRESHOLD') or 5000)
+    CACHE_L1_MAX_ITEMS = int(os.environ.get('CACHE_L1_MAX_ITEMS') or 1000)
+    CACHE_L1_TIMEOUT = int(os.environ.get('CACHE_L1_TIMEOUT') or 30)  # segundos
 
 
 class DevelopmentConfig(Config):
@@ -76,6 +87,8 @@ class ProductionConfig(Config):
     DEBUG = False
     SESSION_COOKIE_SECURE = True
     SQLALCHEMY_ECHO = False
+    # Workers de gunicorn: L2 compartido (Redis si hay REDIS_URL, si no archivo SQLite)
+    CACHE_L2 = os.environ.get('CACHE_L2') or ('redis' if os.environ.get('REDIS_URL') else 'sqlite')
 
 
 class TestingConfig(Config):
@@ -1,6 +1,14 @@
 from datetime import datetime
+import numpy as np
 from saas.extensions import db
-from sqlalchemy import func
+from sqlalchemy import event, func, select, update
+from saas.utils.fechas import TURNOS, ahora_local, hoy_local, filtro_dia
+from saas.utils.secuencias import siguiente_valor, valor_actual
+from saas.utils import signos_vitales
+
+# Máximo de consultas por turno (mañana/tarde)
+LIMITE_POR_TURNO = 20
+
 
 class Consulta(db.Model):
     """
@@ -8,12 +16,22 @@ class Consulta(db.Model):
     Sistema de turnos: máximo 20 consultas por turno (mañana/tarde).
     """
     __tablename__ = 'consultas'
+    __table_args__ = (
+        # Paginación por keyset (fecha_hora DESC, id DESC)
+        db.Index('idx_consultas_fecha_id', 'fecha_hora', 'id'),
+        # Migración 569d9341e509: conteo por día/turno e historial del paciente
+        db.Index('idx_consultas_fecha_turno', 'fecha_hora', 'turno'),
+        db.Index('idx_consultas_paciente_fecha', 'paciente_id', 'fecha_hora'),
+        # Lista de trabajo por riesgo (severidad DESC, fecha_hora DESC, id DESC)
+        db.Index('idx_consultas_severidad_fecha', 'severidad', 'fecha_hora', 'id'),
+        db.Index('idx_consultas_medico_severidad', 'medico_id', 'severidad', 'fecha_hora', 'id'),
+    )
     
     # Identificadores
     id = db.Column(db.Integer, primary_key=True)
     
     # Control de turnos (J&S Software Inteligentes)
-    turno = db.Column(db.String(20), default='mañana', nullable=False, index=True)  # 'mañana' o 'tarde'
+    turno = db.Column(db.String(20), default='mañana', nullable=False)  # 'mañana' o 'tarde' (ver idx_consultas_fecha_turno)
     numero_consulta = db.Column(db.Integer, nullable=False)  # Consecutivo diario por turno (1-20)
     
     # Relaciones
@@ -43,6 +61,11 @@ class Consulta(db.Model):
     sector = db.Column(db.String(120), nullable=True, index=True)  # Sector o comunidad rural
     nivel_conciencia = db.Column(db.String(50), nullable=True)  # Alerta, Somnoliento, Inconsciente
     
+    # Alertas calculadas al guardar (ver actualizar_alertas y saas.utils.signos_vitales)
+    imc_valor = db.Column(db.Float, nullable=True)
+    alertas = db.Column(db.Integer, default=0, nullable=False)  # Un bit por regla (ALERTA_*)
+    severidad = db.Column(db.Integer, default=0, nullable=False)  # Suma de pesos de las alertas
+    
     # Estado
     estado = db.Column(db.String(20), default='abierta', nullable=False, index=True)  # abierta, cerrada
     fecha_cierre = db.Column(db.DateTime, nullable=True)  # Fecha de cierre de consulta
@@ -66,41 +89,26 @@ class Consulta(db.Model):
         Mañana: 07:00 - 12:00
         Tarde: 13:30 - 17:00
         """
-        from datetime import timezone, timedelta
-        # Hora de Venezuela (UTC-4)
-        tz_venezuela = timezone(timedelta(hours=-4))
-        hora_actual = datetime.now(tz_venezuela).hour
-        minuto_actual = datetime.now(tz_venezuela).minute
+        minuto_actual = ahora_local().time().replace(second=0, microsecond=0)
         
-        # Mañana: 07:00 - 12:00
-        if 7 <= hora_actual < 12:
-            return 'mañana'
-        elif hora_actual == 12 and minuto_actual == 0:
-            return 'mañana'
-        # Tarde: 13:30 - 17:00
-        elif (hora_actual == 13 and minuto_actual >= 30) or (14 <= hora_actual < 17):
-            return 'tarde'
-        elif hora_actual == 17 and minuto_actual == 0:
-            return 'tarde'
-        else:
-            raise ValueError("Fuera del horario de atención. Horarios: Mañana (07:00-12:00), Tarde (13:30-17:00)")
+        for turno, (inicio, fin) in TURNOS.items():
+            if inicio <= minuto_actual <= fin:
+                return turno
+        
+        raise ValueError("Fuera del horario de atención. Horarios: Mañana (07:00-12:00), Tarde (13:30-17:00)")
     
     @staticmethod
     def contar_consultas_turno(turno, fecha=None):
         """
-        Cuenta cuántas consultas hay en un turno específico de una fecha.
+        Cuenta cuántas consultas hay en un turno específico de una fecha
+        (día local de Venezuela; hoy si no se indica).
         Retorna el número de consultas existentes.
         """
-        if fecha is None:
-            from datetime import timezone, timedelta
-            # Hora de Venezuela (UTC-4)
-            tz_venezuela = timezone(timedelta(hours=-4))
-            fecha = datetime.now(tz_venezuela).date()
-        
-        return Consulta.query.filter(
-            func.date(Consulta.fecha_hora) == fecha,
+        # Rango UTC del día + turno: se resuelve solo con idx_consultas_fecha_turno
+        return db.session.query(func.count(Consulta.id)).filter(
+            filtro_dia(Consulta.fecha_hora, fecha or hoy_local()),
             Consulta.turno == turno
-        ).count()
+        ).scalar()
     
     @staticmethod
     def verificar_disponibilidad_turno(turno=None):
@@ -108,12 +116,13 @@ class Consulta(db.Model):
         Verifica si hay espacio disponible en el turno.
         Retorna: (disponible: bool, consultas_actuales: int, limite: int)
         """
-        LIMITE_POR_TURNO = 20
-        
         if turno is None:
             turno = Consulta.detectar_turno_actual()
         
-        consultas_actuales = Consulta.contar_consultas_turno(turno)
+        # O(1): lectura de la fila del contador; sin fila aún, se cuenta por índice
+        consultas_actuales = ContadorTurno.actual(hoy_local(), turno)
+        if consultas_actuales is None:
+            consultas_actuales = Consulta.contar_consultas_turno(turno)
         disponible = consultas_actuales < LIMITE_POR_TURNO
         
         return disponible, consultas_actuales, LIMITE_POR_TURNO
@@ -121,12 +130,13 @@ class Consulta(db.Model):
     def asignar_turno_y_numero(self):
         """
         Asigna automáticamente el turno y número correlativo.
-        Debe llamarse ANTES de db.session.add()
+        Debe llamarse justo ANTES de db.session.add() y del commit: el número
+        se toma dentro de la transacción actual (ver ContadorTurno).
         """
         # Detectar turno según hora
         self.turno = Consulta.detectar_turno_actual()
         
-        # Verificar disponibilidad
+        # Rechazo rápido sin escribir (la garantía real es el UPDATE condicional)
         disponible, consultas_actuales, limite = Consulta.verificar_disponibilidad_turno(self.turno)
         
         if not disponible:
@@ -135,80 +145,105 @@ class Consulta(db.Model):
                 f"Actualmente hay {consultas_actuales} consultas registradas."
             )
         
-        # Asignar número correlativo (siguiente disponible)
-        self.numero_consulta = consultas_actuales + 1
+        # Siguiente número del turno, tomado atómicamente con el límite en la misma sentencia
+        numero = ContadorTurno.tomar_numero(hoy_local(), self.turno, limite)
+        if numero is None:
+            raise ValueError(
+                f"❌ Límite de {limite} consultas para el turno de {self.turno} ya fue alcanzado. "
+                f"Actualmente hay {limite} consultas registradas."
+            )
+        self.numero_consulta = numero
     
     def validar_antes_guardar(self):
         """Validaciones clínicas antes de guardar en base de datos"""
-        if self.presion_diastolica and self.presion_sistolica:
-            if self.presion_diastolica >= self.presion_sistolica:
-                raise ValueError("La presión diastólica debe ser menor que la sistólica")
+        signos_vitales.validar(signos_vitales.signos_de(self))
+    
+    def actualizar_alertas(self):
+        """Recalcula imc_valor, alertas y severidad (se llama al insertar/actualizar)"""
+        self.imc_valor = self.imc
+        self.alertas, self.severidad = signos_vitales.evaluar(signos_vitales.signos_de(self))
+    
+    @staticmethod
+    def recalcular_alertas(tamano_lote=1000):
+        """
+        Recalcula imc_valor, alertas y severidad de todas las consultas
+        (backfill o cambio de reglas). Recorre por id en lotes, evalúa cada
+        lote vectorizado y solo escribe las filas que cambian.
+        Retorna (revisadas, actualizadas).
+        """
+        columnas = (Consulta.id, Consulta.temperatura, Consulta.presion_sistolica,
+                    Consulta.presion_diastolica, Consulta.frecuencia_cardiaca, Consulta.saturacion,
+                    Consulta.peso, Consulta.altura, Consulta.imc_valor, Consulta.alertas, Consulta.severidad)
+        revisadas = actualizadas = 0
+        ultimo_id = 0
+        
+        while True:
+            filas = db.session.execute(
+                select(*columnas).where(Consulta.id > ultimo_id).order_by(Consulta.id).limit(tamano_lote)
+            ).all()
+            if not filas:
+                break
+            
+            lote = dict(zip([c.key for c in columnas], zip(*filas)))
+            imc = signos_vitales.calcular_imc_lote(lote['peso'], lote['altura'])
+            alertas, severidad = signos_vitales.evaluar_lote({
+                campo: lote[campo] for campo in signos_vitales.CAMPOS
+            })
+            
+            imc_guardado = signos_vitales.a_arreglo(lote['imc_valor'])
+            distinto = (
+                (alertas != np.asarray(lote['alertas'])) |
+                (severidad != np.asarray(lote['severidad'])) |
+                ~((imc == imc_guardado) | (np.isnan(imc) & np.isnan(imc_guardado)))
+            )
+            cambios = [
+                {
+                    'id': lote['id'][i],
+                    'imc_valor': None if np.isnan(imc[i]) else float(imc[i]),
+                    'alertas': int(alertas[i]),
+                    'severidad': int(severidad[i]),
+                }
+                for i in np.flatnonzero(distinto)
+            ]
+            
+            if cambios:
+                # UPDATE por clave primaria en lote (executemany)
+                db.session.execute(update(Consulta), cambios)
+            db.session.commit()
+            
+            revisadas += len(filas)
+            actualizadas += len(cambios)
+            ultimo_id = filas[-1].id
         
-        if self.peso and self.altura:
-            altura_metros = self.altura / 100
-            imc = self.peso / (altura_metros ** 2)
-            if imc < 10 or imc > 80:
-                raise ValueError("IMC fuera de rango razonable (10-80)")
+        return revisadas, actualizadas
     
     @property
     def imc(self):
         """Calcula el Índice de Masa Corporal (IMC)"""
-        if self.peso and self.altura and self.altura > 0:
-            altura_metros = self.altura / 100
-            return round(self.peso / (altura_metros ** 2), 2)
-        return None
+        return signos_vitales.calcular_imc(self.peso, self.altura)
     
     @property
     def alerta_riesgo(self):
         """Determina si hay alertas de riesgo según signos vitales"""
-        if self.temperatura and self.temperatura >= 38:
-            return True
-        if self.presion_sistolica and self.presion_sistolica >= 140:
-            return True
-        if self.presion_diastolica and self.presion_diastolica >= 90:
-            return True
-        if self.imc and self.imc > 30:
-            return True
-        return False
+        alertas, _ = signos_vitales.evaluar(signos_vitales.signos_de(self))
+        return bool(alertas)
     
     @property
     def alertas_detalle(self):
         """Retorna lista de alertas específicas con tipo y mensaje"""
-        alertas = []
-        
-        if self.temperatura and self.temperatura >= 38:
-            alertas.append({
-                'tipo': 'fiebre',
-                'mensaje': f'Fiebre: {self.temperatura}°C',
-                'clase': 'danger',
-                'icono': 'thermometer-high'
-            })
-        
-        if self.presion_sistolica and self.presion_sistolica >= 140:
-            alertas.append({
-                'tipo': 'hipertension',
-                'mensaje': f'Presión sistólica elevada: {self.presion_sistolica} mmHg',
-                'clase': 'warning',
-                'icono': 'heart-pulse'
-            })
-        
-        if self.presion_diastolica and self.presion_diastolica >= 90:
-            alertas.append({
-                'tipo': 'hipertension',
-                'mensaje': f'Presión diastólica elevada: {self.presion_diastolica} mmHg',
-                'clase': 'warning',
-                'icono': 'heart-pulse'
-            })
-        
-        if self.imc and self.imc > 30:
-            alertas.append({
-                'tipo': 'obesidad',
-                'mensaje': f'IMC elevado: {self.imc} (Obesidad)',
-                'clase': 'info',
-                'icono': 'person'
-            })
-        
-        return alertas
+        signos = signos_vitales.signos_de(self)
+        alertas, _ = signos_vitales.evaluar(signos)
+        return signos_vitales.detalle(alertas, signos)
+    
+    @property
+    def total_alertas(self):
+        """Número de alertas guardadas (para listados, sin recalcular)"""
+        return signos_vitales.contar_alertas(self.alertas)
+    
+    @property
+    def nivel_severidad(self):
+        """(etiqueta, clase) según la severidad guardada"""
+        return signos_vitales.nivel_severidad(self.severidad)
     
     @property
     def presion_arterial(self):
@@ -231,3 +266,57 @@ class Consulta(db.Model):
         else:
             return 'Obesidad'
 
+
+@event.listens_for(Consulta, 'before_insert')
+@event.listens_for(Consulta, 'before_update')
+def _guardar_alertas(mapper, connection, consulta):
+    consulta.actualizar_alertas()
+
+
+class ContadorTurno(db.Model):
+    """
+    Último número de consulta entregado por día local y turno.
+
+    Una fila por (fecha, turno), protegida por restricción UNIQUE. El número
+    se toma con UPDATE ... SET ultimo_numero = ultimo_numero + 1 WHERE
+    ultimo_numero < límite RETURNING (saas.utils.secuencias): dos recepciones
+    simultáneas nunca obtienen el mismo número ni pasan del límite.
+    """
+    __tablename__ = 'contadores_turno'
+    __table_args__ = (
+        db.UniqueConstraint('fecha', 'turno', name='uq_contadores_turno_fecha_turno'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    fecha = db.Column(db.Date, nullable=False)  # Día local de Venezuela
+    turno = db.Column(db.String(20), nullable=False)
+    ultimo_numero = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ContadorTurno {self.fecha} {self.turno}: {self.ultimo_numero}>'
+
+    @staticmethod
+    def tomar_numero(fecha, turno, limite=LIMITE_POR_TURNO):
+        """
+        Siguiente número del turno, o None si ya se entregaron 'limite'.
+        Al crear la fila parte del mayor número ya registrado ese día y turno
+        (consultas previas al contador).
+        """
+        existentes = db.session.query(
+            func.coalesce(func.max(Consulta.numero_consulta), 0)
+        ).filter(
+            filtro_dia(Consulta.fecha_hora, fecha),
+            Consulta.turno == turno
+        ).scalar_subquery()
+
+        return siguiente_valor(
+            ContadorTurno.__table__,
+            {'fecha': fecha, 'turno': turno},
+            limite=limite,
+            inicial=existentes,
+        )
+
+    @staticmethod
+    def actual(fecha, turno):
+        """Último número entregado, o None si el turno aún no tiene contador"""
+        return valor_actual(ContadorTurno.__table__, {'fecha': fecha, 'turno': turno})
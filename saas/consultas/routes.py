@@ -1,9 +1,13 @@
 
 from flask import render_template, redirect, url_for, flash, request
 from flask_login import login_required, current_user
-from datetime import datetime, date
-from saas.extensions import db, cache
+from datetime import datetime
+from saas.extensions import db
 from saas.models import Paciente
+from saas.utils.busqueda import filtro_busqueda_pacientes
+from saas.utils.paginacion import paginar_keyset
+from saas.utils.cache_etiquetas import cache_por_etiquetas
+from saas.utils.fechas import hoy_local, filtro_dia
 from sqlalchemy.orm import joinedload
 from . import consultas_bp
 from .models import Consulta
@@ -15,11 +19,11 @@ from .forms import ConsultaForm
 @login_required
 def registrar_consulta():
     form = ConsultaForm()
-    hoy = date.today()
+    hoy = hoy_local()
 
     def obtener_consultas_hoy():
         return Consulta.query.filter(
-            db.func.date(Consulta.fecha_hora) == hoy
+            filtro_dia(Consulta.fecha_hora, hoy)
         ).order_by(Consulta.fecha_hora.asc()).all()
 
     consultas_hoy = obtener_consultas_hoy()
@@ -52,9 +56,9 @@ def registrar_consulta():
                 estado=form.estado.data
             )
 
-            # Lógica existente del sistema
-            consulta.asignar_turno_y_numero()
+            # Lógica existente del sistema (el número se toma al final, en esta transacción)
             consulta.validar_antes_guardar()
+            consulta.asignar_turno_y_numero()
 
             db.session.add(consulta)
             db.session.commit()
@@ -74,8 +78,8 @@ def registrar_consulta():
     )
 from flask import render_template, redirect, url_for, flash, request
 from flask_login import login_required, current_user
-from datetime import datetime, date
-from saas.extensions import db, cache
+from datetime import datetime
+from saas.extensions import db
 from saas.models import Paciente
 from sqlalchemy.orm import joinedload
 from . import consultas_bp
@@ -97,10 +101,12 @@ def index():
     sector = request.args.get('sector', '', type=str)
     turno = request.args.get('turno', '', type=str)
     fecha = request.args.get('fecha', None, type=str)
+    severidad_min = request.args.get('severidad', None, type=int)
+    orden = request.args.get('orden', '', type=str)
 
     # Si el filtro de fecha está vacío, siempre mostrar las consultas del día actual
     if not fecha:
-        fecha = date.today().isoformat()
+        fecha = hoy_local().isoformat()
 
     # Query base con EAGER LOADING para evitar N+1
     query = Consulta.query.options(
@@ -112,7 +118,7 @@ def index():
     if fecha:
         try:
             fecha_obj = datetime.strptime(fecha, '%Y-%m-%d').date()
-            query = query.filter(db.func.date(Consulta.fecha_hora) == fecha_obj)
+            query = query.filter(filtro_dia(Consulta.fecha_hora, fecha_obj))
         except ValueError:
             pass
 
@@ -121,14 +127,9 @@ def index():
         query = query.filter_by(turno=turno)
 
     # Filtro por paciente (búsqueda por nombre o cédula)
-    if paciente_query:
-        query = query.join(Paciente).filter(
-            db.or_(
-                Paciente.nombre.ilike(f'%{paciente_query}%'),
-                Paciente.apellido.ilike(f'%{paciente_query}%'),
-                Paciente.cedula.ilike(f'%{paciente_query}%')
-            )
-        )
+    filtro_paciente = filtro_busqueda_pacientes(paciente_query)
+    if filtro_paciente is not None:
+        query = query.join(Paciente).filter(filtro_paciente)
 
     # Filtro por médico
     if medico_id:
@@ -145,18 +146,27 @@ def index():
     if sector:
         query = query.filter(Consulta.sector.ilike(f'%{sector}%'))
 
-    # Ordenar y paginar
-    page = request.args.get('page', 1, type=int)
-    per_page = 20
+    # Filtro por severidad mínima (columna guardada al registrar)
+    if severidad_min:
+        query = query.filter(Consulta.severidad >= severidad_min)
+
+    # Ordenar y paginar (keyset); 'severidad' = lista de trabajo por riesgo,
+    # resuelta con idx_consultas_medico_severidad / idx_consultas_severidad_fecha
+    if orden == 'severidad':
+        orden_keyset = [Consulta.severidad.desc(), Consulta.fecha_hora.desc(), Consulta.id.desc()]
+    else:
+        orden = ''
+        orden_keyset = [Consulta.fecha_hora.desc(), Consulta.id.desc()]
 
-    pagination = query.order_by(Consulta.fecha_hora.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
+    pagination = paginar_keyset(
+        query, orden_keyset,
+        cursor=request.args.get('cursor'), per_page=20
     )
 
     consultas = pagination.items
 
-    # Obtener lista de médicos para el filtro (CACHEADA)
-    @cache.cached(timeout=300, key_prefix='medicos_activos')
+    # Obtener lista de médicos para el filtro (CACHEADA hasta que cambien los usuarios)
+    @cache_por_etiquetas('usuarios', timeout=86400, key_prefix='medicos_activos')
     def get_medicos_activos():
         from saas.models import Usuario
         return Usuario.query.filter_by(
@@ -177,7 +187,9 @@ def index():
             'estado': estado,
             'sector': sector,
             'turno': turno,
-            'fecha': fecha
+            'fecha': fecha,
+            'severidad': severidad_min,
+            'orden': orden
         }
     )
 
@@ -232,21 +244,6 @@ def crear():
             return render_template('form.html', form=form, titulo='Nueva Consulta', 
                                    turno_info=turno_info)
         
-        # Verificar disponibilidad nuevamente antes de crear
-        try:
-            turno_actual = Consulta.detectar_turno_actual()
-            disponible, count, limite = Consulta.verificar_disponibilidad_turno(turno_actual)
-            
-            if not disponible:
-                flash(f'❌ Límite de {limite} consultas alcanzado para el turno de {turno_actual}. '
-                      f'Por favor, intente en el próximo turno.', 'danger')
-                return render_template('form.html', form=form, titulo='Nueva Consulta', 
-                                       turno_info=turno_info)
-        except ValueError as e:
-            flash(f'❌ {str(e)}', 'danger')
-            return render_template('form.html', form=form, titulo='Nueva Consulta', 
-                                   turno_info=turno_info)
-        
         consulta = Consulta(
             paciente_id=paciente_id,
             medico_id=current_user.id,
@@ -263,19 +260,20 @@ def crear():
             estado='abierta'
         )
         
-        # Asignar turno y número de consulta automáticamente
+        # Validar antes de guardar
         try:
-            consulta.asignar_turno_y_numero()
+            consulta.validar_antes_guardar()
         except ValueError as e:
-            flash(f'❌ {str(e)}', 'danger')
+            flash(f'Error de validación: {str(e)}', 'danger')
             return render_template('form.html', form=form, titulo='Nueva Consulta', 
                                    turno_info=turno_info)
         
-        # Validar antes de guardar
+        # Asignar turno y número al final: el número se toma en esta transacción
         try:
-            consulta.validar_antes_guardar()
+            consulta.asignar_turno_y_numero()
         except ValueError as e:
-            flash(f'Error de validación: {str(e)}', 'danger')
+            db.session.rollback()
+            flash(f'❌ {str(e)}', 'danger')
             return render_template('form.html', form=form, titulo='Nueva Consulta', 
                                    turno_info=turno_info)
         
@@ -0,0 +1,184 @@
+"""
+Cola de prioridad de triage en memoria
+Sistema SaaS - Hospital Tipo 1 Uracoa
+
+Ordenar solo por (triage_nivel, hora_ingreso) deja esperando sin límite a
+un nivel 4 mientras sigan llegando niveles 3. Aquí cada caso tiene un
+plazo virtual: hora de ingreso + tiempo objetivo de su nivel (Manchester).
+El montículo se ordena por ese plazo, así que la espera "envejece" a los
+casos de menor prioridad: un nivel 4 que lleva 2 horas pasa delante de un
+nivel 3 recién llegado. El nivel 1 (atención inmediata) va siempre
+primero: ninguna espera acumulada lo adelanta. Como el plazo no cambia con
+el tiempo, el orden del montículo nunca hay que recalcularlo.
+
+Cada proceso (worker) tiene su propia cola:
+- se carga de la base de datos (solo casos activos, índice parcial
+  idx_emergencias_cola) la primera vez que se usa;
+- crear/cambiar_estado la actualizan al confirmar, sin volver a consultar
+  (los flujos en espera reciben el cambio al instante);
+- los cambios hechos por otros workers se detectan comparando las
+  versiones de etiqueta de 'emergencias'/'pacientes' (lectura de caché,
+  no de la base de datos) y provocan una recarga.
+
+Los flujos SSE esperan sobre esta cola, no sobre la BD: la revisión y la
+espera son las de saas.utils.sse.AvisosCambios.
+"""
+import heapq
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy.orm import Session, joinedload
+from saas.extensions import db
+from saas.utils.cache_etiquetas import versiones_etiquetas
+from saas.utils.sse import AvisosCambios
+from .models import Emergencia
+
+# Tiempo objetivo de atención por nivel de triage, en minutos (Manchester)
+TIEMPO_OBJETIVO = {1: 0, 2: 10, 3: 60, 4: 120, 5: 240}
+
+# Tablas cuyos cambios (en cualquier worker) obligan a recargar
+ETIQUETAS = ('emergencias', 'pacientes')
+
+# Segundos máximos sin recarga completa (red de seguridad)
+RECARGA_MAXIMA = 300
+
+
+def plazo_atencion(triage_nivel, hora_ingreso):
+    """Hora límite virtual de atención del caso (clave del montículo)"""
+    return hora_ingreso + timedelta(minutes=TIEMPO_OBJETIVO.get(triage_nivel, max(TIEMPO_OBJETIVO.values())))
+
+
+class ColaTriage(AvisosCambios):
+    """Montículo de casos activos ordenado por plazo virtual de atención"""
+
+    ETIQUETAS = ETIQUETAS
+    REFRESCO = RECARGA_MAXIMA
+
+    def __init__(self):
+        super().__init__()
+        self._heap = []        # [no_critico, plazo, nivel, id, datos] (datos=None: descartada)
+        self._entradas = {}    # id -> entrada vigente del montículo
+
+    # ---------- Montículo (llamar con el lock tomado) ----------
+
+    def _agregar(self, datos):
+        nivel = datos['triage_nivel']
+        entrada = [nivel != 1, datos['plazo'], nivel, datos['id'], datos]
+        self._entradas[datos['id']] = entrada
+        heapq.heappush(self._heap, entrada)
+
+    def _quitar(self, emergencia_id):
+        entrada = self._entradas.pop(emergencia_id, None)
+        if entrada is not None:
+            entrada[-1] = None  # Borrado perezoso: se descarta al llegar a la cima
+        while self._heap and self._heap[0][-1] is None:
+            heapq.heappop(self._heap)
+
+    @staticmethod
+    def _datos(emergencia):
+        return {
+            'id': emergencia.id,
+            'triage_nivel': emergencia.triage_nivel,
+            'color_triage': emergencia.color_triage,
+            'nombre_triage': emergencia.nombre_triage,
+            'paciente': {'nombre_completo': emergencia.paciente.nombre_completo} if emergencia.paciente else None,
+            'tipo': emergencia.tipo,
+            'descripcion': emergencia.descripcion,
+            'hora_ingreso': emergencia.hora_ingreso,
+            'hora_atencion': emergencia.hora_atencion,
+            'estado': emergencia.estado,
+            'estado_traducido': emergencia.estado_traducido,
+            'plazo': plazo_atencion(emergencia.triage_nivel, emergencia.hora_ingreso),
+        }
+
+    # ---------- Carga y sincronización ----------
+
+    def cargar(self):
+        """Reconstruye la cola desde la base de datos (solo casos activos)"""
+        # Versiones leídas ANTES de consultar: un cambio concurrente deja una
+        # versión nueva y provoca otra recarga, nunca se pierde
+        versiones = versiones_etiquetas(ETIQUETAS)
+        # Sesión propia y breve: no toca la de la petición y en un flujo SSE
+        # no deja una conexión tomada mientras espera
+        with Session(db.engine) as sesion:
+            activas = sesion.query(Emergencia).options(joinedload(Emergencia.paciente)).filter(
+                Emergencia.filtro_activas()
+            ).all()
+            datos = [self._datos(e) for e in activas]
+
+        with self._lock:
+            self._heap = []
+            self._entradas = {}
+            for item in datos:
+                self._agregar(item)
+            self._marcar(versiones)
+            self._avanzar()
+
+    def sincronizar(self):
+        """Recarga si nunca se cargó, si otro worker cambió las tablas o por antigüedad"""
+        if self._versiones is None or self._desactualizada(versiones_etiquetas(ETIQUETAS)):
+            self.cargar()
+
+    def actualizar(self, emergencia):
+        """
+        Aplica una emergencia recién confirmada (crear / cambiar_estado) y
+        avisa a los flujos en espera. Llamar DESPUÉS del commit.
+        """
+        if self._versiones is None:
+            return  # Aún no cargada: la primera lectura la trae completa
+        datos = self._datos(emergencia) if emergencia.estado in Emergencia.ESTADOS_ACTIVOS else None
+        # Las versiones guardadas NO se actualizan: leídas ahora incluirían
+        # también los commits de otros workers posteriores a la última carga,
+        # que se perderían. El commit propio provoca una sola recarga.
+        with self._lock:
+            self._quitar(emergencia.id)
+            if datos is not None:
+                self._agregar(datos)
+            self._avanzar()
+
+    # ---------- Lectura ----------
+
+    def siguiente(self):
+        """Caso que debe atenderse primero (o None)"""
+        self.sincronizar()
+        with self._lock:
+            return dict(self._heap[0][-1]) if self._heap else None
+
+    def instantanea(self, estado=None, nivel=None):
+        """
+        Casos activos en orden de atención, con la espera actual.
+        Retorna {'revision', 'cola', 'en_triaje', 'en_atencion', 'total', 'por_nivel'}.
+        """
+        self.sincronizar()
+        with self._lock:
+            entradas = sorted(e for e in self._heap if e[-1] is not None)
+            revision = self.revision
+
+        ahora = datetime.utcnow()
+        cola = []
+        conteo = dict.fromkeys(Emergencia.ESTADOS_ACTIVOS, 0)
+        por_nivel = dict.fromkeys(TIEMPO_OBJETIVO, 0)
+        for *_, datos in entradas:
+            conteo[datos['estado']] = conteo.get(datos['estado'], 0) + 1
+            por_nivel[datos['triage_nivel']] = por_nivel.get(datos['triage_nivel'], 0) + 1
+            if (estado and datos['estado'] != estado) or (nivel and datos['triage_nivel'] != nivel):
+                continue
+            fin_espera = datos['hora_atencion'] or ahora
+            cola.append(dict(
+                datos,
+                tiempo_espera=int((fin_espera - datos['hora_ingreso']).total_seconds() / 60),
+                vencida=datos['estado'] == 'en_triaje' and ahora > datos['plazo'],
+            ))
+
+        return {
+            'revision': revision,
+            'cola': cola,
+            'en_triaje': conteo['en_triaje'],
+            'en_atencion': conteo['en_atencion'],
+            'total': sum(conteo.values()),
+            'por_nivel': por_nivel,
+        }
+
+
+def obtener_cola():
+    """Cola de triage de esta aplicación en este proceso"""
+    return current_app.extensions.setdefault('cola_triage', ColaTriage())
@@ -1,5 +1,8 @@
 from datetime import datetime
+from sqlalchemy import bindparam, func, text
+from sqlalchemy.orm import deferred
 from saas.extensions import db
+from saas.utils import signos_vitales
 
 class Emergencia(db.Model):
     """
@@ -8,6 +11,20 @@ class Emergencia(db.Model):
              4=Verde (Menor), 5=Azul (No urgente)
     """
     __tablename__ = 'emergencias'
+    __table_args__ = (
+        # Migración 569d9341e509
+        db.Index('idx_emergencias_hora_triage', 'hora_ingreso', 'triage_nivel'),
+        db.Index('idx_emergencias_paciente_hora', 'paciente_id', 'hora_ingreso'),
+        # Cola activa: índice parcial (SQLite/PostgreSQL) solo con casos no egresados
+        db.Index('idx_emergencias_cola', 'estado', 'triage_nivel', 'hora_ingreso',
+                 sqlite_where=text("estado IN ('en_triaje', 'en_atencion')"),
+                 postgresql_where=text("estado IN ('en_triaje', 'en_atencion')")),
+        # Historial paginado por keyset (hora_ingreso DESC, id DESC)
+        db.Index('idx_emergencias_ingreso_id', 'hora_ingreso', 'id'),
+    )
+    
+    # Estados de la cola de atención (el resto ya egresó: derivado, alta)
+    ESTADOS_ACTIVOS = ('en_triaje', 'en_atencion')
     
     # Identificadores
     id = db.Column(db.Integer, primary_key=True)
@@ -31,20 +48,26 @@ class Emergencia(db.Model):
     descripcion = db.Column(db.Text, nullable=False)
     
     # Estado del paciente
-    estado = db.Column(db.String(20), nullable=False, default='en_triaje', index=True)
+    # Sin índice propio: la cola activa usa idx_emergencias_cola (índice parcial)
+    # y un índice simple sobre estado empataría con él en el planificador
+    estado = db.Column(db.String(20), nullable=False, default='en_triaje')
     # Estados: en_triaje, en_atencion, derivado, alta
     
     # Signos vitales al ingreso
-    presion_arterial = db.Column(db.String(20))  # ej: 120/80
+    presion_arterial = db.Column(db.String(20))  # ej: 120/80 (texto mostrado)
+    presion_sistolica = db.Column(db.Integer)  # mmHg (numérica, para series y reglas)
+    presion_diastolica = db.Column(db.Integer)  # mmHg
     frecuencia_cardiaca = db.Column(db.Integer)  # BPM
     temperatura = db.Column(db.Float)  # °C
     saturacion = db.Column(db.Integer)  # SpO2 %
     glasgow = db.Column(db.Integer)  # Escala de Glasgow (3-15)
     
     # Observaciones y seguimiento
-    observaciones = db.Column(db.Text)
     diagnostico_preliminar = db.Column(db.Text)
-    tratamiento = db.Column(db.Text)
+    # Texto acumulado previo a notas_emergencia (la migración c5a9e3f7d2b1 lo
+    # pasó a notas). Diferidas: los listados no cargan estos TEXT
+    observaciones = deferred(db.Column(db.Text), group='texto_historico')
+    tratamiento = deferred(db.Column(db.Text), group='texto_historico')
     
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -55,6 +78,8 @@ class Emergencia(db.Model):
     # Relaciones
     paciente = db.relationship('Paciente', backref='emergencias', foreign_keys=[paciente_id])
     medico = db.relationship('Usuario', backref='emergencias_atendidas', foreign_keys=[atendido_por])
+    notas = db.relationship('NotaEmergencia', backref='emergencia', lazy='dynamic',
+                            cascade='all, delete-orphan', order_by='NotaEmergencia.created_at')
     
     @property
     def color_triage(self):
@@ -90,6 +115,13 @@ class Emergencia(db.Model):
             delta = datetime.utcnow() - self.hora_ingreso
             return int(delta.total_seconds() / 60)
     
+    @property
+    def alertas_detalle(self):
+        """Alertas de los signos vitales de ingreso (mismas reglas que Consulta)"""
+        signos = signos_vitales.signos_de(self)
+        alertas, _ = signos_vitales.evaluar(signos)
+        return signos_vitales.detalle(alertas, signos)
+    
     @property
     def estado_traducido(self):
         """Retorna estado en español legible"""
@@ -101,5 +133,96 @@ class Emergencia(db.Model):
         }
         return estados.get(self.estado, self.estado)
     
+    def agregar_nota(self, tipo, texto, usuario_id=None):
+        """Agrega una nota: un INSERT en notas_emergencia, sin reescribir la emergencia"""
+        nota = NotaEmergencia(emergencia_id=self.id, tipo=tipo, texto=texto, usuario_id=usuario_id)
+        db.session.add(nota)
+        return nota
+    
+    @staticmethod
+    def filtro_activas():
+        """
+        estado IN ('en_triaje', 'en_atencion') con los valores en línea: el
+        planificador solo usa el índice parcial idx_emergencias_cola si el
+        WHERE repite su condición con constantes, no con parámetros.
+        """
+        return Emergencia.estado.in_(
+            bindparam('estados_activos', Emergencia.ESTADOS_ACTIVOS, expanding=True, literal_execute=True)
+        )
+    
+    @staticmethod
+    def contar_por_estado():
+        """{estado: cantidad} de la cola activa, en un solo GROUP BY"""
+        filas = db.session.query(Emergencia.estado, func.count()).filter(
+            Emergencia.filtro_activas()
+        ).group_by(Emergencia.estado).all()
+        conteo = dict.fromkeys(Emergencia.ESTADOS_ACTIVOS, 0)
+        conteo.update(filas)
+        return conteo
+    
     def __repr__(self):
         return f'<Emergencia {self.id} - Nivel {self.triage_nivel} - {self.estado}>'
+
+
+class NotaEmergencia(db.Model):
+    """
+    Nota clínica de una emergencia: tratamiento, observación o cambio de estado.
+    Solo se insertan; el seguimiento del caso es la lista de sus notas.
+    """
+    __tablename__ = 'notas_emergencia'
+    __table_args__ = (
+        # Notas de una emergencia en orden cronológico
+        db.Index('idx_notas_emergencia_fecha', 'emergencia_id', 'created_at'),
+    )
+    
+    TIPOS = {
+        'tratamiento': 'Tratamiento',
+        'observacion': 'Observación',
+        'estado': 'Cambio de estado',
+    }
+    
+    id = db.Column(db.Integer, primary_key=True)
+    emergencia_id = db.Column(db.Integer, db.ForeignKey('emergencias.id', ondelete='CASCADE'), nullable=False)
+    tipo = db.Column(db.String(20), nullable=False)
+    texto = db.Column(db.Text, nullable=False)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    usuario = db.relationship('Usuario')
+    
+    @property
+    def tipo_traducido(self):
+        return self.TIPOS.get(self.tipo, self.tipo)
+    
+    def __repr__(self):
+        return f'<NotaEmergencia {self.id} - Emergencia {self.emergencia_id} - {self.tipo}>'
+
+
+class TiempoEmergenciaDia(db.Model):
+    """
+    Histograma diario de tiempos de emergencia (ver saas/emergencias/tiempos.py).
+    
+    Una fila por día local de ingreso, nivel de triage, tipo, hora local,
+    métrica ('espera': ingreso -> atención, 'estancia': ingreso -> alta) y
+    cubeta de minutos. Los histogramas de varios días se suman, así los
+    percentiles de un mes salen de unas cientos de filas.
+    """
+    __tablename__ = 'tiempos_emergencia_dia'
+    __table_args__ = (
+        db.UniqueConstraint('fecha', 'triage_nivel', 'tipo', 'hora', 'metrica', 'cubeta',
+                            name='uq_tiempos_emergencia_dia'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    fecha = db.Column(db.Date, nullable=False)  # Día local de ingreso
+    triage_nivel = db.Column(db.Integer, nullable=False)
+    tipo = db.Column(db.String(50), nullable=False)
+    hora = db.Column(db.Integer, nullable=False)  # Hora local de ingreso (0-23)
+    metrica = db.Column(db.String(20), nullable=False)
+    cubeta = db.Column(db.Integer, nullable=False)  # Índice en tiempos.BORDES_MINUTOS
+    cantidad = db.Column(db.Integer, nullable=False, default=0)
+    suma_minutos = db.Column(db.Float, nullable=False, default=0)
+    max_minutos = db.Column(db.Float, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<TiempoEmergenciaDia {self.fecha} N{self.triage_nivel} {self.metrica}[{self.cubeta}]={self.cantidad}>'
@@ -1,11 +1,16 @@
-from flask import render_template, redirect, url_for, flash, request
+from flask import render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required, current_user
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from saas.extensions import db
 from saas.models import Paciente
+from saas.utils.paginacion import paginar_keyset
+from saas.utils.sse import flujo_eventos
+from saas.utils.fechas import hoy_local
 from sqlalchemy.orm import joinedload
 from . import emergencias_bp
-from .models import Emergencia
+from .models import Emergencia, NotaEmergencia
+from .cola import obtener_cola
+from .tiempos import resumen_tiempos
 from .forms import EmergenciaForm
 
 
@@ -13,46 +18,136 @@ from .forms import EmergenciaForm
 @login_required
 def index():
     """
-    Lista de emergencias ordenadas por nivel de triage (prioridad).
-    Cola de atención: 1 (Rojo) tiene máxima prioridad.
+    Cola de atención ordenada por nivel de triage (prioridad).
+    1 (Rojo) tiene máxima prioridad.
+    
+    vista=activas (por defecto): casos en triaje/atención desde la cola de
+    triage en memoria (ver cola.py), actualizada en vivo por SSE.
+    vista=historial: todas las emergencias, paginadas por keyset.
     """
     # Filtros
     estado_filtro = request.args.get('estado', '')
     nivel_filtro = request.args.get('nivel', type=int)
+    vista = request.args.get('vista', '')
+    if vista not in ('activas', 'historial'):
+        # Filtrar por un estado de egreso (derivado, alta) es consultar el historial
+        vista = 'historial' if estado_filtro and estado_filtro not in Emergencia.ESTADOS_ACTIVOS else 'activas'
     
-    # Query base con EAGER LOADING para evitar N+1
-    query = Emergencia.query.options(
-        joinedload(Emergencia.paciente)
-    )
-    
-    # Aplicar filtros
-    if estado_filtro:
-        query = query.filter_by(estado=estado_filtro)
-    if nivel_filtro:
-        query = query.filter_by(triage_nivel=nivel_filtro)
-    
-    # Ordenar por nivel de triage (1 primero) y luego por hora de ingreso
-    emergencias = query.order_by(
-        Emergencia.triage_nivel.asc(),
-        Emergencia.hora_ingreso.asc()
-    ).all()
-    
-    # Estadísticas
-    total = len(emergencias)
-    en_triaje = len([e for e in emergencias if e.estado == 'en_triaje'])
-    en_atencion = len([e for e in emergencias if e.estado == 'en_atencion'])
+    pagination = None
+    if vista == 'activas':
+        # Cola de triage en memoria: orden por plazo virtual (nivel + espera)
+        cola = obtener_cola().instantanea(estado=estado_filtro or None, nivel=nivel_filtro)
+        emergencias = cola['cola']
+        conteo = {estado: cola[estado] for estado in Emergencia.ESTADOS_ACTIVOS}
+    else:
+        # Query base con EAGER LOADING para evitar N+1
+        query = Emergencia.query.options(
+            joinedload(Emergencia.paciente)
+        )
+        
+        # Aplicar filtros
+        if estado_filtro:
+            query = query.filter_by(estado=estado_filtro)
+        if nivel_filtro:
+            query = query.filter_by(triage_nivel=nivel_filtro)
+        
+        pagination = paginar_keyset(
+            query,
+            [Emergencia.hora_ingreso.desc(), Emergencia.id.desc()],
+            cursor=request.args.get('cursor'), per_page=25
+        )
+        emergencias = pagination.items
+        
+        # Estadísticas de la cola activa (un solo GROUP BY sobre el índice parcial)
+        conteo = Emergencia.contar_por_estado()
     
     return render_template(
         'emergencias/index.html',
         emergencias=emergencias,
+        pagination=pagination,
+        vista=vista,
         estado_filtro=estado_filtro,
         nivel_filtro=nivel_filtro,
-        total=total,
-        en_triaje=en_triaje,
-        en_atencion=en_atencion
+        total=sum(conteo.values()),
+        en_triaje=conteo['en_triaje'],
+        en_atencion=conteo['en_atencion']
+    )
+
+
+@emergencias_bp.route('/triage')
+@login_required
+def triage():
+    """Tablero de triage: tarjetas en orden de atención, actualizadas por SSE"""
+    cola = obtener_cola().instantanea()
+    return render_template(
+        'emergencias/triage.html',
+        emergencias=cola['cola'],
+        por_nivel=cola['por_nivel']
     )
 
 
+@emergencias_bp.route('/stream')
+@login_required
+def stream():
+    """
+    Flujo SSE de la cola de triage: envía el HTML de la vista (tabla o
+    tablero) y los contadores al conectar y en cada cambio de la cola.
+    """
+    vista = request.args.get('vista', 'tabla')
+    estado_filtro = request.args.get('estado') or None
+    nivel_filtro = request.args.get('nivel', type=int)
+    plantilla = 'emergencias/_tarjetas_cola.html' if vista == 'tablero' else 'emergencias/_filas_cola.html'
+    cola_triage = obtener_cola()
+    
+    def producir():
+        cola = cola_triage.instantanea(estado=estado_filtro, nivel=nivel_filtro)
+        return {
+            'html': render_template(plantilla, emergencias=cola['cola']),
+            'total': cola['total'],
+            'en_triaje': cola['en_triaje'],
+            'en_atencion': cola['en_atencion'],
+            'por_nivel': cola['por_nivel'],
+        }
+    
+    return flujo_eventos(cola_triage.esperar_cambio, producir, evento='cola')
+
+
+@emergencias_bp.route('/api/tiempos')
+@login_required
+def api_tiempos():
+    """
+    Tiempos puerta-atención y puerta-alta (n, promedio, mediana, p90, máx.)
+    
+    Query params:
+        desde, hasta: días locales YYYY-MM-DD (por defecto los últimos 30 días)
+        agrupar: triage_nivel (por defecto), tipo u hora
+        fuente: auto (por defecto), vivo (exacto) o resumen (histograma diario)
+    """
+    hoy = hoy_local()
+    try:
+        hasta = date.fromisoformat(request.args.get('hasta') or hoy.isoformat())
+        desde = date.fromisoformat(request.args.get('desde') or (hasta - timedelta(days=29)).isoformat())
+    except ValueError:
+        return jsonify({"ok": False, "error": "Fechas inválidas (use YYYY-MM-DD)"}), 400
+    if desde > hasta:
+        return jsonify({"ok": False, "error": "'desde' debe ser anterior a 'hasta'"}), 400
+    
+    agrupar = request.args.get('agrupar', 'triage_nivel')
+    try:
+        fuente, grupos = resumen_tiempos(desde, hasta, agrupar, request.args.get('fuente', 'auto'))
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    
+    return jsonify({
+        "ok": True,
+        "desde": desde.isoformat(),
+        "hasta": hasta.isoformat(),
+        "agrupar": agrupar,
+        "fuente": fuente,
+        "grupos": grupos
+    })
+
+
 @emergencias_bp.route('/nueva', methods=['GET', 'POST'])
 @login_required
 def crear():
@@ -89,6 +184,8 @@ def crear():
             triage_nivel=form.nivel_triage.data,
             descripcion=form.motivo_consulta.data,
             presion_arterial=presion_str,
+            presion_sistolica=form.presion_sistolica.data if presion_str else None,
+            presion_diastolica=form.presion_diastolica.data if presion_str else None,
             frecuencia_cardiaca=form.frecuencia_cardiaca.data,
             temperatura=form.temperatura.data,
             saturacion=None,  # No se pregunta en triage inicial
@@ -102,6 +199,7 @@ def crear():
         
         db.session.add(emergencia)
         db.session.commit()
+        obtener_cola().actualizar(emergencia)
         
         flash(f'Emergencia registrada - Nivel {emergencia.nombre_triage}', 'success')
         return redirect(url_for('emergencias.show', id=emergencia.id))
@@ -119,7 +217,8 @@ def crear():
 def show(id):
     """Muestra detalle completo de una emergencia"""
     emergencia = Emergencia.query.get_or_404(id)
-    return render_template('emergencias/show.html', emergencia=emergencia)
+    notas = emergencia.notas.options(joinedload(NotaEmergencia.usuario)).all()
+    return render_template('emergencias/show.html', emergencia=emergencia, notas=notas)
 
 
 @emergencias_bp.route('/<int:id>/estado', methods=['POST'])
@@ -132,8 +231,8 @@ def cambiar_estado(id):
     emergencia = Emergencia.query.get_or_404(id)
     
     nuevo_estado = request.form.get('estado')
-    tratamiento = request.form.get('tratamiento', '')
-    observaciones = request.form.get('observaciones', '')
+    tratamiento = request.form.get('tratamiento', '').strip()
+    observaciones = request.form.get('observaciones', '').strip()
     
     if nuevo_estado not in ['en_triaje', 'en_atencion', 'derivado', 'alta']:
         flash('Estado inválido', 'danger')
@@ -141,6 +240,7 @@ def cambiar_estado(id):
     
     # Actualizar estado
     estado_anterior = emergencia.estado
+    estado_anterior_texto = emergencia.estado_traducido
     emergencia.estado = nuevo_estado
     
     # Registrar hora de atención si pasa a en_atencion
@@ -152,21 +252,17 @@ def cambiar_estado(id):
     if nuevo_estado == 'alta' and not emergencia.hora_alta:
         emergencia.hora_alta = datetime.utcnow()
     
-    # Actualizar tratamiento y observaciones
+    # Seguimiento como notas nuevas (INSERT), sin reescribir texto acumulado
+    if nuevo_estado != estado_anterior:
+        emergencia.agregar_nota('estado', f'{estado_anterior_texto} → {emergencia.estado_traducido}', current_user.id)
     if tratamiento:
-        if emergencia.tratamiento:
-            emergencia.tratamiento += f"\n\n[{datetime.utcnow().strftime('%Y-%m-%d %H:%M')}]\n{tratamiento}"
-        else:
-            emergencia.tratamiento = tratamiento
-    
+        emergencia.agregar_nota('tratamiento', tratamiento, current_user.id)
     if observaciones:
-        if emergencia.observaciones:
-            emergencia.observaciones += f"\n\n[{datetime.utcnow().strftime('%Y-%m-%d %H:%M')}]\n{observaciones}"
-        else:
-            emergencia.observaciones = observaciones
+        emergencia.agregar_nota('observacion', observaciones, current_user.id)
     
     emergencia.updated_at = datetime.utcnow()
     db.session.commit()
+    obtener_cola().actualizar(emergencia)
     
     flash(f'Estado cambiado de "{estado_anterior}" a "{nuevo_estado}"', 'success')
     return redirect(url_for('emergencias.show', id=id))
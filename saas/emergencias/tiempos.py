@@ -0,0 +1,290 @@
+"""
+Tiempos de espera y estancia en emergencias
+Sistema SaaS - Hospital Tipo 1 Uracoa
+
+Dos métricas por caso, en minutos desde el ingreso:
+    espera:   hora_ingreso -> hora_atencion  (puerta-atención)
+    estancia: hora_ingreso -> hora_alta      (puerta-alta)
+
+Resumidas (n, promedio, mediana, p90, máximo) por nivel de triage, tipo o
+hora local de ingreso, y calculadas en la base de datos, no fila a fila:
+
+- fuente 'vivo': exacto. PostgreSQL usa percentile_cont(); en SQLite se
+  emula con ROW_NUMBER()/COUNT() OVER (PARTITION BY grupo) y la misma
+  interpolación lineal, así ambos motores dan el mismo resultado.
+- fuente 'resumen': histograma diario en tiempos_emergencia_dia
+  (consolidar_dias(), scripts/consolidar_tiempos_emergencia.py). Un mes
+  suma unas cientos de filas; el percentil se interpola dentro de la
+  cubeta y el máximo es exacto. Los días sin consolidar (hoy, o días
+  pasados en que el script no corrió) se agregan con la misma consulta de
+  histograma sobre emergencias.
+
+'auto' usa el cálculo exacto en rangos de hasta DIAS_VIVO días.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from sqlalchemy import Integer, and_, case, cast, func, literal
+from saas.extensions import db
+from saas.utils.fechas import (hoy_local, rango_dia, filtro_rango, dia_local_sql,
+                               hora_local_sql, minutos_entre_sql)
+from .models import Emergencia, TiempoEmergenciaDia
+
+# Métrica -> columna donde termina el intervalo
+METRICAS = {
+    'espera': Emergencia.hora_atencion,
+    'estancia': Emergencia.hora_alta,
+}
+
+DIMENSIONES = ('triage_nivel', 'tipo', 'hora')
+
+PERCENTILES = {'mediana': 0.5, 'p90': 0.9}
+
+# Límites inferiores de las cubetas del histograma (minutos); la última es abierta
+BORDES_MINUTOS = (0, 5, 10, 15, 20, 30, 45, 60, 90, 120, 180, 240, 360, 480, 720, 1440)
+
+# Rangos de hasta estos días se calculan exactos sobre emergencias
+DIAS_VIVO = 7
+
+FUENTES = ('auto', 'vivo', 'resumen')
+
+
+# ---------- Expresiones ----------
+
+def _dimension(nombre):
+    if nombre == 'hora':
+        return hora_local_sql(Emergencia.hora_ingreso)
+    return getattr(Emergencia, nombre)
+
+
+def _minutos(metrica):
+    return minutos_entre_sql(Emergencia.hora_ingreso, METRICAS[metrica])
+
+
+def _filtro(metrica, inicio, fin):
+    """Ingresos en [inicio, fin) UTC con la métrica registrada y coherente"""
+    final = METRICAS[metrica]
+    return and_(filtro_rango(Emergencia.hora_ingreso, inicio, fin),
+                final.isnot(None), final >= Emergencia.hora_ingreso)
+
+
+def _cubeta(minutos):
+    """Índice de cubeta de BORDES_MINUTOS como CASE"""
+    return case(
+        *[(minutos < borde, indice) for indice, borde in enumerate(BORDES_MINUTOS[1:])],
+        else_=len(BORDES_MINUTOS) - 1
+    )
+
+
+def _rango_utc(desde, hasta):
+    """Días locales [desde, hasta] (inclusive) -> (inicio, fin) en UTC"""
+    return rango_dia(desde)[0], rango_dia(hasta)[1]
+
+
+# ---------- Exacto (vivo) ----------
+
+def _percentiles_postgresql(grupo, minutos, filtro):
+    columnas = [grupo.label('grupo'), func.count().label('n'),
+                func.avg(minutos).label('promedio'), func.max(minutos).label('max')]
+    columnas += [func.percentile_cont(p).within_group(minutos).label(nombre)
+                 for nombre, p in PERCENTILES.items()]
+    return db.session.query(*columnas).filter(filtro).group_by(grupo).all()
+
+
+def _percentiles_ventana(grupo, minutos, filtro):
+    """
+    percentile_cont() con funciones de ventana (SQLite y otros motores):
+    en la posición p * (n - 1) de cada grupo ordenado se interpola entre
+    la fila de abajo y la siguiente.
+    """
+    ordenados = db.session.query(
+        grupo.label('grupo'),
+        minutos.label('minutos'),
+        func.row_number().over(partition_by=grupo, order_by=minutos).label('fila'),
+        func.count().over(partition_by=grupo).label('n'),
+    ).filter(filtro).subquery()
+
+    valor, fila, n = ordenados.c.minutos, ordenados.c.fila, ordenados.c.n
+    columnas = [ordenados.c.grupo, func.max(n).label('n'),
+                func.avg(valor).label('promedio'), func.max(valor).label('max')]
+    for nombre, p in PERCENTILES.items():
+        posicion = literal(p) * (n - 1)
+        base = cast(posicion, Integer)  # floor: posicion >= 0
+        abajo = func.max(case((fila - 1 == base, valor)))
+        arriba = func.coalesce(func.max(case((fila - 2 == base, valor))), abajo)
+        columnas.append((abajo + func.max(posicion - base) * (arriba - abajo)).label(nombre))
+
+    return db.session.query(*columnas).group_by(ordenados.c.grupo).all()
+
+
+def _resumen_vivo(agrupar, desde, hasta):
+    grupo = _dimension(agrupar)
+    calcular = _percentiles_postgresql if db.engine.dialect.name == 'postgresql' else _percentiles_ventana
+    resultado = defaultdict(dict)
+    for metrica in METRICAS:
+        for fila in calcular(grupo, _minutos(metrica), _filtro(metrica, *_rango_utc(desde, hasta))):
+            resultado[fila.grupo][metrica] = {
+                'n': fila.n,
+                'promedio': fila.promedio,
+                **{nombre: getattr(fila, nombre) for nombre in PERCENTILES},
+                'max': fila.max,
+            }
+    return resultado
+
+
+# ---------- Histograma (resumen) ----------
+
+def consulta_histograma(metrica, dimensiones, inicio, fin):
+    """
+    SELECT dimensiones..., cubeta, cantidad, suma, máximo de los ingresos en
+    [inicio, fin) UTC agrupados por dimensiones y cubeta.
+    """
+    minutos = _minutos(metrica)
+    cubeta = _cubeta(minutos)
+    columnas = [dimension.label(f'd{i}') for i, dimension in enumerate(dimensiones)]
+    return db.session.query(
+        *columnas,
+        cubeta.label('cubeta'),
+        func.count().label('cantidad'),
+        func.sum(minutos).label('suma'),
+        func.max(minutos).label('maximo'),
+    ).filter(_filtro(metrica, inicio, fin)).group_by(*columnas, cubeta)
+
+
+def consolidar_dias(desde, hasta):
+    """
+    Recalcula el histograma de los días locales [desde, hasta] (idempotente:
+    borra y vuelve a insertar cada día con INSERT ... SELECT).
+
+    Returns:
+        Filas escritas
+    """
+    tabla = TiempoEmergenciaDia.__table__
+    inicio, fin = _rango_utc(desde, hasta)
+    db.session.execute(tabla.delete().where(tabla.c.fecha.between(desde, hasta)))
+
+    escritas = 0
+    for metrica in METRICAS:
+        dimensiones = [dia_local_sql(Emergencia.hora_ingreso), Emergencia.triage_nivel, Emergencia.tipo,
+                       _dimension('hora')]
+        origen = consulta_histograma(metrica, dimensiones, inicio, fin).add_columns(
+            literal(metrica).label('metrica')
+        ).statement
+        resultado = db.session.execute(tabla.insert().from_select(
+            ['fecha', 'triage_nivel', 'tipo', 'hora', 'cubeta', 'cantidad', 'suma_minutos',
+             'max_minutos', 'metrica'],
+            origen
+        ))
+        escritas += max(resultado.rowcount, 0)
+
+    db.session.commit()
+    return escritas
+
+
+def percentil_histograma(cubetas, p):
+    """
+    Percentil estimado de [(cubeta, cantidad, máximo)] ordenado por cubeta:
+    interpolación lineal dentro de la cubeta, acotada por su máximo real.
+    """
+    total = sum(cantidad for _, cantidad, _ in cubetas)
+    objetivo = p * total
+    acumulado = 0
+    for indice, cantidad, maximo in cubetas:
+        if cantidad and acumulado + cantidad >= objetivo:
+            inferior = BORDES_MINUTOS[indice]
+            superior = BORDES_MINUTOS[indice + 1] if indice + 1 < len(BORDES_MINUTOS) else maximo
+            superior = max(min(superior, maximo), inferior)
+            return inferior + (superior - inferior) * (objetivo - acumulado) / cantidad
+        acumulado += cantidad
+    return None
+
+
+def _tramos(dias):
+    """Días ordenados -> [(inicio, fin)] de días consecutivos"""
+    tramos = []
+    for dia in dias:
+        if tramos and tramos[-1][1] == dia - timedelta(days=1):
+            tramos[-1] = (tramos[-1][0], dia)
+        else:
+            tramos.append((dia, dia))
+    return tramos
+
+
+def _resumen_histograma(agrupar, desde, hasta):
+    cubetas = defaultdict(lambda: defaultdict(lambda: [0, 0.0, 0.0]))  # (grupo, metrica) -> cubeta -> [n, suma, max]
+
+    def acumular(grupo, metrica, cubeta, cantidad, suma, maximo):
+        acumulada = cubetas[(grupo, metrica)][cubeta]
+        acumulada[0] += cantidad
+        acumulada[1] += suma or 0
+        acumulada[2] = max(acumulada[2], maximo or 0)
+
+    hoy = hoy_local()
+    tramos = []  # Días sin consolidar: se leen de emergencias
+    if desde < hoy:
+        ultimo = min(hasta, hoy - timedelta(days=1))
+        en_rango = TiempoEmergenciaDia.fecha.between(desde, ultimo)
+        columna = getattr(TiempoEmergenciaDia, agrupar)
+        filas = db.session.query(
+            columna, TiempoEmergenciaDia.metrica, TiempoEmergenciaDia.cubeta,
+            func.sum(TiempoEmergenciaDia.cantidad), func.sum(TiempoEmergenciaDia.suma_minutos),
+            func.max(TiempoEmergenciaDia.max_minutos),
+        ).filter(en_rango).group_by(columna, TiempoEmergenciaDia.metrica, TiempoEmergenciaDia.cubeta)
+        for fila in filas:
+            acumular(*fila)
+
+        # Un día pasado sin filas puede no haberse consolidado nunca; si de
+        # verdad no tuvo casos, la consulta sobre emergencias es vacía y barata
+        consolidados = {fecha for fecha, in db.session.query(TiempoEmergenciaDia.fecha).filter(en_rango).distinct()}
+        tramos = _tramos(dia for dia in (desde + timedelta(days=i) for i in range((ultimo - desde).days + 1))
+                         if dia not in consolidados)
+
+    if hasta >= hoy:
+        tramos.append((max(desde, hoy), hasta))  # Hoy todavía no está consolidado
+
+    for metrica in METRICAS:
+        for inicio, fin in tramos:
+            for fila in consulta_histograma(metrica, [_dimension(agrupar)], *_rango_utc(inicio, fin)):
+                acumular(fila.d0, metrica, fila.cubeta, fila.cantidad, fila.suma, fila.maximo)
+
+    resultado = defaultdict(dict)
+    for (grupo, metrica), por_cubeta in cubetas.items():
+        ordenadas = [(indice, n, maximo) for indice, (n, _, maximo) in sorted(por_cubeta.items())]
+        n = sum(valores[0] for valores in por_cubeta.values())
+        resultado[grupo][metrica] = {
+            'n': n,
+            'promedio': sum(valores[1] for valores in por_cubeta.values()) / n if n else None,
+            **{nombre: percentil_histograma(ordenadas, p) for nombre, p in PERCENTILES.items()},
+            'max': max(valores[2] for valores in por_cubeta.values()),
+        }
+    return resultado
+
+
+# ---------- API ----------
+
+def resumen_tiempos(desde, hasta, agrupar='triage_nivel', fuente='auto'):
+    """
+    Tiempos de espera/estancia de los ingresos entre los días locales
+    desde y hasta (inclusive).
+
+    Returns:
+        (fuente usada, [{'grupo', 'espera': {...}, 'estancia': {...}}] ordenado por grupo)
+    """
+    if agrupar not in DIMENSIONES:
+        raise ValueError(f'Agrupación inválida: {agrupar}')
+    if fuente not in FUENTES:
+        raise ValueError(f'Fuente inválida: {fuente}')
+    if fuente == 'auto':
+        fuente = 'vivo' if (hasta - desde).days < DIAS_VIVO else 'resumen'
+
+    calcular = _resumen_vivo if fuente == 'vivo' else _resumen_histograma
+    resultado = calcular(agrupar, desde, hasta)
+
+    vacio = dict.fromkeys(['n', 'promedio', *PERCENTILES, 'max'])
+    grupos = []
+    for grupo in sorted(resultado, key=lambda g: (g is None, g)):
+        fila = {'grupo': grupo}
+        for metrica in METRICAS:
+            valores = resultado[grupo].get(metrica, dict(vacio, n=0))
+            fila[metrica] = {clave: round(v, 1) if isinstance(v, float) else v for clave, v in valores.items()}
+        grupos.append(fila)
+    return fuente, grupos
@@ -4,17 +4,17 @@ from saas.extensions import db, cache
 from . import especialidades_bp
 from .models import Especialidad
 from .forms import EspecialidadForm
+from saas.utils.paginacion import paginar_keyset
 
 @especialidades_bp.route('/')
 @login_required
 def index():
-    """Listar especialidades - OPTIMIZADA con paginación"""
-    page = request.args.get('page', 1, type=int)
-    
-    # Paginación directa sin caché (objeto Pagination no serializable)
-    especialidades = Especialidad.query.filter_by(activo=True).order_by(
-        Especialidad.nombre_medico
-    ).paginate(page=page, per_page=20, error_out=False)
+    """Listar especialidades - OPTIMIZADA con paginación por keyset"""
+    especialidades = paginar_keyset(
+        Especialidad.query.filter_by(activo=True),
+        [Especialidad.nombre_medico.asc(), Especialidad.id.asc()],
+        cursor=request.args.get('cursor'), per_page=20
+    )
     
     return render_template('especialidades/index.html', especialidades=especialidades)
 
@@ -0,0 +1,90 @@
+"""
+Censo de camas de internados
+Sistema SaaS - Hospital Tipo 1 Uracoa
+
+El tablero de ocupación (por estado y por sala) sale de un solo
+GROUP BY sala, estado sobre camas, y los ocupantes actuales de una sola
+consulta por lote (internados activos con su paciente), en lugar de un
+COUNT por estado y de Cama.ocupante_actual cama por cama (N+1).
+
+El resultado se guarda en caché bajo las etiquetas de las tablas de las
+que depende: cualquier commit que escriba en camas, internados_registro
+o pacientes (nuevo, alta, liberar_cama, marcar_mantenimiento, editar un
+paciente) lo invalida automáticamente (saas.utils.cache_etiquetas).
+"""
+from sqlalchemy import func
+from saas.extensions import db
+from saas.models import Paciente
+from saas.utils.cache_etiquetas import cache_por_etiquetas
+from .models import Cama, Internado
+
+ESTADOS_CAMA = ('libre', 'ocupada', 'mantenimiento')
+
+ETIQUETAS = ('camas', 'internados_registro', 'pacientes')
+
+
+def _porcentaje(parte, total):
+    return round(100 * parte / total, 1) if total else 0.0
+
+
+def ocupacion_por_sala():
+    """
+    {'total', 'por_estado': {estado: n}, 'ocupacion', 'salas': [...]} en un
+    solo GROUP BY sala, estado.
+    """
+    filas = db.session.query(Cama.sala, Cama.estado, func.count(Cama.id)).group_by(
+        Cama.sala, Cama.estado
+    ).all()
+
+    salas = {}
+    por_estado = dict.fromkeys(ESTADOS_CAMA, 0)
+    for sala, estado, cantidad in filas:
+        fila = salas.setdefault(sala, {'sala': sala, 'total': 0, **dict.fromkeys(ESTADOS_CAMA, 0)})
+        fila[estado] = fila.get(estado, 0) + cantidad
+        fila['total'] += cantidad
+        por_estado[estado] = por_estado.get(estado, 0) + cantidad
+
+    for fila in salas.values():
+        fila['ocupacion'] = _porcentaje(fila['ocupada'], fila['total'])
+
+    total = sum(por_estado.values())
+    return {
+        'total': total,
+        'por_estado': por_estado,
+        'ocupacion': _porcentaje(por_estado['ocupada'], total),
+        'salas': sorted(salas.values(), key=lambda fila: fila['sala']),
+    }
+
+
+def ocupantes_actuales(cama_ids=None):
+    """
+    {cama_id: datos del internado activo} en una sola consulta (carga por
+    lote). Sin cama_ids trae los de todas las camas.
+    """
+    query = db.session.query(
+        Internado.cama_id, Internado.id, Internado.fecha_ingreso,
+        Paciente.id.label('paciente_id'), Paciente.nombre, Paciente.apellido, Paciente.cedula
+    ).join(Paciente, Internado.paciente_id == Paciente.id).filter(Internado.estado == 'activo')
+    if cama_ids is not None:
+        if not cama_ids:
+            return {}
+        query = query.filter(Internado.cama_id.in_(cama_ids))
+
+    return {
+        fila.cama_id: {
+            'internado_id': fila.id,
+            'paciente_id': fila.paciente_id,
+            'paciente': f'{fila.nombre} {fila.apellido}',
+            'cedula': fila.cedula,
+            'fecha_ingreso': fila.fecha_ingreso,
+        }
+        for fila in query
+    }
+
+
+@cache_por_etiquetas(*ETIQUETAS, timeout=3600, key_prefix='censo_camas')
+def censo_camas():
+    """Ocupación por estado y sala más los ocupantes actuales (cacheado)"""
+    censo = ocupacion_por_sala()
+    censo['ocupantes'] = ocupantes_actuales()
+    return censo
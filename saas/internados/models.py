@@ -1,5 +1,7 @@
 from datetime import datetime
+from sqlalchemy import event, exists, or_, text, update
 from saas.extensions import db
+from saas.utils import signos_vitales
 
 class Cama(db.Model):
     """
@@ -19,9 +21,46 @@ class Cama(db.Model):
     
     @property
     def ocupante_actual(self):
-        """Retorna el internado activo en esta cama"""
+        """
+        Retorna el internado activo en esta cama (una consulta por cama;
+        en listados usar saas.internados.censo.ocupantes_actuales)
+        """
         return self.internados.filter_by(estado='activo').first()
     
+    @staticmethod
+    def ocupar(cama_id):
+        """
+        Reserva la cama si está libre, en un solo UPDATE condicional:
+            UPDATE camas SET estado='ocupada' WHERE id=? AND estado='libre'
+        Dos ingresos simultáneos a la misma cama no pueden ganar ambos (el
+        segundo UPDATE ya no encuentra la fila libre). Retorna True si la
+        reservó; la reserva se confirma o revierte con la transacción.
+        """
+        resultado = db.session.execute(
+            update(Cama).where(Cama.id == cama_id, Cama.estado == 'libre')
+            .values(estado='ocupada').execution_options(synchronize_session=False)
+        )
+        return resultado.rowcount == 1
+    
+    @staticmethod
+    def cambiar_estado_si_desocupada(cama_id, estado, desde=None):
+        """
+        Cambia el estado solo si la cama no tiene internado activo (y, si se
+        indica, solo desde los estados 'desde'), en un UPDATE condicional.
+        Retorna True si la cambió.
+        """
+        condiciones = [
+            Cama.id == cama_id,
+            ~exists().where(Internado.cama_id == Cama.id, Internado.estado == 'activo'),
+        ]
+        if desde:
+            condiciones.append(Cama.estado.in_(desde))
+        resultado = db.session.execute(
+            update(Cama).where(*condiciones).values(estado=estado)
+            .execution_options(synchronize_session=False)
+        )
+        return resultado.rowcount == 1
+    
     @property
     def color_estado(self):
         """Color badge según estado"""
@@ -41,6 +80,16 @@ class Internado(db.Model):
     Modelo para registro de pacientes internados.
     """
     __tablename__ = 'internados_registro'
+    __table_args__ = (
+        # Paginación por keyset (fecha_ingreso DESC, id DESC)
+        db.Index('idx_internados_ingreso_id', 'fecha_ingreso', 'id'),
+        # Como máximo un internado activo por cama (índice único parcial)
+        db.Index('uq_internados_cama_activo', 'cama_id', unique=True,
+                 sqlite_where=text("estado = 'activo'"),
+                 postgresql_where=text("estado = 'activo'")),
+        # Tablero de deterioro: activos por NEWS2 descendente
+        db.Index('idx_internados_estado_news2', 'estado', 'news2_puntaje'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     
@@ -64,6 +113,11 @@ class Internado(db.Model):
     tipo_alta = db.Column(db.String(50))  # medica, voluntaria, referencia, fallecimiento
     observaciones_alta = db.Column(db.Text)
     
+    # NEWS2 de la última evolución con signos (se actualiza al insertar cada evolución)
+    news2_puntaje = db.Column(db.Integer)
+    news2_maximo = db.Column(db.Integer)  # Mayor puntaje de un solo parámetro
+    news2_fecha = db.Column(db.DateTime)  # Fecha de la evolución que lo originó
+    
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, onupdate=datetime.utcnow)
@@ -86,6 +140,11 @@ class Internado(db.Model):
         """Estado en español"""
         return 'Activo' if self.estado == 'activo' else 'Alta'
     
+    @property
+    def riesgo_news2(self):
+        """(etiqueta, clase) del riesgo según el último NEWS2"""
+        return signos_vitales.riesgo_news2(self.news2_puntaje, self.news2_maximo)
+    
     def __repr__(self):
         return f'<Internado {self.id} - Paciente: {self.paciente_id} - {self.estado}>'
 
@@ -95,6 +154,10 @@ class Evolucion(db.Model):
     Modelo para evoluciones diarias de pacientes internados.
     """
     __tablename__ = 'evoluciones'
+    __table_args__ = (
+        # Serie de signos vitales de un internado en orden de fecha
+        db.Index('idx_evoluciones_internado_fecha', 'internado_id', 'fecha'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     internado_id = db.Column(db.Integer, db.ForeignKey('internados_registro.id'), nullable=False, index=True)
@@ -116,5 +179,72 @@ class Evolucion(db.Model):
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    @property
+    def alertas_detalle(self):
+        """Alertas de los signos vitales de la evolución (mismas reglas que Consulta)"""
+        signos = signos_vitales.signos_de(self)
+        alertas, _ = signos_vitales.evaluar(signos)
+        return signos_vitales.detalle(alertas, signos)
+    
+    @property
+    def news2(self):
+        """(puntaje, maximo) NEWS2 de la evolución; (None, None) sin signos"""
+        return signos_vitales.news2({campo: getattr(self, campo) for campo in signos_vitales.ESCALAS_NEWS2})
+    
     def __repr__(self):
         return f'<Evolucion {self.id} - Internado: {self.internado_id}>'
+
+
+@event.listens_for(Evolucion, 'after_insert')
+def _actualizar_news2(mapper, connection, evolucion):
+    """
+    Guarda el NEWS2 de la evolución como el último del internado, en un
+    UPDATE condicional: una evolución cargada con fecha anterior a la del
+    puntaje vigente no lo reemplaza.
+    """
+    puntaje, maximo = evolucion.news2
+    if puntaje is None:
+        return
+    tabla = Internado.__table__
+    connection.execute(
+        update(tabla).where(
+            tabla.c.id == evolucion.internado_id,
+            or_(tabla.c.news2_fecha.is_(None), tabla.c.news2_fecha <= evolucion.fecha),
+        ).values(news2_puntaje=puntaje, news2_maximo=maximo, news2_fecha=evolucion.fecha)
+    )
+
+
+class CensoCamasDia(db.Model):
+    """
+    Censo de medianoche por sala (ver saas/internados/reportes.py).
+    
+    Una fila por día local y sala: camas por estado al cierre del día
+    (foto tomada por scripts/registrar_censo_camas.py) y los movimientos
+    del día (ingresos, altas y días de estancia de esas altas). Los
+    reportes de ocupación y estancia de meses o trimestres salen de aquí
+    sin recorrer internados_registro.
+    """
+    __tablename__ = 'censo_camas_dia'
+    __table_args__ = (
+        db.UniqueConstraint('fecha', 'sala', name='uq_censo_camas_dia'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    fecha = db.Column(db.Date, nullable=False)  # Día local censado
+    sala = db.Column(db.String(50), nullable=False)
+    
+    # Camas por estado al cierre del día
+    total = db.Column(db.Integer, nullable=False, default=0)
+    libre = db.Column(db.Integer, nullable=False, default=0)
+    ocupada = db.Column(db.Integer, nullable=False, default=0)
+    mantenimiento = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Movimientos del día
+    ingresos = db.Column(db.Integer, nullable=False, default=0)
+    altas = db.Column(db.Integer, nullable=False, default=0)
+    dias_estancia = db.Column(db.Float, nullable=False, default=0)  # Suma de las estancias de las altas
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<CensoCamasDia {self.fecha} {self.sala}: {self.ocupada}/{self.total}>'
@@ -0,0 +1,201 @@
+"""
+Reportes históricos de internados: ocupación y estancia
+Sistema SaaS - Hospital Tipo 1 Uracoa
+
+El estado de las camas solo existe en presente, así que la ocupación
+pasada sale del censo de medianoche (censo_camas_dia): registrar_censo()
+guarda cada noche, por sala, las camas por estado y los movimientos del
+día (scripts/registrar_censo_camas.py). Un trimestre son ~90 filas por
+sala, y los promedios se calculan con SUM() sobre esas filas:
+
+    ocupación    = SUM(ocupada) / SUM(total)
+    paciente-día = SUM(ocupada)
+    estancia     = SUM(dias_estancia) / SUM(altas)
+
+La estancia por diagnóstico, sala o tipo de alta se agrega en SQL sobre
+las altas del rango (índice de fecha_alta), en vez de sumar
+Internado.dias_internado objeto por objeto.
+"""
+from datetime import timedelta
+from sqlalchemy import delete, func, insert, update
+from saas.extensions import db
+from saas.utils.cache_etiquetas import cache_por_etiquetas
+from saas.utils.fechas import hoy_local, rango_dia, filtro_rango, minutos_entre_sql
+from .censo import ESTADOS_CAMA, _porcentaje
+from .models import Cama, CensoCamasDia, Internado
+
+AGRUPACIONES_ESTANCIA = ('diagnostico', 'sala', 'tipo_alta')
+
+
+def _rango_utc(desde, hasta):
+    """Días locales [desde, hasta] (inclusive) -> (inicio, fin) en UTC"""
+    return rango_dia(desde)[0], rango_dia(hasta)[1]
+
+
+def _dias_estancia():
+    """Días (fracción incluida) entre ingreso y alta, como expresión SQL"""
+    return minutos_entre_sql(Internado.fecha_ingreso, Internado.fecha_alta) / 1440.0
+
+
+def _filtro_altas(inicio, fin):
+    return (Internado.estado == 'alta', Internado.fecha_alta.isnot(None),
+            filtro_rango(Internado.fecha_alta, inicio, fin))
+
+
+# ---------- Censo de medianoche ----------
+
+def _movimientos(inicio, fin):
+    """{sala: {'ingresos', 'altas', 'dias_estancia'}} del rango UTC [inicio, fin)"""
+    movimientos = {}
+
+    def fila(sala):
+        return movimientos.setdefault(sala, {'ingresos': 0, 'altas': 0, 'dias_estancia': 0.0})
+
+    for sala, ingresos in db.session.query(Cama.sala, func.count(Internado.id)).join(
+        Internado, Internado.cama_id == Cama.id
+    ).filter(filtro_rango(Internado.fecha_ingreso, inicio, fin)).group_by(Cama.sala):
+        fila(sala)['ingresos'] = ingresos
+
+    for sala, altas, dias in db.session.query(
+        Cama.sala, func.count(Internado.id), func.sum(_dias_estancia())
+    ).join(Internado, Internado.cama_id == Cama.id).filter(
+        *_filtro_altas(inicio, fin)
+    ).group_by(Cama.sala):
+        fila(sala).update(altas=altas, dias_estancia=dias or 0.0)
+
+    return movimientos
+
+
+def registrar_censo(fecha=None, hoy=None):
+    """
+    Guarda el censo del día local 'fecha' (ayer por defecto: se corre
+    pasada la medianoche). Idempotente: reemplaza las filas del día.
+
+    Las camas por estado son las del momento de la corrida, así que solo
+    se toman para ayer u hoy. Para días anteriores las camas de entonces
+    ya no se conocen: se recalculan solo los ingresos, altas y días de
+    estancia de las filas guardadas, sin tocar las camas por estado.
+
+    Returns:
+        Salas registradas (o actualizadas, en días anteriores)
+    """
+    hoy = hoy or hoy_local()
+    fecha = fecha or hoy - timedelta(days=1)
+    if fecha > hoy:
+        raise ValueError(f'No se puede censar un día futuro: {fecha}')
+    movimientos = _movimientos(*rango_dia(fecha))
+
+    if fecha < hoy - timedelta(days=1):
+        filas = [
+            {'id': censo_id, 'ingresos': 0, 'altas': 0, 'dias_estancia': 0.0, **movimientos.get(sala, {})}
+            for censo_id, sala in db.session.query(CensoCamasDia.id, CensoCamasDia.sala)
+            .filter(CensoCamasDia.fecha == fecha)
+        ]
+        if filas:
+            db.session.execute(update(CensoCamasDia), filas)
+        db.session.commit()
+        return len(filas)
+
+    filas = {}
+
+    def fila(sala):
+        return filas.setdefault(sala, {
+            'fecha': fecha, 'sala': sala, 'total': 0, **dict.fromkeys(ESTADOS_CAMA, 0),
+            'ingresos': 0, 'altas': 0, 'dias_estancia': 0.0,
+        })
+
+    for sala, estado, cantidad in db.session.query(
+        Cama.sala, Cama.estado, func.count(Cama.id)
+    ).group_by(Cama.sala, Cama.estado):
+        if estado in ESTADOS_CAMA:
+            fila(sala)[estado] += cantidad
+        fila(sala)['total'] += cantidad
+
+    for sala, valores in movimientos.items():
+        fila(sala).update(valores)
+
+    db.session.execute(delete(CensoCamasDia).where(CensoCamasDia.fecha == fecha))
+    if filas:
+        db.session.execute(insert(CensoCamasDia), list(filas.values()))
+    db.session.commit()
+    return len(filas)
+
+
+def _indicadores(ocupada, total, ingresos, altas, dias_estancia):
+    return {
+        'paciente_dias': ocupada,
+        'cama_dias': total,
+        'ocupacion': _porcentaje(ocupada, total),
+        'ingresos': ingresos,
+        'altas': altas,
+        'estancia_promedio': round(dias_estancia / altas, 1) if altas else None,
+    }
+
+
+@cache_por_etiquetas('censo_camas_dia', timeout=86400, key_prefix='ocupacion_historica')
+def ocupacion_historica(desde, hasta, sala=None):
+    """
+    Ocupación y estancia entre los días locales desde y hasta (inclusive)
+    a partir del censo de medianoche.
+
+    Returns:
+        {'salas': [resumen por sala], 'serie': [por día], 'dias_censados': n}
+    """
+    sumas = (
+        func.sum(CensoCamasDia.ocupada), func.sum(CensoCamasDia.total),
+        func.sum(CensoCamasDia.ingresos), func.sum(CensoCamasDia.altas),
+        func.sum(CensoCamasDia.dias_estancia),
+    )
+    filtros = [CensoCamasDia.fecha.between(desde, hasta)]
+    if sala:
+        filtros.append(CensoCamasDia.sala == sala)
+
+    salas = [
+        {'sala': fila[0], **_indicadores(*fila[1:])}
+        for fila in db.session.query(CensoCamasDia.sala, *sumas).filter(*filtros)
+        .group_by(CensoCamasDia.sala).order_by(CensoCamasDia.sala)
+    ]
+    serie = [
+        {'fecha': fila[0].isoformat(), **_indicadores(*fila[1:])}
+        for fila in db.session.query(CensoCamasDia.fecha, *sumas).filter(*filtros)
+        .group_by(CensoCamasDia.fecha).order_by(CensoCamasDia.fecha)
+    ]
+    return {'salas': salas, 'serie': serie, 'dias_censados': len(serie)}
+
+
+# ---------- Estancia ----------
+
+def _agrupacion(nombre):
+    if nombre == 'diagnostico':
+        return func.lower(func.trim(Internado.diagnostico_inicial))
+    if nombre == 'sala':
+        return Cama.sala
+    return Internado.tipo_alta
+
+
+def estancia_por(agrupar, desde, hasta):
+    """
+    Días de estancia (n, promedio, mínimo, máximo) de las altas entre los
+    días locales desde y hasta, agrupados por diagnóstico inicial, sala o
+    tipo de alta, en un solo GROUP BY.
+    """
+    if agrupar not in AGRUPACIONES_ESTANCIA:
+        raise ValueError(f'Agrupación inválida: {agrupar}')
+
+    grupo = _agrupacion(agrupar).label('grupo')
+    dias = _dias_estancia()
+    query = db.session.query(
+        grupo, func.count(Internado.id).label('n'), func.avg(dias).label('promedio'),
+        func.min(dias).label('minimo'), func.max(dias).label('maximo'),
+    ).filter(*_filtro_altas(*_rango_utc(desde, hasta)))
+    if agrupar == 'sala':
+        query = query.join(Cama, Internado.cama_id == Cama.id)
+
+    return [
+        {
+            'grupo': fila.grupo,
+            'n': fila.n,
+            **{clave: round(getattr(fila, clave), 1) for clave in ('promedio', 'minimo', 'maximo')},
+        }
+        for fila in query.group_by(grupo).order_by(func.count(Internado.id).desc(), grupo)
+    ]
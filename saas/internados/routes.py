@@ -1,19 +1,25 @@
-from flask import render_template, redirect, url_for, flash, request
+from flask import render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required, current_user
 from saas.internados import bp
 from saas.internados.models import Internado, Cama, Evolucion
 from saas.internados.forms import InternadoForm, AltaForm, EvolucionForm, CamaForm
+from saas.internados.censo import censo_camas
+from saas.internados.reportes import ocupacion_historica, estancia_por
 from saas.models import Paciente, Usuario
-from saas.extensions import db, cache
+from saas.extensions import db
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import joinedload
-from datetime import datetime
+from saas.utils.paginacion import paginar_keyset
+from saas.utils.cache_etiquetas import cache_por_etiquetas
+from saas.utils.fechas import hoy_local
+from datetime import datetime, date, timedelta
 
 
 @bp.route('/')
 @login_required
 def index():
     """Lista internaciones activas con ocupación de camas"""
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     estado_filter = request.args.get('estado', 'activo')
     sala_filter = request.args.get('sala', '')
     
@@ -28,33 +34,21 @@ def index():
     if estado_filter and estado_filter != 'todos':
         query = query.filter_by(estado=estado_filter)
     
-    # Paginar
-    pagination = query.order_by(Internado.fecha_ingreso.desc()).paginate(
-        page=page, per_page=15, error_out=False
+    # Paginar (keyset)
+    pagination = paginar_keyset(
+        query,
+        [Internado.fecha_ingreso.desc(), Internado.id.desc()],
+        cursor=cursor, per_page=15
     )
     internados = pagination.items
     
-    # Estadísticas de camas
-    total_camas = Cama.query.count()
-    camas_libres = Cama.query.filter_by(estado='libre').count()
-    camas_ocupadas = Cama.query.filter_by(estado='ocupada').count()
-    camas_mantenimiento = Cama.query.filter_by(estado='mantenimiento').count()
-    
-    # Camas por sala
-    salas = db.session.query(
-        Cama.sala,
-        db.func.count(Cama.id).label('total'),
-        db.func.sum(db.case((Cama.estado == 'libre', 1), else_=0)).label('libres')
-    ).group_by(Cama.sala).all()
+    # Censo de camas (un GROUP BY, cacheado hasta el próximo cambio)
+    censo = censo_camas()
     
     return render_template('internados/index.html',
                           internados=internados,
                           pagination=pagination,
-                          total_camas=total_camas,
-                          camas_libres=camas_libres,
-                          camas_ocupadas=camas_ocupadas,
-                          camas_mantenimiento=camas_mantenimiento,
-                          salas=salas,
+                          censo=censo,
                           estado_filter=estado_filter,
                           sala_filter=sala_filter)
 
@@ -65,18 +59,18 @@ def nuevo():
     """Registrar nueva internación"""
     form = InternadoForm()
     
-    # Cargar opciones de selects con CACHÉ para evitar queries repetidas
-    @cache.cached(timeout=300, key_prefix='pacientes_select')
+    # Cargar opciones de selects con CACHÉ; se invalidan al escribir en cada tabla
+    @cache_por_etiquetas('pacientes', timeout=86400, key_prefix='pacientes_select')
     def get_pacientes_choices():
         return [(p.id, f"{p.nombre_completo} - {p.cedula}") 
                 for p in Paciente.query.order_by(Paciente.nombre).all()]
     
-    @cache.cached(timeout=60, key_prefix='camas_libres_select')
+    @cache_por_etiquetas('camas', timeout=86400, key_prefix='camas_libres_select')
     def get_camas_libres_choices():
         return [(c.id, f"{c.codigo} - {c.sala} ({c.estado})") 
                 for c in Cama.query.filter_by(estado='libre').order_by(Cama.codigo).all()]
     
-    @cache.cached(timeout=300, key_prefix='medicos_select')
+    @cache_por_etiquetas('usuarios', timeout=86400, key_prefix='medicos_select')
     def get_medicos_choices():
         return [(u.id, u.nombre_completo) 
                 for u in Usuario.query.filter_by(rol='medico').order_by(Usuario.nombre).all()]
@@ -86,9 +80,12 @@ def nuevo():
     form.medico_id.choices = get_medicos_choices()
     
     if form.validate_on_submit():
-        # Verificar que la cama esté libre
         cama = Cama.query.get_or_404(form.cama_id.data)
-        if cama.estado != 'libre':
+        
+        # Reservar la cama con un UPDATE condicional (libre -> ocupada): si otro
+        # ingreso la tomó primero no se actualiza ninguna fila
+        if not Cama.ocupar(cama.id):
+            db.session.rollback()
             flash('La cama seleccionada no está disponible', 'danger')
             return redirect(url_for('internados.nuevo'))
         
@@ -102,11 +99,14 @@ def nuevo():
             diagnostico_inicial=form.diagnostico_inicial.data
         )
         
-        # Actualizar estado de cama
-        cama.estado = 'ocupada'
-        
         db.session.add(internado)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # uq_internados_cama_activo: la cama ya tiene un internado activo
+            db.session.rollback()
+            flash('La cama seleccionada no está disponible', 'danger')
+            return redirect(url_for('internados.nuevo'))
         
         flash(f'Paciente internado en cama {cama.codigo}', 'success')
         return redirect(url_for('internados.show', id=internado.id))
@@ -209,11 +209,38 @@ def nueva_evolucion(id):
     return redirect(url_for('internados.show', id=id))
 
 
+@bp.route('/deterioro')
+@login_required
+def deterioro():
+    """Tablero de deterioro: internados activos ordenados por último NEWS2"""
+    sala_filter = request.args.get('sala', '')
+    
+    # Una sola consulta (idx_internados_estado_news2); los sin puntaje al final
+    query = Internado.query.options(
+        joinedload(Internado.paciente),
+        joinedload(Internado.cama)
+    ).filter(Internado.estado == 'activo')
+    
+    if sala_filter:
+        query = query.join(Cama, Internado.cama_id == Cama.id).filter(Cama.sala == sala_filter)
+    
+    internados = query.order_by(
+        Internado.news2_puntaje.desc().nulls_last(),
+        Internado.news2_maximo.desc().nulls_last(),
+        Internado.news2_fecha.asc()
+    ).all()
+    
+    return render_template('internados/deterioro.html',
+                          internados=internados,
+                          salas=[s['sala'] for s in censo_camas()['salas']],
+                          sala_filter=sala_filter)
+
+
 @bp.route('/camas')
 @login_required
 def camas():
     """Gestión de camas"""
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     sala_filter = request.args.get('sala', '')
     estado_filter = request.args.get('estado', '')
     
@@ -225,14 +252,21 @@ def camas():
     if estado_filter:
         query = query.filter_by(estado=estado_filter)
     
-    pagination = query.order_by(Cama.codigo).paginate(
-        page=page, per_page=20, error_out=False
+    pagination = paginar_keyset(
+        query,
+        [Cama.codigo.asc(), Cama.id.asc()],
+        cursor=cursor, per_page=20
     )
     camas_list = pagination.items
     
+    # Ocupantes desde el censo cacheado (no Cama.ocupante_actual cama por cama)
+    censo = censo_camas()
+    
     return render_template('internados/camas.html',
                           camas=camas_list,
                           pagination=pagination,
+                          censo=censo,
+                          ocupantes=censo['ocupantes'],
                           sala_filter=sala_filter,
                           estado_filter=estado_filter)
 
@@ -243,14 +277,12 @@ def liberar_cama(id):
     """Liberar cama manualmente (si no hay internado activo)"""
     cama = Cama.query.get_or_404(id)
     
-    # Verificar que no haya internado activo
-    internado_activo = cama.internados.filter_by(estado='activo').first()
-    
-    if internado_activo:
+    # Solo si no hay internado activo (verificado en el mismo UPDATE)
+    if not Cama.cambiar_estado_si_desocupada(cama.id, 'libre'):
+        db.session.rollback()
         flash('No se puede liberar la cama: hay un paciente internado', 'danger')
         return redirect(url_for('internados.camas'))
     
-    cama.estado = 'libre'
     db.session.commit()
     
     flash(f'Cama {cama.codigo} liberada exitosamente', 'success')
@@ -263,15 +295,79 @@ def marcar_mantenimiento(id):
     """Marcar cama en mantenimiento"""
     cama = Cama.query.get_or_404(id)
     
-    # Verificar que no haya internado activo
-    internado_activo = cama.internados.filter_by(estado='activo').first()
-    
-    if internado_activo:
+    # Solo camas no ocupadas y sin internado activo: una cama recién reservada
+    # por un ingreso en curso sigue 'ocupada' y no se pisa
+    if not Cama.cambiar_estado_si_desocupada(cama.id, 'mantenimiento', desde=('libre', 'mantenimiento')):
+        db.session.rollback()
         flash('No se puede poner en mantenimiento: hay un paciente internado', 'danger')
         return redirect(url_for('internados.camas'))
     
-    cama.estado = 'mantenimiento'
     db.session.commit()
     
     flash(f'Cama {cama.codigo} marcada en mantenimiento', 'warning')
     return redirect(url_for('internados.camas'))
+
+
+def _rango_reporte(dias_defecto):
+    """(desde, hasta, error) desde los query params; por defecto hasta ayer"""
+    try:
+        hasta = date.fromisoformat(request.args.get('hasta') or (hoy_local() - timedelta(days=1)).isoformat())
+        desde = date.fromisoformat(request.args.get('desde') or (hasta - timedelta(days=dias_defecto - 1)).isoformat())
+    except ValueError:
+        return None, None, "Fechas inválidas (use YYYY-MM-DD)"
+    if desde > hasta:
+        return None, None, "'desde' debe ser anterior a 'hasta'"
+    return desde, hasta, None
+
+
+@bp.route('/api/ocupacion')
+@login_required
+def api_ocupacion():
+    """
+    Ocupación histórica desde el censo de medianoche (para gráficos de tendencia)
+    
+    Query params:
+        desde, hasta: días locales YYYY-MM-DD (por defecto los últimos 90 días)
+        sala: opcional, una sola sala
+    """
+    desde, hasta, error = _rango_reporte(90)
+    if error:
+        return jsonify({"ok": False, "error": error}), 400
+    
+    sala = request.args.get('sala') or None
+    return jsonify({
+        "ok": True,
+        "desde": desde.isoformat(),
+        "hasta": hasta.isoformat(),
+        "sala": sala,
+        **ocupacion_historica(desde, hasta, sala)
+    })
+
+
+@bp.route('/api/estancia')
+@login_required
+def api_estancia():
+    """
+    Días de estancia de las altas del período
+    
+    Query params:
+        desde, hasta: días locales YYYY-MM-DD (por defecto los últimos 90 días)
+        agrupar: diagnostico (por defecto), sala o tipo_alta
+    """
+    desde, hasta, error = _rango_reporte(90)
+    if error:
+        return jsonify({"ok": False, "error": error}), 400
+    
+    agrupar = request.args.get('agrupar', 'diagnostico')
+    try:
+        grupos = estancia_por(agrupar, desde, hasta)
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    
+    return jsonify({
+        "ok": True,
+        "desde": desde.isoformat(),
+        "hasta": hasta.isoformat(),
+        "agrupar": agrupar,
+        "grupos": grupos
+    })
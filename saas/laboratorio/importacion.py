@@ -0,0 +1,283 @@
+"""
+Importación de archivos exportados por los analizadores de laboratorio
+Sistema SaaS - Hospital Tipo 1 Uracoa
+
+Formatos aceptados:
+
+    csv   Con encabezado; separador ',' o ';'. Columnas: orden (codigo_orden),
+          codigo (examen del catálogo), valor, y opcionales observaciones y
+          fecha (hora local, ISO).
+
+              orden;codigo;valor;observaciones
+              LAB-2026-0042;GLU;98;
+              LAB-2026-0042;ORINA;Negativo;Muestra matutina
+
+    astm  Registros separados por '|', uno por línea. Vale ASTM E1394
+          (O = orden, R = resultado) y segmentos HL7 equivalentes
+          (OBR, OBX); los demás registros (H, P, C, L, MSH, PID...) se
+          ignoran. La fecha es la del analizador (AAAAMMDDHHMMSS, hora local).
+
+              O|1|LAB-2026-0042||^^^GLU
+              R|1|^^^GLU|98|mg/dL|70-100|N||F||||20261017083000
+
+El archivo se lee como flujo: los lectores son generadores que entregan
+una entrada por línea, se agrupan en lotes de TAMANO_LOTE y cada lote
+hace un SELECT ... IN de las órdenes que no se han visto y un único
+executemany. Todo el archivo va en una transacción: si algo falla en la
+BD no queda importado a medias. Las líneas inválidas no detienen la
+importación; se informan con su número de línea.
+
+Reimportar un archivo no duplica resultados: una línea cuyo (orden,
+examen, fecha del analizador) ya está guardado o apareció antes en el
+archivo se omite y se cuenta en 'duplicados'. Sin fecha del analizador
+basta con que la orden ya tenga un resultado de ese examen.
+"""
+import csv
+from datetime import datetime
+from itertools import chain, islice
+from sqlalchemy import insert, update
+from saas.extensions import db
+from saas.utils.fechas import local_a_utc
+from .models import OrdenLaboratorio, ResultadoLaboratorio, ExamenLaboratorio
+from .resultados import fila_resultado
+
+FORMATOS = ('csv', 'astm')
+
+# Filas por INSERT
+TAMANO_LOTE = 500
+
+# Errores detallados en el reporte (el total siempre se cuenta)
+MAXIMO_ERRORES = 200
+
+# Nombres aceptados para cada columna del CSV
+COLUMNAS_CSV = {
+    'orden': ('orden', 'codigo_orden', 'muestra'),
+    'codigo': ('codigo', 'examen', 'prueba'),
+    'valor': ('valor', 'resultado'),
+    'observaciones': ('observaciones', 'comentario'),
+    'fecha': ('fecha',),
+}
+
+
+def _entrada(orden, codigo, valor, observaciones=None, fecha=None):
+    """Entrada en el formato de fila_resultado (el valor sirve a numéricos y texto)"""
+    return {
+        'orden': (orden or '').strip(),
+        'codigo': (codigo or '').strip().upper(),
+        'valor': valor,
+        'resultado': valor,
+        'observaciones': observaciones,
+        'fecha': fecha,
+    }
+
+
+def leer_csv(lineas):
+    """
+    Genera (número de línea, entrada, error) por cada fila del CSV.
+    """
+    lineas = iter(lineas)
+    encabezado = next(lineas, '')
+    separador = ';' if encabezado.count(';') > encabezado.count(',') else ','
+    lector = csv.reader(chain([encabezado], lineas), delimiter=separador)
+
+    nombres = [nombre.strip().lower() for nombre in next(lector, [])]
+    posicion = {}
+    for columna, alias in COLUMNAS_CSV.items():
+        for nombre in alias:
+            if nombre in nombres:
+                posicion[columna] = nombres.index(nombre)
+                break
+    faltantes = [c for c in ('orden', 'codigo', 'valor') if c not in posicion]
+    if faltantes:
+        yield 1, None, f'Encabezado sin columnas: {", ".join(faltantes)}'
+        return
+
+    for campos in lector:
+        if not any(c.strip() for c in campos):
+            continue
+        valores = {c: campos[i].strip() if i < len(campos) else '' for c, i in posicion.items()}
+        fecha = None
+        if valores.get('fecha'):
+            try:
+                fecha = local_a_utc(datetime.fromisoformat(valores['fecha']))
+            except ValueError:
+                yield lector.line_num, None, f'Fecha inválida: {valores["fecha"]}'
+                continue
+        yield lector.line_num, _entrada(valores['orden'], valores['codigo'], valores['valor'],
+                                        valores.get('observaciones'), fecha), None
+
+
+def _componente(campo, ultimo=False):
+    """'^^^GLU' -> 'GLU'; 'GLU^Glicemia' -> 'GLU'"""
+    partes = [p for p in campo.split('^') if p.strip()]
+    if not partes:
+        return ''
+    return partes[-1] if ultimo else partes[0]
+
+
+def _fecha_analizador(texto):
+    """AAAAMMDDHHMMSS (hora local) -> datetime UTC; None si viene vacía"""
+    texto = texto.strip()
+    if not texto:
+        return None
+    return local_a_utc(datetime.strptime(texto[:14].ljust(14, '0'), '%Y%m%d%H%M%S'))
+
+
+def leer_astm(lineas):
+    """
+    Genera (número de línea, entrada, error) por cada registro de
+    resultado (R / OBX), con la orden del último registro O / OBR.
+    """
+    orden = None
+    for numero, linea in enumerate(lineas, start=1):
+        linea = linea.strip().strip('\x02\x03')
+        if not linea or '|' not in linea:
+            continue
+        campos = linea.split('|')
+        # Algunos analizadores anteponen el número de trama: '2R|1|...'
+        tipo = campos[0].lstrip('0123456789').upper()
+        campos += [''] * (15 - len(campos))
+
+        if tipo in ('O', 'OBR'):
+            orden = _componente(campos[2]) or _componente(campos[3])
+            continue
+        if tipo not in ('R', 'OBX'):
+            continue
+        if not orden:
+            yield numero, None, 'Resultado sin registro de orden previo'
+            continue
+
+        if tipo == 'R':
+            codigo, valor, fecha = _componente(campos[2], ultimo=True), campos[3], campos[12]
+        else:
+            codigo, valor, fecha = _componente(campos[3]), campos[5], campos[14]
+        try:
+            fecha = _fecha_analizador(fecha)
+        except ValueError:
+            yield numero, None, f'Fecha inválida: {fecha}'
+            continue
+        yield numero, _entrada(orden, codigo, valor, fecha=fecha), None
+
+
+LECTORES = {'csv': leer_csv, 'astm': leer_astm}
+
+
+def _lotes(entradas, tamano):
+    while True:
+        lote = list(islice(entradas, tamano))
+        if not lote:
+            return
+        yield lote
+
+
+def _buscar_ordenes(codigos, conocidas):
+    """Completa conocidas[codigo_orden] = (id, paciente_id) con un solo SELECT ... IN"""
+    nuevos = {c for c in codigos if c and c not in conocidas}
+    if not nuevos:
+        return
+    for codigo, orden_id, paciente_id in db.session.query(
+        OrdenLaboratorio.codigo_orden, OrdenLaboratorio.id, OrdenLaboratorio.paciente_id
+    ).filter(OrdenLaboratorio.codigo_orden.in_(nuevos)):
+        conocidas[codigo] = (orden_id, paciente_id)
+    for codigo in nuevos - conocidas.keys():
+        conocidas[codigo] = None
+
+
+def _buscar_resultados(orden_ids, guardados):
+    """Completa guardados[orden_id] = {examen_id: {fechas}} con los resultados ya cargados"""
+    nuevas = {i for i in orden_ids if i not in guardados}
+    if not nuevas:
+        return
+    for orden_id in nuevas:
+        guardados[orden_id] = {}
+    for orden_id, examen_id, fecha in db.session.query(
+        ResultadoLaboratorio.orden_id, ResultadoLaboratorio.examen_id, ResultadoLaboratorio.fecha
+    ).filter(ResultadoLaboratorio.orden_id.in_(nuevas)):
+        guardados[orden_id].setdefault(examen_id, set()).add(fecha)
+
+
+def importar_archivo(lineas, formato='csv', tamano_lote=TAMANO_LOTE):
+    """
+    Importa los resultados de un archivo del analizador en una transacción.
+
+    Args:
+        lineas: iterable de líneas de texto (archivo abierto, stream)
+        formato: 'csv' o 'astm'
+
+    Returns:
+        {'leidos', 'importados', 'duplicados', 'fuera_de_rango', 'ordenes',
+         'total_errores', 'errores': [{'linea', 'error'}] (los primeros MAXIMO_ERRORES)}
+    """
+    if formato not in LECTORES:
+        raise ValueError(f'Formato desconocido: {formato}')
+
+    catalogo = {e.codigo: e for e in ExamenLaboratorio.query.filter_by(activo=True)}
+    conocidas = {}
+    guardados = {}
+    actualizadas = set()
+    reporte = {'leidos': 0, 'importados': 0, 'duplicados': 0, 'fuera_de_rango': 0,
+               'total_errores': 0, 'errores': []}
+
+    def error(numero, mensaje):
+        reporte['total_errores'] += 1
+        if len(reporte['errores']) < MAXIMO_ERRORES:
+            reporte['errores'].append({'linea': numero, 'error': mensaje})
+
+    sentencia = insert(ResultadoLaboratorio).execution_options(render_nulls=True)
+    ahora = datetime.utcnow()
+    try:
+        for lote in _lotes(LECTORES[formato](lineas), tamano_lote):
+            _buscar_ordenes((e['orden'] for _, e, _ in lote if e), conocidas)
+            _buscar_resultados({conocidas[e['orden']][0] for _, e, _ in lote
+                                if e and conocidas.get(e['orden'])}, guardados)
+
+            filas = []
+            for numero, entrada, mensaje in lote:
+                reporte['leidos'] += 1
+                if mensaje:
+                    error(numero, mensaje)
+                    continue
+                orden = conocidas.get(entrada['orden'])
+                if orden is None:
+                    error(numero, f'Orden no encontrada: {entrada["orden"] or "(vacía)"}')
+                    continue
+                examen = catalogo.get(entrada['codigo'])
+                if examen is None:
+                    error(numero, f'Examen desconocido: {entrada["codigo"] or "(vacío)"}')
+                    continue
+                # Fechas ya guardadas (o importadas antes en este archivo) del examen en la orden
+                fechas = guardados[orden[0]].setdefault(examen.id, set())
+                repetido = entrada['fecha'] in fechas if entrada['fecha'] else bool(fechas)
+                if repetido:
+                    reporte['duplicados'] += 1
+                    continue
+                fila, mensaje = fila_resultado(examen, entrada, entrada['fecha'] or ahora)
+                if mensaje:
+                    error(numero, mensaje)
+                    continue
+                fechas.add(fila['fecha'])
+                filas.append({'orden_id': orden[0], 'paciente_id': orden[1], **fila})
+                actualizadas.add(orden[0])
+                reporte['fuera_de_rango'] += fila['bandera'] in ('bajo', 'alto')
+
+            if filas:
+                db.session.execute(sentencia, filas)
+                reporte['importados'] += len(filas)
+
+        # Órdenes con resultados recibidos: pendiente -> en_proceso
+        ids = list(actualizadas)
+        for inicio in range(0, len(ids), tamano_lote):
+            db.session.execute(
+                update(OrdenLaboratorio)
+                .where(OrdenLaboratorio.id.in_(ids[inicio:inicio + tamano_lote]),
+                       OrdenLaboratorio.estado == 'pendiente')
+                .values(estado='en_proceso')
+                .execution_options(synchronize_session=False)
+            )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    reporte['ordenes'] = len(actualizadas)
+    return reporte
@@ -1,9 +1,23 @@
 from datetime import datetime
+from sqlalchemy import Integer, cast, func
 from saas.extensions import db
+from saas.utils.fechas import hoy_local
+from saas.utils.secuencias import siguiente_valor, valor_actual
+
+# Códigos de orden: LAB-<año>-<número correlativo del año>
+PREFIJO_CODIGO = 'LAB'
+
 
 class OrdenLaboratorio(db.Model):
-    """Órdenes de laboratorio. TODO: Catálogo de exámenes"""
+    """Órdenes de laboratorio (resultados por examen del catálogo en ResultadoLaboratorio)"""
     __tablename__ = 'ordenes_laboratorio'
+    __table_args__ = (
+        # Paginación por keyset (fecha_orden DESC, id DESC)
+        db.Index('idx_ordenes_lab_fecha_id', 'fecha_orden', 'id'),
+        # Lista de trabajo: por estado, urgentes primero y por antigüedad
+        # (urgente DESC: el ORDER BY mixto se lee del índice sin ordenar)
+        db.Index('idx_ordenes_lab_estado_urgente_fecha', 'estado', db.desc('urgente'), 'fecha_orden'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     hospital_id = db.Column(db.Integer, nullable=False, default=1)
@@ -26,22 +40,159 @@ class OrdenLaboratorio(db.Model):
     medico = db.relationship('Usuario', backref='ordenes_laboratorio', foreign_keys=[medico_id])
     
     def generar_codigo(self):
-        año = datetime.utcnow().year
-        ultimo_id = db.session.query(db.func.max(OrdenLaboratorio.id)).scalar() or 0
-        self.codigo_orden = f'LAB-{año}-{str(ultimo_id + 1).zfill(4)}'
+        """
+        Asigna LAB-<año>-<n>, con n correlativo por año local. El número sale
+        de contadores_orden_laboratorio dentro de la transacción de la orden:
+        dos órdenes simultáneas no repiten código y un rollback lo libera.
+        """
+        año = hoy_local().year
+        numero = ContadorOrdenLaboratorio.tomar_numero(año)
+        self.codigo_orden = f'{PREFIJO_CODIGO}-{año}-{str(numero).zfill(4)}'
+
+
+class ContadorOrdenLaboratorio(db.Model):
+    """
+    Último número de orden de laboratorio entregado por año.
+
+    Una fila por año, protegida por restricción UNIQUE; el número se toma
+    con UPDATE ... SET ultimo_numero = ultimo_numero + 1 RETURNING
+    (saas.utils.secuencias), igual que ContadorTurno.
+    """
+    __tablename__ = 'contadores_orden_laboratorio'
+    __table_args__ = (
+        db.UniqueConstraint('anio', name='uq_contadores_orden_laboratorio_anio'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    anio = db.Column(db.Integer, nullable=False)
+    ultimo_numero = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ContadorOrdenLaboratorio {self.anio}: {self.ultimo_numero}>'
+
+    @staticmethod
+    def tomar_numero(anio):
+        """
+        Siguiente número del año. Al crear la fila parte del mayor número ya
+        usado en los códigos LAB-<año>-* (órdenes previas al contador).
+        """
+        prefijo = f'{PREFIJO_CODIGO}-{anio}-'
+        existentes = db.session.query(
+            func.coalesce(func.max(cast(func.substr(OrdenLaboratorio.codigo_orden, len(prefijo) + 1), Integer)), 0)
+        ).filter(
+            OrdenLaboratorio.codigo_orden.like(f'{prefijo}%')
+        ).scalar_subquery()
+
+        return siguiente_valor(ContadorOrdenLaboratorio.__table__, {'anio': anio}, inicial=existentes)
+
+    @staticmethod
+    def actual(anio):
+        """Último número entregado, o None si el año aún no tiene contador"""
+        return valor_actual(ContadorOrdenLaboratorio.__table__, {'anio': anio})
+
+
+class ExamenLaboratorio(db.Model):
+    """
+    Catálogo de exámenes: unidad y rango de referencia de cada examen
+    numérico (los de tipo 'texto' se informan como texto libre).
+    """
+    __tablename__ = 'examenes_laboratorio'
+    
+    TIPOS = ('numerico', 'texto')
+    
+    id = db.Column(db.Integer, primary_key=True)
+    codigo = db.Column(db.String(20), unique=True, nullable=False)  # ej: GLU, HB, CREA
+    nombre = db.Column(db.String(100), nullable=False)
+    categoria = db.Column(db.String(50))  # Hematología, Química, Orina...
+    tipo = db.Column(db.String(10), nullable=False, default='numerico')
+    unidad = db.Column(db.String(20))
+    ref_min = db.Column(db.Float)
+    ref_max = db.Column(db.Float)
+    activo = db.Column(db.Boolean, nullable=False, default=True)
+    
+    def clasificar(self, valor):
+        """'bajo', 'alto' o 'normal' según el rango; None sin valor o sin rango"""
+        if valor is None or (self.ref_min is None and self.ref_max is None):
+            return None
+        if self.ref_min is not None and valor < self.ref_min:
+            return 'bajo'
+        if self.ref_max is not None and valor > self.ref_max:
+            return 'alto'
+        return 'normal'
+    
+    @property
+    def rango_referencia(self):
+        """Rango como texto, ej: '70–100 mg/dL'"""
+        return formatear_rango(self.ref_min, self.ref_max, self.unidad)
+    
+    def __repr__(self):
+        return f'<ExamenLaboratorio {self.codigo} - {self.nombre}>'
+
+
+def formatear_rango(ref_min, ref_max, unidad=None):
+    if ref_min is None and ref_max is None:
+        return None
+    if ref_min is None:
+        rango = f'< {ref_max:g}'
+    elif ref_max is None:
+        rango = f'> {ref_min:g}'
+    else:
+        rango = f'{ref_min:g}–{ref_max:g}'
+    return f'{rango} {unidad}' if unidad else rango
+
 
 class ResultadoLaboratorio(db.Model):
-    """Resultados de exámenes. TODO: Valores de referencia"""
+    """
+    Resultados de exámenes. Los del catálogo guardan el valor numérico con
+    la unidad y el rango vigentes al informarlos (el catálogo puede cambiar)
+    y su clasificación; los anteriores al catálogo solo tienen el texto.
+    """
     __tablename__ = 'resultados_laboratorio'
+    __table_args__ = (
+        # Tendencia de un examen en un paciente
+        db.Index('idx_resultados_lab_paciente_examen_fecha', 'paciente_id', 'examen_id', 'fecha'),
+    )
+    
+    BANDERAS = ('bajo', 'normal', 'alto')
     
     id = db.Column(db.Integer, primary_key=True)
     orden_id = db.Column(db.Integer, db.ForeignKey('ordenes_laboratorio.id'), nullable=False, index=True)
+    paciente_id = db.Column(db.Integer, db.ForeignKey('pacientes.id'))  # Copiado de la orden
+    examen_id = db.Column(db.Integer, db.ForeignKey('examenes_laboratorio.id'))
+    fecha = db.Column(db.DateTime, default=datetime.utcnow)
     
     examen = db.Column(db.String(100), nullable=False)
-    resultado = db.Column(db.Text, nullable=False)
+    resultado = db.Column(db.Text, nullable=False)  # Texto mostrado (o el valor formateado)
     valor_referencia = db.Column(db.String(100))
     observaciones = db.Column(db.Text)
     
+    # Exámenes numéricos del catálogo
+    valor = db.Column(db.Float)
+    unidad = db.Column(db.String(20))
+    ref_min = db.Column(db.Float)
+    ref_max = db.Column(db.Float)
+    bandera = db.Column(db.String(10))  # bajo, normal, alto
+    
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     orden = db.relationship('OrdenLaboratorio', backref='resultados')
+    examen_catalogo = db.relationship('ExamenLaboratorio')
+    
+    @property
+    def fuera_de_rango(self):
+        return self.bandera in ('bajo', 'alto')
+    
+    @property
+    def color_bandera(self):
+        return {'bajo': 'warning', 'alto': 'danger', 'normal': 'success'}.get(self.bandera, 'secondary')
+    
+    @staticmethod
+    def serie(paciente_id, examen_id):
+        """(fecha, valor, bandera) del examen en el paciente, por fecha (idx_resultados_lab_paciente_examen_fecha)"""
+        return db.session.query(
+            ResultadoLaboratorio.fecha, ResultadoLaboratorio.valor, ResultadoLaboratorio.bandera
+        ).filter(
+            ResultadoLaboratorio.paciente_id == paciente_id,
+            ResultadoLaboratorio.examen_id == examen_id,
+            ResultadoLaboratorio.valor.isnot(None)
+        ).order_by(ResultadoLaboratorio.fecha).all()
@@ -0,0 +1,133 @@
+"""
+Carga de resultados de laboratorio por panel
+Sistema SaaS - Hospital Tipo 1 Uracoa
+
+Un panel completo (hematología, química...) llega en una sola petición:
+
+    [{'codigo': 'HB', 'valor': 11.2}, {'codigo': 'GLU', 'valor': '98'},
+     {'codigo': 'ORINA', 'resultado': 'Negativo', 'observaciones': '...'}]
+
+Los exámenes se buscan en el catálogo con un solo SELECT ... IN, cada
+valor se valida y clasifica contra su rango de referencia y todas las
+filas se insertan con un único executemany. Si alguna entrada es
+inválida no se inserta ninguna.
+"""
+import math
+from datetime import datetime
+from sqlalchemy import insert
+from saas.extensions import db
+from .models import ExamenLaboratorio, ResultadoLaboratorio, formatear_rango
+
+
+def _numero(valor):
+    if isinstance(valor, bool):
+        raise ValueError
+    if isinstance(valor, str):
+        valor = valor.strip().replace(',', '.')
+    numero = float(valor)
+    # float() acepta 'nan' e 'inf'
+    if not math.isfinite(numero):
+        raise ValueError
+    return numero
+
+
+def fila_resultado(examen, entrada, fecha):
+    """
+    Valida una entrada contra su examen del catálogo.
+
+    Returns:
+        (columnas del resultado sin orden_id/paciente_id, error)
+    """
+    codigo = examen.codigo
+    fila = {
+        'examen_id': examen.id,
+        'fecha': fecha,
+        'examen': examen.nombre,
+        'observaciones': (entrada.get('observaciones') or '').strip() or None,
+        'valor': None, 'unidad': None, 'ref_min': None, 'ref_max': None, 'bandera': None,
+        'valor_referencia': None,
+    }
+
+    if examen.tipo == 'numerico':
+        try:
+            valor = _numero(entrada.get('valor'))
+        except (TypeError, ValueError):
+            return None, f'{codigo}: valor numérico requerido'
+        fila.update(
+            valor=valor, unidad=examen.unidad, ref_min=examen.ref_min, ref_max=examen.ref_max,
+            bandera=examen.clasificar(valor),
+            resultado=f'{valor:g} {examen.unidad}' if examen.unidad else f'{valor:g}',
+            valor_referencia=formatear_rango(examen.ref_min, examen.ref_max, examen.unidad),
+        )
+    else:
+        texto = str(entrada.get('resultado') or '').strip()
+        if not texto:
+            return None, f'{codigo}: resultado requerido'
+        fila['resultado'] = texto
+
+    return fila, None
+
+
+def preparar_resultados(orden, entradas, fecha=None):
+    """
+    Valida las entradas contra el catálogo.
+
+    Returns:
+        (filas para insertar, errores): errores es [{'indice', 'error'}]
+    """
+    if not isinstance(entradas, list) or not entradas:
+        return [], [{'indice': None, 'error': 'Se requiere una lista de resultados'}]
+
+    codigos = {str(e.get('codigo', '')).strip().upper() for e in entradas if isinstance(e, dict)}
+    catalogo = {
+        examen.codigo: examen
+        for examen in ExamenLaboratorio.query.filter(
+            ExamenLaboratorio.codigo.in_(codigos), ExamenLaboratorio.activo.is_(True)
+        )
+    }
+
+    fecha = fecha or datetime.utcnow()
+    filas, errores, vistos = [], [], set()
+    for indice, entrada in enumerate(entradas):
+        if not isinstance(entrada, dict):
+            errores.append({'indice': indice, 'error': 'Entrada inválida'})
+            continue
+        codigo = str(entrada.get('codigo', '')).strip().upper()
+        examen = catalogo.get(codigo)
+        if examen is None:
+            errores.append({'indice': indice, 'error': f'Examen desconocido: {codigo or "(vacío)"}'})
+            continue
+        if codigo in vistos:
+            errores.append({'indice': indice, 'error': f'Examen repetido en el panel: {codigo}'})
+            continue
+        vistos.add(codigo)
+
+        fila, error = fila_resultado(examen, entrada, fecha)
+        if error:
+            errores.append({'indice': indice, 'error': error})
+            continue
+        filas.append({'orden_id': orden.id, 'paciente_id': orden.paciente_id, **fila})
+
+    return filas, errores
+
+
+def registrar_resultados(orden, entradas, completar=False):
+    """
+    Inserta el panel en un solo executemany (sin commit).
+
+    Returns:
+        (filas insertadas, errores); si hay errores no se inserta nada
+    """
+    filas, errores = preparar_resultados(orden, entradas)
+    if errores:
+        return [], errores
+
+    # render_nulls: sin él, el ORM agrupa las filas según qué columnas son
+    # NULL y un panel mixto (numéricos + texto) saldría en varios INSERT
+    db.session.execute(insert(ResultadoLaboratorio).execution_options(render_nulls=True), filas)
+    if completar:
+        orden.estado = 'completada'
+        orden.fecha_resultado = filas[0]['fecha']
+    elif orden.estado == 'pendiente':
+        orden.estado = 'en_proceso'
+    return filas, []
@@ -1,29 +1,75 @@
-from flask import render_template, redirect, url_for, flash, request
+import io
+from flask import render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required, current_user
 from saas.extensions import db
 from saas.models import Paciente
 from sqlalchemy.orm import joinedload
+from saas.utils.paginacion import paginar_keyset
+from saas.utils.sse import flujo_eventos
 from . import laboratorio_bp
-from .models import OrdenLaboratorio, ResultadoLaboratorio
+from .models import OrdenLaboratorio, ResultadoLaboratorio, ExamenLaboratorio
+from .resultados import registrar_resultados
+from .importacion import importar_archivo, FORMATOS
+from .trabajo import lista_trabajo, contadores_sla, obtener_avisos, ESTADOS_TRABAJO
 from .forms import OrdenLaboratorioForm, ResultadoForm
 
 @laboratorio_bp.route('/')
 @login_required
 def index():
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     estado = request.args.get('estado', 'todas')
     
     # Query con EAGER LOADING para evitar N+1
     query = OrdenLaboratorio.query.options(
         joinedload(OrdenLaboratorio.paciente),
         joinedload(OrdenLaboratorio.medico)
-    ).order_by(OrdenLaboratorio.fecha_orden.desc())
+    )
     
     if estado != 'todas':
         query = query.filter_by(estado=estado)
-    pagination = query.paginate(page=page, per_page=20, error_out=False)
+    pagination = paginar_keyset(
+        query,
+        [OrdenLaboratorio.fecha_orden.desc(), OrdenLaboratorio.id.desc()],
+        cursor=cursor, per_page=20
+    )
     return render_template('laboratorio/index.html', ordenes=pagination.items, pagination=pagination, estado_filtro=estado)
 
+@laboratorio_bp.route('/trabajo')
+@login_required
+def trabajo():
+    """Lista de trabajo de la mesa: urgentes primero, actualizada por SSE"""
+    return render_template(
+        'laboratorio/trabajo.html',
+        columnas={estado: lista_trabajo(estado) for estado in ESTADOS_TRABAJO},
+        sla=contadores_sla()
+    )
+
+@laboratorio_bp.route('/api/trabajo')
+@login_required
+def api_trabajo():
+    """Lista de trabajo y contadores de tiempo de respuesta (JSON)"""
+    limite = min(request.args.get('limite', 100, type=int), 500)
+    return jsonify({
+        "ok": True,
+        **{estado: lista_trabajo(estado, limite=limite) for estado in ESTADOS_TRABAJO},
+        "sla": contadores_sla()
+    })
+
+@laboratorio_bp.route('/stream')
+@login_required
+def stream():
+    """Flujo SSE de la lista de trabajo: HTML de las columnas y contadores en cada cambio"""
+    avisos = obtener_avisos()
+    
+    def producir():
+        return {
+            'html': render_template('laboratorio/_lista_trabajo.html',
+                                    columnas={estado: lista_trabajo(estado) for estado in ESTADOS_TRABAJO}),
+            'sla': contadores_sla()
+        }
+    
+    return flujo_eventos(avisos.esperar_cambio, producir, evento='trabajo')
+
 @laboratorio_bp.route('/nueva/<int:paciente_id>', methods=['GET', 'POST'])
 @login_required
 def crear(paciente_id):
@@ -34,6 +80,7 @@ def crear(paciente_id):
         orden.generar_codigo()
         db.session.add(orden)
         db.session.commit()
+        obtener_avisos().notificar()
         flash(f'Orden {orden.codigo_orden} creada', 'success')
         return redirect(url_for('laboratorio.show', id=orden.id))
     return render_template('laboratorio/form.html', form=form, paciente=paciente, titulo='Nueva Orden')
@@ -55,6 +102,94 @@ def editar(id):
             from datetime import datetime
             orden.fecha_resultado = datetime.utcnow()
         db.session.commit()
+        obtener_avisos().notificar()
         flash('Orden actualizada', 'success')
         return redirect(url_for('laboratorio.show', id=orden.id))
     return render_template('laboratorio/form.html', form=form, paciente=orden.paciente, orden=orden, titulo='Editar Orden')
+
+@laboratorio_bp.route('/<int:id>/resultados', methods=['POST'])
+@login_required
+def cargar_resultados(id):
+    """
+    Carga un panel de resultados en una sola petición (JSON)
+    
+    Body:
+        {"resultados": [{"codigo": "GLU", "valor": 98}, {"codigo": "ORINA", "resultado": "Negativo"}],
+         "completar": true}
+    """
+    orden = OrdenLaboratorio.query.get_or_404(id)
+    datos = request.get_json(silent=True) or {}
+    
+    filas, errores = registrar_resultados(orden, datos.get('resultados'), completar=bool(datos.get('completar')))
+    if errores:
+        db.session.rollback()
+        return jsonify({"ok": False, "errores": errores}), 400
+    
+    db.session.commit()
+    obtener_avisos().notificar()
+    return jsonify({
+        "ok": True,
+        "orden": orden.codigo_orden,
+        "estado": orden.estado,
+        "creados": len(filas),
+        "fuera_de_rango": [f['examen'] for f in filas if f['bandera'] in ('bajo', 'alto')]
+    }), 201
+
+@laboratorio_bp.route('/importar', methods=['GET', 'POST'])
+@login_required
+def importar():
+    """Importa el archivo exportado por un analizador (CSV o ASTM/HL7)"""
+    reporte = None
+    archivo = request.files.get('archivo')
+    if request.method == 'POST':
+        if not archivo or not archivo.filename:
+            flash('Seleccione un archivo', 'warning')
+            return redirect(url_for('laboratorio.importar'))
+        formato = request.form.get('formato') or ('csv' if archivo.filename.lower().endswith('.csv') else 'astm')
+        if formato not in FORMATOS:
+            flash('Formato no soportado', 'danger')
+            return redirect(url_for('laboratorio.importar'))
+        # Se lee línea a línea desde el archivo temporal de la subida
+        lineas = io.TextIOWrapper(archivo.stream, encoding='utf-8-sig', errors='replace', newline='')
+        reporte = importar_archivo(lineas, formato)
+        if reporte['ordenes']:
+            obtener_avisos().notificar()
+        flash(f"{reporte['importados']} resultados importados, {reporte['duplicados']} ya importados, "
+              f"{reporte['total_errores']} líneas con error",
+              'success' if not reporte['total_errores'] else 'warning')
+    return render_template('laboratorio/importar.html', reporte=reporte,
+                           nombre_archivo=archivo.filename if archivo else None)
+
+@laboratorio_bp.route('/api/catalogo')
+@login_required
+def api_catalogo():
+    """Catálogo de exámenes activos (códigos para la carga de resultados)"""
+    examenes = ExamenLaboratorio.query.filter_by(activo=True).order_by(
+        ExamenLaboratorio.categoria, ExamenLaboratorio.nombre
+    ).all()
+    return jsonify({"ok": True, "examenes": [{
+        "codigo": e.codigo,
+        "nombre": e.nombre,
+        "categoria": e.categoria,
+        "tipo": e.tipo,
+        "unidad": e.unidad,
+        "rango": e.rango_referencia
+    } for e in examenes]})
+
+@laboratorio_bp.route('/api/pacientes/<int:paciente_id>/examenes/<codigo>')
+@login_required
+def api_tendencia_examen(paciente_id, codigo):
+    """Valores de un examen numérico en el tiempo para un paciente"""
+    examen = ExamenLaboratorio.query.filter_by(codigo=codigo.upper()).first_or_404()
+    serie = ResultadoLaboratorio.serie(paciente_id, examen.id)
+    return jsonify({
+        "ok": True,
+        "codigo": examen.codigo,
+        "nombre": examen.nombre,
+        "unidad": examen.unidad,
+        "ref_min": examen.ref_min,
+        "ref_max": examen.ref_max,
+        "fecha": [f.isoformat() for f, _, _ in serie],
+        "valor": [v for _, v, _ in serie],
+        "bandera": [b for _, _, b in serie]
+    })
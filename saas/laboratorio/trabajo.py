@@ -0,0 +1,142 @@
+"""
+Lista de trabajo del laboratorio
+Sistema SaaS - Hospital Tipo 1 Uracoa
+
+La mesa de trabajo ve dos columnas, pendientes y en proceso, con las
+órdenes urgentes primero y luego por antigüedad. Cada columna es un
+WHERE estado = ? ORDER BY urgente DESC, fecha_orden que recorre
+idx_ordenes_lab_estado_urgente_fecha (estado, urgente DESC, fecha_orden)
+en orden, sin ordenar en memoria.
+
+Tiempo de respuesta (TAT) = fecha_resultado - fecha_orden, con un objetivo
+por prioridad (TIEMPO_OBJETIVO). Los contadores se calculan en SQL: las
+órdenes activas fuera de plazo con un GROUP BY (estado, urgente) cubierto
+por el mismo índice, y el cumplimiento de las completadas del día con
+SUM(CASE ...).
+
+Las pantallas de la mesa se actualizan por SSE (saas.utils.sse). Cada
+proceso tiene un AvisosLaboratorio (saas.utils.sse.AvisosCambios): las
+rutas avisan tras confirmar un cambio y los cambios de otros workers se
+detectan por la versión de etiqueta de 'ordenes_laboratorio'.
+"""
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import and_, case, func
+from sqlalchemy.orm import joinedload
+from saas.extensions import db
+from saas.utils.fechas import rango_dia, filtro_rango, minutos_entre_sql
+from saas.utils.sse import AvisosCambios
+from .models import OrdenLaboratorio
+
+# Tiempo objetivo de respuesta en minutos, por urgente
+TIEMPO_OBJETIVO = {True: 60, False: 240}
+
+ESTADOS_TRABAJO = ('pendiente', 'en_proceso')
+
+# Órdenes por columna de la lista
+LIMITE_LISTA = 100
+
+ETIQUETAS = ('ordenes_laboratorio',)
+
+# Segundos tras los que se reenvía la lista aunque no haya cambios
+# (las esperas y los contadores de fuera de plazo avanzan con el reloj)
+REFRESCO = 60
+
+
+def _limite(urgente, ahora):
+    """Órdenes con fecha_orden anterior a esto están fuera de plazo"""
+    return ahora - timedelta(minutes=TIEMPO_OBJETIVO[bool(urgente)])
+
+
+def lista_trabajo(estado, limite=LIMITE_LISTA, ahora=None):
+    """
+    Órdenes del estado, urgentes primero y luego las más antiguas.
+
+    Returns:
+        [{'id', 'codigo_orden', 'paciente', 'examenes', 'urgente', 'estado',
+          'fecha_orden', 'espera', 'objetivo', 'vencida'}]
+    """
+    ahora = ahora or datetime.utcnow()
+    ordenes = OrdenLaboratorio.query.options(
+        joinedload(OrdenLaboratorio.paciente)
+    ).filter(
+        OrdenLaboratorio.estado == estado
+    ).order_by(
+        OrdenLaboratorio.urgente.desc(), OrdenLaboratorio.fecha_orden
+    ).limit(limite).all()
+
+    return [
+        {
+            'id': orden.id,
+            'codigo_orden': orden.codigo_orden,
+            'paciente': orden.paciente.nombre_completo if orden.paciente else None,
+            'examenes': orden.examenes_solicitados,
+            'urgente': bool(orden.urgente),
+            'estado': orden.estado,
+            'fecha_orden': orden.fecha_orden,
+            'espera': int((ahora - orden.fecha_orden).total_seconds() // 60),
+            'objetivo': TIEMPO_OBJETIVO[bool(orden.urgente)],
+            'vencida': orden.fecha_orden < _limite(orden.urgente, ahora),
+        }
+        for orden in ordenes
+    ]
+
+
+def contadores_sla(ahora=None):
+    """
+    Órdenes activas por estado y prioridad (y cuántas fuera de plazo), y
+    cumplimiento del objetivo en las completadas hoy (día local).
+
+    Returns:
+        {'activas': {estado: {'urgentes', 'rutina', 'vencidas'}},
+         'completadas_hoy', 'dentro_objetivo', 'cumplimiento', 'tat_promedio',
+         'tat_urgentes'}
+    """
+    ahora = ahora or datetime.utcnow()
+    urgente = func.coalesce(OrdenLaboratorio.urgente, False)
+
+    activas = {estado: {'urgentes': 0, 'rutina': 0, 'vencidas': 0} for estado in ESTADOS_TRABAJO}
+    # Agrupa por la columna (no por coalesce) para que el índice cubra la consulta
+    for estado, es_urgente, total, vencidas in db.session.query(
+        OrdenLaboratorio.estado, OrdenLaboratorio.urgente, func.count(),
+        func.sum(case(
+            (and_(urgente.is_(True), OrdenLaboratorio.fecha_orden < _limite(True, ahora)), 1),
+            (and_(urgente.is_(False), OrdenLaboratorio.fecha_orden < _limite(False, ahora)), 1),
+            else_=0,
+        ))
+    ).filter(OrdenLaboratorio.estado.in_(ESTADOS_TRABAJO)).group_by(OrdenLaboratorio.estado, OrdenLaboratorio.urgente):
+        activas[estado]['urgentes' if es_urgente else 'rutina'] += total
+        activas[estado]['vencidas'] += vencidas or 0
+
+    minutos = minutos_entre_sql(OrdenLaboratorio.fecha_orden, OrdenLaboratorio.fecha_resultado)
+    objetivo = case((urgente.is_(True), TIEMPO_OBJETIVO[True]), else_=TIEMPO_OBJETIVO[False])
+    completadas, dentro, promedio, promedio_urgentes = db.session.query(
+        func.count(),
+        func.sum(case((minutos <= objetivo, 1), else_=0)),
+        func.avg(minutos),
+        func.avg(case((urgente.is_(True), minutos))),
+    ).filter(
+        OrdenLaboratorio.estado == 'completada',
+        filtro_rango(OrdenLaboratorio.fecha_resultado, *rango_dia())
+    ).one()
+
+    return {
+        'activas': activas,
+        'completadas_hoy': completadas,
+        'dentro_objetivo': dentro or 0,
+        'cumplimiento': round(100 * (dentro or 0) / completadas, 1) if completadas else None,
+        'tat_promedio': round(promedio) if promedio is not None else None,
+        'tat_urgentes': round(promedio_urgentes) if promedio_urgentes is not None else None,
+    }
+
+
+class AvisosLaboratorio(AvisosCambios):
+    """Revisión de la lista de trabajo en este proceso y espera de cambios"""
+
+    ETIQUETAS = ETIQUETAS
+    REFRESCO = REFRESCO
+
+
+def obtener_avisos():
+    """Avisos de la lista de trabajo de esta aplicación en este proceso"""
+    return current_app.extensions.setdefault('avisos_laboratorio', AvisosLaboratorio())
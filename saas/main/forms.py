@@ -5,8 +5,9 @@ Hospital Tipo 1 Uracoa - J&S Software Inteligentes
 from flask_wtf import FlaskForm
 from wtforms import StringField, TextAreaField, DateField, SelectField, IntegerField, FloatField, BooleanField, SubmitField, DateTimeField
 from wtforms.validators import DataRequired, Email, Length, Optional, NumberRange, ValidationError
-from datetime import datetime
 from saas.models import Paciente
+from saas.utils.cedula import normalizar_cedula
+from saas.utils.fechas import ahora_local
 
 
 class PacienteForm(FlaskForm):
@@ -67,7 +68,9 @@ class PacienteForm(FlaskForm):
     
     def validate_cedula(self, cedula):
         """Validar que la cédula no exista"""
-        paciente = Paciente.query.filter_by(cedula=cedula.data).first()
+        paciente = Paciente.query.filter_by(
+            cedula_normalizada=normalizar_cedula(cedula.data)
+        ).first()
         if paciente and (self.paciente_id is None or paciente.id != self.paciente_id):
             raise ValidationError('Esta cédula ya está registrada.')
 
@@ -111,7 +114,7 @@ class CitaForm(FlaskForm):
     
     def validate_fecha_hora(self, fecha_hora):
         """Validar que la fecha no sea en el pasado"""
-        if fecha_hora.data < datetime.now():
+        if fecha_hora.data < ahora_local():
             raise ValidationError('No se pueden programar citas en el pasado.')
 
 
@@ -4,13 +4,22 @@ Hospital Tipo 1 Uracoa - J&S Software Inteligentes
 """
 from flask import render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required, current_user
-from datetime import datetime, timedelta
-from sqlalchemy import func, or_
+from datetime import date, datetime, timedelta
+from sqlalchemy import func
 from sqlalchemy.orm import joinedload
 from saas.main import main_bp
 from saas.main.forms import PacienteForm, CitaForm, HistoriaClinicaForm
 from saas.models import Usuario, Paciente, Cita, HistoriaClinica, Medicamento
 from saas.extensions import db, cache
+from saas.utils.busqueda import buscar_pacientes, filtro_busqueda_pacientes
+from saas.utils.cedula import normalizar_cedula
+from saas.utils.paginacion import paginar_keyset
+from saas.utils.cache_etiquetas import cache_por_etiquetas
+from saas.utils.fechas import ahora_local, hoy_local, filtro_dia, rango_dia
+from saas.utils.series_signos import serie_paciente, CAMPOS_SERIE, MAXIMO_PUNTOS
+from saas.utils.estadisticas import (
+    leer_contadores, clave_citas_dia, clave_consultas_dia, clave_pacientes_medico
+)
 
 
 @main_bp.route('/')
@@ -24,72 +33,53 @@ def index():
 @main_bp.route('/dashboard')
 @login_required
 def dashboard():
-    """Dashboard principal del sistema con caché para estadísticas"""
-    
-    # Función para obtener estadísticas (cacheadas)
-    @cache.cached(timeout=300, key_prefix='dashboard_stats')
-    def get_statistics():
-        total_pacientes = Paciente.query.filter_by(activo=True).count()
-        total_usuarios = Usuario.query.filter_by(activo=True).count()
-        
-        hoy = datetime.now().date()
-        citas_hoy = Cita.query.filter(
-            func.date(Cita.fecha_hora) == hoy
-        ).count()
-        
-        return {
-            'total_pacientes': total_pacientes,
-            'total_usuarios': total_usuarios,
-            'citas_hoy': citas_hoy
-        }
+    """Dashboard principal del sistema con contadores incrementales"""
+    
+    # Estadísticas: contadores mantenidos en cada escritura (un solo SELECT)
+    hoy = hoy_local()
+    claves = {
+        'total_pacientes': 'pacientes_activos',
+        'total_usuarios': 'usuarios_activos',
+        'citas_hoy': clave_citas_dia(hoy),
+        'consultas_hoy': clave_consultas_dia(hoy),
+        'emergencias_activas': 'emergencias_activas',
+        'internados_activos': 'internados_activos',
+    }
+    if current_user.es_medico:
+        claves['mis_citas_hoy'] = clave_citas_dia(hoy, current_user.id)
+        claves['mis_pacientes'] = clave_pacientes_medico(current_user.id)
     
-    stats = get_statistics()
+    contadores = leer_contadores(*claves.values())
+    stats = {'mis_citas_hoy': 0, 'mis_pacientes': 0}
+    stats.update({nombre: contadores[clave] for nombre, clave in claves.items()})
     
     # Próximas citas (siguientes 7 días) con eager loading - NO cacheadas
-    fecha_limite = datetime.now() + timedelta(days=7)
+    # Cita.fecha_hora se guarda en hora local
+    ahora = ahora_local()
+    fecha_limite = ahora + timedelta(days=7)
     proximas_citas = Cita.query.options(
         joinedload(Cita.paciente),
         joinedload(Cita.medico)
     ).filter(
-        Cita.fecha_hora >= datetime.now(),
+        Cita.fecha_hora >= ahora,
         Cita.fecha_hora <= fecha_limite,
         Cita.estado.in_(['programada', 'confirmada'])
     ).order_by(Cita.fecha_hora).limit(10).all()
     
-    # Medicamentos con stock bajo - cacheados
-    @cache.cached(timeout=300, key_prefix='medicamentos_bajo_stock')
+    # Medicamentos con stock bajo - cacheados hasta que cambie el inventario
+    @cache_por_etiquetas('medicamentos', timeout=86400, key_prefix='medicamentos_bajo_stock')
     def get_low_stock_meds():
         return Medicamento.query.filter(
-            Medicamento.cantidad_stock <= Medicamento.stock_minimo,
+            Medicamento.stock_bajo,
             Medicamento.activo == True
         ).limit(5).all()
     
     medicamentos_bajo_stock = get_low_stock_meds()
     
-    # Estadísticas por rol - NO cacheadas (personalizadas por usuario)
-    if current_user.es_medico:
-        hoy = datetime.now().date()
-        mis_citas_hoy = Cita.query.filter(
-            func.date(Cita.fecha_hora) == hoy,
-            Cita.medico_id == current_user.id
-        ).count()
-        
-        mis_pacientes = Paciente.query.filter_by(
-            medico_id=current_user.id,
-            activo=True
-        ).count()
-    else:
-        mis_citas_hoy = 0
-        mis_pacientes = 0
-    
     return render_template('main/dashboard.html',
-                         total_pacientes=stats['total_pacientes'],
-                         total_usuarios=stats['total_usuarios'],
-                         citas_hoy=stats['citas_hoy'],
                          proximas_citas=proximas_citas,
                          medicamentos_bajo_stock=medicamentos_bajo_stock,
-                         mis_citas_hoy=mis_citas_hoy,
-                         mis_pacientes=mis_pacientes)
+                         **stats)
 
 
 @main_bp.route('/usuarios')
@@ -100,9 +90,11 @@ def usuarios():
         flash('No tienes permisos para acceder a esta página.', 'danger')
         return redirect(url_for('main.dashboard'))
     
-    page = request.args.get('page', 1, type=int)
-    usuarios = Usuario.query.order_by(Usuario.fecha_registro.desc()).paginate(
-        page=page, per_page=20, error_out=False
+    cursor = request.args.get('cursor')
+    usuarios = paginar_keyset(
+        Usuario.query,
+        [Usuario.fecha_registro.desc(), Usuario.id.desc()],
+        cursor=cursor, per_page=20, contar='exacto'
     )
     
     return render_template('main/usuarios.html', usuarios=usuarios)
@@ -112,36 +104,28 @@ def usuarios():
 @login_required
 def pacientes():
     """Listar pacientes - OPTIMIZADA con caché y eager loading"""
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     search = request.args.get('search', '', type=str)
     
     # Query con eager loading del médico tratante
     query = Paciente.query.options(joinedload(Paciente.medico_tratante))
     
-    if search:
-        query = query.filter(
-            or_(
-                Paciente.nombre.ilike(f'%{search}%'),
-                Paciente.apellido.ilike(f'%{search}%'),
-                Paciente.cedula.ilike(f'%{search}%')
-            )
-        )
+    # Búsqueda por subcadena respaldada por índices de trigramas
+    filtro = filtro_busqueda_pacientes(search)
+    if filtro is not None:
+        query = query.filter(filtro)
     
     # Si es médico, mostrar solo sus pacientes
     if current_user.es_medico and not current_user.es_admin:
         query = query.filter_by(medico_id=current_user.id)
     
-    # Cachear conteo solo si no hay búsqueda
-    if not search:
-        cache_key = f'pacientes_count_{current_user.id}_{current_user.rol}'
-        total_count = cache.get(cache_key)
-        if total_count is None:
-            total_count = query.filter_by(activo=True).count()
-            cache.set(cache_key, total_count, timeout=300)
-    
-    pacientes = query.filter_by(activo=True).order_by(
-        Paciente.fecha_registro.desc()
-    ).paginate(page=page, per_page=20, error_out=False)
+    # Paginación por keyset; el total sin búsqueda se cachea
+    pacientes = paginar_keyset(
+        query.filter_by(activo=True),
+        [Paciente.fecha_registro.desc(), Paciente.id.desc()],
+        cursor=cursor, per_page=20,
+        contar=None if search else 'cache'
+    )
     
     return render_template('main/pacientes.html', pacientes=pacientes, search=search)
 
@@ -178,7 +162,7 @@ def paciente_detalle(id):
 @login_required
 def citas():
     """Listar citas"""
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     fecha = request.args.get('fecha', None, type=str)
     estado = request.args.get('estado', None, type=str)
     
@@ -195,7 +179,7 @@ def citas():
     if fecha:
         try:
             fecha_obj = datetime.strptime(fecha, '%Y-%m-%d').date()
-            query = query.filter(func.date(Cita.fecha_hora) == fecha_obj)
+            query = query.filter(filtro_dia(Cita.fecha_hora, fecha_obj, utc=False))
         except ValueError:
             pass
     
@@ -203,8 +187,10 @@ def citas():
     if estado:
         query = query.filter_by(estado=estado)
     
-    citas = query.order_by(Cita.fecha_hora.desc()).paginate(
-        page=page, per_page=20, error_out=False
+    citas = paginar_keyset(
+        query,
+        [Cita.fecha_hora.desc(), Cita.id.desc()],
+        cursor=cursor, per_page=20
     )
     
     return render_template('main/citas.html', citas=citas, fecha=fecha, estado=estado)
@@ -243,6 +229,55 @@ def api_estadisticas():
     })
 
 
+@main_bp.route('/api/cache/estadisticas')
+@login_required
+def api_cache_estadisticas():
+    """API con aciertos/fallos/desalojos del caché del worker que atiende"""
+    if not current_user.es_admin:
+        return jsonify({"ok": False, "error": "No autorizado"}), 403
+    
+    backend = cache.cache
+    estadisticas = backend.estadisticas() if hasattr(backend, 'estadisticas') else {}
+    return jsonify({"ok": True, "backend": type(backend).__name__, **estadisticas})
+
+
+@main_bp.route('/api/pacientes/<int:id>/signos')
+@login_required
+def api_signos_paciente(id):
+    """
+    Series de signos vitales del paciente (consultas, emergencias y
+    evoluciones) como arreglos por columna, para gráficos de tendencia
+    
+    Query params:
+        desde, hasta: días locales YYYY-MM-DD (opcionales)
+        puntos: máximo de puntos por signo, reducidos con LTTB (por defecto 300)
+        campos: signos separados por coma (por defecto todos)
+    """
+    paciente = Paciente.query.get_or_404(id)
+    
+    try:
+        desde = rango_dia(date.fromisoformat(request.args['desde']))[0] if request.args.get('desde') else None
+        hasta = rango_dia(date.fromisoformat(request.args['hasta']))[1] if request.args.get('hasta') else None
+    except ValueError:
+        return jsonify({"ok": False, "error": "Fechas inválidas (use YYYY-MM-DD)"}), 400
+    
+    puntos = request.args.get('puntos', 300, type=int)
+    if not puntos or not 3 <= puntos <= MAXIMO_PUNTOS:
+        return jsonify({"ok": False, "error": f"'puntos' debe estar entre 3 y {MAXIMO_PUNTOS}"}), 400
+    
+    campos = tuple(c for c in (request.args.get('campos') or '').split(',') if c) or CAMPOS_SERIE
+    invalidos = set(campos) - set(CAMPOS_SERIE)
+    if invalidos:
+        return jsonify({"ok": False, "error": f"Signos inválidos: {', '.join(sorted(invalidos))}"}), 400
+    
+    return jsonify({
+        "ok": True,
+        "paciente_id": paciente.id,
+        "puntos": puntos,
+        **serie_paciente(paciente.id, desde, hasta, puntos, campos)
+    })
+
+
 @main_bp.route('/api/pacientes/buscar')
 @login_required
 def api_buscar_paciente():
@@ -264,23 +299,20 @@ def api_buscar_paciente():
             "error": "Ingrese al menos 4 dígitos de la cédula"
         }), 400
     
-    # Búsqueda exacta (case-insensitive) - solo campos necesarios
+    # Búsqueda exacta por cédula normalizada (seek sobre índice único)
     paciente = Paciente.query.filter(
-        func.lower(Paciente.cedula) == cedula.lower()
+        Paciente.cedula_normalizada == normalizar_cedula(cedula)
     ).first()
     
     if not paciente:
-        # No encontrado - buscar similares (máximo 5, solo campos básicos)
-        similares = Paciente.query.with_entities(
+        # No encontrado - buscar similares por cédula o nombre, ordenados por similitud
+        similares = buscar_pacientes(cedula, limite=5, query=Paciente.query.with_entities(
             Paciente.id,
             Paciente.cedula,
             Paciente.nombre,
             Paciente.apellido,
             Paciente.fecha_nacimiento
-        ).filter(
-            Paciente.cedula.ilike(f"%{cedula}%"),
-            Paciente.activo == True
-        ).limit(5).all()
+        ))
         
         return jsonify({
             "ok": True,
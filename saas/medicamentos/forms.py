@@ -109,3 +109,28 @@ class MedicamentoForm(FlaskForm):
         validators=[Optional()],
         render_kw={'rows': 3, 'placeholder': 'Notas adicionales sobre el medicamento...'}
     )
+
+
+class MovimientoStockForm(FlaskForm):
+    """Formulario para registrar un movimiento de inventario (kardex)"""
+    
+    tipo = SelectField(
+        'Tipo de Movimiento',
+        choices=[
+            ('entrada', 'Entrada'),
+            ('salida', 'Salida / Despacho'),
+            ('vencimiento', 'Baja por Vencimiento'),
+            ('ajuste', 'Ajuste (+/-)')
+        ],
+        default='entrada'
+    )
+    cantidad = IntegerField(
+        'Cantidad',
+        validators=[DataRequired(message='Indique una cantidad distinta de cero')],
+        render_kw={'placeholder': 'Ej: 20 (en ajustes, negativa para descontar)'}
+    )
+    motivo = StringField(
+        'Motivo',
+        validators=[Optional()],
+        render_kw={'placeholder': 'Ej: Donación, despacho a emergencia, conteo físico...'}
+    )
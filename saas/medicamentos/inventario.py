@@ -0,0 +1,44 @@
+"""
+Contadores del inventario de medicamentos
+Sistema SaaS - Hospital Tipo 1 Uracoa
+
+Los badges de la lista (total, bajo stock, vencidos, por vencer) salen de
+un solo SELECT con SUM(CASE ...) sobre los medicamentos activos, en vez
+de un COUNT por badge. Las condiciones son las mismas de los filtros
+(Medicamento.stock_bajo y Medicamento.filtro_vencimiento) y todas las
+columnas están en idx_medicamentos_activo_vencimiento, así que el motor
+recorre solo el índice. El total es COUNT(*), no COUNT(id): id no está en
+el índice de PostgreSQL (en SQLite sí, es el rowid).
+
+El resultado se cachea con la etiqueta 'medicamentos' (se invalida al
+confirmar cualquier cambio del inventario) y por día local: los vencidos
+cambian a medianoche aunque nadie toque la tabla.
+"""
+from sqlalchemy import case, func
+from saas.extensions import db
+from saas.models import Medicamento
+from saas.utils.cache_etiquetas import cache_por_etiquetas
+from saas.utils.fechas import hoy_local
+
+
+def _suma(condicion):
+    return func.coalesce(func.sum(case((condicion, 1), else_=0)), 0)
+
+
+@cache_por_etiquetas('medicamentos', timeout=86400, key_prefix='contadores_inventario')
+def _contadores(hoy):
+    total, bajo_stock, vencidos, por_vencer = db.session.query(
+        func.count(),
+        _suma(Medicamento.stock_bajo),
+        _suma(Medicamento.filtro_vencimiento('vencido', hoy)),
+        _suma(Medicamento.filtro_vencimiento('por_vencer', hoy)),
+    ).filter(Medicamento.activo.is_(True)).one()
+    return {'total': total, 'bajo_stock': bajo_stock, 'vencidos': vencidos, 'por_vencer': por_vencer}
+
+
+def contadores_inventario(hoy=None):
+    """
+    Returns:
+        {'total', 'bajo_stock', 'vencidos', 'por_vencer'} de los activos
+    """
+    return _contadores(hoy or hoy_local())
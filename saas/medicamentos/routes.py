@@ -2,20 +2,21 @@
 Rutas del módulo Medicamentos
 Inventario institucional para hospital público rural
 """
-from datetime import datetime, date
 from flask import render_template, redirect, url_for, flash, request
 from flask_login import login_required, current_user
 from saas.medicamentos import medicamentos_bp
-from saas.medicamentos.forms import MedicamentoForm
-from saas.models import Medicamento
+from saas.medicamentos.forms import MedicamentoForm, MovimientoStockForm
+from saas.models import Medicamento, MovimientoStock
 from saas.extensions import db
+from saas.utils.paginacion import paginar_keyset
+from saas.medicamentos.inventario import contadores_inventario
 
 
 @medicamentos_bp.route('/')
 @login_required
 def index():
     """Lista de medicamentos con filtros y badges de estado"""
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     filtro = request.args.get('filtro', 'todos')
     buscar = request.args.get('buscar', '').strip()
     
@@ -30,42 +31,27 @@ def index():
             )
         )
     
-    # Aplicar filtros
+    # Aplicar filtros (mismas condiciones que los contadores)
     if filtro == 'bajo_stock':
-        query = query.filter(Medicamento.cantidad_stock <= Medicamento.stock_minimo)
-    elif filtro == 'vencido':
-        query = query.filter(Medicamento.fecha_vencimiento < date.today())
-    elif filtro == 'por_vencer':
-        # Medicamentos que vencen en los próximos 30 días
-        from datetime import timedelta
-        fecha_limite = date.today() + timedelta(days=30)
-        query = query.filter(
-            Medicamento.fecha_vencimiento.between(date.today(), fecha_limite)
-        )
+        query = query.filter(Medicamento.stock_bajo)
+    elif filtro in ('vencido', 'por_vencer'):
+        query = query.filter(Medicamento.filtro_vencimiento(filtro))
     
-    medicamentos = query.order_by(Medicamento.nombre).paginate(
-        page=page, per_page=20, error_out=False
+    medicamentos = paginar_keyset(
+        query,
+        [Medicamento.nombre.asc(), Medicamento.id.asc()],
+        cursor=cursor, per_page=20
     )
     
-    # Contadores para badges
-    total = Medicamento.query.filter_by(activo=True).count()
-    bajo_stock = Medicamento.query.filter(
-        Medicamento.activo == True,
-        Medicamento.cantidad_stock <= Medicamento.stock_minimo
-    ).count()
-    vencidos = Medicamento.query.filter(
-        Medicamento.activo == True,
-        Medicamento.fecha_vencimiento < date.today()
-    ).count()
+    # Contadores para badges (un solo SUM(CASE ...), cacheado)
+    contadores = contadores_inventario()
     
     return render_template(
         'medicamentos/index.html',
         medicamentos=medicamentos,
         filtro=filtro,
         buscar=buscar,
-        total=total,
-        bajo_stock=bajo_stock,
-        vencidos=vencidos
+        **contadores
     )
 
 
@@ -84,7 +70,7 @@ def crear():
             codigo_barras=form.codigo_barras.data if form.codigo_barras.data else None,
             registro_sanitario=form.registro_sanitario.data,
             laboratorio=form.laboratorio.data,
-            cantidad_stock=form.cantidad_stock.data,
+            cantidad_stock=0,
             unidad_medida=form.unidad_medida.data,
             stock_minimo=form.stock_minimo.data,
             fecha_vencimiento=form.fecha_vencimiento.data,
@@ -94,6 +80,11 @@ def crear():
         )
         
         db.session.add(medicamento)
+        db.session.flush()
+        # El stock inicial entra por el kardex como cualquier otro movimiento
+        if form.cantidad_stock.data:
+            MovimientoStock.registrar(medicamento.id, 'entrada', form.cantidad_stock.data,
+                                      usuario_id=current_user.id, motivo='Saldo inicial')
         db.session.commit()
         
         flash(f'Medicamento "{medicamento.nombre}" agregado al inventario', 'success')
@@ -107,7 +98,11 @@ def crear():
 def detalle(id):
     """Ver detalle de medicamento"""
     medicamento = Medicamento.query.get_or_404(id)
-    return render_template('medicamentos/detalle.html', medicamento=medicamento)
+    movimientos = medicamento.movimientos.order_by(
+        MovimientoStock.fecha.desc(), MovimientoStock.id.desc()
+    ).limit(50).all()
+    return render_template('medicamentos/detalle.html', medicamento=medicamento,
+                           movimientos=movimientos, form_movimiento=MovimientoStockForm())
 
 
 @medicamentos_bp.route('/<int:id>/editar', methods=['GET', 'POST'])
@@ -116,6 +111,8 @@ def editar(id):
     """Editar medicamento"""
     medicamento = Medicamento.query.get_or_404(id)
     form = MedicamentoForm(obj=medicamento)
+    # El stock solo cambia con movimientos (kardex), no editando el saldo
+    del form.cantidad_stock
     
     if form.validate_on_submit():
         medicamento.nombre = form.nombre.data
@@ -125,7 +122,6 @@ def editar(id):
         medicamento.codigo_barras = form.codigo_barras.data if form.codigo_barras.data else None
         medicamento.registro_sanitario = form.registro_sanitario.data
         medicamento.laboratorio = form.laboratorio.data
-        medicamento.cantidad_stock = form.cantidad_stock.data
         medicamento.unidad_medida = form.unidad_medida.data
         medicamento.stock_minimo = form.stock_minimo.data
         medicamento.fecha_vencimiento = form.fecha_vencimiento.data
@@ -139,6 +135,36 @@ def editar(id):
     return render_template('medicamentos/form.html', form=form, medicamento=medicamento, title='Editar Medicamento')
 
 
+@medicamentos_bp.route('/<int:id>/movimientos', methods=['POST'])
+@login_required
+def registrar_movimiento(id):
+    """Registrar entrada, salida, baja o ajuste de stock"""
+    medicamento = Medicamento.query.get_or_404(id)
+    form = MovimientoStockForm()
+    
+    if form.validate_on_submit():
+        try:
+            movimiento = MovimientoStock.registrar(
+                medicamento.id, form.tipo.data, form.cantidad.data,
+                usuario_id=current_user.id, motivo=form.motivo.data or None
+            )
+        except ValueError as e:
+            flash(str(e), 'danger')
+            return redirect(url_for('medicamentos.detalle', id=medicamento.id))
+        
+        if movimiento is None:
+            db.session.rollback()
+            flash(f'Stock insuficiente: hay {medicamento.cantidad_stock} {medicamento.unidad_medida or ""}', 'danger')
+        else:
+            db.session.commit()
+            flash(f'Movimiento registrado. Nuevo saldo: {movimiento.saldo}', 'success')
+    else:
+        for errores in form.errors.values():
+            flash(errores[0], 'danger')
+    
+    return redirect(url_for('medicamentos.detalle', id=medicamento.id))
+
+
 @medicamentos_bp.route('/<int:id>/eliminar', methods=['POST'])
 @login_required
 def eliminar(id):
@@ -2,10 +2,17 @@
 Modelos de Base de Datos - Hospital Tipo 1 Uracoa
 J&S Software Inteligentes
 """
-from datetime import datetime
+from datetime import datetime, timedelta
 from flask_login import UserMixin
+from sqlalchemy import event, DDL, and_, case, func, select, update
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import validates
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
 from werkzeug.security import generate_password_hash, check_password_hash
 from saas.extensions import db, login_manager
+from saas.utils.cedula import normalizar_cedula
+from saas.utils.fechas import hoy_local
 
 
 @login_manager.user_loader
@@ -17,6 +24,10 @@ def load_user(user_id):
 class Usuario(UserMixin, db.Model):
     """Modelo de Usuario del sistema"""
     __tablename__ = 'usuarios'
+    __table_args__ = (
+        # Paginación por keyset (fecha_registro DESC, id DESC)
+        db.Index('idx_usuarios_registro_id', 'fecha_registro', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False, index=True)
@@ -27,6 +38,7 @@ class Usuario(UserMixin, db.Model):
     nombre = db.Column(db.String(100), nullable=False)
     apellido = db.Column(db.String(100), nullable=False)
     cedula = db.Column(db.String(20), unique=True, index=True)
+    cedula_normalizada = db.Column(db.String(20), unique=True, index=True)  # ver normalizar_cedula()
     telefono = db.Column(db.String(20))
     
     # Rol y permisos
@@ -38,7 +50,7 @@ class Usuario(UserMixin, db.Model):
     
     # Estado y fechas
     activo = db.Column(db.Boolean, default=True)
-    fecha_registro = db.Column(db.DateTime, default=datetime.utcnow)
+    fecha_registro = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     ultimo_acceso = db.Column(db.DateTime)
     
     # Relaciones (optimized with lazy='select' to avoid N+1 queries)
@@ -47,6 +59,12 @@ class Usuario(UserMixin, db.Model):
     citas_asignadas = db.relationship('Cita', backref='medico', lazy='select')
     historias_creadas = db.relationship('HistoriaClinica', backref='medico', lazy='select')
     
+    @validates('cedula')
+    def _sincronizar_cedula(self, key, cedula):
+        """Mantener cedula_normalizada al crear o editar"""
+        self.cedula_normalizada = normalizar_cedula(cedula)
+        return cedula
+    
     def set_password(self, password):
         """Generar hash de contraseña"""
         self.password_hash = generate_password_hash(password)
@@ -75,11 +93,16 @@ class Usuario(UserMixin, db.Model):
 class Paciente(db.Model):
     """Modelo de Paciente"""
     __tablename__ = 'pacientes'
+    __table_args__ = (
+        # Paginación por keyset (fecha_registro DESC, id DESC)
+        db.Index('idx_pacientes_registro_id', 'fecha_registro', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     
     # Información personal
     cedula = db.Column(db.String(20), unique=True, nullable=False, index=True)
+    cedula_normalizada = db.Column(db.String(20), unique=True, index=True)  # ver normalizar_cedula()
     nombre = db.Column(db.String(100), nullable=False)
     apellido = db.Column(db.String(100), nullable=False)
     fecha_nacimiento = db.Column(db.Date, nullable=False)
@@ -112,7 +135,7 @@ class Paciente(db.Model):
     
     # Estado y fechas
     activo = db.Column(db.Boolean, default=True)
-    fecha_registro = db.Column(db.DateTime, default=datetime.utcnow)
+    fecha_registro = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     ultima_consulta = db.Column(db.DateTime)
     
     # Relaciones (optimized with lazy='select' to avoid N+1 queries)
@@ -120,6 +143,12 @@ class Paciente(db.Model):
     historias_clinicas = db.relationship('HistoriaClinica', backref='paciente', 
                                         lazy='select', cascade='all, delete-orphan')
     
+    @validates('cedula')
+    def _sincronizar_cedula(self, key, cedula):
+        """Mantener cedula_normalizada al crear o editar"""
+        self.cedula_normalizada = normalizar_cedula(cedula)
+        return cedula
+    
     @property
     def nombre_completo(self):
         return f"{self.nombre} {self.apellido}"
@@ -137,9 +166,54 @@ class Paciente(db.Model):
         return f'<Paciente {self.nombre_completo} - {self.cedula}>'
 
 
+# Índices de búsqueda por trigramas (ver saas/utils/busqueda.py)
+# PostgreSQL: pg_trgm + GIN. SQLite: tabla FTS5 'trigram' sincronizada por triggers.
+_DDL_BUSQUEDA_POSTGRES = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS idx_pacientes_nombre_trgm ON pacientes USING gin (nombre gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS idx_pacientes_apellido_trgm ON pacientes USING gin (apellido gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS idx_pacientes_cedula_trgm ON pacientes USING gin (cedula gin_trgm_ops)',
+]
+
+_DDL_BUSQUEDA_SQLITE = [
+    'DROP TABLE IF EXISTS pacientes_fts',
+    "CREATE VIRTUAL TABLE pacientes_fts USING fts5("
+    "cedula, nombre, apellido, content='pacientes', content_rowid='id', tokenize='trigram')",
+    'CREATE TRIGGER IF NOT EXISTS pacientes_fts_ai AFTER INSERT ON pacientes BEGIN '
+    'INSERT INTO pacientes_fts(rowid, cedula, nombre, apellido) '
+    'VALUES (new.id, new.cedula, new.nombre, new.apellido); END',
+    'CREATE TRIGGER IF NOT EXISTS pacientes_fts_ad AFTER DELETE ON pacientes BEGIN '
+    "INSERT INTO pacientes_fts(pacientes_fts, rowid, cedula, nombre, apellido) "
+    "VALUES ('delete', old.id, old.cedula, old.nombre, old.apellido); END",
+    'CREATE TRIGGER IF NOT EXISTS pacientes_fts_au AFTER UPDATE OF cedula, nombre, apellido ON pacientes BEGIN '
+    "INSERT INTO pacientes_fts(pacientes_fts, rowid, cedula, nombre, apellido) "
+    "VALUES ('delete', old.id, old.cedula, old.nombre, old.apellido); "
+    'INSERT INTO pacientes_fts(rowid, cedula, nombre, apellido) '
+    'VALUES (new.id, new.cedula, new.nombre, new.apellido); END',
+]
+
+for _sentencia in _DDL_BUSQUEDA_POSTGRES:
+    event.listen(Paciente.__table__, 'after_create',
+                 DDL(_sentencia).execute_if(dialect='postgresql'))
+
+for _sentencia in _DDL_BUSQUEDA_SQLITE:
+    event.listen(Paciente.__table__, 'after_create',
+                 DDL(_sentencia).execute_if(dialect='sqlite'))
+
+event.listen(Paciente.__table__, 'before_drop',
+             DDL('DROP TABLE IF EXISTS pacientes_fts').execute_if(dialect='sqlite'))
+
+
 class Cita(db.Model):
     """Modelo de Citas Médicas"""
     __tablename__ = 'citas'
+    __table_args__ = (
+        # Paginación por keyset (fecha_hora DESC, id DESC)
+        db.Index('idx_citas_fecha_id', 'fecha_hora', 'id'),
+        # Migración 569d9341e509: agenda por estado y por médico
+        db.Index('idx_citas_estado_fecha', 'estado', 'fecha_hora'),
+        db.Index('idx_citas_medico_fecha', 'medico_id', 'fecha_hora'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     
@@ -218,6 +292,17 @@ class HistoriaClinica(db.Model):
 class Medicamento(db.Model):
     """Modelo de Medicamentos (Inventario Institucional)"""
     __tablename__ = 'medicamentos'
+    __table_args__ = (
+        # Paginación por keyset (nombre, id)
+        db.Index('idx_medicamentos_nombre_id', 'nombre', 'id'),
+        # Contadores del inventario y filtros por vencimiento: cubre
+        # SUM(CASE ...) sin leer la tabla
+        db.Index('idx_medicamentos_activo_vencimiento', 'activo', 'fecha_vencimiento',
+                 'cantidad_stock', 'stock_minimo'),
+    )
+    
+    # Días antes del vencimiento en que un medicamento pasa a 'por_vencer'
+    DIAS_POR_VENCER = 30
     
     id = db.Column(db.Integer, primary_key=True)
     
@@ -252,27 +337,162 @@ class Medicamento(db.Model):
     # Relación con responsable
     responsable = db.relationship('Usuario', foreign_keys=[responsable_id], backref='medicamentos_asignados')
     
-    @property
+    @hybrid_property
     def stock_bajo(self):
-        """Retorna True si el stock está por debajo del mínimo"""
+        """True si el stock está en el mínimo o por debajo (también como expresión SQL)"""
+        if self.cantidad_stock is None or self.stock_minimo is None:
+            return False
         return self.cantidad_stock <= self.stock_minimo
     
-    @property
+    @stock_bajo.expression
+    def stock_bajo(cls):
+        return cls.cantidad_stock <= cls.stock_minimo
+    
+    @classmethod
+    def filtro_vencimiento(cls, estado, hoy=None):
+        """
+        Condición SQL de 'vencido', 'por_vencer' o 'vigente' como rango
+        sobre fecha_vencimiento (usa idx_medicamentos_activo_vencimiento)
+        """
+        hoy = hoy or hoy_local()
+        limite = hoy + timedelta(days=cls.DIAS_POR_VENCER)
+        if estado == 'vencido':
+            return cls.fecha_vencimiento < hoy
+        if estado == 'por_vencer':
+            return and_(cls.fecha_vencimiento >= hoy, cls.fecha_vencimiento <= limite)
+        if estado == 'vigente':
+            return cls.fecha_vencimiento > limite
+        raise ValueError(f'Estado de vencimiento desconocido: {estado}')
+    
+    @hybrid_property
     def estado_vencimiento(self):
-        """Retorna estado según fecha de vencimiento"""
+        """'vencido', 'por_vencer', 'vigente' o None sin fecha (también como expresión SQL)"""
         if not self.fecha_vencimiento:
             return None
         
-        from datetime import date, timedelta
-        hoy = date.today()
-        dias_para_vencer = (self.fecha_vencimiento - hoy).days
+        dias_para_vencer = (self.fecha_vencimiento - hoy_local()).days
         
         if dias_para_vencer < 0:
             return 'vencido'
-        elif dias_para_vencer <= 30:
+        elif dias_para_vencer <= self.DIAS_POR_VENCER:
             return 'por_vencer'
         else:
             return 'vigente'
     
+    @estado_vencimiento.expression
+    def estado_vencimiento(cls):
+        return case(
+            (cls.filtro_vencimiento('vencido'), 'vencido'),
+            (cls.filtro_vencimiento('por_vencer'), 'por_vencer'),
+            (cls.filtro_vencimiento('vigente'), 'vigente'),
+            else_=None
+        )
+    
     def __repr__(self):
         return f'<Medicamento {self.nombre} - Stock: {self.cantidad_stock}>'
+
+
+class MovimientoStock(db.Model):
+    """
+    Kardex de medicamentos: movimientos de inventario, solo inserción.
+
+    cantidad_stock de Medicamento es el saldo materializado; solo lo cambia
+    MovimientoStock.registrar() con un UPDATE condicional, nunca se edita
+    directamente.
+    """
+    __tablename__ = 'movimientos_stock'
+    __table_args__ = (
+        # Kardex de un medicamento por fecha
+        db.Index('idx_movimientos_stock_medicamento_fecha', 'medicamento_id', 'fecha'),
+    )
+    
+    # Signo de la cantidad por tipo (ajuste: la cantidad ya trae su signo)
+    TIPOS = {'entrada': 1, 'salida': -1, 'vencimiento': -1, 'ajuste': None}
+    
+    id = db.Column(db.Integer, primary_key=True)
+    medicamento_id = db.Column(db.Integer, db.ForeignKey('medicamentos.id'), nullable=False)
+    tipo = db.Column(db.String(20), nullable=False)  # entrada, salida, ajuste, vencimiento
+    cantidad = db.Column(db.Integer, nullable=False)  # Con signo: + entra, - sale
+    saldo = db.Column(db.Integer, nullable=False)  # cantidad_stock tras el movimiento
+    motivo = db.Column(db.String(200))
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'))
+    fecha = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    medicamento = db.relationship('Medicamento', backref=db.backref('movimientos', lazy='dynamic'))
+    usuario = db.relationship('Usuario', foreign_keys=[usuario_id])
+    
+    @staticmethod
+    def registrar(medicamento_id, tipo, cantidad, usuario_id=None, motivo=None):
+        """
+        Aplica el movimiento al saldo en un solo UPDATE condicional:
+            UPDATE medicamentos SET cantidad_stock = cantidad_stock + :delta
+            WHERE id = ? AND cantidad_stock + :delta >= 0
+        y agrega la fila del kardex con el saldo resultante. Dos salidas
+        simultáneas no pierden ninguna actualización ni dejan el saldo
+        negativo (la segunda re-evalúa la condición con el saldo ya
+        descontado). No hace commit.
+        
+        Returns:
+            El MovimientoStock, o None si el saldo quedaría negativo
+        """
+        if tipo not in MovimientoStock.TIPOS:
+            raise ValueError(f'Tipo de movimiento desconocido: {tipo}')
+        signo = MovimientoStock.TIPOS[tipo]
+        if not cantidad or (signo is not None and cantidad < 0):
+            raise ValueError('La cantidad debe ser positiva (o distinta de cero en un ajuste)')
+        delta = cantidad * signo if signo is not None else cantidad
+        
+        saldo_nuevo = func.coalesce(Medicamento.cantidad_stock, 0) + delta
+        sentencia = update(Medicamento).where(
+            Medicamento.id == medicamento_id, saldo_nuevo >= 0
+        ).values(cantidad_stock=saldo_nuevo).execution_options(synchronize_session=False)
+        
+        if db.session.get_bind().dialect.update_returning:
+            saldo = db.session.execute(sentencia.returning(Medicamento.cantidad_stock)).scalar()
+        elif db.session.execute(sentencia).rowcount == 1:
+            # Sin RETURNING: la fila queda bloqueada por el UPDATE hasta el commit
+            saldo = db.session.execute(
+                select(Medicamento.cantidad_stock).where(Medicamento.id == medicamento_id)
+            ).scalar()
+        else:
+            saldo = None
+        if saldo is None:
+            return None
+        
+        # El Medicamento ya cargado en la sesión ve el saldo nuevo
+        cargado = db.session.identity_map.get(identity_key(Medicamento, medicamento_id))
+        if cargado is not None:
+            set_committed_value(cargado, 'cantidad_stock', saldo)
+        
+        movimiento = MovimientoStock(medicamento_id=medicamento_id, tipo=tipo, cantidad=delta,
+                                     saldo=saldo, motivo=motivo, usuario_id=usuario_id)
+        db.session.add(movimiento)
+        return movimiento
+    
+    @property
+    def color_tipo(self):
+        return {'entrada': 'success', 'salida': 'primary', 'vencimiento': 'danger'}.get(self.tipo, 'secondary')
+    
+    def __repr__(self):
+        return f'<MovimientoStock {self.tipo} {self.cantidad:+d} -> {self.saldo}>'
+
+
+@event.listens_for(MovimientoStock, 'before_update')
+@event.listens_for(MovimientoStock, 'before_delete')
+def _kardex_solo_insercion(mapper, connection, movimiento):
+    raise ValueError('Los movimientos de stock no se modifican: registre un ajuste')
+
+
+class EstadisticaContador(db.Model):
+    """
+    Contadores del dashboard mantenidos en cada flush (ver saas/utils/estadisticas.py).
+    Claves: 'pacientes_activos', 'citas_dia:2025-11-06', 'pacientes_medico:7', ...
+    """
+    __tablename__ = 'estadisticas_contadores'
+    
+    clave = db.Column(db.String(100), primary_key=True)
+    valor = db.Column(db.Integer, nullable=False, default=0)
+    actualizado = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<EstadisticaContador {self.clave}={self.valor}>'
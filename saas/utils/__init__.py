@@ -1 +1,2 @@
 from .sidebar import get_menu_for, is_menu_active
+from .cedula import normalizar_cedula
@@ -0,0 +1,172 @@
+"""
+Búsqueda de pacientes por subcadena (cédula, nombre, apellido)
+Sistema SaaS - Hospital Tipo 1 Uracoa
+
+Un único punto de entrada para las búsquedas parciales, respaldado por
+índices de trigramas según el motor de base de datos:
+
+- PostgreSQL: extensión pg_trgm con índices GIN sobre nombre, apellido y
+  cédula. Los ILIKE '%x%' usan el índice y el ranking usa similarity().
+- SQLite: tabla virtual FTS5 'pacientes_fts' con tokenizer trigram,
+  sincronizada por triggers.
+- Cualquier otro motor (o una BD sin migrar): ILIKE clásico.
+"""
+from sqlalchemy import and_, or_, case, func, select, table, column, literal_column, inspect
+from saas.extensions import db
+from saas.models import Paciente
+
+# Los trigramas necesitan al menos 3 caracteres por término
+LONGITUD_MINIMA_TRIGRAMA = 3
+
+# Candidatos más parecidos que se ordenan en detalle en buscar_pacientes()
+MAX_CANDIDATOS = 200
+
+# Motores con tabla FTS5 detectada (se consulta sqlite_master una sola vez)
+_fts_disponible = {}
+
+pacientes_fts = table('pacientes_fts', column('rowid'), column('rank'))
+
+
+def _terminos(texto):
+    """Divide la búsqueda en palabras no vacías"""
+    return [t for t in (texto or '').split() if t]
+
+
+def _motor():
+    """Retorna 'postgresql', 'sqlite_fts' o 'generico'"""
+    engine = db.engine
+    dialecto = engine.dialect.name
+
+    if dialecto == 'postgresql':
+        return 'postgresql'
+
+    if dialecto == 'sqlite':
+        clave = id(engine)
+        if clave not in _fts_disponible:
+            _fts_disponible[clave] = inspect(engine).has_table('pacientes_fts')
+        if _fts_disponible[clave]:
+            return 'sqlite_fts'
+
+    return 'generico'
+
+
+def _filtro_ilike(termino):
+    return or_(
+        Paciente.nombre.ilike(f'%{termino}%'),
+        Paciente.apellido.ilike(f'%{termino}%'),
+        Paciente.cedula.ilike(f'%{termino}%')
+    )
+
+
+def _consulta_fts(terminos):
+    """Expresión MATCH de FTS5: cada término como frase, unidos con AND"""
+    frases = ['"{}"'.format(t.replace('"', '""')) for t in terminos]
+    return ' AND '.join(frases)
+
+
+def filtro_busqueda_pacientes(texto):
+    """
+    Retorna una condición SQL para filtrar pacientes por subcadena.
+
+    Se usa en listados paginados que mantienen su propio orden
+    (main.pacientes, consultas.index). Retorna None si no hay términos.
+    """
+    terminos = _terminos(texto)
+    if not terminos:
+        return None
+
+    motor = _motor()
+    trigramables = all(len(t) >= LONGITUD_MINIMA_TRIGRAMA for t in terminos)
+
+    if motor == 'sqlite_fts' and trigramables:
+        ids = select(pacientes_fts.c.rowid).where(
+            literal_column('pacientes_fts').op('MATCH')(_consulta_fts(terminos))
+        )
+        return Paciente.id.in_(ids)
+
+    # PostgreSQL: ILIKE '%x%' usa directamente los índices GIN gin_trgm_ops
+    return and_(*[_filtro_ilike(t) for t in terminos])
+
+
+def _similitud_postgresql(terminos):
+    """Mayor similarity() de pg_trgm entre la búsqueda y cada columna"""
+    texto_completo = ' '.join(terminos)
+    return func.greatest(
+        func.similarity(Paciente.cedula, texto_completo),
+        func.similarity(Paciente.nombre, texto_completo),
+        func.similarity(Paciente.apellido, texto_completo),
+        func.similarity(Paciente.nombre + ' ' + Paciente.apellido, texto_completo)
+    )
+
+
+def _orden_portable(terminos):
+    """
+    Similitud portable: primero los que empiezan por el término, luego
+    los textos más cortos (mayor proporción coincidente)
+    """
+    primero = terminos[0]
+    por_prefijo = case(
+        (or_(
+            Paciente.cedula.ilike(f'{primero}%'),
+            Paciente.nombre.ilike(f'{primero}%'),
+            Paciente.apellido.ilike(f'{primero}%')
+        ), 0),
+        else_=1
+    )
+    longitud = func.length(Paciente.nombre) + func.length(Paciente.apellido)
+    return [por_prefijo, longitud, Paciente.id]
+
+
+def buscar_pacientes(texto, limite=10, solo_activos=True, query=None):
+    """
+    Busca pacientes por subcadena y los ordena por similitud.
+
+    La consulta final (con la query base del llamador) solo carga y ordena
+    los MAX_CANDIDATOS más parecidos: un apellido común puede coincidir con
+    decenas de miles de filas. En SQLite el rank de FTS5 sale del índice;
+    en PostgreSQL el GIN acota las filas que cumplen el ILIKE, pero
+    similarity() se calcula y ordena sobre todas ellas antes del LIMIT.
+
+    Args:
+        texto: Término(s) de búsqueda (cédula, nombre o apellido)
+        limite: Máximo de resultados
+        solo_activos: Excluir pacientes desactivados
+        query: Query base opcional (permite with_entities, filtros, etc.)
+
+    Returns:
+        Lista de resultados ordenados de más a menos parecido
+    """
+    terminos = _terminos(texto)
+    if not terminos:
+        return []
+
+    if query is None:
+        query = Paciente.query
+    if solo_activos:
+        query = query.filter(Paciente.activo == True)
+
+    motor = _motor()
+    trigramables = all(len(t) >= LONGITUD_MINIMA_TRIGRAMA for t in terminos)
+
+    if motor == 'postgresql':
+        orden = [_similitud_postgresql(terminos).desc(), Paciente.id]
+    else:
+        orden = _orden_portable(terminos)
+
+    # Los candidatos se eligen ya ordenados y filtrados: el LIMIT no debe
+    # dejar fuera a los más parecidos por llegar tarde en el índice ni
+    # llenarse de pacientes inactivos
+    filtros = [Paciente.activo == True] if solo_activos else []
+    if motor == 'sqlite_fts' and trigramables:
+        candidatos = select(pacientes_fts.c.rowid.label('id')).join(
+            Paciente, Paciente.id == pacientes_fts.c.rowid
+        ).where(
+            literal_column('pacientes_fts').op('MATCH')(_consulta_fts(terminos)), *filtros
+        ).order_by(pacientes_fts.c.rank).limit(MAX_CANDIDATOS).subquery()
+    else:
+        candidatos = select(Paciente.id.label('id')).where(
+            and_(*[_filtro_ilike(t) for t in terminos]), *filtros
+        ).order_by(*orden).limit(MAX_CANDIDATOS).subquery()
+
+    query = query.join(candidatos, Paciente.id == candidatos.c.id)
+    return query.order_by(*orden).limit(limite).all()
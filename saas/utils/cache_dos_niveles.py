@@ -0,0 +1,336 @@
+"""
+Backend de caché de dos niveles para Flask-Caching
+Sistema SaaS - Hospital Tipo 1 Uracoa
+
+Con varios workers de gunicorn un SimpleCache por proceso da copias frías
+e incoherentes de cada consulta. Este backend combina:
+
+- L1: LRU acotado en memoria del proceso (lecturas sin red ni disco)
+- L2: caché compartido entre workers, elegido por configuración:
+      'redis' (CACHE_REDIS_URL), 'sqlite' (archivo, CACHE_SQLITE_PATH),
+      'filesystem' (CACHE_DIR) o 'simple' (solo pruebas / un proceso)
+
+Las claves de versión de cache_etiquetas (tag_version:*) nunca se guardan
+en L1: se leen siempre de L2, así una invalidación hecha por un worker la
+ven todos en la siguiente petición. Las demás entradas viven en L1 como
+máximo CACHE_L1_TIMEOUT segundos, lo que acota la incoherencia de las
+claves sin versión (p. ej. cache.delete() hecho en otro worker).
+
+Configuración:
+    CACHE_TYPE = 'saas.utils.cache_dos_niveles.CacheDosNiveles'
+    CACHE_L2 = 'redis' | 'sqlite' | 'filesystem' | 'simple'
+    CACHE_L1_MAX_ITEMS = 1000
+    CACHE_L1_TIMEOUT = 30
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from flask_caching.backends.base import BaseCache
+from flask_caching.backends.filesystemcache import FileSystemCache
+from flask_caching.backends.rediscache import RedisCache
+from flask_caching.backends.simplecache import SimpleCache
+from saas.utils.cache_etiquetas import PREFIJO_VERSION
+
+
+class CacheSQLite(BaseCache):
+    """
+    Caché compartido en un archivo SQLite (WAL): coherente entre los
+    workers de un mismo servidor sin instalar Redis.
+    """
+
+    # Cada cuántas escrituras se purgan expirados y excedentes
+    FRECUENCIA_PURGA = 200
+
+    def __init__(self, ruta, default_timeout=300, threshold=5000):
+        super().__init__(default_timeout=default_timeout)
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self._ruta = ruta
+        self._threshold = threshold
+        self._local = threading.local()
+        self._escrituras = 0
+        with self._conexion() as conexion:
+            conexion.execute(
+                'CREATE TABLE IF NOT EXISTS cache '
+                '(clave TEXT PRIMARY KEY, valor BLOB NOT NULL, expira REAL NOT NULL)'
+            )
+
+    def _conexion(self):
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = sqlite3.connect(self._ruta, timeout=10, isolation_level=None)
+            conexion.execute('PRAGMA journal_mode=WAL')
+            conexion.execute('PRAGMA synchronous=NORMAL')
+            self._local.conexion = conexion
+        return conexion
+
+    def _expira(self, timeout):
+        timeout = self._normalize_timeout(timeout)
+        return time.time() + timeout if timeout else 0
+
+    def _purgar(self, conexion):
+        self._escrituras += 1
+        if self._escrituras % self.FRECUENCIA_PURGA:
+            return
+        conexion.execute('DELETE FROM cache WHERE expira != 0 AND expira <= ?', (time.time(),))
+        # El excedente sale de las entradas con expiración: las que no
+        # expiran (versiones de etiqueta) no se recortan nunca. Perder una
+        # no sirve datos viejos (se crea otra versión al azar), pero deja
+        # sin aciertos todas las entradas de la etiqueta a la vez y todos
+        # los workers las recalculan juntos
+        conexion.execute(
+            'DELETE FROM cache WHERE clave IN (SELECT clave FROM cache WHERE expira != 0 '
+            'ORDER BY expira LIMIT max(0, (SELECT count(*) FROM cache) - ?))', (self._threshold,)
+        )
+
+    def get(self, key):
+        fila = self._conexion().execute(
+            'SELECT valor FROM cache WHERE clave = ? AND (expira = 0 OR expira > ?)',
+            (key, time.time())
+        ).fetchone()
+        return pickle.loads(fila[0]) if fila else None
+
+    def get_many(self, *keys):
+        if not keys:
+            return []
+        marcas = ','.join('?' * len(keys))
+        filas = dict(self._conexion().execute(
+            f'SELECT clave, valor FROM cache WHERE clave IN ({marcas}) AND (expira = 0 OR expira > ?)',
+            (*keys, time.time())
+        ).fetchall())
+        return [pickle.loads(filas[k]) if k in filas else None for k in keys]
+
+    def set(self, key, value, timeout=None):
+        conexion = self._conexion()
+        conexion.execute(
+            'INSERT OR REPLACE INTO cache (clave, valor, expira) VALUES (?, ?, ?)',
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), self._expira(timeout))
+        )
+        self._purgar(conexion)
+        return True
+
+    def add(self, key, value, timeout=None):
+        conexion = self._conexion()
+        conexion.execute('DELETE FROM cache WHERE clave = ? AND expira != 0 AND expira <= ?',
+                         (key, time.time()))
+        cursor = conexion.execute(
+            'INSERT OR IGNORE INTO cache (clave, valor, expira) VALUES (?, ?, ?)',
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), self._expira(timeout))
+        )
+        return cursor.rowcount == 1
+
+    def set_many(self, mapping, timeout=None):
+        expira = self._expira(timeout)
+        conexion = self._conexion()
+        conexion.executemany(
+            'INSERT OR REPLACE INTO cache (clave, valor, expira) VALUES (?, ?, ?)',
+            [(k, pickle.dumps(v, pickle.HIGHEST_PROTOCOL), expira) for k, v in mapping.items()]
+        )
+        self._purgar(conexion)
+        return list(mapping)
+
+    def delete(self, key):
+        return self._conexion().execute('DELETE FROM cache WHERE clave = ?', (key,)).rowcount == 1
+
+    def delete_many(self, *keys):
+        return [k for k in keys if self.delete(k)]
+
+    def has(self, key):
+        return self._conexion().execute(
+            'SELECT 1 FROM cache WHERE clave = ? AND (expira = 0 OR expira > ?)', (key, time.time())
+        ).fetchone() is not None
+
+    def clear(self):
+        self._conexion().execute('DELETE FROM cache')
+        return True
+
+
+# CACHE_L2 -> clase de Flask-Caching (se construye con su propio factory)
+BACKENDS_L2 = {
+    'redis': RedisCache,
+    'filesystem': FileSystemCache,
+    'simple': SimpleCache,
+}
+
+
+def crear_l2(app, config, opciones):
+    tipo = config.get('CACHE_L2', 'simple')
+    if tipo == 'sqlite':
+        ruta = config.get('CACHE_SQLITE_PATH') or os.path.join(app.instance_path, 'cache.sqlite')
+        return CacheSQLite(ruta, default_timeout=opciones.get('default_timeout', 300),
+                           threshold=config.get('CACHE_THRESHOLD', 5000))
+    if tipo not in BACKENDS_L2:
+        raise ValueError(f'CACHE_L2 desconocido: {tipo!r} (opciones: sqlite, {", ".join(BACKENDS_L2)})')
+    return BACKENDS_L2[tipo].factory(app, config, [], dict(opciones))
+
+
+class CacheDosNiveles(BaseCache):
+    """LRU en proceso (L1) delante de un caché compartido (L2)"""
+
+    def __init__(self, l2, max_items=1000, l1_timeout=30, default_timeout=300):
+        super().__init__(default_timeout=default_timeout)
+        self.l2 = l2
+        self.max_items = max_items
+        self.l1_timeout = l1_timeout
+        self._l1 = OrderedDict()  # clave -> (expira, valor serializado)
+        self._lock = threading.Lock()
+        self._stats = dict.fromkeys(('hits_l1', 'hits_l2', 'misses', 'evictions', 'sets'), 0)
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        return cls(
+            crear_l2(app, config, kwargs),
+            max_items=config.get('CACHE_L1_MAX_ITEMS', 1000),
+            l1_timeout=config.get('CACHE_L1_TIMEOUT', 30),
+            default_timeout=kwargs.get('default_timeout', 300),
+        )
+
+    # ---------- L1 ----------
+
+    @staticmethod
+    def _solo_l2(key):
+        return key.startswith(PREFIJO_VERSION)
+
+    def _l1_get(self, key):
+        with self._lock:
+            entrada = self._l1.get(key)
+            if entrada is None:
+                return None
+            expira, datos = entrada
+            if expira <= time.monotonic():
+                del self._l1[key]
+                return None
+            self._l1.move_to_end(key)
+            self._stats['hits_l1'] += 1
+        # Se guarda serializado: cada lectura recibe su propia copia
+        return pickle.loads(datos)
+
+    def _l1_set(self, key, value, timeout=None):
+        if self._solo_l2(key) or self.max_items <= 0:
+            return
+        timeout = self._normalize_timeout(timeout)
+        vida = min(timeout, self.l1_timeout) if timeout else self.l1_timeout
+        datos = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._l1[key] = (time.monotonic() + vida, datos)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self.max_items:
+                self._l1.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def _l1_delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._l1.pop(key, None)
+
+    def _contar(self, estadistica, cantidad=1):
+        with self._lock:
+            self._stats[estadistica] += cantidad
+
+    # ---------- API de BaseCache ----------
+
+    def get(self, key):
+        if not self._solo_l2(key):
+            valor = self._l1_get(key)
+            if valor is not None:
+                return valor
+
+        valor = self.l2.get(key)
+        if valor is None:
+            self._contar('misses')
+            return None
+        self._contar('hits_l2')
+        self._l1_set(key, valor)
+        return valor
+
+    def get_many(self, *keys):
+        valores = {}
+        faltantes = []
+        for key in keys:
+            valor = None if self._solo_l2(key) else self._l1_get(key)
+            if valor is None:
+                faltantes.append(key)
+            else:
+                valores[key] = valor
+
+        if faltantes:
+            for key, valor in zip(faltantes, self.l2.get_many(*faltantes)):
+                if valor is None:
+                    self._contar('misses')
+                    continue
+                self._contar('hits_l2')
+                self._l1_set(key, valor)
+                valores[key] = valor
+
+        return [valores.get(key) for key in keys]
+
+    def set(self, key, value, timeout=None):
+        resultado = self.l2.set(key, value, timeout=timeout)
+        self._contar('sets')
+        self._l1_set(key, value, timeout)
+        return resultado
+
+    def add(self, key, value, timeout=None):
+        agregado = self.l2.add(key, value, timeout=timeout)
+        if agregado:
+            self._contar('sets')
+            self._l1_set(key, value, timeout)
+        return agregado
+
+    def set_many(self, mapping, timeout=None):
+        resultado = self.l2.set_many(mapping, timeout=timeout)
+        self._contar('sets', len(mapping))
+        for key, value in mapping.items():
+            self._l1_set(key, value, timeout)
+        return resultado
+
+    def delete(self, key):
+        self._l1_delete(key)
+        return self.l2.delete(key)
+
+    def delete_many(self, *keys):
+        self._l1_delete(*keys)
+        return self.l2.delete_many(*keys)
+
+    def has(self, key):
+        if not self._solo_l2(key) and self._l1_get(key) is not None:
+            return True
+        return self.l2.has(key)
+
+    def clear(self):
+        with self._lock:
+            self._l1.clear()
+        return self.l2.clear()
+
+    def inc(self, key, delta=1):
+        self._l1_delete(key)
+        return self.l2.inc(key, delta)
+
+    def dec(self, key, delta=1):
+        self._l1_delete(key)
+        return self.l2.dec(key, delta)
+
+    # ---------- Estadísticas ----------
+
+    def estadisticas(self):
+        """Contadores de este proceso (cada worker tiene los suyos)"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['items_l1'] = len(self._l1)
+        lecturas = stats['hits_l1'] + stats['hits_l2'] + stats['misses']
+        stats['hit_rate'] = round((stats['hits_l1'] + stats['hits_l2']) / lecturas, 4) if lecturas else None
+        stats.update({
+            'pid': os.getpid(),
+            'l2': type(self.l2).__name__,
+            'max_items_l1': self.max_items,
+            'l1_timeout': self.l1_timeout,
+        })
+        return stats
+
+    def reiniciar_estadisticas(self):
+        with self._lock:
+            self._stats = dict.fromkeys(self._stats, 0)
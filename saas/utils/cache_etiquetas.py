@@ -0,0 +1,133 @@
+"""
+Caché con invalidación por etiquetas sobre saas.extensions.cache
+Sistema SaaS - Hospital Tipo 1 Uracoa
+
+Cada valor cacheado declara las tablas de las que depende (etiquetas).
+La clave real incluye la versión actual de cada etiqueta:
+
+    pacientes_select|pacientes=3f9a1c...
+
+Al confirmar una transacción que escribió en 'pacientes' se genera una
+versión nueva; las claves viejas dejan de consultarse y expiran solas.
+Así los TTL pueden ser largos sin servir datos desactualizados.
+
+Las etiquetas son nombres de tabla ('pacientes', 'camas', ...) y se
+invalidan automáticamente desde los hooks de sesión de este módulo.
+"""
+import hashlib
+import uuid
+from functools import wraps
+from flask import has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from saas.extensions import cache
+
+PREFIJO_VERSION = 'tag_version:'
+
+# Las versiones no expiran: perderlas solo provoca un fallo de caché
+TIMEOUT_VERSION = 0
+
+
+def _clave_version(etiqueta):
+    return f'{PREFIJO_VERSION}{etiqueta}'
+
+
+def _nueva_version():
+    # Aleatoria y no incremental: tras un reinicio del caché nunca
+    # reaparece una versión vieja con datos viejos asociados
+    return uuid.uuid4().hex[:12]
+
+
+def versiones_etiquetas(etiquetas):
+    """Retorna {etiqueta: versión} creando las que no existan"""
+    claves = [_clave_version(e) for e in etiquetas]
+    versiones = dict(zip(etiquetas, cache.get_many(*claves))) if claves else {}
+    for etiqueta, version in versiones.items():
+        if version is None:
+            cache.add(_clave_version(etiqueta), _nueva_version(), timeout=TIMEOUT_VERSION)
+            versiones[etiqueta] = cache.get(_clave_version(etiqueta))
+    return versiones
+
+
+def invalidar_etiquetas(*etiquetas):
+    """Invalida todas las entradas que dependen de alguna de las etiquetas"""
+    if etiquetas:
+        cache.set_many({_clave_version(e): _nueva_version() for e in etiquetas},
+                       timeout=TIMEOUT_VERSION)
+
+
+def clave_etiquetada(key_prefix, etiquetas):
+    versiones = versiones_etiquetas(sorted(etiquetas))
+    return key_prefix + ''.join(f'|{e}={v}' for e, v in versiones.items())
+
+
+def cache_por_etiquetas(*etiquetas, timeout=None, key_prefix=None):
+    """
+    Decorador equivalente a cache.cached() cuya entrada se invalida al
+    escribir en cualquiera de las tablas indicadas.
+
+    Uso:
+        @cache_por_etiquetas('camas', timeout=86400, key_prefix='camas_libres_select')
+        def get_camas_libres_choices():
+            ...
+    """
+    def decorador(funcion):
+        prefijo = key_prefix or f'{funcion.__module__}.{funcion.__qualname__}'
+
+        @wraps(funcion)
+        def envoltura(*args, **kwargs):
+            clave = clave_etiquetada(prefijo, etiquetas)
+            if args or kwargs:
+                firma = repr((args, sorted(kwargs.items())))
+                clave += '|' + hashlib.md5(firma.encode()).hexdigest()
+
+            valor = cache.get(clave)
+            if valor is None:
+                valor = funcion(*args, **kwargs)
+                cache.set(clave, valor, timeout=timeout)
+            return valor
+
+        return envoltura
+    return decorador
+
+
+# ==========================================
+# INVALIDACIÓN AUTOMÁTICA
+# ==========================================
+
+_INFO_TABLAS = 'cache_etiquetas_tablas'
+
+
+def _tablas_pendientes(session):
+    return session.info.setdefault(_INFO_TABLAS, set())
+
+
+@event.listens_for(Session, 'after_flush')
+def _registrar_tablas_modificadas(session, flush_context):
+    tablas = _tablas_pendientes(session)
+    modificados = [o for o in session.dirty if session.is_modified(o)]
+    for objeto in (*session.new, *modificados, *session.deleted):
+        tabla = getattr(objeto, '__tablename__', None)
+        if tabla:
+            tablas.add(tabla)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _registrar_sentencias_masivas(orm_execute_state):
+    # query.update(), query.delete() y session.execute(insert(...))
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        tabla = getattr(orm_execute_state.statement.table, 'name', None)
+        if tabla:
+            _tablas_pendientes(orm_execute_state.session).add(tabla)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidar_al_confirmar(session):
+    tablas = session.info.pop(_INFO_TABLAS, None)
+    if tablas and has_app_context():
+        invalidar_etiquetas(*tablas)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_al_revertir(session):
+    session.info.pop(_INFO_TABLAS, None)
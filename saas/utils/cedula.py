@@ -0,0 +1,25 @@
+"""
+Normalización de cédulas de identidad
+Sistema SaaS - Hospital Tipo 1 Uracoa
+"""
+import re
+
+# Prefijo de nacionalidad (V/E) seguido de dígitos
+_PREFIJO = re.compile(r'^[VE](?=\d)')
+_SEPARADORES = re.compile(r'[\s.\-]')
+
+
+def normalizar_cedula(cedula):
+    """
+    Retorna la forma canónica de una cédula para búsquedas exactas.
+
+    'V-12.345.678', 'v12345678' y '12 345 678' -> '12345678'
+
+    Se guarda en la columna cedula_normalizada (índice único) para que
+    la búsqueda exacta sea un simple 'columna = valor'.
+    """
+    if cedula is None:
+        return None
+
+    valor = _SEPARADORES.sub('', str(cedula).strip().upper())
+    return _PREFIJO.sub('', valor) or None
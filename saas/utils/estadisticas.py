@@ -0,0 +1,293 @@
+"""
+Contadores del dashboard mantenidos de forma incremental
+Sistema SaaS - Hospital Tipo 1 Uracoa
+
+Cada INSERT/UPDATE/DELETE de Paciente, Usuario, Cita, Consulta, Emergencia
+e Internado suma o resta 1 en la tabla 'estadisticas_contadores' dentro de
+la misma transacción (hooks after_insert/after_update/after_delete). El
+dashboard lee todos sus números con un único SELECT por clave primaria,
+sin importar cuántas filas tengan las tablas, y siempre está al día.
+
+Las operaciones masivas (query.update(), executemany, SQL manual) no
+disparan los hooks; reconciliar_contadores() recalcula todo desde cero y
+corrige las diferencias (scripts/reconciliar_estadisticas.py) sin perder
+los incrementos que se confirmen mientras tanto.
+"""
+from datetime import datetime
+from sqlalchemy import event, func, inspect, select, update, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from saas.extensions import db
+from saas.utils.fechas import utc_a_local, dia_local_sql
+from saas.models import EstadisticaContador, Usuario, Paciente, Cita
+from saas.consultas.models import Consulta
+from saas.emergencias.models import Emergencia
+from saas.internados.models import Internado
+
+ESTADOS_EMERGENCIA_ACTIVOS = Emergencia.ESTADOS_ACTIVOS
+
+_tabla = EstadisticaContador.__table__
+
+
+# ==========================================
+# CLAVES
+# ==========================================
+
+def _dia(fecha):
+    """'YYYY-MM-DD' a partir de date, datetime o texto (func.date() en SQLite)"""
+    return (fecha if isinstance(fecha, str) else fecha.isoformat())[:10]
+
+
+def clave_citas_dia(fecha, medico_id=None):
+    """Citas de un día (fecha o datetime), opcionalmente de un médico"""
+    if medico_id:
+        return f'citas_dia_medico:{medico_id}:{_dia(fecha)}'
+    return f'citas_dia:{_dia(fecha)}'
+
+
+def clave_consultas_dia(fecha):
+    return f'consultas_dia:{_dia(fecha)}'
+
+
+def clave_pacientes_medico(medico_id):
+    return f'pacientes_medico:{medico_id}'
+
+
+def _claves_usuario(valor):
+    return ['usuarios_activos'] if valor('activo') else []
+
+
+def _claves_paciente(valor):
+    if not valor('activo'):
+        return []
+    claves = ['pacientes_activos']
+    if valor('medico_id'):
+        claves.append(clave_pacientes_medico(valor('medico_id')))
+    return claves
+
+
+def _claves_cita(valor):
+    fecha = valor('fecha_hora')
+    if not fecha:
+        return []
+    claves = [clave_citas_dia(fecha)]
+    if valor('medico_id'):
+        claves.append(clave_citas_dia(fecha, valor('medico_id')))
+    return claves
+
+
+def _claves_consulta(valor):
+    # Consulta.fecha_hora está en UTC; el contador es por día local
+    fecha = valor('fecha_hora')
+    return [clave_consultas_dia(utc_a_local(fecha))] if fecha else []
+
+
+def _claves_emergencia(valor):
+    return ['emergencias_activas'] if valor('estado') in ESTADOS_EMERGENCIA_ACTIVOS else []
+
+
+def _claves_internado(valor):
+    return ['internados_activos'] if valor('estado') == 'activo' else []
+
+
+# Modelo -> (atributos que afectan los contadores, función de claves)
+CONTADORES = {
+    Usuario: (('activo',), _claves_usuario),
+    Paciente: (('activo', 'medico_id'), _claves_paciente),
+    Cita: (('fecha_hora', 'medico_id'), _claves_cita),
+    Consulta: (('fecha_hora',), _claves_consulta),
+    Emergencia: (('estado',), _claves_emergencia),
+    Internado: (('estado',), _claves_internado),
+}
+
+
+# ==========================================
+# ESCRITURA (dentro del flush)
+# ==========================================
+
+def _sumar(connection, deltas):
+    """UPSERT valor = valor + delta para cada clave, en la conexión del flush"""
+    ahora = datetime.utcnow()
+    dialecto = connection.dialect.name
+
+    for clave, delta in deltas.items():
+        if not delta:
+            continue
+
+        if dialecto in ('postgresql', 'sqlite'):
+            insertar = pg_insert if dialecto == 'postgresql' else sqlite_insert
+            sentencia = insertar(_tabla).values(clave=clave, valor=delta, actualizado=ahora)
+            sentencia = sentencia.on_conflict_do_update(
+                index_elements=[_tabla.c.clave],
+                set_={'valor': _tabla.c.valor + sentencia.excluded.valor, 'actualizado': ahora}
+            )
+            connection.execute(sentencia)
+            continue
+
+        resultado = connection.execute(
+            update(_tabla).where(_tabla.c.clave == clave)
+            .values(valor=_tabla.c.valor + delta, actualizado=ahora)
+        )
+        if resultado.rowcount == 0:
+            connection.execute(_tabla.insert().values(clave=clave, valor=delta, actualizado=ahora))
+
+
+def _valor_actual(target):
+    return lambda atributo: getattr(target, atributo)
+
+
+def _valor_previo(target):
+    """Valor antes del flush (los atributos usan active_history, ver abajo)"""
+    estado = inspect(target)
+
+    def valor(atributo):
+        historia = estado.attrs[atributo].history
+        if historia.deleted:
+            return historia.deleted[0]
+        if historia.unchanged:
+            return historia.unchanged[0]
+        return None
+    return valor
+
+
+def _registrar(modelo, atributos, claves):
+
+    def despues_de_insertar(mapper, connection, target):
+        _sumar(connection, {clave: 1 for clave in claves(_valor_actual(target))})
+
+    def despues_de_actualizar(mapper, connection, target):
+        antes = set(claves(_valor_previo(target)))
+        despues = set(claves(_valor_actual(target)))
+        if antes == despues:
+            return
+        deltas = {clave: 1 for clave in despues - antes}
+        deltas.update({clave: -1 for clave in antes - despues})
+        _sumar(connection, deltas)
+
+    def despues_de_borrar(mapper, connection, target):
+        _sumar(connection, {clave: -1 for clave in claves(_valor_previo(target))})
+
+    event.listen(modelo, 'after_insert', despues_de_insertar)
+    event.listen(modelo, 'after_update', despues_de_actualizar)
+    event.listen(modelo, 'after_delete', despues_de_borrar)
+
+    # Cargar el valor anterior aunque el atributo esté expirado al asignarlo
+    for atributo in atributos:
+        event.listen(getattr(modelo, atributo), 'set', lambda *args: None, active_history=True)
+
+
+for _modelo, (_atributos, _claves) in CONTADORES.items():
+    _registrar(_modelo, _atributos, _claves)
+
+
+# ==========================================
+# LECTURA
+# ==========================================
+
+def leer_contadores(*claves):
+    """Retorna {clave: valor} en un solo SELECT; las claves ausentes valen 0"""
+    valores = dict.fromkeys(claves, 0)
+    if claves:
+        filas = db.session.execute(
+            select(_tabla.c.clave, _tabla.c.valor).where(_tabla.c.clave.in_(claves))
+        )
+        valores.update({clave: valor for clave, valor in filas})
+    return valores
+
+
+# ==========================================
+# RECONCILIACIÓN
+# ==========================================
+
+def calcular_contadores():
+    """Recalcula todos los contadores desde las tablas (costoso: solo para reconciliar)"""
+    esperados = {}
+
+    def agregar(filas, clave):
+        for fila in filas:
+            if fila[-1]:
+                esperados[clave(*fila[:-1])] = fila[-1]
+
+    sesion = db.session
+    agregar(sesion.query(func.count(Usuario.id)).filter(Usuario.activo == True),
+            lambda: 'usuarios_activos')
+    agregar(sesion.query(func.count(Paciente.id)).filter(Paciente.activo == True),
+            lambda: 'pacientes_activos')
+    agregar(sesion.query(Paciente.medico_id, func.count(Paciente.id))
+            .filter(Paciente.activo == True, Paciente.medico_id.isnot(None))
+            .group_by(Paciente.medico_id),
+            clave_pacientes_medico)
+
+    dia_cita = func.date(Cita.fecha_hora)
+    agregar(sesion.query(dia_cita, func.count(Cita.id)).group_by(dia_cita),
+            clave_citas_dia)
+    agregar(sesion.query(dia_cita, Cita.medico_id, func.count(Cita.id))
+            .filter(Cita.medico_id.isnot(None)).group_by(dia_cita, Cita.medico_id),
+            clave_citas_dia)
+
+    dia_consulta = dia_local_sql(Consulta.fecha_hora)
+    agregar(sesion.query(dia_consulta, func.count(Consulta.id)).group_by(dia_consulta),
+            clave_consultas_dia)
+
+    agregar(sesion.query(func.count(Emergencia.id))
+            .filter(Emergencia.estado.in_(ESTADOS_EMERGENCIA_ACTIVOS)),
+            lambda: 'emergencias_activas')
+    agregar(sesion.query(func.count(Internado.id)).filter(Internado.estado == 'activo'),
+            lambda: 'internados_activos')
+
+    return esperados
+
+
+def _insertar_si_falta(clave, valor, ahora):
+    """INSERT de la clave salvo que otra transacción ya la haya creado"""
+    dialecto = db.session.get_bind().dialect.name
+    if dialecto in ('postgresql', 'sqlite'):
+        insertar = pg_insert if dialecto == 'postgresql' else sqlite_insert
+        sentencia = insertar(_tabla).values(clave=clave, valor=valor, actualizado=ahora)
+        return db.session.execute(sentencia.on_conflict_do_nothing(index_elements=[_tabla.c.clave])).rowcount
+    return db.session.execute(_tabla.insert().values(clave=clave, valor=valor, actualizado=ahora)).rowcount
+
+
+def reconciliar_contadores():
+    """
+    Corrige la deriva de los contadores respecto a las tablas.
+
+    Los contadores guardados se leen antes de recalcular y cada corrección
+    solo se aplica si el contador sigue con el valor leído. Si otra
+    transacción lo movió entretanto (un alta confirmada durante el
+    recálculo), la clave se omite en esta pasada en vez de pisar el
+    incremento; la siguiente reconciliación la corrige.
+
+    Returns:
+        {clave: (valor_guardado, valor_correcto)} con las claves corregidas
+    """
+    guardados = dict(db.session.execute(select(_tabla.c.clave, _tabla.c.valor)).all())
+    esperados = calcular_contadores()
+
+    diferencias = {}
+    for clave in set(esperados) | set(guardados):
+        correcto = esperados.get(clave, 0)
+        guardado = guardados.get(clave)
+        if guardado == correcto or (guardado is None and correcto == 0):
+            continue
+        diferencias[clave] = (guardado or 0, correcto)
+
+    ahora = datetime.utcnow()
+    correcciones = {}
+    for clave, (guardado, correcto) in diferencias.items():
+        if clave not in guardados:
+            aplicada = _insertar_si_falta(clave, correcto, ahora)
+        elif correcto == 0:
+            aplicada = db.session.execute(
+                delete(_tabla).where(_tabla.c.clave == clave, _tabla.c.valor == guardado)
+            ).rowcount
+        else:
+            aplicada = db.session.execute(
+                update(_tabla).where(_tabla.c.clave == clave, _tabla.c.valor == guardado)
+                .values(valor=_tabla.c.valor + (correcto - guardado), actualizado=ahora)
+            ).rowcount
+        if aplicada:
+            correcciones[clave] = (guardado, correcto)
+
+    db.session.commit()
+    return correcciones
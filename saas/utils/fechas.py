@@ -0,0 +1,127 @@
+"""
+Días y turnos locales (Venezuela, UTC-4) como rangos sobre columnas DateTime
+Sistema SaaS - Hospital Tipo 1 Uracoa
+
+Filtrar con func.date(columna) == fecha aplica una función a cada fila y
+el motor no puede usar los índices de fecha_hora (ni los compuestos como
+idx_consultas_fecha_turno o idx_citas_medico_fecha). Además date.today()
+usa la hora del servidor, no la de Venezuela.
+
+Aquí un día o turno local se convierte en un rango semiabierto
+[inicio, fin) sobre la columna tal como está guardada:
+
+    filtro_dia(Consulta.fecha_hora, fecha)              # columna en UTC
+    filtro_dia(Cita.fecha_hora, fecha, utc=False)       # columna en hora local
+
+Convenciones de almacenamiento del sistema:
+    - UTC: Consulta.fecha_hora, Emergencia.hora_ingreso, Internado.fecha_ingreso,
+      OrdenLaboratorio.fecha_orden y demás columnas con default=datetime.utcnow
+    - Hora local: Cita.fecha_hora (la ingresa el usuario en el formulario)
+"""
+from datetime import datetime, date, time, timedelta, timezone
+from sqlalchemy import and_, func, literal_column
+from saas.extensions import db
+
+# Venezuela usa UTC-4 fijo (sin horario de verano desde 2016)
+TZ_VENEZUELA = timezone(timedelta(hours=-4))
+
+# Turnos de consulta: (inicio, fin) en hora local; el minuto final se incluye
+TURNOS = {
+    'mañana': (time(7, 0), time(12, 0)),
+    'tarde': (time(13, 30), time(17, 0)),
+}
+
+
+def ahora_local():
+    """Fecha y hora actual de Venezuela (naive, hora local)"""
+    return datetime.now(TZ_VENEZUELA).replace(tzinfo=None)
+
+
+def hoy_local():
+    """Fecha actual en Venezuela (no la del servidor)"""
+    return ahora_local().date()
+
+
+def local_a_utc(momento):
+    """Datetime naive en hora local -> datetime naive en UTC"""
+    return momento.replace(tzinfo=TZ_VENEZUELA).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def utc_a_local(momento):
+    """Datetime naive en UTC -> datetime naive en hora local"""
+    return momento.replace(tzinfo=timezone.utc).astimezone(TZ_VENEZUELA).replace(tzinfo=None)
+
+
+def _como_fecha(fecha):
+    if isinstance(fecha, str):
+        return date.fromisoformat(fecha)
+    if isinstance(fecha, datetime):
+        return fecha.date()
+    return fecha
+
+
+def rango_dia(fecha=None, utc=True):
+    """
+    Retorna (inicio, fin) del día local indicado (hoy si es None).
+
+    Args:
+        fecha: date, datetime o 'YYYY-MM-DD'
+        utc: True si la columna guarda UTC; False si guarda hora local
+    """
+    inicio = datetime.combine(_como_fecha(fecha) or hoy_local(), time.min)
+    fin = inicio + timedelta(days=1)
+    if utc:
+        return local_a_utc(inicio), local_a_utc(fin)
+    return inicio, fin
+
+
+def rango_turno(turno, fecha=None, utc=True):
+    """Retorna (inicio, fin) del turno local ('mañana' o 'tarde') de un día"""
+    if turno not in TURNOS:
+        raise ValueError(f'Turno desconocido: {turno}')
+    dia = _como_fecha(fecha) or hoy_local()
+    hora_inicio, hora_fin = TURNOS[turno]
+    inicio = datetime.combine(dia, hora_inicio)
+    fin = datetime.combine(dia, hora_fin) + timedelta(minutes=1)
+    if utc:
+        return local_a_utc(inicio), local_a_utc(fin)
+    return inicio, fin
+
+
+def filtro_rango(columna, inicio, fin):
+    """columna >= inicio AND columna < fin (usa el índice de la columna)"""
+    return and_(columna >= inicio, columna < fin)
+
+
+def filtro_dia(columna, fecha=None, utc=True):
+    return filtro_rango(columna, *rango_dia(fecha, utc))
+
+
+def filtro_turno(columna, turno, fecha=None, utc=True):
+    return filtro_rango(columna, *rango_turno(turno, fecha, utc))
+
+
+def dia_local_sql(columna):
+    """
+    Expresión SQL del día local de una columna UTC, para GROUP BY en
+    reportes y reconciliaciones (no usar en WHERE: ahí va filtro_dia).
+    """
+    horas = int(TZ_VENEZUELA.utcoffset(None).total_seconds() // 3600)
+    if db.engine.dialect.name == 'sqlite':
+        return func.date(columna, f'{horas:+d} hours')
+    return func.date(columna + literal_column(f"interval '{horas} hours'"))
+
+
+def hora_local_sql(columna):
+    """Expresión SQL de la hora local (0-23) de una columna UTC, para GROUP BY"""
+    horas = int(TZ_VENEZUELA.utcoffset(None).total_seconds() // 3600)
+    if db.engine.dialect.name == 'sqlite':
+        return func.cast(func.strftime('%H', columna, f'{horas:+d} hours'), db.Integer)
+    return func.cast(func.extract('hour', columna + literal_column(f"interval '{horas} hours'")), db.Integer)
+
+
+def minutos_entre_sql(desde, hasta):
+    """Expresión SQL de los minutos transcurridos entre dos columnas DateTime"""
+    if db.engine.dialect.name == 'sqlite':
+        return (func.julianday(hasta) - func.julianday(desde)) * 1440.0
+    return func.extract('epoch', hasta - desde) / 60.0
@@ -0,0 +1,49 @@
+"""
+Notas clínicas acumuladas en texto
+Sistema SaaS - Hospital Tipo 1 Uracoa
+
+Antes de la tabla notas_emergencia, cada actualización de una emergencia
+se agregaba al final de 'tratamiento' u 'observaciones' con una marca UTC:
+
+    <texto inicial>
+
+    [2025-11-06 08:30]
+    <texto agregado>
+
+separar_notas() convierte ese texto en notas individuales (migración que
+crea la tabla) y unir_notas() lo reconstruye (downgrade).
+"""
+import re
+from datetime import datetime
+
+FORMATO_MARCA = '%Y-%m-%d %H:%M'
+
+_MARCA = re.compile(r'\n\n\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2})\]\n')
+
+
+def separar_notas(texto, fecha_inicial):
+    """
+    Texto acumulado -> [(fecha, texto)] en orden.
+
+    El primer tramo no tiene marca: toma fecha_inicial (p. ej. la hora de
+    atención de la emergencia). Los tramos vacíos se descartan.
+    """
+    if not texto or not texto.strip():
+        return []
+
+    partes = _MARCA.split(texto)
+    notas = []
+    if partes[0].strip():
+        notas.append((fecha_inicial, partes[0].strip()))
+    for marca, cuerpo in zip(partes[1::2], partes[2::2]):
+        if cuerpo.strip():
+            notas.append((datetime.strptime(marca, FORMATO_MARCA), cuerpo.strip()))
+    return notas
+
+
+def unir_notas(notas):
+    """[(fecha, texto)] -> texto acumulado en el formato anterior (o None)"""
+    tramos = []
+    for fecha, texto in notas:
+        tramos.append(f'[{fecha.strftime(FORMATO_MARCA)}]\n{texto}' if tramos else texto)
+    return '\n\n'.join(tramos) or None
@@ -0,0 +1,201 @@
+"""
+Paginación por keyset (seek) para los listados
+Sistema SaaS - Hospital Tipo 1 Uracoa
+
+En lugar de OFFSET + COUNT(*), cada página continúa desde la última fila
+vista usando el orden del listado (p. ej. fecha_hora DESC, id DESC):
+
+    WHERE (fecha_hora < :f) OR (fecha_hora = :f AND id < :id)
+    ORDER BY fecha_hora DESC, id DESC LIMIT :n
+
+El costo de una página no depende de su profundidad. La posición viaja
+en un cursor opaco (?cursor=...) y el total es opcional.
+"""
+import json
+import base64
+import hashlib
+from datetime import datetime, date
+from sqlalchemy import and_, or_, text
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import UnaryExpression
+from saas.extensions import db, cache
+from saas.utils.cache_etiquetas import clave_etiquetada
+
+# Segundos que se reutiliza un total calculado con contar='cache'
+# (se invalida antes si cambia la tabla, ver cache_etiquetas)
+TIMEOUT_TOTAL = 3600
+
+
+def _serializar(valor):
+    if isinstance(valor, datetime):
+        return {'$dt': valor.isoformat()}
+    if isinstance(valor, date):
+        return {'$d': valor.isoformat()}
+    return valor
+
+
+def _deserializar(valor):
+    if isinstance(valor, dict):
+        if '$dt' in valor:
+            return datetime.fromisoformat(valor['$dt'])
+        if '$d' in valor:
+            return date.fromisoformat(valor['$d'])
+    return valor
+
+
+def codificar_cursor(valores, direccion):
+    """Codifica la posición (valores del orden + dirección) en un token URL-safe"""
+    datos = json.dumps({'v': [_serializar(v) for v in valores], 'd': direccion},
+                       separators=(',', ':'))
+    return base64.urlsafe_b64encode(datos.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """Retorna (valores, direccion) o (None, None) si el cursor no es válido"""
+    if not cursor:
+        return None, None
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        datos = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        direccion = datos['d'] if datos['d'] in ('n', 'p') else 'n'
+        return [_deserializar(v) for v in datos['v']], direccion
+    except (ValueError, KeyError, TypeError):
+        return None, None
+
+
+def _columnas_orden(orden):
+    """[(columna, descendente)] a partir de expresiones col.asc()/col.desc()"""
+    columnas = []
+    for expresion in orden:
+        if isinstance(expresion, UnaryExpression) and expresion.modifier in (operators.desc_op, operators.asc_op):
+            columnas.append((expresion.element, expresion.modifier is operators.desc_op))
+        else:
+            columnas.append((expresion, False))
+    return columnas
+
+
+def _condicion_seek(columnas, valores, hacia_atras):
+    """Filas estrictamente posteriores (o anteriores) a la posición dada"""
+    condiciones = []
+    for i, (columna, descendente) in enumerate(columnas):
+        iguales = [c == v for (c, _), v in zip(columnas[:i], valores[:i])]
+        menor = descendente != hacia_atras
+        paso = columna < valores[i] if menor else columna > valores[i]
+        condiciones.append(and_(*iguales, paso))
+    return or_(*condiciones)
+
+
+def _clave_total(query):
+    sentencia = query.order_by(None).statement.compile(db.engine)
+    firma = f'{sentencia}|{sorted(sentencia.params.items(), key=lambda p: p[0])!r}'
+    return 'keyset_total_' + hashlib.md5(firma.encode()).hexdigest()
+
+
+def _total_aproximado(query):
+    """Estimación del planificador de PostgreSQL (sin ejecutar la consulta)"""
+    sentencia = query.order_by(None).statement.compile(
+        db.engine, compile_kwargs={'literal_binds': True}
+    )
+    plan = db.session.execute(text(f'EXPLAIN (FORMAT JSON) {sentencia}')).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def contar_total(query, contar):
+    """
+    Total de filas según el modo:
+        None        -> no se cuenta
+        'exacto'    -> COUNT(*) en cada página
+        'cache'     -> COUNT(*) reutilizado hasta que cambie la tabla
+        'aproximado'-> estimación del planificador en PostgreSQL ('cache' en otros motores)
+    """
+    if not contar:
+        return None
+
+    if contar == 'aproximado':
+        if db.engine.dialect.name == 'postgresql':
+            return _total_aproximado(query)
+        contar = 'cache'
+
+    if contar == 'cache':
+        tablas = {d['entity'].__tablename__ for d in query.column_descriptions
+                  if d.get('entity') is not None}
+        clave = clave_etiquetada(_clave_total(query), tablas)
+        total = cache.get(clave)
+        if total is None:
+            total = query.order_by(None).count()
+            cache.set(clave, total, timeout=TIMEOUT_TOTAL)
+        return total
+
+    return query.order_by(None).count()
+
+
+class PaginacionKeyset:
+    """Página de resultados; se itera como los items (igual que Pagination)"""
+
+    def __init__(self, items, per_page, has_next, has_prev, next_cursor, prev_cursor, total=None):
+        self.items = items
+        self.per_page = per_page
+        self.has_next = has_next
+        self.has_prev = has_prev
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def paginar_keyset(query, orden, cursor=None, per_page=20, contar=None):
+    """
+    Pagina un query por keyset.
+
+    Args:
+        query: Query de Flask-SQLAlchemy ya filtrado (sin order_by)
+        orden: Lista de expresiones de orden; la última debe ser única
+               (normalmente el id), p. ej. [Cita.fecha_hora.desc(), Cita.id.desc()].
+               Las columnas del orden no deben ser NULL.
+        cursor: Token recibido en ?cursor= (None para la primera página)
+        per_page: Filas por página
+        contar: Modo de total, ver contar_total()
+
+    Returns:
+        PaginacionKeyset
+    """
+    columnas = _columnas_orden(orden)
+    valores, direccion = decodificar_cursor(cursor)
+    if valores is not None and len(valores) != len(columnas):
+        valores, direccion = None, None
+
+    total = contar_total(query, contar)
+    hacia_atras = direccion == 'p'
+
+    if valores is not None:
+        query = query.filter(_condicion_seek(columnas, valores, hacia_atras))
+
+    if hacia_atras:
+        query = query.order_by(*[c.asc() if desc else c.desc() for c, desc in columnas])
+    else:
+        query = query.order_by(*orden)
+
+    filas = query.limit(per_page + 1).all()
+    hay_mas = len(filas) > per_page
+    filas = filas[:per_page]
+
+    if hacia_atras:
+        filas.reverse()
+        has_prev, has_next = hay_mas, True
+    else:
+        has_prev, has_next = valores is not None, hay_mas
+
+    def posicion(fila):
+        return [getattr(fila, c.key) for c, _ in columnas]
+
+    next_cursor = codificar_cursor(posicion(filas[-1]), 'n') if filas and has_next else None
+    prev_cursor = codificar_cursor(posicion(filas[0]), 'p') if filas and has_prev else None
+
+    return PaginacionKeyset(filas, per_page, has_next, has_prev, next_cursor, prev_cursor, total)
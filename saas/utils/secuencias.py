@@ -0,0 +1,91 @@
+"""
+Contadores atómicos en fila (números de turno, códigos correlativos)
+Sistema SaaS - Hospital Tipo 1 Uracoa
+
+COUNT(*) + 1 es lento y no es seguro con varias recepciones registrando
+a la vez: dos transacciones leen el mismo conteo y obtienen el mismo
+número, o ambas pasan el límite. Aquí cada secuencia es una fila con
+restricción UNIQUE sobre sus claves (p. ej. fecha + turno) y el número se
+toma con una sola sentencia:
+
+    UPDATE contadores SET ultimo = ultimo + 1
+    WHERE <claves> AND ultimo < :limite
+    RETURNING ultimo
+
+- PostgreSQL: el UPDATE bloquea la fila; las transacciones concurrentes
+  esperan y re-evalúan "ultimo < :limite" con el valor ya confirmado.
+- SQLite: la primera escritura de la transacción (el INSERT que crea la
+  fila si falta) toma el lock de escritura de la BD, igual que un
+  BEGIN IMMEDIATE; el resto espera según el busy timeout.
+
+El número queda dentro de la transacción del llamador: si la inserción
+que lo usa falla y se hace rollback, el número se libera.
+"""
+from sqlalchemy import and_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from saas.extensions import db
+
+
+def _crear_si_falta(tabla, claves, columna, inicial):
+    """INSERT de la fila del contador; no hace nada si ya existe"""
+    valores = dict(claves, **{columna: inicial})
+    dialecto = db.session.get_bind().dialect.name
+
+    if dialecto in ('postgresql', 'sqlite'):
+        insertar = pg_insert if dialecto == 'postgresql' else sqlite_insert
+        db.session.execute(insertar(tabla).values(**valores).on_conflict_do_nothing())
+        return
+
+    existe = db.session.execute(
+        select(tabla.c[columna]).where(_condicion(tabla, claves))
+    ).first()
+    if existe is None:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(tabla.insert().values(**valores))
+        except IntegrityError:
+            pass  # Otra transacción la creó primero
+
+
+def _condicion(tabla, claves):
+    return and_(*[tabla.c[nombre] == valor for nombre, valor in claves.items()])
+
+
+def siguiente_valor(tabla, claves, columna='ultimo_numero', limite=None, inicial=0):
+    """
+    Incrementa atómicamente el contador identificado por 'claves'.
+
+    Args:
+        tabla: Table con restricción UNIQUE sobre las columnas de 'claves'
+        claves: {columna: valor} que identifica la fila (p. ej. fecha y turno)
+        columna: Columna entera con el último valor entregado
+        limite: Valor máximo a entregar (None = sin límite)
+        inicial: Valor (o subconsulta escalar) con que se crea la fila si no existe
+
+    Returns:
+        El nuevo valor, o None si el contador ya alcanzó el límite
+    """
+    _crear_si_falta(tabla, claves, columna, inicial)
+
+    condicion = _condicion(tabla, claves)
+    if limite is not None:
+        condicion = and_(condicion, tabla.c[columna] < limite)
+
+    sentencia = update(tabla).where(condicion).values({columna: tabla.c[columna] + 1})
+
+    if db.session.get_bind().dialect.update_returning:
+        return db.session.execute(sentencia.returning(tabla.c[columna])).scalar()
+
+    # Sin RETURNING: la fila queda bloqueada por el UPDATE hasta el commit
+    if db.session.execute(sentencia).rowcount == 0:
+        return None
+    return db.session.execute(select(tabla.c[columna]).where(_condicion(tabla, claves))).scalar()
+
+
+def valor_actual(tabla, claves, columna='ultimo_numero'):
+    """Último valor entregado, o None si la fila del contador no existe"""
+    return db.session.execute(
+        select(tabla.c[columna]).where(_condicion(tabla, claves))
+    ).scalar()
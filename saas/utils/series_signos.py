@@ -0,0 +1,127 @@
+"""
+Series de tiempo de signos vitales por paciente
+Sistema SaaS - Hospital Tipo 1 Uracoa
+
+Un paciente acumula signos en tres tablas: consultas, emergencias (al
+ingreso) y evoluciones de sus internaciones. Para graficar tendencias
+no se cargan objetos ORM: un solo SELECT ... UNION ALL trae solo las
+columnas numéricas, ordenado por fecha, y se arma una columna (arreglo
+NumPy) por signo:
+
+    serie_paciente(paciente_id, puntos=300)
+    -> {'total': n, 'series': {'temperatura': {'fecha': [...], 'valor': [...], 'origen': [...]}, ...}}
+
+Cada signo se reduce por separado (tienen huecos distintos) a un máximo
+de 'puntos' con LTTB (Largest-Triangle-Three-Buckets, Steinarsson 2013):
+conserva primer y último punto y, en cada cubeta, el punto que forma el
+triángulo de mayor área con el elegido antes y el promedio de la cubeta
+siguiente. A diferencia de promediar, mantiene los picos (una fiebre de
+una noche sigue visible en una internación de meses).
+"""
+import numpy as np
+from sqlalchemy import literal, null, select, union_all
+from saas.extensions import db
+from saas.consultas.models import Consulta
+from saas.emergencias.models import Emergencia
+from saas.internados.models import Evolucion, Internado
+
+# Signos graficables (columnas numéricas comunes a los tres orígenes)
+CAMPOS_SERIE = ('temperatura', 'presion_sistolica', 'presion_diastolica',
+                'frecuencia_cardiaca', 'frecuencia_respiratoria', 'saturacion')
+
+# Máximo de puntos por signo que acepta la API
+MAXIMO_PUNTOS = 2000
+
+
+def _columnas(modelo):
+    """Los CAMPOS_SERIE del modelo; NULL donde el origen no registra ese signo"""
+    return [getattr(modelo, campo, null()).label(campo) for campo in CAMPOS_SERIE]
+
+
+def _consulta_signos(paciente_id, desde=None, hasta=None):
+    """SELECT fecha, origen, CAMPOS_SERIE... de los tres orígenes, por fecha"""
+    def rango(columna):
+        condiciones = []
+        if desde:
+            condiciones.append(columna >= desde)
+        if hasta:
+            condiciones.append(columna < hasta)
+        return condiciones
+
+    consultas = select(
+        Consulta.fecha_hora.label('fecha'), literal('consulta').label('origen'), *_columnas(Consulta)
+    ).where(Consulta.paciente_id == paciente_id, *rango(Consulta.fecha_hora))
+
+    emergencias = select(
+        Emergencia.hora_ingreso.label('fecha'), literal('emergencia').label('origen'), *_columnas(Emergencia)
+    ).where(Emergencia.paciente_id == paciente_id, *rango(Emergencia.hora_ingreso))
+
+    evoluciones = select(
+        Evolucion.fecha.label('fecha'), literal('evolucion').label('origen'), *_columnas(Evolucion)
+    ).join(Internado, Evolucion.internado_id == Internado.id).where(
+        Internado.paciente_id == paciente_id, *rango(Evolucion.fecha)
+    )
+
+    union = union_all(consultas, emergencias, evoluciones).subquery()
+    return select(union).order_by(union.c.fecha)
+
+
+def lttb(x, y, puntos):
+    """
+    Índices de los puntos que conserva LTTB al reducir (x, y) a 'puntos'.
+    x debe estar ordenado; si ya hay 'puntos' o menos se conservan todos.
+    """
+    n = len(x)
+    if puntos >= n or puntos < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # puntos - 2 cubetas entre el primero y el último: [cortes[i], cortes[i + 1])
+    cortes = (np.arange(puntos - 1) * (n - 2) // (puntos - 2) + 1).astype(int)
+
+    elegidos = np.empty(puntos, dtype=int)
+    elegidos[0], elegidos[-1] = 0, n - 1
+    anterior = 0
+    for i in range(puntos - 2):
+        inicio, fin = cortes[i], cortes[i + 1]
+        siguiente = slice(cortes[i + 1], cortes[i + 2]) if i + 2 < len(cortes) else slice(n - 1, n)
+        x_promedio, y_promedio = x[siguiente].mean(), y[siguiente].mean()
+
+        xa, ya = x[anterior], y[anterior]
+        areas = np.abs((xa - x_promedio) * (y[inicio:fin] - ya) - (xa - x[inicio:fin]) * (y_promedio - ya))
+        anterior = inicio + int(np.argmax(areas))
+        elegidos[i + 1] = anterior
+
+    return elegidos
+
+
+def serie_paciente(paciente_id, desde=None, hasta=None, puntos=None, campos=CAMPOS_SERIE):
+    """
+    Signos vitales del paciente en [desde, hasta) (UTC) como arreglos por
+    columna, cada signo reducido con LTTB a 'puntos' si se indica.
+
+    Returns:
+        {'total': filas leídas, 'series': {campo: {'fecha', 'valor', 'origen'}}}
+    """
+    filas = db.session.execute(_consulta_signos(paciente_id, desde, hasta)).all()
+    if not filas:
+        return {'total': 0, 'series': {campo: {'fecha': [], 'valor': [], 'origen': []} for campo in campos}}
+
+    fechas = np.array([fila.fecha for fila in filas], dtype='datetime64[s]')
+    x = fechas.astype(np.int64)
+    origenes = np.array([fila.origen for fila in filas])
+
+    series = {}
+    for campo in campos:
+        valores = np.array([getattr(fila, campo) for fila in filas], dtype=float)
+        medidos = np.flatnonzero(~np.isnan(valores) & (valores != 0))
+        if puntos:
+            medidos = medidos[lttb(x[medidos], valores[medidos], puntos)]
+        series[campo] = {
+            'fecha': np.datetime_as_string(fechas[medidos]).tolist(),
+            'valor': valores[medidos].tolist(),
+            'origen': origenes[medidos].tolist(),
+        }
+    return {'total': len(filas), 'series': series}
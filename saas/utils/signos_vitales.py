@@ -0,0 +1,307 @@
+"""
+Motor de reglas clínicas sobre signos vitales (vectorizado con NumPy)
+Sistema SaaS - Hospital Tipo 1 Uracoa
+
+Una sola tabla de reglas para Consulta, Evolucion y Emergencia. Las
+reglas se evalúan sobre lotes completos como arreglos por columna
+(temperatura, presión sistólica/diastólica, frecuencia cardíaca,
+saturación, IMC), así un recálculo, reporte o listado de miles de filas
+cuesta unos pocos milisegundos:
+
+    alertas, severidad = evaluar_lote({'temperatura': [...], 'saturacion': [...]})
+
+El camino de una sola fila (formularios, propiedades del modelo) pasa
+por el mismo código con un lote de tamaño 1, por lo que el resultado es
+idéntico. Un valor None o 0 se considera "no medido" y no dispara reglas.
+
+Cada regla ocupa un bit en 'alertas' y aporta un peso a 'severidad'
+(mayor si supera el umbral crítico), columnas que Consulta guarda para
+filtrar y ordenar por riesgo en SQL.
+"""
+import operator
+from collections import namedtuple
+import numpy as np
+
+Regla = namedtuple('Regla', 'bit tipo campo op umbral umbral_critico peso peso_critico mensaje clase icono')
+
+ALERTA_FIEBRE = 1 << 0
+ALERTA_SISTOLICA = 1 << 1
+ALERTA_DIASTOLICA = 1 << 2
+ALERTA_OBESIDAD = 1 << 3
+ALERTA_HIPOXEMIA = 1 << 4
+ALERTA_TAQUICARDIA = 1 << 5
+ALERTA_BRADICARDIA = 1 << 6
+
+COMPARADORES = {'>=': operator.ge, '>': operator.gt, '<': operator.lt}
+
+REGLAS = (
+    Regla(ALERTA_FIEBRE, 'fiebre', 'temperatura', '>=', 38, 40, 2, 3,
+          'Fiebre: {valor}°C', 'danger', 'thermometer-high'),
+    Regla(ALERTA_SISTOLICA, 'hipertension', 'presion_sistolica', '>=', 140, 180, 2, 3,
+          'Presión sistólica elevada: {valor} mmHg', 'warning', 'heart-pulse'),
+    Regla(ALERTA_DIASTOLICA, 'hipertension', 'presion_diastolica', '>=', 90, 120, 1, 3,
+          'Presión diastólica elevada: {valor} mmHg', 'warning', 'heart-pulse'),
+    Regla(ALERTA_OBESIDAD, 'obesidad', 'imc', '>', 30, None, 1, 1,
+          'IMC elevado: {valor} (Obesidad)', 'info', 'person'),
+    # MEJORAS_IMPLANTACION.md: saturación < 92% es crítica por sí sola
+    Regla(ALERTA_HIPOXEMIA, 'hipoxemia', 'saturacion', '<', 92, 85, 5, 6,
+          'Hipoxemia: SpO₂ {valor}%', 'danger', 'lungs'),
+    Regla(ALERTA_TAQUICARDIA, 'taquicardia', 'frecuencia_cardiaca', '>=', 100, 130, 1, 2,
+          'Taquicardia: {valor} lpm', 'warning', 'activity'),
+    Regla(ALERTA_BRADICARDIA, 'bradicardia', 'frecuencia_cardiaca', '<', 50, 40, 1, 3,
+          'Bradicardia: {valor} lpm', 'warning', 'activity'),
+)
+
+# (severidad mínima, etiqueta, clase bootstrap), de mayor a menor
+NIVELES_SEVERIDAD = (
+    (5, 'Alta', 'danger'),
+    (3, 'Moderada', 'warning'),
+    (1, 'Baja', 'info'),
+    (0, 'Sin alertas', 'light'),
+)
+
+# Validaciones de coherencia (antes en Consulta.validar_antes_guardar)
+ERROR_PRESION = 1 << 0
+ERROR_IMC = 1 << 1
+
+MENSAJES_VALIDACION = {
+    ERROR_PRESION: 'La presión diastólica debe ser menor que la sistólica',
+    ERROR_IMC: 'IMC fuera de rango razonable (10-80)',
+}
+
+# NEWS2 (Royal College of Physicians, 2017): campo -> (bordes, puntos).
+# Un valor v recibe puntos[i] si bordes[i - 1] < v <= bordes[i]. Sin registro
+# de oxígeno suplementario ni de conciencia, se asume aire ambiente y alerta
+# (SpO₂ en escala 1).
+ESCALAS_NEWS2 = {
+    'frecuencia_respiratoria': ((8, 11, 20, 24), (3, 1, 0, 2, 3)),
+    'saturacion': ((91, 93, 95), (3, 2, 1, 0)),
+    'presion_sistolica': ((90, 100, 110, 219), (3, 2, 1, 0, 3)),
+    'frecuencia_cardiaca': ((40, 50, 90, 110, 130), (3, 1, 0, 1, 2, 3)),
+    'temperatura': ((35.0, 36.0, 38.0, 39.0), (3, 1, 0, 1, 2)),
+}
+
+# (puntaje mínimo, etiqueta, clase bootstrap), de mayor a menor; un solo
+# parámetro con 3 puntos sube el riesgo bajo a 'Bajo-medio'
+NIVELES_NEWS2 = (
+    (7, 'Alto', 'danger'),
+    (5, 'Medio', 'warning'),
+    (0, 'Bajo', 'success'),
+)
+
+# Atributos que se leen de un registro (Consulta, Evolucion o Emergencia)
+CAMPOS = ('temperatura', 'presion_sistolica', 'presion_diastolica',
+          'frecuencia_cardiaca', 'saturacion', 'peso', 'altura')
+
+
+# ---------- Entrada ----------
+
+def a_arreglo(valores):
+    """Secuencia con None -> arreglo float con NaN (0 también cuenta como no medido)"""
+    arreglo = np.asarray(valores, dtype=float)
+    return np.where(arreglo == 0, np.nan, arreglo)
+
+
+def separar_presion(texto):
+    """'120/80' -> (120, 80); (None, None) si falta o no se entiende"""
+    try:
+        sistolica, diastolica = str(texto).split('/')
+        return int(sistolica), int(diastolica)
+    except (ValueError, TypeError):
+        return None, None
+
+
+def signos_de(registro):
+    """
+    Signos de un registro; si no trae la presión numérica (HistoriaClinica,
+    Emergencia anterior a la migración 0b4d8e2f6a91) se lee del texto '120/80'
+    """
+    signos = {campo: getattr(registro, campo, None) for campo in CAMPOS}
+    if signos['presion_sistolica'] is None and getattr(registro, 'presion_arterial', None):
+        signos['presion_sistolica'], signos['presion_diastolica'] = separar_presion(registro.presion_arterial)
+    return signos
+
+
+def columnas_de(registros):
+    """Lista de registros -> {campo: arreglo} para evaluar_lote()"""
+    filas = [signos_de(registro) for registro in registros]
+    return {campo: a_arreglo([fila[campo] for fila in filas]) for campo in CAMPOS}
+
+
+def _preparar(columnas):
+    arreglos = {campo: a_arreglo(valores) for campo, valores in columnas.items()}
+    if 'imc' not in arreglos and 'peso' in arreglos and 'altura' in arreglos:
+        arreglos['imc'] = np.round(_imc_crudo(arreglos['peso'], arreglos['altura']), 2)
+    return arreglos
+
+
+def _longitud(arreglos):
+    return len(next(iter(arreglos.values()))) if arreglos else 0
+
+
+def _imc_crudo(peso, altura):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(altura > 0, peso / (altura / 100) ** 2, np.nan)
+
+
+# ---------- Lotes ----------
+
+def calcular_imc_lote(peso, altura):
+    """IMC (altura en cm) redondeado a 2 decimales; NaN si faltan datos"""
+    return np.round(_imc_crudo(a_arreglo(peso), a_arreglo(altura)), 2)
+
+
+def evaluar_lote(columnas):
+    """
+    Evalúa todas las reglas sobre un lote.
+
+    Args:
+        columnas: {campo: secuencia o arreglo}, todas del mismo largo. Si no
+                  viene 'imc' se calcula desde 'peso' y 'altura'. Las
+                  columnas ausentes no disparan sus reglas.
+
+    Returns:
+        (alertas, severidad): arreglos int64, una posición por fila
+    """
+    arreglos = _preparar(columnas)
+    n = _longitud(arreglos)
+    alertas = np.zeros(n, dtype=np.int64)
+    severidad = np.zeros(n, dtype=np.int64)
+
+    with np.errstate(invalid='ignore'):
+        for regla in REGLAS:
+            valores = arreglos.get(regla.campo)
+            if valores is None:
+                continue
+            comparar = COMPARADORES[regla.op]
+            activa = comparar(valores, regla.umbral)
+            critica = activa & comparar(valores, regla.umbral_critico) if regla.umbral_critico is not None else False
+            alertas |= np.where(activa, regla.bit, 0)
+            severidad += np.where(critica, regla.peso_critico, np.where(activa, regla.peso, 0))
+
+    return alertas, severidad
+
+
+def validar_lote(columnas):
+    """Arreglo con los bits ERROR_* de cada fila (0 = coherente)"""
+    arreglos = _preparar(columnas)
+    errores = np.zeros(_longitud(arreglos), dtype=np.int64)
+
+    with np.errstate(invalid='ignore'):
+        if 'presion_sistolica' in arreglos and 'presion_diastolica' in arreglos:
+            errores |= np.where(arreglos['presion_diastolica'] >= arreglos['presion_sistolica'], ERROR_PRESION, 0)
+        if 'peso' in arreglos and 'altura' in arreglos:
+            imc = _imc_crudo(arreglos['peso'], arreglos['altura'])
+            errores |= np.where((imc < 10) | (imc > 80), ERROR_IMC, 0)
+
+    return errores
+
+
+def news2_lote(columnas):
+    """
+    Puntaje NEWS2 de un lote.
+
+    Args:
+        columnas: {campo: secuencia o arreglo} con los campos de ESCALAS_NEWS2
+                  (los ausentes o no medidos suman 0)
+
+    Returns:
+        (puntaje, maximo, medidos): arreglos int64 con el total, el mayor
+        puntaje de un solo parámetro y cuántos parámetros se midieron
+    """
+    arreglos = {campo: a_arreglo(valores) for campo, valores in columnas.items()}
+    n = _longitud(arreglos)
+    puntaje = np.zeros(n, dtype=np.int64)
+    maximo = np.zeros(n, dtype=np.int64)
+    medidos = np.zeros(n, dtype=np.int64)
+
+    for campo, (bordes, puntos) in ESCALAS_NEWS2.items():
+        valores = arreglos.get(campo)
+        if valores is None:
+            continue
+        medido = ~np.isnan(valores)
+        parcial = np.where(medido, np.asarray(puntos)[np.digitize(valores, bordes, right=True)], 0)
+        puntaje += parcial
+        maximo = np.maximum(maximo, parcial)
+        medidos += medido
+
+    return puntaje, maximo, medidos
+
+
+def evaluar_registros(registros):
+    """(alertas, severidad) de una lista de Consulta / Evolucion / Emergencia"""
+    return evaluar_lote(columnas_de(registros))
+
+
+# ---------- Una fila (mismo código, lote de tamaño 1) ----------
+
+def _fila(signos):
+    fila = {campo: [signos.get(campo)] for campo in CAMPOS}
+    fila.update((campo, [valor]) for campo, valor in signos.items())
+    return fila
+
+
+def calcular_imc(peso, altura):
+    """IMC con altura en cm; None si faltan datos"""
+    imc = calcular_imc_lote([peso], [altura])[0]
+    return None if np.isnan(imc) else float(imc)
+
+
+def evaluar(signos):
+    """(alertas, severidad) de un dict de signos vitales"""
+    alertas, severidad = evaluar_lote(_fila(signos))
+    return int(alertas[0]), int(severidad[0])
+
+
+def validar(signos):
+    """Lanza ValueError con el primer error de coherencia encontrado"""
+    errores = int(validar_lote(_fila(signos))[0])
+    for bit, mensaje in MENSAJES_VALIDACION.items():
+        if errores & bit:
+            raise ValueError(mensaje)
+
+
+def news2(signos):
+    """(puntaje, maximo) NEWS2 de un dict de signos; (None, None) si no hay ninguno medido"""
+    puntaje, maximo, medidos = news2_lote(_fila(signos))
+    if not medidos[0]:
+        return None, None
+    return int(puntaje[0]), int(maximo[0])
+
+
+def riesgo_news2(puntaje, maximo=None):
+    """(etiqueta, clase) del riesgo clínico de un puntaje NEWS2"""
+    if puntaje is None:
+        return 'Sin datos', 'secondary'
+    for minimo, etiqueta, clase in NIVELES_NEWS2:
+        if puntaje >= minimo:
+            if etiqueta == 'Bajo' and maximo == 3:
+                return 'Bajo-medio', 'info'
+            return etiqueta, clase
+
+
+def detalle(alertas, signos):
+    """Lista de alertas (tipo, mensaje, clase, icono) para las vistas"""
+    if 'imc' not in signos:
+        signos = dict(signos, imc=calcular_imc(signos.get('peso'), signos.get('altura')))
+    return [
+        {
+            'tipo': regla.tipo,
+            'mensaje': regla.mensaje.format(valor=signos.get(regla.campo)),
+            'clase': regla.clase,
+            'icono': regla.icono,
+        }
+        for regla in REGLAS if alertas & regla.bit
+    ]
+
+
+def contar_alertas(alertas):
+    return bin(alertas or 0).count('1')
+
+
+def nivel_severidad(severidad):
+    """(etiqueta, clase) del nivel de una severidad"""
+    for minimo, etiqueta, clase in NIVELES_SEVERIDAD:
+        if (severidad or 0) >= minimo:
+            return etiqueta, clase
+    return NIVELES_SEVERIDAD[-1][1:]
@@ -0,0 +1,175 @@
+"""
+Server-Sent Events (SSE) para tableros en vivo
+Sistema SaaS - Hospital Tipo 1 Uracoa
+
+Un flujo SSE mantiene abierta la respuesta HTTP y envía un evento cada
+vez que cambia la fuente observada (p. ej. la cola de triage), en lugar
+de que cada pantalla recargue la página o consulte la base de datos.
+El navegador reconecta solo (EventSource) al cerrarse el flujo.
+
+La fuente solo necesita dos funciones:
+    esperar_cambio(revision, timeout) -> revisión actual (bloquea hasta
+                                          que difiera o venza el timeout)
+    producir() -> datos serializables a JSON del estado actual
+
+AvisosCambios da esperar_cambio a una fuente que vive en cada proceso
+(cola de triage, lista de trabajo del laboratorio): las rutas avisan al
+confirmar y los cambios de otros workers se detectan por la versión de
+etiqueta de sus tablas.
+
+Cada flujo ocupa un hilo del worker mientras está abierto: en producción
+gunicorn debe usar workers con hilos (ver Procfile) y cada flujo se cierra
+tras SSE_DURACION segundos para liberar el hilo (el navegador reconecta).
+Entre eventos el flujo no retiene una conexión del pool: la transacción de
+la sesión se termina al abrir el flujo y después de cada producir().
+"""
+import json
+import threading
+import time
+from flask import Response, current_app, stream_with_context
+from saas.extensions import db
+from saas.utils.cache_etiquetas import versiones_etiquetas
+
+# Segundos entre comentarios de mantenimiento (evitan cortes de proxies)
+INTERVALO_PING = 15
+
+# Duración máxima de un flujo antes de pedir reconexión
+DURACION_FLUJO = 300
+
+# Milisegundos que espera el navegador antes de reconectar
+REINTENTO_MS = 3000
+
+# Segundos entre revisiones de las versiones de etiqueta mientras se espera
+SONDEO_VERSIONES = 2
+
+
+def formatear_evento(datos, evento=None, id_evento=None):
+    """Mensaje SSE: líneas 'event:', 'id:' y 'data:' terminadas en línea en blanco"""
+    lineas = []
+    if evento:
+        lineas.append(f'event: {evento}')
+    if id_evento is not None:
+        lineas.append(f'id: {id_evento}')
+    carga = datos if isinstance(datos, str) else json.dumps(datos, ensure_ascii=False, default=str)
+    lineas.extend(f'data: {linea}' for linea in carga.splitlines() or [''])
+    return '\n'.join(lineas) + '\n\n'
+
+
+class AvisosCambios:
+    """
+    Revisión de una fuente en este proceso y espera de sus cambios.
+
+    Las rutas llaman notificar() DESPUÉS del commit. Los cambios hechos por
+    otros workers se detectan comparando las versiones de etiqueta de
+    ETIQUETAS (lectura de caché, no de la BD) cada SONDEO_VERSIONES
+    segundos mientras haya flujos esperando; pasados REFRESCO segundos la
+    revisión avanza aunque no haya cambios (None: nunca). Las subclases con
+    estado propio redefinen sincronizar() para recargarlo.
+    """
+
+    ETIQUETAS = ()
+    REFRESCO = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cambio = threading.Condition(self._lock)
+        self._versiones = None
+        self._marcada_en = 0
+        self.revision = 0
+
+    # ---------- Llamar con el lock tomado ----------
+
+    def _marcar(self, versiones):
+        """Versiones de referencia y momento en que se tomaron"""
+        self._versiones = versiones
+        self._marcada_en = time.monotonic()
+
+    def _avanzar(self):
+        self.revision += 1
+        self._cambio.notify_all()
+
+    # ----------
+
+    def _desactualizada(self, versiones):
+        """Otro worker cambió las tablas o pasó REFRESCO desde la última marca"""
+        return (versiones != self._versiones
+                or (self.REFRESCO is not None and time.monotonic() - self._marcada_en > self.REFRESCO))
+
+    def notificar(self):
+        """Avisa a los flujos en espera. Llamar DESPUÉS del commit."""
+        versiones = versiones_etiquetas(self.ETIQUETAS)
+        with self._lock:
+            self._marcar(versiones)
+            self._avanzar()
+
+    def sincronizar(self):
+        """Avanza la revisión si otro worker cambió las tablas o pasó REFRESCO"""
+        versiones = versiones_etiquetas(self.ETIQUETAS)
+        with self._lock:
+            if self._versiones is None:
+                self._marcar(versiones)
+            elif self._desactualizada(versiones):
+                self._marcar(versiones)
+                self._avanzar()
+
+    def esperar_cambio(self, revision, timeout):
+        """
+        Bloquea hasta que la revisión difiera de 'revision' o venza el
+        timeout, revisando cada SONDEO_VERSIONES segundos los cambios de
+        otros workers. Retorna la revisión actual.
+        """
+        fin = time.monotonic() + timeout
+        while True:
+            self.sincronizar()
+            with self._lock:
+                if self.revision != revision:
+                    return self.revision
+                restante = fin - time.monotonic()
+                if restante <= 0:
+                    return self.revision
+                self._cambio.wait(min(SONDEO_VERSIONES, restante))
+                if self.revision != revision:
+                    return self.revision
+
+
+def flujo_eventos(esperar_cambio, producir, evento='cambio'):
+    """
+    Response SSE que envía el estado actual al conectar y luego cada cambio.
+
+    Args:
+        esperar_cambio: función(revision, timeout) -> revisión actual
+        producir: función() -> datos del evento
+        evento: nombre del evento SSE
+    """
+    intervalo = current_app.config.get('SSE_INTERVALO_PING', INTERVALO_PING)
+    duracion = current_app.config.get('SSE_DURACION', DURACION_FLUJO)
+
+    def generar():
+        fin = time.monotonic() + duracion
+        revision = None
+        # La carga del usuario (login_required) abrió una transacción
+        db.session.rollback()
+        yield f'retry: {REINTENTO_MS}\n\n'
+        while True:
+            restante = fin - time.monotonic()
+            if restante <= 0:
+                return
+            nueva = esperar_cambio(revision, timeout=min(intervalo, restante))
+            if nueva != revision:
+                revision = nueva
+                datos = producir()
+                # Devuelve la conexión al pool antes de volver a esperar
+                db.session.rollback()
+                yield formatear_evento(datos, evento=evento, id_evento=revision)
+            else:
+                db.session.rollback()
+                yield ': ping\n\n'
+
+    return Response(
+        stream_with_context(generar()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',  # nginx / proxies: no acumular el flujo
+        },
+    )
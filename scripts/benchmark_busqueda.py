@@ -0,0 +1,137 @@
+"""
+Benchmark de búsqueda parcial de pacientes
+Sistema SaaS - Hospital Tipo 1 Uracoa - J&S Software Inteligentes
+
+Compara la latencia (p50/p95) de ILIKE '%x%' contra la búsqueda por
+trigramas de saas/utils/busqueda.py: FTS5 en SQLite, pg_trgm + GIN en
+PostgreSQL (candidatos ordenados por similarity()).
+
+Uso:
+    python scripts/benchmark_busqueda.py                  # 100k y 1M pacientes
+    python scripts/benchmark_busqueda.py --pacientes 20000
+    DATABASE_URL=postgresql://.../bench python scripts/benchmark_busqueda.py
+
+Con DATABASE_URL=postgresql://... mide contra PostgreSQL (las tablas se
+borran y se vuelven a crear: usar una BD de pruebas); si no, usa una BD
+SQLite temporal.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import statistics
+from datetime import date
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+NOMBRES = ['Juan', 'María', 'José', 'Carmen', 'Luis', 'Ana', 'Carlos', 'Rosa', 'Pedro', 'Luisa',
+           'Jesús', 'Yolanda', 'Miguel', 'Daniela', 'Rafael', 'Gabriela', 'Andrés', 'Yusmary']
+APELLIDOS = ['González', 'Rodríguez', 'Pérez', 'Hernández', 'García', 'Martínez', 'López', 'Díaz',
+             'Ramírez', 'Torres', 'Rojas', 'Medina', 'Guzmán', 'Salazar', 'Marcano', 'Brito']
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, int(round(p / 100 * len(ordenados))) - 1))
+    return ordenados[indice]
+
+
+def poblar(db, cantidad, lote=20000):
+    """Inserta pacientes sintéticos con executemany por lotes"""
+    from saas.models import Paciente
+    rnd = random.Random(42)
+    insertar = Paciente.__table__.insert()
+    for inicio in range(0, cantidad, lote):
+        filas = [{
+            'cedula': f'V{10000000 + i}',
+            'cedula_normalizada': str(10000000 + i),
+            'nombre': rnd.choice(NOMBRES),
+            'apellido': f'{rnd.choice(APELLIDOS)} {rnd.choice(APELLIDOS)}',
+            'fecha_nacimiento': date(1950 + i % 60, 1 + i % 12, 1 + i % 28),
+            'sexo': 'Masculino' if i % 2 else 'Femenino',
+            'activo': True,
+        } for i in range(inicio, min(inicio + lote, cantidad))]
+        db.session.execute(insertar, filas)
+        db.session.commit()
+
+
+def medir(funcion, terminos):
+    tiempos = []
+    for termino in terminos:
+        inicio = time.perf_counter()
+        funcion(termino)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos), percentil(tiempos, 95)
+
+
+def ejecutar(cantidad, repeticiones):
+    from sqlalchemy import text
+    from saas import create_app
+    from saas.extensions import db
+    from saas.models import Paciente
+    from saas.utils.busqueda import buscar_pacientes, _filtro_ilike
+
+    app = create_app('production')
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        inicio = time.perf_counter()
+        poblar(db, cantidad)
+        # Estadísticas para el planificador (en PostgreSQL decide si usa los GIN)
+        db.session.execute(text('ANALYZE pacientes'))
+        db.session.commit()
+        print(f'  Carga de {cantidad:,} pacientes: {time.perf_counter() - inicio:.1f}s')
+
+        rnd = random.Random(7)
+        terminos = []
+        for _ in range(repeticiones):
+            tipo = rnd.random()
+            if tipo < 0.5:
+                terminos.append(str(10000000 + rnd.randrange(cantidad))[rnd.randrange(3):][:5])
+            elif tipo < 0.8:
+                terminos.append(rnd.choice(APELLIDOS)[:5])
+            else:
+                terminos.append(f'{rnd.choice(NOMBRES)[:4]} {rnd.choice(APELLIDOS)[:4]}')
+
+        def con_ilike(termino):
+            query = Paciente.query.filter(Paciente.activo == True)
+            for t in termino.split():
+                query = query.filter(_filtro_ilike(t))
+            return query.limit(5).all()
+
+        def con_trigramas(termino):
+            return buscar_pacientes(termino, limite=5)
+
+        for nombre, funcion in (('ILIKE %x%', con_ilike), ('Trigramas', con_trigramas)):
+            p50, p95 = medir(funcion, terminos)
+            print(f'  {nombre:<10} p50={p50:8.2f} ms   p95={p95:8.2f} ms')
+
+        db.session.remove()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de búsqueda de pacientes')
+    parser.add_argument('--pacientes', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--repeticiones', type=int, default=200)
+    args = parser.parse_args()
+
+    # BD temporal (la configuración lee DATABASE_URL al importarse)
+    if not os.environ.get('DATABASE_URL'):
+        directorio = tempfile.mkdtemp(prefix='bench_busqueda_')
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(directorio, 'bench.db')
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+
+    motor = os.environ['DATABASE_URL'].split(':')[0]
+    print(f'\n🏥 Benchmark búsqueda de pacientes ({motor})\n')
+    for cantidad in args.pacientes:
+        print(f'📊 {cantidad:,} pacientes')
+        ejecutar(cantidad, args.repeticiones)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Benchmark de importación de resultados de analizadores
+Sistema SaaS - Hospital Tipo 1 Uracoa - J&S Software Inteligentes
+
+Genera un archivo CSV del analizador con N filas (con un porcentaje de
+líneas inválidas) y mide filas por segundo de:
+
+    - Fila a fila: un SELECT de la orden y un session.add() por línea,
+      como quedaría cargando a mano con el ORM.
+    - importar_archivo() con distintos tamaños de lote.
+
+Uso:
+    python scripts/benchmark_importacion_laboratorio.py
+    python scripts/benchmark_importacion_laboratorio.py --filas 200000 --lotes 100 500 2000
+
+Con DATABASE_URL=postgresql://... mide contra PostgreSQL; si no, usa una
+BD SQLite temporal.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import date, datetime, timedelta
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+EXAMENES = [
+    ('HB', 'Hemoglobina', 'numerico', 'g/dL', 12.0, 16.0),
+    ('GLU', 'Glicemia', 'numerico', 'mg/dL', 70.0, 100.0),
+    ('CREA', 'Creatinina', 'numerico', 'mg/dL', 0.6, 1.2),
+    ('UREA', 'Urea', 'numerico', 'mg/dL', 15.0, 45.0),
+    ('ORINA', 'Examen de orina', 'texto', None, None, None),
+]
+
+
+def generar_csv(ruta, codigos_orden, filas, invalidas):
+    """
+    CSV del analizador; 'invalidas' es la fracción de líneas con error.
+    Cada línea lleva su hora de toma, así ninguna cuenta como ya importada.
+    """
+    rnd = random.Random(42)
+    inicio = datetime(2026, 1, 1)
+    with open(ruta, 'w', encoding='utf-8', newline='') as archivo:
+        archivo.write('orden;codigo;valor;fecha\n')
+        for i in range(filas):
+            orden = rnd.choice(codigos_orden)
+            codigo, _, tipo, _, minimo, maximo = rnd.choice(EXAMENES)
+            if rnd.random() < invalidas:
+                valor, codigo = 'n/d', rnd.choice([codigo, 'XYZ'])
+            elif tipo == 'texto':
+                valor = 'Negativo'
+            else:
+                valor = f'{rnd.uniform(minimo * 0.7, maximo * 1.3):.1f}'.replace('.', ',')
+            fecha = (inicio + timedelta(seconds=i)).isoformat()
+            archivo.write(f'{orden};{codigo};{valor};{fecha}\n')
+
+
+def importar_fila_a_fila(ruta):
+    """Línea base: una consulta de la orden y un objeto ORM por línea"""
+    from saas.extensions import db
+    from saas.laboratorio.importacion import leer_csv
+    from saas.laboratorio.models import OrdenLaboratorio, ResultadoLaboratorio, ExamenLaboratorio
+    from saas.laboratorio.resultados import fila_resultado
+
+    catalogo = {e.codigo: e for e in ExamenLaboratorio.query.all()}
+    importados = 0
+    with open(ruta, encoding='utf-8', newline='') as archivo:
+        for _, entrada, error in leer_csv(archivo):
+            orden = OrdenLaboratorio.query.filter_by(codigo_orden=entrada['orden']).first() if entrada else None
+            examen = catalogo.get(entrada['codigo']) if entrada else None
+            if error or not orden or not examen:
+                continue
+            fila, error = fila_resultado(examen, entrada, None)
+            if error:
+                continue
+            fila.pop('fecha')
+            db.session.add(ResultadoLaboratorio(orden_id=orden.id, paciente_id=orden.paciente_id, **fila))
+            importados += 1
+    db.session.commit()
+    return importados
+
+
+def importar_por_lotes(ruta, tamano_lote):
+    from saas.laboratorio.importacion import importar_archivo
+    with open(ruta, encoding='utf-8', newline='') as archivo:
+        return importar_archivo(archivo, 'csv', tamano_lote=tamano_lote)['importados']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de importación de resultados de laboratorio')
+    parser.add_argument('--filas', type=int, default=50000)
+    parser.add_argument('--ordenes', type=int, default=2000)
+    parser.add_argument('--invalidas', type=float, default=0.02, help='Fracción de líneas inválidas')
+    parser.add_argument('--lotes', type=int, nargs='+', default=[50, 500, 5000])
+    parser.add_argument('--sin-fila-a-fila', action='store_true', help='Omitir la línea base ORM')
+    args = parser.parse_args()
+
+    # BD temporal (la configuración lee DATABASE_URL al importarse)
+    directorio = tempfile.mkdtemp(prefix='bench_importacion_')
+    if not os.environ.get('DATABASE_URL'):
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(directorio, 'bench.db')
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+
+    from saas import create_app
+    from saas.extensions import db
+    from saas.models import Paciente, Usuario
+    from saas.laboratorio.models import OrdenLaboratorio, ExamenLaboratorio
+
+    app = create_app('production')
+    print(f"\n🏥 Benchmark importación de resultados ({app.config['SQLALCHEMY_DATABASE_URI'].split(':')[0]}): "
+          f"{args.filas} filas, {args.ordenes} órdenes\n")
+
+    def preparar():
+        db.drop_all()
+        db.create_all()
+        medico = Usuario(username='bench', email='bench@hospital.com', nombre='Bench',
+                         apellido='Lab', rol='medico', activo=True)
+        medico.set_password('x')
+        paciente = Paciente(cedula='V99999999', nombre='Bench', apellido='Lab',
+                            fecha_nacimiento=date(1980, 1, 1), sexo='Femenino')
+        db.session.add_all([medico, paciente] + [
+            ExamenLaboratorio(codigo=c, nombre=n, tipo=t, unidad=u, ref_min=mn, ref_max=mx)
+            for c, n, t, u, mn, mx in EXAMENES
+        ])
+        db.session.flush()
+        db.session.add_all([
+            OrdenLaboratorio(codigo_orden=f'LAB-BENCH-{i:06d}', paciente_id=paciente.id,
+                             medico_id=medico.id, examenes_solicitados='Perfil')
+            for i in range(args.ordenes)
+        ])
+        db.session.commit()
+
+    ruta = os.path.join(directorio, 'analizador.csv')
+    generar_csv(ruta, [f'LAB-BENCH-{i:06d}' for i in range(args.ordenes)], args.filas, args.invalidas)
+    print(f'  Archivo: {os.path.getsize(ruta) / 1024 / 1024:.1f} MB\n')
+
+    casos = [(f'Lotes de {n}', lambda n=n: importar_por_lotes(ruta, n)) for n in args.lotes]
+    if not args.sin_fila_a_fila:
+        casos.insert(0, ('Fila a fila (ORM)', lambda: importar_fila_a_fila(ruta)))
+
+    for nombre, importar in casos:
+        with app.app_context():
+            preparar()
+            inicio = time.perf_counter()
+            importados = importar()
+            total = time.perf_counter() - inicio
+            db.session.remove()
+        print(f'  {nombre:<20} {args.filas / total:10.0f} filas/s   {total:7.2f} s   importados={importados}')
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Benchmark de movimientos de stock de medicamentos
+Sistema SaaS - Hospital Tipo 1 Uracoa - J&S Software Inteligentes
+
+Varios hilos registran entradas y salidas del mismo medicamento a la vez
+(cada movimiento en su transacción) y se compara la edición anterior,
+leer cantidad_stock, sumar en Python y guardar, con
+MovimientoStock.registrar() (UPDATE condicional + fila del kardex):
+movimientos por segundo, latencia p50/p95, actualizaciones perdidas
+(saldo final distinto del esperado) y si el saldo quedó negativo.
+
+Uso:
+    python scripts/benchmark_movimientos_stock.py
+    python scripts/benchmark_movimientos_stock.py --hilos 1 8 16 --movimientos 200
+
+Con DATABASE_URL=postgresql://... mide contra PostgreSQL; si no, usa una
+BD SQLite temporal.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import threading
+import statistics
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STOCK_INICIAL = 100
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, int(round(p / 100 * len(ordenados))) - 1))
+    return ordenados[indice]
+
+
+def mover_leyendo(medicamento_id, delta):
+    """Implementación anterior (medicamentos.editar): leer, sumar y guardar"""
+    from saas.extensions import db
+    from saas.models import Medicamento
+    medicamento = db.session.get(Medicamento, medicamento_id)
+    if medicamento.cantidad_stock + delta < 0:
+        return False
+    medicamento.cantidad_stock = medicamento.cantidad_stock + delta
+    return True
+
+
+def mover_kardex(medicamento_id, delta):
+    from saas.models import MovimientoStock
+    tipo = 'entrada' if delta > 0 else 'salida'
+    return MovimientoStock.registrar(medicamento_id, tipo, abs(delta)) is not None
+
+
+def ejecutar(app, mover, hilos, movimientos, medicamento_id):
+    from saas.extensions import db
+
+    tiempos, aplicados, fallidos = [], [], []
+    lock = threading.Lock()
+    barrera = threading.Barrier(hilos)
+
+    def trabajador(semilla):
+        rnd = random.Random(semilla)
+        with app.app_context():
+            barrera.wait()
+            for _ in range(movimientos):
+                delta = rnd.choice([5, -3, -2])
+                inicio = time.perf_counter()
+                try:
+                    if mover(medicamento_id, delta):
+                        db.session.commit()
+                        with lock:
+                            aplicados.append(delta)
+                    else:
+                        db.session.rollback()
+                    with lock:
+                        tiempos.append((time.perf_counter() - inicio) * 1000)
+                except Exception:
+                    db.session.rollback()
+                    with lock:
+                        fallidos.append(1)
+            db.session.remove()
+
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=trabajador, args=(i,)) for i in range(hilos)]
+    for hilo in threads:
+        hilo.start()
+    for hilo in threads:
+        hilo.join()
+    total = time.perf_counter() - inicio
+
+    return (len(tiempos) / total, statistics.median(tiempos or [0]), percentil(tiempos or [0], 95),
+            STOCK_INICIAL + sum(aplicados), len(fallidos))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de movimientos de stock')
+    parser.add_argument('--hilos', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--movimientos', type=int, default=100, help='Movimientos por hilo')
+    args = parser.parse_args()
+
+    # BD temporal (la configuración lee DATABASE_URL al importarse)
+    if not os.environ.get('DATABASE_URL'):
+        directorio = tempfile.mkdtemp(prefix='bench_kardex_')
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(directorio, 'bench.db')
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+
+    from saas import create_app
+    from saas.extensions import db
+    from saas.models import Medicamento
+
+    app = create_app('production')
+    print(f"\n🏥 Benchmark movimientos de stock ({app.config['SQLALCHEMY_DATABASE_URI'].split(':')[0]})\n")
+
+    for nombre, mover in (('Leer y guardar', mover_leyendo), ('Kardex', mover_kardex)):
+        for hilos in args.hilos:
+            with app.app_context():
+                db.drop_all()
+                db.create_all()
+                medicamento = Medicamento(nombre='Bench', cantidad_stock=STOCK_INICIAL, stock_minimo=10)
+                db.session.add(medicamento)
+                db.session.commit()
+                medicamento_id = medicamento.id
+                db.session.remove()
+
+            por_segundo, p50, p95, esperado, fallidos = ejecutar(app, mover, hilos, args.movimientos, medicamento_id)
+
+            with app.app_context():
+                saldo = db.session.get(Medicamento, medicamento_id).cantidad_stock
+                db.session.remove()
+            print(f'  {nombre:<15} {hilos:>3} hilos  {por_segundo:8.1f} mov/s   '
+                  f'p50={p50:7.2f} ms   p95={p95:7.2f} ms   '
+                  f'saldo={saldo} (esperado {esperado}, perdidas={esperado != saldo})   '
+                  f'negativo={saldo < 0}   fallidos={fallidos}')
+        print()
+
+
+if __name__ == '__main__':
+    main()
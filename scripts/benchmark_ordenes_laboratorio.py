@@ -0,0 +1,128 @@
+"""
+Benchmark de creación de órdenes de laboratorio
+Sistema SaaS - Hospital Tipo 1 Uracoa - J&S Software Inteligentes
+
+Varios hilos crean órdenes a la vez (cada una en su transacción) y se
+compara el código anterior, SELECT max(id) + 1, con el contador por año
+de contadores_orden_laboratorio: órdenes por segundo, latencia p50/p95 y
+cuántas órdenes fallaron por código repetido.
+
+Uso:
+    python scripts/benchmark_ordenes_laboratorio.py
+    python scripts/benchmark_ordenes_laboratorio.py --hilos 1 8 16 --ordenes 200
+
+Con DATABASE_URL=postgresql://... mide contra PostgreSQL; si no, usa una
+BD SQLite temporal.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+import statistics
+from datetime import date, datetime
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, int(round(p / 100 * len(ordenados))) - 1))
+    return ordenados[indice]
+
+
+def codigo_max_id(orden):
+    """Implementación anterior de OrdenLaboratorio.generar_codigo"""
+    from saas.extensions import db
+    from saas.laboratorio.models import OrdenLaboratorio
+    año = datetime.utcnow().year
+    ultimo_id = db.session.query(db.func.max(OrdenLaboratorio.id)).scalar() or 0
+    orden.codigo_orden = f'LAB-{año}-{str(ultimo_id + 1).zfill(4)}'
+
+
+def codigo_contador(orden):
+    orden.generar_codigo()
+
+
+def ejecutar(app, asignar, hilos, ordenes, paciente_id, medico_id):
+    from saas.extensions import db
+    from saas.laboratorio.models import OrdenLaboratorio
+
+    tiempos, fallidas = [], []
+    lock = threading.Lock()
+    barrera = threading.Barrier(hilos)
+
+    def trabajador():
+        with app.app_context():
+            barrera.wait()
+            for _ in range(ordenes):
+                inicio = time.perf_counter()
+                try:
+                    orden = OrdenLaboratorio(paciente_id=paciente_id, medico_id=medico_id,
+                                             examenes_solicitados='Hemograma completo')
+                    asignar(orden)
+                    db.session.add(orden)
+                    db.session.commit()
+                    with lock:
+                        tiempos.append((time.perf_counter() - inicio) * 1000)
+                except Exception:
+                    db.session.rollback()
+                    with lock:
+                        fallidas.append(1)
+            db.session.remove()
+
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=trabajador) for _ in range(hilos)]
+    for hilo in threads:
+        hilo.start()
+    for hilo in threads:
+        hilo.join()
+    total = time.perf_counter() - inicio
+
+    return len(tiempos) / total, statistics.median(tiempos or [0]), percentil(tiempos or [0], 95), len(fallidas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de creación de órdenes de laboratorio')
+    parser.add_argument('--hilos', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--ordenes', type=int, default=100, help='Órdenes por hilo')
+    args = parser.parse_args()
+
+    # BD temporal (la configuración lee DATABASE_URL al importarse)
+    if not os.environ.get('DATABASE_URL'):
+        directorio = tempfile.mkdtemp(prefix='bench_laboratorio_')
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(directorio, 'bench.db')
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+
+    from saas import create_app
+    from saas.extensions import db
+    from saas.models import Paciente, Usuario
+
+    app = create_app('production')
+    print(f"\n🏥 Benchmark órdenes de laboratorio ({app.config['SQLALCHEMY_DATABASE_URI'].split(':')[0]})\n")
+
+    for nombre, asignar in (('max(id) + 1', codigo_max_id), ('Contador', codigo_contador)):
+        for hilos in args.hilos:
+            with app.app_context():
+                db.drop_all()
+                db.create_all()
+                medico = Usuario(username='bench', email='bench@hospital.com', nombre='Bench',
+                                 apellido='Lab', rol='medico', activo=True)
+                medico.set_password('x')
+                paciente = Paciente(cedula='V99999999', nombre='Bench', apellido='Lab',
+                                    fecha_nacimiento=date(1980, 1, 1), sexo='Femenino')
+                db.session.add_all([medico, paciente])
+                db.session.commit()
+                ids = (paciente.id, medico.id)
+                db.session.remove()
+
+            por_segundo, p50, p95, fallidas = ejecutar(app, asignar, hilos, args.ordenes, *ids)
+            print(f'  {nombre:<12} {hilos:>3} hilos  {por_segundo:8.1f} órdenes/s   '
+                  f'p50={p50:7.2f} ms   p95={p95:7.2f} ms   fallidas={fallidas}')
+        print()
+
+
+if __name__ == '__main__':
+    main()
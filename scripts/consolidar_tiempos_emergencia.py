@@ -0,0 +1,38 @@
+"""
+Consolidación diaria de tiempos de emergencia
+Sistema SaaS - Hospital Tipo 1 Uracoa - J&S Software Inteligentes
+
+Recalcula el histograma de tiempos_emergencia_dia (espera y estancia por
+día, nivel de triage, tipo y hora) que usa /emergencias/api/tiempos para
+rangos largos. Programarlo cada noche: por defecto rehace ayer y
+anteayer, porque un caso ingresado antes de medianoche puede recibir su
+atención o alta al día siguiente. Es idempotente.
+
+Uso:
+    python scripts/consolidar_tiempos_emergencia.py [desde] [hasta]   (YYYY-MM-DD)
+"""
+import os
+import sys
+from datetime import date, timedelta
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from saas import create_app
+from saas.utils.fechas import hoy_local
+from saas.emergencias.tiempos import consolidar_dias
+
+
+def main():
+    app = create_app()
+    with app.app_context():
+        ayer = hoy_local() - timedelta(days=1)
+        desde = date.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else ayer - timedelta(days=1)
+        hasta = date.fromisoformat(sys.argv[2]) if len(sys.argv) > 2 else ayer
+        escritas = consolidar_dias(desde, hasta)
+
+    print(f'✅ {desde} a {hasta}: {escritas} fila(s) de histograma')
+
+
+if __name__ == '__main__':
+    main()
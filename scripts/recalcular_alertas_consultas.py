@@ -0,0 +1,33 @@
+"""
+Recálculo de las alertas guardadas de las consultas
+Sistema SaaS - Hospital Tipo 1 Uracoa - J&S Software Inteligentes
+
+Llena imc_valor, alertas y severidad de las consultas registradas antes
+de la migración a8d3f1c7e2b5, o de todas tras cambiar las reglas de
+saas/utils/signos_vitales.py. Recorre la tabla por id en lotes y solo
+escribe las filas que cambian.
+
+Uso:
+    python scripts/recalcular_alertas_consultas.py [tamaño_lote]
+"""
+import os
+import sys
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from saas import create_app
+from saas.consultas.models import Consulta
+
+
+def main():
+    tamano_lote = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    app = create_app()
+    with app.app_context():
+        revisadas, actualizadas = Consulta.recalcular_alertas(tamano_lote)
+
+    print(f'✅ {revisadas} consulta(s) revisada(s), {actualizadas} actualizada(s)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""
+Reconciliación de los contadores del dashboard
+Sistema SaaS - Hospital Tipo 1 Uracoa - J&S Software Inteligentes
+
+Recalcula los contadores de 'estadisticas_contadores' desde las tablas y
+corrige cualquier deriva (cargas masivas, SQL manual, restauraciones).
+También sirve para cargarlos la primera vez tras la migración.
+
+Programar en horario de baja actividad, p. ej. con cron:
+    15 3 * * *  cd /srv/hospital && python scripts/reconciliar_estadisticas.py
+"""
+import os
+import sys
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from saas import create_app
+from saas.utils.estadisticas import reconciliar_contadores
+
+
+def main():
+    app = create_app()
+    with app.app_context():
+        correcciones = reconciliar_contadores()
+
+    if not correcciones:
+        print('✅ Contadores al día, sin correcciones')
+        return
+
+    print(f'🔧 {len(correcciones)} contador(es) corregido(s):')
+    for clave, (antes, despues) in sorted(correcciones.items()):
+        print(f'   {clave}: {antes} -> {despues}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""
+Censo de medianoche de camas
+Sistema SaaS - Hospital Tipo 1 Uracoa - J&S Software Inteligentes
+
+Guarda en censo_camas_dia, por sala, las camas por estado y los
+ingresos, altas y días de estancia del día, que usa
+/internados/api/ocupacion para los reportes históricos. Programarlo
+pasada la medianoche (p. ej. 00:05): por defecto registra el día de ayer
+con las camas tal como están en ese momento. Es idempotente.
+
+Con una fecha anterior a ayer solo recalcula los ingresos, altas y días
+de estancia de las filas ya guardadas de ese día (p. ej. tras cargar una
+alta atrasada); las camas por estado de entonces no se pueden reconstruir
+y se conservan.
+
+Uso:
+    python scripts/registrar_censo_camas.py [fecha]   (YYYY-MM-DD)
+"""
+import os
+import sys
+from datetime import date
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from saas import create_app
+from saas.internados.reportes import registrar_censo
+
+
+def main():
+    app = create_app()
+    with app.app_context():
+        fecha = date.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else None
+        salas = registrar_censo(fecha)
+
+    print(f'✅ Censo registrado: {salas} sala(s)')
+
+
+if __name__ == '__main__':
+    main()
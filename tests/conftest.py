@@ -1,6 +1,7 @@
 """
 Configuración de fixtures compartidas para tests
 """
+import threading
 import pytest
 from flask import url_for
 from saas import create_app
@@ -33,6 +34,43 @@ def db_session(app):
         yield db.session
 
 
+@pytest.fixture(scope='function')
+def en_paralelo(app):
+    """
+    Ejecuta las tareas a la vez en hilos, soltadas juntas por una barrera.
+    Cada hilo tiene su app_context y su sesión (una transacción por tarea).
+
+    Uso: resultados, errores = en_paralelo([tarea, ...])
+    """
+    def ejecutar(tareas):
+        resultados, errores = [], []
+        barrera = threading.Barrier(len(tareas))
+        lock = threading.Lock()
+
+        def correr(tarea):
+            with app.app_context():
+                barrera.wait()
+                try:
+                    resultado = tarea()
+                    with lock:
+                        resultados.append(resultado)
+                except Exception as e:  # pragma: no cover - solo para el reporte
+                    db.session.rollback()
+                    with lock:
+                        errores.append(repr(e))
+                finally:
+                    db.session.remove()
+
+        hilos = [threading.Thread(target=correr, args=(tarea,)) for tarea in tareas]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return resultados, errores
+
+    return ejecutar
+
+
 @pytest.fixture(scope='function')
 def client(app):
     """Fixture de test client"""
@@ -0,0 +1,81 @@
+"""
+Tests para las alertas clínicas guardadas (alertas, severidad) de consultas
+Sistema SaaS Hospital Uracoa - J&S Software Inteligentes
+"""
+import pytest
+from datetime import date, datetime
+from sqlalchemy import update
+from saas.extensions import db
+from saas.models import Paciente
+from saas.consultas.models import Consulta
+from saas.utils import signos_vitales
+from saas.utils.signos_vitales import ALERTA_FIEBRE, ALERTA_SISTOLICA, ALERTA_OBESIDAD
+
+
+@pytest.fixture
+def paciente(app):
+    paciente = Paciente(cedula='V30303030', nombre='Josefa', apellido='Bermúdez',
+                        fecha_nacimiento=date(1960, 2, 2), sexo='Femenino')
+    db.session.add(paciente)
+    db.session.commit()
+    return paciente
+
+
+def _consulta(paciente, medico, numero, **signos):
+    consulta = Consulta(paciente_id=paciente.id, medico_id=medico.id, motivo=f'Consulta {numero}',
+                        fecha_hora=datetime.utcnow(), turno='mañana', numero_consulta=numero, **signos)
+    db.session.add(consulta)
+    db.session.commit()
+    return consulta
+
+
+def test_evaluar_pesos_y_umbral_critico():
+    assert signos_vitales.evaluar({}) == (0, 0)
+    assert signos_vitales.evaluar({'temperatura': 38.2}) == (ALERTA_FIEBRE, 2)
+    assert signos_vitales.evaluar({'temperatura': 40.1, 'presion_sistolica': 150}) == (
+        ALERTA_FIEBRE | ALERTA_SISTOLICA, 5)
+    # IMC compara estricto (> 30), igual que antes
+    assert signos_vitales.evaluar({'imc': 30}) == (0, 0)
+    assert signos_vitales.evaluar({'imc': 30.1}) == (ALERTA_OBESIDAD, 1)
+
+
+def test_columnas_se_calculan_al_guardar(auth_login, paciente):
+    consulta = _consulta(paciente, auth_login, 1, temperatura=38.5, peso=95, altura=170)
+
+    assert consulta.imc_valor == 32.87
+    assert consulta.alertas == ALERTA_FIEBRE | ALERTA_OBESIDAD
+    assert consulta.severidad == 3
+    assert consulta.total_alertas == len(consulta.alertas_detalle) == 2
+
+    consulta.temperatura = 36.8
+    db.session.commit()
+
+    assert consulta.alertas == ALERTA_OBESIDAD
+    assert consulta.severidad == 1
+
+
+def test_lista_ordenada_por_riesgo(client, auth_login, paciente):
+    _consulta(paciente, auth_login, 1, temperatura=36.5)
+    _consulta(paciente, auth_login, 2, temperatura=40.5, presion_sistolica=190)
+    _consulta(paciente, auth_login, 3, temperatura=38.1)
+
+    html = client.get('/consultas/?orden=severidad').get_data(as_text=True)
+    assert html.index('Consulta 2') < html.index('Consulta 3') < html.index('Consulta 1')
+
+    html = client.get('/consultas/?severidad=3').get_data(as_text=True)
+    assert 'Consulta 2' in html
+    assert 'Consulta 3' not in html and 'Consulta 1' not in html
+
+
+def test_recalcular_alertas_backfill(auth_login, paciente):
+    consulta = _consulta(paciente, auth_login, 1, presion_sistolica=150, presion_diastolica=95)
+    _consulta(paciente, auth_login, 2, temperatura=36.6)
+    # Simula filas anteriores a la migración (columnas en 0)
+    db.session.execute(update(Consulta).values(alertas=0, severidad=0))
+    db.session.commit()
+
+    assert Consulta.recalcular_alertas(tamano_lote=1) == (2, 1)
+
+    db.session.refresh(consulta)
+    assert consulta.severidad == 3
+    assert Consulta.recalcular_alertas() == (2, 0)
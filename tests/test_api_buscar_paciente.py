@@ -239,3 +239,38 @@ def test_api_buscar_performance(client, auth_login, app):
             for p in pacientes:
                 db.session.delete(p)
             db.session.commit()
+
+
+def test_normalizar_cedula():
+    """Test: Forma canónica de la cédula"""
+    from saas.utils.cedula import normalizar_cedula
+
+    assert normalizar_cedula('V-12.345.678') == '12345678'
+    assert normalizar_cedula(' v12 345 678 ') == '12345678'
+    assert normalizar_cedula('E-81234567') == '81234567'
+    assert normalizar_cedula('') is None
+    assert normalizar_cedula(None) is None
+
+
+def test_api_buscar_paciente_formato_libre(client, auth_login, paciente_test):
+    """Test: Búsqueda exacta con prefijo, guiones y puntos"""
+    response = client.get('/api/pacientes/buscar?cedula=V-12.345.678')
+
+    assert response.status_code == 200
+    data = response.get_json()
+
+    assert data['found'] is True
+    assert data['paciente']['cedula'] == 'V12345678'
+
+
+def test_api_buscar_paciente_usa_indice(app, paciente_test):
+    """Test: La búsqueda exacta es un seek sobre el índice único"""
+    from saas.extensions import db
+    from saas.utils.cedula import normalizar_cedula
+
+    query = Paciente.query.filter(Paciente.cedula_normalizada == normalizar_cedula('v12345678'))
+    sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    plan = ' '.join(str(fila) for fila in db.session.execute(db.text(f'EXPLAIN QUERY PLAN {sql}')))
+
+    assert 'ix_pacientes_cedula_normalizada' in plan
+    assert query.first().id == paciente_test.id
@@ -0,0 +1,113 @@
+"""
+Tests para la búsqueda de pacientes por subcadena (trigramas)
+Sistema SaaS Hospital Uracoa - J&S Software Inteligentes
+"""
+import pytest
+from datetime import date
+from saas.extensions import db
+from saas.models import Paciente
+from saas.utils import busqueda
+from saas.utils.busqueda import buscar_pacientes, filtro_busqueda_pacientes
+
+
+@pytest.fixture
+def pacientes_busqueda(app):
+    """Crear pacientes con nombres y cédulas parecidas"""
+    datos = [
+        ('V30111222', 'Carmen', 'Rodríguez', True),
+        ('V30111333', 'Carlos', 'Rodríguez', True),
+        ('V18555444', 'María', 'González', True),
+        ('V30111999', 'Pedro', 'Inactivo', False),
+    ]
+    pacientes = []
+    for cedula, nombre, apellido, activo in datos:
+        p = Paciente(cedula=cedula, nombre=nombre, apellido=apellido,
+                     fecha_nacimiento=date(1990, 1, 1), sexo='Masculino', activo=activo)
+        db.session.add(p)
+        pacientes.append(p)
+    db.session.commit()
+    yield pacientes
+
+
+def test_busqueda_parcial_por_cedula(app, pacientes_busqueda):
+    """Una subcadena de la cédula encuentra solo pacientes activos"""
+    resultados = buscar_pacientes('30111')
+    cedulas = {p.cedula for p in resultados}
+
+    assert cedulas == {'V30111222', 'V30111333'}
+
+
+def test_busqueda_por_nombre_y_apellido(app, pacientes_busqueda):
+    """Varios términos se combinan con AND sobre todas las columnas"""
+    resultados = buscar_pacientes('carm rodr')
+
+    assert [p.nombre for p in resultados] == ['Carmen']
+
+
+def test_candidatos_elegidos_por_similitud(app, pacientes_busqueda, monkeypatch):
+    """El límite de candidatos no descarta al más parecido aunque se haya registrado último"""
+    monkeypatch.setattr(busqueda, 'MAX_CANDIDATOS', 2)
+    for i in range(3):
+        db.session.add(Paciente(cedula=f'V4100000{i}', nombre='Ana Lucía',
+                                apellido='Rodríguez Hernández de Salazar', fecha_nacimiento=date(1990, 1, 1),
+                                sexo='Femenino'))
+    rodrigo = Paciente(cedula='V41000009', nombre='Rodrigo', apellido='Díaz',
+                       fecha_nacimiento=date(1990, 1, 1), sexo='Masculino')
+    db.session.add(rodrigo)
+    db.session.commit()
+
+    assert buscar_pacientes('rodr', limite=1)[0].id == rodrigo.id
+
+
+@pytest.mark.parametrize('texto', ['salaz', 'sa'])
+def test_candidatos_excluyen_inactivos(app, monkeypatch, texto):
+    """Los inactivos más parecidos no ocupan el cupo de candidatos (FTS5 e ILIKE)"""
+    monkeypatch.setattr(busqueda, 'MAX_CANDIDATOS', 2)
+    for i in range(3):
+        db.session.add(Paciente(cedula=f'V4200000{i}', nombre='Ana', apellido='Salazar',
+                                fecha_nacimiento=date(1990, 1, 1), sexo='Femenino', activo=False))
+    activo = Paciente(cedula='V42000009', nombre='Ana Lucía', apellido='Salazar Brito',
+                      fecha_nacimiento=date(1990, 1, 1), sexo='Femenino')
+    db.session.add(activo)
+    db.session.commit()
+
+    assert [p.id for p in buscar_pacientes(texto)] == [activo.id]
+
+
+def test_busqueda_termino_corto_usa_ilike(app, pacientes_busqueda):
+    """Términos de menos de 3 letras no usan trigramas pero sí filtran"""
+    resultados = buscar_pacientes('ma')
+
+    assert any(p.nombre == 'María' for p in resultados)
+
+
+def test_indice_sincronizado_al_actualizar(app, pacientes_busqueda):
+    """Los triggers mantienen el índice al cambiar o borrar pacientes"""
+    paciente = pacientes_busqueda[2]
+    paciente.apellido = 'Fernández'
+    db.session.commit()
+
+    assert buscar_pacientes('gonzá') == []
+    assert [p.id for p in buscar_pacientes('fernán')] == [paciente.id]
+
+    db.session.delete(paciente)
+    db.session.commit()
+    assert buscar_pacientes('fernán') == []
+
+
+def test_filtro_en_listado(app, pacientes_busqueda):
+    """El filtro es una condición SQL combinable con otros filtros"""
+    filtro = filtro_busqueda_pacientes('rodríguez')
+    total = Paciente.query.filter(filtro, Paciente.activo == True).count()
+
+    assert total == 2
+    assert filtro_busqueda_pacientes('   ') is None
+
+
+def test_api_similares_por_nombre(client, auth_login, pacientes_busqueda):
+    """La API AJAX devuelve similares también al buscar por nombre"""
+    response = client.get('/api/pacientes/buscar?cedula=González')
+
+    data = response.get_json()
+    assert data['found'] is False
+    assert [s['nombre_completo'] for s in data['similares']] == ['María González']
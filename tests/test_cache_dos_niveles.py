@@ -0,0 +1,121 @@
+"""
+Tests para el backend de caché de dos niveles (L1 en proceso + L2 compartido)
+Sistema SaaS Hospital Uracoa - J&S Software Inteligentes
+"""
+import time
+import pytest
+from flask_caching.backends.simplecache import SimpleCache
+from saas.extensions import db, cache
+from saas.utils.cache_dos_niveles import CacheDosNiveles, CacheSQLite
+from saas.utils.cache_etiquetas import PREFIJO_VERSION
+
+
+@pytest.fixture
+def ruta_sqlite(tmp_path):
+    return str(tmp_path / 'cache.sqlite')
+
+
+def _worker(ruta, **kwargs):
+    """Simula un worker de gunicorn: L1 propio, L2 en el archivo compartido"""
+    return CacheDosNiveles(CacheSQLite(ruta), **kwargs)
+
+
+def test_lru_acotado_y_estadisticas():
+    backend = CacheDosNiveles(SimpleCache(), max_items=2)
+    backend.set('a', 1)
+    backend.set('b', 2)
+    backend.get('a')          # 'a' pasa a ser la más reciente
+    backend.set('c', 3)       # desaloja 'b' de L1
+
+    assert backend.get('a') == 1   # L1
+    assert backend.get('b') == 2   # L2, vuelve a L1
+    assert backend.get('zzz') is None
+
+    stats = backend.estadisticas()
+    assert stats['evictions'] == 2
+    assert stats['hits_l1'] == 2
+    assert stats['hits_l2'] == 1
+    assert stats['misses'] == 1
+    assert stats['items_l1'] == 2
+
+
+def test_l1_entrega_copias():
+    backend = CacheDosNiveles(SimpleCache())
+    backend.set('lista', [1, 2])
+    backend.get('lista').append(3)
+
+    assert backend.get('lista') == [1, 2]
+
+
+def test_workers_comparten_l2(ruta_sqlite):
+    worker_1 = _worker(ruta_sqlite)
+    worker_2 = _worker(ruta_sqlite)
+
+    worker_1.set('pacientes_select', ['Ana'], timeout=86400)
+
+    assert worker_2.get('pacientes_select') == ['Ana']
+    assert worker_2.estadisticas()['hits_l2'] == 1
+
+
+def test_versiones_siempre_desde_l2(ruta_sqlite):
+    """Una invalidación hecha por un worker la ve el otro en la siguiente lectura"""
+    worker_1 = _worker(ruta_sqlite)
+    worker_2 = _worker(ruta_sqlite)
+    worker_1.set('tag_version:camas', 'v1', timeout=0)
+    assert worker_2.get('tag_version:camas') == 'v1'
+
+    worker_1.set('tag_version:camas', 'v2', timeout=0)
+
+    assert worker_2.get('tag_version:camas') == 'v2'
+    assert worker_2.estadisticas()['items_l1'] == 0
+
+
+def test_l1_expira(ruta_sqlite):
+    worker_1 = _worker(ruta_sqlite, l1_timeout=0.05)
+    worker_2 = _worker(ruta_sqlite)
+    worker_1.set('clave', 'vieja')
+    worker_2.set('clave', 'nueva')
+
+    assert worker_1.get('clave') == 'vieja'
+    time.sleep(0.06)
+    assert worker_1.get('clave') == 'nueva'
+
+
+def test_sqlite_add_y_expiracion(ruta_sqlite):
+    l2 = CacheSQLite(ruta_sqlite)
+
+    assert l2.add('k', 1)
+    assert not l2.add('k', 2)
+    assert l2.get_many('k', 'otra') == [1, None]
+
+    l2.set('temporal', 'x', timeout=-1)
+    assert l2.get('temporal') is None
+    assert l2.add('temporal', 'y')
+
+
+def test_sqlite_purga_conserva_versiones(ruta_sqlite, monkeypatch):
+    monkeypatch.setattr(CacheSQLite, 'FRECUENCIA_PURGA', 1)
+    l2 = CacheSQLite(ruta_sqlite, threshold=10)
+
+    l2.set(PREFIJO_VERSION + 'pacientes', 3, timeout=0)
+    l2.set(PREFIJO_VERSION + 'consultas', 7, timeout=0)
+    for i in range(30):
+        l2.set(f'consulta:{i}', i, timeout=60 + i)
+
+    assert l2.get(PREFIJO_VERSION + 'pacientes') == 3
+    assert l2.get(PREFIJO_VERSION + 'consultas') == 7
+    # Se recortan las que expiran antes
+    assert l2.get('consulta:0') is None and l2.get('consulta:29') == 29
+    assert l2._conexion().execute('SELECT count(*) FROM cache').fetchone()[0] == 10
+
+
+def test_backend_configurado_en_la_app(client, auth_login):
+    assert isinstance(cache.cache, CacheDosNiveles)
+
+    auth_login.rol = 'admin'
+    db.session.commit()
+    respuesta = client.get('/api/cache/estadisticas')
+
+    assert respuesta.status_code == 200
+    assert respuesta.get_json()['backend'] == 'CacheDosNiveles'
+    assert 'hit_rate' in respuesta.get_json()
@@ -0,0 +1,96 @@
+"""
+Tests para la invalidación del caché por etiquetas
+Sistema SaaS Hospital Uracoa - J&S Software Inteligentes
+"""
+import pytest
+from datetime import date
+from saas.extensions import db, cache
+from saas.models import Paciente
+from saas.internados.models import Cama
+from saas.utils.cache_etiquetas import cache_por_etiquetas, invalidar_etiquetas
+
+
+@pytest.fixture
+def cache_limpio(app):
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def _contar_llamadas(etiqueta, key_prefix):
+    llamadas = []
+
+    @cache_por_etiquetas(etiqueta, timeout=86400, key_prefix=key_prefix)
+    def camas_libres():
+        llamadas.append(1)
+        return [c.codigo for c in Cama.query.filter_by(estado='libre').order_by(Cama.codigo)]
+
+    return camas_libres, llamadas
+
+
+def test_reutiliza_mientras_no_hay_escrituras(app, cache_limpio):
+    camas_libres, llamadas = _contar_llamadas('camas', 'test_camas')
+
+    assert camas_libres() == camas_libres() == []
+    assert len(llamadas) == 1
+
+
+def test_commit_invalida_la_tabla_modificada(app, cache_limpio):
+    cama = Cama(codigo='A-101', sala='Sala A', estado='ocupada')
+    db.session.add(cama)
+    db.session.commit()
+    camas_libres, llamadas = _contar_llamadas('camas', 'test_camas')
+    assert camas_libres() == []
+
+    # Cama liberada: visible de inmediato pese al TTL de 24 h
+    cama.estado = 'libre'
+    db.session.commit()
+
+    assert camas_libres() == ['A-101']
+    assert len(llamadas) == 2
+
+
+def test_otras_tablas_no_invalidan(app, cache_limpio):
+    camas_libres, llamadas = _contar_llamadas('camas', 'test_camas')
+    camas_libres()
+
+    db.session.add(Paciente(cedula='V12121212', nombre='Rosa', apellido='Brito',
+                            fecha_nacimiento=date(1970, 1, 1), sexo='Femenino'))
+    db.session.commit()
+    camas_libres()
+
+    assert len(llamadas) == 1
+
+
+def test_rollback_no_invalida(app, cache_limpio):
+    camas_libres, llamadas = _contar_llamadas('camas', 'test_camas')
+    camas_libres()
+
+    db.session.add(Cama(codigo='B-201', sala='Sala B'))
+    db.session.flush()
+    db.session.rollback()
+    camas_libres()
+
+    assert len(llamadas) == 1
+
+
+def test_actualizacion_masiva_invalida(app, cache_limpio):
+    db.session.add(Cama(codigo='C-301', sala='UCI', estado='mantenimiento'))
+    db.session.commit()
+    camas_libres, llamadas = _contar_llamadas('camas', 'test_camas')
+    assert camas_libres() == []
+
+    Cama.query.filter_by(codigo='C-301').update({'estado': 'libre'})
+    db.session.commit()
+
+    assert camas_libres() == ['C-301']
+
+
+def test_invalidacion_manual(app, cache_limpio):
+    camas_libres, llamadas = _contar_llamadas('camas', 'test_camas')
+    camas_libres()
+
+    invalidar_etiquetas('camas')
+    camas_libres()
+
+    assert len(llamadas) == 2
@@ -0,0 +1,101 @@
+"""
+Tests para la reserva de camas sin doble asignación
+Sistema SaaS Hospital Uracoa - J&S Software Inteligentes
+"""
+import pytest
+from datetime import date, datetime
+from sqlalchemy.exc import IntegrityError
+from saas.extensions import db
+from saas.models import Paciente
+from saas.internados.models import Cama, Internado
+
+PACIENTES = 12
+
+
+@pytest.fixture
+def datos(app, auth_login):
+    camas = [Cama(codigo=f'C-{i}', sala='Sala C', estado='libre') for i in range(PACIENTES)]
+    pacientes = [Paciente(cedula=f'V3100000{i:02d}', nombre='Paciente', apellido=f'N{i}',
+                          fecha_nacimiento=date(1965, 3, 3), sexo='F') for i in range(PACIENTES)]
+    db.session.add_all(camas + pacientes)
+    db.session.commit()
+    return [c.id for c in camas], [p.id for p in pacientes], auth_login.id
+
+
+def _internar(paciente_id, cama_id, medico_id):
+    """Camino de internados.nuevo: reserva condicional + INSERT + commit"""
+    if not Cama.ocupar(cama_id):
+        db.session.rollback()
+        return False
+    db.session.add(Internado(paciente_id=paciente_id, cama_id=cama_id, medico_id=medico_id,
+                             fecha_ingreso=datetime.utcnow(), motivo='Ingreso', diagnostico_inicial='Ingreso'))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return False
+    return True
+
+
+def test_ocupar_solo_si_libre(datos):
+    camas, _, _ = datos
+    assert Cama.ocupar(camas[0]) is True
+    assert Cama.ocupar(camas[0]) is False
+    db.session.commit()
+    assert db.session.get(Cama, camas[0]).estado == 'ocupada'
+
+
+def test_indice_unico_parcial_un_activo_por_cama(datos):
+    camas, pacientes, medico_id = datos
+
+    def internado(paciente_id, estado):
+        return Internado(paciente_id=paciente_id, cama_id=camas[0], medico_id=medico_id, estado=estado,
+                         fecha_ingreso=datetime.utcnow(), motivo='X', diagnostico_inicial='X')
+
+    # Altas anteriores en la misma cama no cuentan
+    db.session.add_all([internado(pacientes[0], 'alta'), internado(pacientes[1], 'alta'),
+                        internado(pacientes[2], 'activo')])
+    db.session.commit()
+
+    db.session.add(internado(pacientes[3], 'activo'))
+    with pytest.raises(IntegrityError):
+        db.session.commit()
+    db.session.rollback()
+
+
+def test_ingresos_simultaneos_misma_cama(en_paralelo, datos):
+    camas, pacientes, medico_id = datos
+
+    resultados, errores = en_paralelo([
+        lambda p=p: _internar(p, camas[0], medico_id) for p in pacientes
+    ])
+
+    assert errores == []
+    assert resultados.count(True) == 1
+    assert Internado.query.filter_by(cama_id=camas[0], estado='activo').count() == 1
+
+
+def test_ingresos_simultaneos_camas_distintas(en_paralelo, datos):
+    """La reserva es por fila: ingresos a camas distintas no se bloquean entre sí"""
+    camas, pacientes, medico_id = datos
+
+    resultados, errores = en_paralelo([
+        lambda p=p, c=c: _internar(p, c, medico_id) for p, c in zip(pacientes, camas)
+    ])
+
+    assert errores == []
+    assert resultados == [True] * PACIENTES
+    assert Cama.query.filter_by(estado='ocupada').count() == PACIENTES
+
+
+def test_mantenimiento_no_pisa_cama_ocupada(client, datos):
+    camas, pacientes, medico_id = datos
+    assert _internar(pacientes[0], camas[0], medico_id)
+
+    client.post(f'/internados/camas/{camas[0]}/mantenimiento')
+    client.post(f'/internados/camas/{camas[0]}/liberar')
+    client.post(f'/internados/camas/{camas[1]}/mantenimiento')
+
+    db.session.expire_all()
+    assert db.session.get(Cama, camas[0]).estado == 'ocupada'
+    assert db.session.get(Cama, camas[1]).estado == 'mantenimiento'
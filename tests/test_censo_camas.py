@@ -0,0 +1,94 @@
+"""
+Tests para el censo de camas de internados
+Sistema SaaS Hospital Uracoa - J&S Software Inteligentes
+"""
+import pytest
+from datetime import date, datetime
+from sqlalchemy import event
+from saas.extensions import db
+from saas.models import Paciente
+from saas.internados.models import Cama, Internado
+from saas.internados.censo import censo_camas, ocupantes_actuales
+
+
+def _consultas(funcion):
+    """(resultado, SELECTs ejecutados)"""
+    sentencias = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            sentencias.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', capturar)
+    try:
+        resultado = funcion()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capturar)
+    return resultado, sentencias
+
+
+@pytest.fixture
+def sala(app, auth_login):
+    camas = [Cama(codigo=f'A-{i}', sala='Sala A', estado='libre') for i in range(1, 5)]
+    camas.append(Cama(codigo='U-1', sala='UCI', estado='mantenimiento'))
+    db.session.add_all(camas)
+    db.session.flush()
+
+    for i, cama in enumerate(camas[:2]):
+        paciente = Paciente(cedula=f'V2000000{i}', nombre='Paciente', apellido=f'Cama{i}',
+                            fecha_nacimiento=date(1970, 1, 1), sexo='M')
+        db.session.add(paciente)
+        db.session.flush()
+        db.session.add(Internado(paciente_id=paciente.id, cama_id=cama.id, medico_id=auth_login.id,
+                                 fecha_ingreso=datetime(2025, 11, 1), motivo='Neumonía',
+                                 diagnostico_inicial='Neumonía'))
+        cama.estado = 'ocupada'
+    db.session.commit()
+    return camas
+
+
+def test_censo_por_estado_y_sala(sala):
+    censo, consultas = _consultas(censo_camas)
+
+    assert len(consultas) == 2  # un GROUP BY + un lote de ocupantes
+    assert censo['total'] == 5
+    assert censo['por_estado'] == {'libre': 2, 'ocupada': 2, 'mantenimiento': 1}
+    assert censo['ocupacion'] == 40.0
+    assert [(s['sala'], s['ocupada'], s['ocupacion']) for s in censo['salas']] == [('Sala A', 2, 50.0), ('UCI', 0, 0.0)]
+    assert censo['ocupantes'][sala[0].id]['paciente'] == 'Paciente Cama0'
+
+
+def test_censo_cacheado_e_invalidado(client, sala):
+    censo_camas()
+    _, consultas = _consultas(censo_camas)
+    assert consultas == []
+
+    client.post(f'/internados/camas/{sala[3].id}/mantenimiento')
+
+    censo, consultas = _consultas(censo_camas)
+    assert len(consultas) == 2
+    assert censo['por_estado']['mantenimiento'] == 2
+
+
+def test_ocupantes_por_lote(sala):
+    assert set(ocupantes_actuales([sala[0].id, sala[2].id])) == {sala[0].id}
+    assert ocupantes_actuales([]) == {}
+
+
+def test_pagina_camas_sin_n_mas_1(client, sala):
+    respuesta = client.get('/internados/camas')
+    html = respuesta.get_data(as_text=True)
+
+    assert respuesta.status_code == 200
+    assert 'Paciente Cama0' in html and 'Paciente Cama1' in html
+    assert 'Sala A' in html and 'UCI' in html
+
+    # Los ocupantes salen del censo cacheado, nunca cama por cama
+    censo_camas()
+    _, consultas = _consultas(lambda: client.get('/internados/camas'))
+    assert not [sql for sql in consultas if 'internados_registro' in sql]
+
+
+def test_index_muestra_censo(client, sala):
+    html = client.get('/internados/').get_data(as_text=True)
+    assert 'Ocupación 40.0%' in html
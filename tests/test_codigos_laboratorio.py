@@ -0,0 +1,74 @@
+"""
+Tests para los códigos correlativos de órdenes de laboratorio
+Sistema SaaS Hospital Uracoa - J&S Software Inteligentes
+"""
+import pytest
+from datetime import date
+from saas.extensions import db
+from saas.models import Paciente
+from saas.laboratorio.models import OrdenLaboratorio, ContadorOrdenLaboratorio
+from saas.utils.fechas import hoy_local
+
+
+@pytest.fixture
+def paciente_id(app, auth_login):
+    paciente = Paciente(cedula='V35000001', nombre='Rosa', apellido='Marcano',
+                        fecha_nacimiento=date(1985, 4, 4), sexo='Femenino')
+    db.session.add(paciente)
+    db.session.commit()
+    return paciente.id
+
+
+def _crear_orden(paciente_id, medico_id):
+    orden = OrdenLaboratorio(paciente_id=paciente_id, medico_id=medico_id, examenes_solicitados='Hemograma')
+    orden.generar_codigo()
+    db.session.add(orden)
+    db.session.commit()
+    return orden.codigo_orden
+
+
+def test_correlativo_por_anio(app):
+    assert [ContadorOrdenLaboratorio.tomar_numero(2025) for _ in range(3)] == [1, 2, 3]
+    assert ContadorOrdenLaboratorio.tomar_numero(2026) == 1
+    assert ContadorOrdenLaboratorio.actual(2025) == 3
+    assert ContadorOrdenLaboratorio.actual(2024) is None
+
+
+def test_parte_de_codigos_existentes(paciente_id, auth_login):
+    año = hoy_local().year
+    db.session.add_all([
+        OrdenLaboratorio(paciente_id=paciente_id, medico_id=auth_login.id, examenes_solicitados='Previa',
+                         codigo_orden=codigo)
+        for codigo in (f'LAB-{año}-0041', f'LAB-{año}-0007', f'LAB-{año - 1}-0950')
+    ])
+    db.session.commit()
+
+    assert _crear_orden(paciente_id, auth_login.id) == f'LAB-{año}-0042'
+
+
+def test_rollback_libera_el_numero(paciente_id, auth_login):
+    orden = OrdenLaboratorio(paciente_id=paciente_id, medico_id=auth_login.id, examenes_solicitados='X')
+    orden.generar_codigo()
+    db.session.rollback()
+
+    assert _crear_orden(paciente_id, auth_login.id) == f'LAB-{hoy_local().year}-0001'
+
+
+def test_ordenes_concurrentes_no_repiten_codigo(en_paralelo, paciente_id, auth_login):
+    medico_id = auth_login.id
+    trabajadores = 30
+
+    codigos, errores = en_paralelo([lambda: _crear_orden(paciente_id, medico_id)] * trabajadores)
+
+    año = hoy_local().year
+    assert errores == []
+    assert sorted(codigos) == [f'LAB-{año}-{n:04d}' for n in range(1, trabajadores + 1)]
+    assert OrdenLaboratorio.query.count() == trabajadores
+
+
+def test_ruta_crea_orden_con_codigo(client, paciente_id):
+    respuesta = client.post(f'/laboratorio/nueva/{paciente_id}', data={
+        'examenes_solicitados': 'Glicemia', 'estado': 'pendiente'
+    })
+    assert respuesta.status_code == 302
+    assert OrdenLaboratorio.query.one().codigo_orden == f'LAB-{hoy_local().year}-0001'
@@ -0,0 +1,128 @@
+"""
+Tests para la cola de prioridad de triage en memoria y su flujo SSE
+Sistema SaaS Hospital Uracoa - J&S Software Inteligentes
+"""
+from datetime import datetime, timedelta
+from saas.extensions import db
+from saas.emergencias.models import Emergencia
+from saas.emergencias.cola import ColaTriage, plazo_atencion
+from saas.utils.sse import formatear_evento, flujo_eventos
+
+
+def _emergencia(descripcion, nivel, minutos_espera, estado='en_triaje'):
+    emergencia = Emergencia(tipo='otra', triage_nivel=nivel, descripcion=descripcion, estado=estado,
+                            hora_ingreso=datetime.utcnow() - timedelta(minutes=minutos_espera))
+    db.session.add(emergencia)
+    db.session.commit()
+    return emergencia
+
+
+def test_plazo_por_nivel():
+    ingreso = datetime(2025, 11, 6, 8, 0)
+    assert plazo_atencion(1, ingreso) == ingreso
+    assert plazo_atencion(3, ingreso) == ingreso + timedelta(minutes=60)
+
+
+def test_espera_envejece_prioridad(app):
+    """Un nivel 4 que lleva más de 2 horas pasa delante de un nivel 3 recién llegado"""
+    _emergencia('Esguince antiguo', 4, 150)
+    _emergencia('Dolor moderado', 3, 5)
+    _emergencia('Paro respiratorio', 1, 0)
+    _emergencia('Ya atendido', 2, 30, estado='alta')
+
+    cola = ColaTriage().instantanea()
+    orden = [e['descripcion'] for e in cola['cola']]
+
+    assert orden == ['Paro respiratorio', 'Esguince antiguo', 'Dolor moderado']
+    assert cola['cola'][1]['vencida'] and not cola['cola'][2]['vencida']
+    assert cola['por_nivel'][4] == 1 and cola['total'] == 3
+
+
+def test_actualizar_sin_recargar(app):
+    cola = ColaTriage()
+    cola.instantanea()
+    revision = cola.revision
+
+    emergencia = _emergencia('Trauma', 2, 0)
+    cola.actualizar(emergencia)
+    assert cola.siguiente()['descripcion'] == 'Trauma'
+    assert cola.revision > revision
+
+    emergencia.estado = 'en_atencion'
+    emergencia.hora_atencion = datetime.utcnow()
+    db.session.commit()
+    cola.actualizar(emergencia)
+    assert cola.instantanea()['en_atencion'] == 1
+
+    emergencia.estado = 'alta'
+    db.session.commit()
+    cola.actualizar(emergencia)
+    assert cola.siguiente() is None and cola.instantanea()['total'] == 0
+
+
+def test_cambio_de_otro_worker_provoca_recarga(app):
+    """Otra instancia (otro worker) no llama actualizar(): la detecta por versión de etiqueta"""
+    cola = ColaTriage()
+    assert cola.instantanea()['total'] == 0
+
+    _emergencia('Crisis asmática', 2, 0)
+    assert cola.esperar_cambio(cola.revision, timeout=1) == cola.revision
+    assert cola.siguiente()['descripcion'] == 'Crisis asmática'
+
+
+def test_actualizar_no_oculta_cambio_de_otro_worker(app):
+    """Un commit de otro worker entre la carga y actualizar() sigue provocando recarga"""
+    cola = ColaTriage()
+    assert cola.instantanea()['total'] == 0
+
+    _emergencia('Fractura expuesta', 2, 0)     # otro worker: no llama actualizar()
+    propia = _emergencia('Cefalea', 3, 0)
+    cola.actualizar(propia)
+
+    descripciones = {e['descripcion'] for e in cola.instantanea()['cola']}
+    assert descripciones == {'Fractura expuesta', 'Cefalea'}
+
+
+def test_formato_evento():
+    assert formatear_evento({'total': 2}, evento='cola', id_evento=3) == \
+        'event: cola\nid: 3\ndata: {"total": 2}\n\n'
+
+
+def test_stream_envia_cola(app, client, auth_login):
+    _emergencia('Dolor torácico', 2, 0)
+    app.config['SSE_DURACION'] = 0.5
+    app.config['SSE_INTERVALO_PING'] = 0.2
+
+    respuesta = client.get('/emergencias/stream')
+    cuerpo = respuesta.get_data(as_text=True)
+
+    assert respuesta.mimetype == 'text/event-stream'
+    assert cuerpo.startswith('retry:')
+    assert 'event: cola' in cuerpo and 'Dolor torácico' in cuerpo
+
+
+def test_flujo_no_retiene_conexion(app):
+    """Entre eventos el flujo devuelve al pool la conexión de db.session"""
+    app.config['SSE_DURACION'] = 0.5
+    revisiones = iter([1, 1])
+
+    with app.test_request_context('/'):
+        db.session.rollback()
+        en_uso = db.engine.pool.checkedout()
+        db.session.query(Emergencia).count()
+        partes = iter(flujo_eventos(lambda revision, timeout: next(revisiones),
+                                    lambda: {'total': db.session.query(Emergencia).count()}).response)
+
+        assert next(partes).startswith('retry:')
+        assert db.engine.pool.checkedout() == en_uso
+        assert next(partes) == formatear_evento({'total': 0}, evento='cambio', id_evento=1)
+        assert db.engine.pool.checkedout() == en_uso
+        assert next(partes) == ': ping\n\n'
+
+
+def test_tablero_triage(client, auth_login, app):
+    _emergencia('Herida cortante', 3, 0)
+    respuesta = client.get('/emergencias/triage')
+
+    assert respuesta.status_code == 200
+    assert 'Herida cortante' in respuesta.get_data(as_text=True)
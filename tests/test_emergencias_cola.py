@@ -0,0 +1,72 @@
+"""
+Tests para la cola activa de emergencias y su historial paginado
+Sistema SaaS Hospital Uracoa - J&S Software Inteligentes
+"""
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from saas.extensions import db
+from saas.emergencias.models import Emergencia
+
+
+def _plan_ejecutado(funcion):
+    """Plan del SELECT tal como se envía al motor (con sus parámetros reales)"""
+    sentencias = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', capturar)
+    try:
+        funcion()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capturar)
+
+    sql, parametros = sentencias[-1]
+    filas = db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}', parametros)
+    return ' '.join(str(fila) for fila in filas)
+
+
+@pytest.fixture
+def emergencias(app):
+    base = datetime(2025, 11, 6, 8, 0)
+    casos = [
+        ('en_triaje', 3, 'Dolor abdominal'),
+        ('en_triaje', 1, 'Paro respiratorio'),
+        ('en_atencion', 2, 'Trauma en pierna'),
+        ('alta', 1, 'Crisis asmática antigua'),
+        ('derivado', 2, 'Fractura expuesta'),
+    ]
+    for i, (estado, nivel, descripcion) in enumerate(casos):
+        db.session.add(Emergencia(tipo='otra', triage_nivel=nivel, descripcion=descripcion,
+                                  estado=estado, hora_ingreso=base + timedelta(minutes=i)))
+    db.session.commit()
+
+
+def test_conteo_agrupado_solo_activas(emergencias):
+    assert Emergencia.contar_por_estado() == {'en_triaje': 2, 'en_atencion': 1}
+
+
+def test_cola_activa_usa_indice_parcial(app):
+    """Los estados van en línea: con parámetros SQLite no usaría el índice parcial"""
+    cola = Emergencia.query.filter(Emergencia.filtro_activas())
+
+    assert 'idx_emergencias_cola' in _plan_ejecutado(cola.all)
+    assert 'COVERING INDEX idx_emergencias_cola' in _plan_ejecutado(Emergencia.contar_por_estado)
+
+
+def test_vista_activa_ordenada_por_prioridad(client, auth_login, emergencias):
+    html = client.get('/emergencias/').get_data(as_text=True)
+
+    assert 'Crisis asmática antigua' not in html and 'Fractura expuesta' not in html
+    assert html.index('Paro respiratorio') < html.index('Trauma en pierna') < html.index('Dolor abdominal')
+
+
+def test_historial_paginado(client, auth_login, emergencias):
+    html = client.get('/emergencias/?vista=historial').get_data(as_text=True)
+    assert 'Crisis asmática antigua' in html and 'Paro respiratorio' in html
+
+    # Un estado de egreso lleva al historial
+    html = client.get('/emergencias/?estado=alta').get_data(as_text=True)
+    assert 'Crisis asmática antigua' in html
+    assert 'Dolor abdominal' not in html
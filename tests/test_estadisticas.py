@@ -0,0 +1,151 @@
+"""
+Tests para los contadores incrementales del dashboard
+Sistema SaaS Hospital Uracoa - J&S Software Inteligentes
+"""
+import pytest
+from datetime import date, datetime
+from sqlalchemy.orm import Session
+from saas.extensions import db
+from saas.models import Paciente, Cita, Usuario
+from saas.emergencias.models import Emergencia
+from saas.utils import estadisticas
+from saas.utils.estadisticas import (
+    leer_contadores, reconciliar_contadores, calcular_contadores,
+    clave_citas_dia, clave_pacientes_medico
+)
+
+
+@pytest.fixture
+def medico(app):
+    usuario = Usuario(username='dr_contador', email='dr@hospital.com', nombre='Ana',
+                      apellido='Pérez', rol='medico', activo=True)
+    usuario.set_password('x')
+    db.session.add(usuario)
+    db.session.commit()
+    return usuario
+
+
+def _paciente(cedula, medico_id=None, activo=True):
+    return Paciente(cedula=cedula, nombre='Luis', apellido='Díaz', fecha_nacimiento=date(1980, 5, 5),
+                    sexo='Masculino', medico_id=medico_id, activo=activo)
+
+
+def test_insertar_y_desactivar_paciente(app, medico):
+    paciente = _paciente('V11111111', medico.id)
+    db.session.add(paciente)
+    db.session.commit()
+
+    claves = ('pacientes_activos', clave_pacientes_medico(medico.id))
+    assert leer_contadores(*claves) == {claves[0]: 1, claves[1]: 1}
+
+    # Tras el commit el objeto está expirado: el valor previo se carga igual
+    paciente.activo = False
+    db.session.commit()
+    assert leer_contadores(*claves) == {claves[0]: 0, claves[1]: 0}
+
+
+def test_cambio_de_medico_mueve_el_contador(app, medico):
+    otro = Usuario(username='dr_otro', email='otro@hospital.com', nombre='Juan',
+                   apellido='Rojas', rol='medico', activo=True)
+    otro.set_password('x')
+    paciente = _paciente('V22222222', medico.id)
+    db.session.add_all([otro, paciente])
+    db.session.commit()
+
+    paciente.medico_id = otro.id
+    db.session.commit()
+
+    valores = leer_contadores(clave_pacientes_medico(medico.id), clave_pacientes_medico(otro.id))
+    assert list(valores.values()) == [0, 1]
+
+
+def test_citas_por_dia_y_borrado(app, medico):
+    paciente = _paciente('V33333333')
+    db.session.add(paciente)
+    db.session.commit()
+
+    fecha = datetime(2025, 11, 6, 9, 30)
+    cita = Cita(paciente_id=paciente.id, medico_id=medico.id, fecha_hora=fecha, motivo='Control')
+    db.session.add(cita)
+    db.session.commit()
+
+    claves = (clave_citas_dia(fecha), clave_citas_dia(fecha.date(), medico.id))
+    assert set(leer_contadores(*claves).values()) == {1}
+
+    db.session.delete(cita)
+    db.session.commit()
+    assert set(leer_contadores(*claves).values()) == {0}
+
+
+def test_rollback_no_altera_contadores(app):
+    db.session.add(_paciente('V44444444'))
+    db.session.flush()
+    db.session.rollback()
+
+    assert leer_contadores('pacientes_activos')['pacientes_activos'] == 0
+
+
+def test_emergencias_activas_por_estado(app):
+    emergencia = Emergencia(tipo='otra', triage_nivel=3, descripcion='Dolor')
+    db.session.add(emergencia)
+    db.session.commit()
+    assert leer_contadores('emergencias_activas')['emergencias_activas'] == 1
+
+    emergencia.estado = 'en_atencion'
+    db.session.commit()
+    assert leer_contadores('emergencias_activas')['emergencias_activas'] == 1
+
+    emergencia.estado = 'alta'
+    db.session.commit()
+    assert leer_contadores('emergencias_activas')['emergencias_activas'] == 0
+
+
+def test_reconciliar_corrige_operaciones_masivas(app, medico):
+    db.session.add_all([_paciente('V55555555', medico.id), _paciente('V66666666')])
+    db.session.commit()
+
+    # query.update() no pasa por los hooks del ORM
+    Paciente.query.filter_by(cedula='V66666666').update({'activo': False})
+    db.session.commit()
+    assert leer_contadores('pacientes_activos')['pacientes_activos'] == 2
+
+    correcciones = reconciliar_contadores()
+
+    assert correcciones == {'pacientes_activos': (2, 1)}
+    assert leer_contadores('pacientes_activos')['pacientes_activos'] == 1
+    assert reconciliar_contadores() == {}
+    assert calcular_contadores()['usuarios_activos'] == 1
+
+
+def test_reconciliar_no_pisa_incrementos_concurrentes(app, medico, monkeypatch):
+    db.session.add_all([_paciente('V55555555'), _paciente('V66666666')])
+    db.session.commit()
+    Paciente.query.filter_by(cedula='V66666666').update({'activo': False})
+    db.session.commit()
+
+    recalcular = estadisticas.calcular_contadores
+
+    def recalcular_con_alta_concurrente():
+        esperados = recalcular()
+        # Otra transacción registra un paciente después del recálculo
+        with Session(db.engine) as otra:
+            otra.add(_paciente('V88888888'))
+            otra.commit()
+        return esperados
+
+    monkeypatch.setattr(estadisticas, 'calcular_contadores', recalcular_con_alta_concurrente)
+    assert 'pacientes_activos' not in reconciliar_contadores()
+    assert leer_contadores('pacientes_activos')['pacientes_activos'] == 3
+
+    monkeypatch.undo()
+    assert reconciliar_contadores() == {'pacientes_activos': (3, 2)}
+
+
+def test_dashboard_muestra_contadores(client, auth_login):
+    db.session.add(_paciente('V77777777', auth_login.id))
+    db.session.commit()
+
+    respuesta = client.get('/dashboard')
+
+    assert respuesta.status_code == 200
+    assert b'Mis Pacientes' in respuesta.data
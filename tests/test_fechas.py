@@ -0,0 +1,111 @@
+"""
+Tests para los rangos de día/turno locales y el uso de índices
+Sistema SaaS Hospital Uracoa - J&S Software Inteligentes
+"""
+import pytest
+from datetime import date, datetime, time
+from sqlalchemy import event
+from saas.extensions import db
+from saas.models import Paciente, Usuario, Cita
+from saas.consultas.models import Consulta
+from saas.utils.fechas import rango_dia, rango_turno, filtro_dia, local_a_utc, utc_a_local
+
+
+def _plan(query):
+    """EXPLAIN QUERY PLAN de SQLite para un query del ORM"""
+    sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    return ' '.join(str(fila) for fila in db.session.execute(db.text(f'EXPLAIN QUERY PLAN {sql}')))
+
+
+def _plan_de(funcion, *args):
+    """Ejecuta la función y retorna el plan del último SELECT que emitió"""
+    sentencias = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            sentencias.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', capturar)
+    try:
+        funcion(*args)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capturar)
+
+    sql, parametros = sentencias[-1]
+    filas = db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}', parametros)
+    return ' '.join(str(fila) for fila in filas)
+
+
+@pytest.fixture
+def medico_y_paciente(app):
+    medico = Usuario(username='dr_fechas', email='fechas@hospital.com', nombre='Eva',
+                     apellido='Marcano', rol='medico', activo=True)
+    medico.set_password('x')
+    paciente = Paciente(cedula='V15151515', nombre='Rafael', apellido='Guzmán',
+                        fecha_nacimiento=date(1985, 3, 3), sexo='Masculino')
+    db.session.add_all([medico, paciente])
+    db.session.commit()
+    return medico, paciente
+
+
+def test_rango_dia_local_en_utc():
+    inicio, fin = rango_dia(date(2025, 11, 6))
+
+    assert inicio == datetime(2025, 11, 6, 4, 0)
+    assert fin == datetime(2025, 11, 7, 4, 0)
+    assert rango_dia('2025-11-06', utc=False) == (datetime(2025, 11, 6), datetime(2025, 11, 7))
+
+
+def test_rango_turno_incluye_minuto_final():
+    inicio, fin = rango_turno('mañana', date(2025, 11, 6), utc=False)
+
+    assert inicio.time() == time(7, 0)
+    assert fin.time() == time(12, 1)
+    with pytest.raises(ValueError):
+        rango_turno('noche')
+
+
+def test_conversion_ida_y_vuelta():
+    momento = datetime(2025, 11, 6, 23, 30)
+
+    assert local_a_utc(momento) == datetime(2025, 11, 7, 3, 30)
+    assert utc_a_local(local_a_utc(momento)) == momento
+
+
+def test_consulta_nocturna_cuenta_en_su_dia_local(app, medico_y_paciente):
+    """23:30 en Venezuela son las 03:30 UTC del día siguiente"""
+    medico, paciente = medico_y_paciente
+    db.session.add(Consulta(paciente_id=paciente.id, medico_id=medico.id, motivo='Fiebre',
+                            fecha_hora=datetime(2025, 11, 7, 3, 30), turno='tarde',
+                            numero_consulta=1))
+    db.session.commit()
+
+    assert Consulta.contar_consultas_turno('tarde', date(2025, 11, 6)) == 1
+    assert Consulta.contar_consultas_turno('tarde', date(2025, 11, 7)) == 0
+
+
+def test_conteo_por_turno_usa_indice_compuesto(app):
+    """El conteo del límite por turno se resuelve solo con el índice"""
+    plan = _plan_de(Consulta.contar_consultas_turno, 'mañana', date(2025, 11, 6))
+
+    assert 'COVERING INDEX idx_consultas_fecha_turno' in plan
+    assert 'SCAN consultas' not in plan
+
+
+def test_agenda_del_medico_usa_indice_compuesto(app, medico_y_paciente):
+    medico, _ = medico_y_paciente
+    query = Cita.query.filter(
+        Cita.medico_id == medico.id,
+        filtro_dia(Cita.fecha_hora, date(2025, 11, 6), utc=False)
+    )
+
+    plan = _plan(query)
+    assert 'idx_citas_medico_fecha' in plan
+    assert 'medico_id=? AND fecha_hora>? AND fecha_hora<?' in plan
+
+
+def test_func_date_no_usa_indice(app):
+    """Referencia: el filtro anterior obligaba a recorrer toda la tabla"""
+    query = Consulta.query.filter(db.func.date(Consulta.fecha_hora) == date(2025, 11, 6))
+
+    assert 'SCAN consultas' in _plan(query)
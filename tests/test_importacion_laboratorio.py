@@ -0,0 +1,157 @@
+"""
+Tests para la importación de archivos de analizadores de laboratorio
+Sistema SaaS Hospital Uracoa - J&S Software Inteligentes
+"""
+import io
+import pytest
+from datetime import date, datetime
+from sqlalchemy import event
+from saas.extensions import db
+from saas.models import Paciente
+from saas.laboratorio.models import OrdenLaboratorio, ResultadoLaboratorio, ExamenLaboratorio
+from saas.laboratorio.importacion import importar_archivo, leer_astm, leer_csv
+
+
+@pytest.fixture
+def ordenes(app, auth_login):
+    db.session.add_all([
+        ExamenLaboratorio(codigo='GLU', nombre='Glicemia', unidad='mg/dL', ref_min=70, ref_max=100),
+        ExamenLaboratorio(codigo='HB', nombre='Hemoglobina', unidad='g/dL', ref_min=12, ref_max=16),
+        ExamenLaboratorio(codigo='ORINA', nombre='Examen de orina', tipo='texto'),
+    ])
+    paciente = Paciente(cedula='V37000001', nombre='Ramón', apellido='Salazar',
+                        fecha_nacimiento=date(1975, 2, 2), sexo='Masculino')
+    db.session.add(paciente)
+    db.session.flush()
+    creadas = []
+    for _ in range(2):
+        orden = OrdenLaboratorio(paciente_id=paciente.id, medico_id=auth_login.id, examenes_solicitados='Perfil')
+        orden.generar_codigo()
+        db.session.add(orden)
+        creadas.append(orden)
+    db.session.commit()
+    return creadas
+
+
+def test_leer_csv_con_punto_y_coma():
+    lineas = ['orden;codigo;valor;fecha\n', 'LAB-1;glu;98,5;2026-10-17T08:30\n', '\n', 'LAB-1;HB;;2026-13-01\n']
+    entradas = list(leer_csv(lineas))
+
+    assert entradas[0][0] == 2 and entradas[0][2] is None
+    assert entradas[0][1]['codigo'] == 'GLU' and entradas[0][1]['valor'] == '98,5'
+    assert entradas[0][1]['fecha'] == datetime(2026, 10, 17, 12, 30)  # UTC
+    assert entradas[1][0] == 4 and 'Fecha inválida' in entradas[1][2]
+    assert 'Encabezado' in list(leer_csv(['a,b\n', '1,2\n']))[0][2]
+
+
+def test_leer_astm_y_hl7():
+    lineas = [
+        'H|\\^&|||ANALIZADOR\n',
+        'R|1|^^^GLU|90\n',
+        'P|1\n',
+        'O|1|LAB-1||^^^GLU\n',
+        '2R|1|^^^GLU|98|mg/dL|70-100|N||F||||20261017083000\n',
+        'OBR|1|LAB-2\n',
+        'OBX|1|NM|HB^Hemoglobina||11.2|g/dL|12-16|L\n',
+        'L|1|N\n',
+    ]
+    entradas = list(leer_astm(lineas))
+
+    assert entradas[0] == (2, None, 'Resultado sin registro de orden previo')
+    assert entradas[1][1]['orden'] == 'LAB-1' and entradas[1][1]['codigo'] == 'GLU'
+    assert entradas[1][1]['fecha'] == datetime(2026, 10, 17, 12, 30)
+    assert (entradas[2][0], entradas[2][1]['orden'], entradas[2][1]['valor']) == (7, 'LAB-2', '11.2')
+
+
+def test_importar_por_lotes_en_una_transaccion(ordenes):
+    a, b = (o.codigo_orden for o in ordenes)
+    contenido = [
+        'orden,codigo,valor,observaciones\n',
+        f'{a},GLU,130,\n',
+        f'{a},HB,10.5,\n',
+        f'{a},ORINA,Negativo,Muestra matutina\n',
+        'LAB-1999-0001,GLU,90,\n',
+        f'{b},TSH,2.1,\n',
+        f'{b},GLU,alto,\n',
+        f'{b},GLU,85,\n',
+    ]
+    inserts = []
+
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('INSERT INTO resultados_laboratorio'):
+            inserts.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', contar)
+    try:
+        reporte = importar_archivo(contenido, 'csv', tamano_lote=3)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', contar)
+
+    assert reporte['leidos'] == 7 and reporte['importados'] == 4
+    assert reporte['fuera_de_rango'] == 2 and reporte['ordenes'] == 2
+    assert [e['linea'] for e in reporte['errores']] == [5, 6, 7]
+    assert 'LAB-1999-0001' in reporte['errores'][0]['error']
+    assert len(inserts) == 2  # lotes de 3: el segundo no tiene filas válidas
+
+    db.session.expire_all()
+    assert {o.estado for o in ordenes} == {'en_proceso'}
+    glicemia = ResultadoLaboratorio.query.filter_by(orden_id=ordenes[0].id, examen='Glicemia').one()
+    assert glicemia.bandera == 'alto' and glicemia.paciente_id == ordenes[0].paciente_id
+
+
+def test_error_de_bd_no_deja_importacion_a_medias(ordenes, monkeypatch):
+    from saas.laboratorio import importacion
+
+    contenido = ['orden,codigo,valor,fecha\n'] + [
+        f'{ordenes[0].codigo_orden},GLU,{90 + i},2026-10-17T08:0{i}:00\n' for i in range(5)
+    ]
+    original = importacion._buscar_ordenes
+    llamadas = []
+
+    def fallar_en_segundo_lote(codigos, conocidas):
+        llamadas.append(1)
+        if len(llamadas) == 2:
+            raise RuntimeError('conexión perdida')
+        return original(codigos, conocidas)
+
+    monkeypatch.setattr(importacion, '_buscar_ordenes', fallar_en_segundo_lote)
+    with pytest.raises(RuntimeError):
+        importar_archivo(contenido, 'csv', tamano_lote=2)
+
+    assert ResultadoLaboratorio.query.count() == 0
+
+
+def test_reimportar_no_duplica(ordenes):
+    a, b = (o.codigo_orden for o in ordenes)
+    contenido = [
+        'orden;codigo;valor;fecha\n',
+        f'{a};GLU;95;2026-10-17T08:00:00\n',
+        f'{a};GLU;95;2026-10-17T08:00:00\n',  # línea repetida en el archivo
+        f'{a};GLU;102;2026-10-17T14:00:00\n',  # otra toma del mismo examen
+        f'{b};HB;13;\n',
+        f'{b};HB;13;\n',
+    ]
+
+    primera = importar_archivo(contenido, 'csv', tamano_lote=2)
+    assert (primera['importados'], primera['duplicados'], primera['total_errores']) == (3, 2, 0)
+
+    segunda = importar_archivo(contenido, 'csv')
+    assert (segunda['importados'], segunda['duplicados']) == (0, 5)
+    assert ResultadoLaboratorio.query.count() == 3
+
+
+def test_subida_de_archivo_astm(client, ordenes):
+    contenido = (
+        f'H|\\^&\r\nO|1|{ordenes[1].codigo_orden}\r\n'
+        'R|1|^^^GLU|65|mg/dL||L||F||||20261017083000\r\nR|2|^^^XYZ|1\r\nL|1|N\r\n'
+    ).encode()
+
+    respuesta = client.post('/laboratorio/importar', data={
+        'archivo': (io.BytesIO(contenido), 'corrida.astm'), 'formato': ''
+    }, content_type='multipart/form-data')
+
+    html = respuesta.get_data(as_text=True)
+    assert respuesta.status_code == 200
+    assert 'Examen desconocido: XYZ' in html
+    resultado = ResultadoLaboratorio.query.one()
+    assert resultado.bandera == 'bajo' and resultado.fecha == datetime(2026, 10, 17, 12, 30)
@@ -0,0 +1,79 @@
+"""
+Tests para los contadores del inventario de medicamentos
+Sistema SaaS Hospital Uracoa - J&S Software Inteligentes
+"""
+import pytest
+from datetime import timedelta
+from sqlalchemy import event
+from saas.extensions import db
+from saas.models import Medicamento
+from saas.utils.fechas import hoy_local
+from saas.medicamentos.inventario import contadores_inventario
+
+
+@pytest.fixture
+def inventario(app):
+    hoy = hoy_local()
+    medicamentos = [
+        Medicamento(nombre='Amoxicilina', cantidad_stock=5, stock_minimo=10, fecha_vencimiento=hoy + timedelta(days=200)),
+        Medicamento(nombre='Ibuprofeno', cantidad_stock=50, stock_minimo=10, fecha_vencimiento=hoy - timedelta(days=1)),
+        Medicamento(nombre='Losartán', cantidad_stock=10, stock_minimo=10, fecha_vencimiento=hoy + timedelta(days=30)),
+        Medicamento(nombre='Metformina', cantidad_stock=80, stock_minimo=10, fecha_vencimiento=hoy),
+        Medicamento(nombre='Omeprazol', cantidad_stock=40, stock_minimo=10),
+        Medicamento(nombre='Salbutamol', cantidad_stock=0, stock_minimo=5, fecha_vencimiento=hoy - timedelta(days=90),
+                    activo=False),
+    ]
+    db.session.add_all(medicamentos)
+    db.session.commit()
+    return {m.nombre: m for m in medicamentos}
+
+
+def test_propiedades_en_python_y_en_sql(inventario):
+    estados = {nombre: (m.estado_vencimiento, m.stock_bajo) for nombre, m in inventario.items()}
+    assert estados['Amoxicilina'] == ('vigente', True)
+    assert estados['Ibuprofeno'] == ('vencido', False)
+    assert estados['Losartán'] == ('por_vencer', True)
+    assert estados['Metformina'] == ('por_vencer', False)
+    assert estados['Omeprazol'] == (None, False)
+
+    en_sql = dict(db.session.query(
+        Medicamento.nombre, Medicamento.estado_vencimiento
+    ).filter(Medicamento.activo.is_(True)))
+    assert en_sql == {nombre: estados[nombre][0] for nombre in en_sql}
+    assert {m.nombre for m in Medicamento.query.filter(Medicamento.stock_bajo)} == {'Amoxicilina', 'Losartán', 'Salbutamol'}
+
+
+def test_contadores_en_una_consulta_cacheada(inventario):
+    consultas = []
+
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM medicamentos' in statement:
+            consultas.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', contar)
+    try:
+        primero = contadores_inventario()
+        segundo = contadores_inventario()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', contar)
+
+    assert primero == segundo == {'total': 5, 'bajo_stock': 2, 'vencidos': 1, 'por_vencer': 2}
+    assert len(consultas) == 1
+
+    plan = str(db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + consultas[0][0], consultas[0][1]).all())
+    assert 'COVERING INDEX idx_medicamentos_activo_vencimiento' in plan
+
+    # Un cambio confirmado invalida la entrada; mañana es otra entrada
+    inventario['Amoxicilina'].cantidad_stock = 100
+    db.session.commit()
+    assert contadores_inventario()['bajo_stock'] == 1
+    assert contadores_inventario(hoy_local() + timedelta(days=31))['vencidos'] == 3
+
+
+def test_index_filtros_y_badges(client, auth_login, inventario):
+    html = client.get('/medicamentos/?filtro=por_vencer').get_data(as_text=True)
+    assert 'Losartán' in html and 'Metformina' in html and 'Amoxicilina' not in html
+    assert 'Por Vencer (30 días)' in html
+
+    html = client.get('/medicamentos/?filtro=bajo_stock').get_data(as_text=True)
+    assert 'Amoxicilina' in html and 'Losartán' in html and 'Salbutamol' not in html
@@ -0,0 +1,121 @@
+"""
+Tests para el kardex de medicamentos y el saldo sin actualizaciones perdidas
+Sistema SaaS Hospital Uracoa - J&S Software Inteligentes
+"""
+import pytest
+from sqlalchemy import func
+from saas.extensions import db
+from saas.models import Medicamento, MovimientoStock
+
+HILOS = 30
+
+
+@pytest.fixture
+def medicamento(app):
+    medicamento = Medicamento(nombre='Paracetamol', cantidad_stock=0, stock_minimo=5, unidad_medida='cajas')
+    db.session.add(medicamento)
+    db.session.commit()
+    MovimientoStock.registrar(medicamento.id, 'entrada', 20, motivo='Saldo inicial')
+    db.session.commit()
+    return medicamento
+
+
+def _suma_kardex(medicamento_id):
+    return db.session.query(func.sum(MovimientoStock.cantidad)).filter_by(medicamento_id=medicamento_id).scalar()
+
+
+def test_movimientos_ajustan_saldo(medicamento):
+    salida = MovimientoStock.registrar(medicamento.id, 'salida', 8, motivo='Despacho a emergencia')
+    ajuste = MovimientoStock.registrar(medicamento.id, 'ajuste', -2, motivo='Conteo físico')
+    db.session.commit()
+
+    assert (salida.cantidad, salida.saldo) == (-8, 12)
+    assert (ajuste.cantidad, ajuste.saldo) == (-2, 10)
+    assert medicamento.cantidad_stock == 10  # el objeto cargado ve el saldo nuevo
+    assert _suma_kardex(medicamento.id) == 10
+
+    assert MovimientoStock.registrar(medicamento.id, 'vencimiento', 11) is None
+    db.session.rollback()
+    assert db.session.get(Medicamento, medicamento.id).cantidad_stock == 10
+    assert MovimientoStock.query.count() == 3
+
+
+def test_validaciones_y_solo_insercion(medicamento):
+    with pytest.raises(ValueError):
+        MovimientoStock.registrar(medicamento.id, 'regalo', 1)
+    with pytest.raises(ValueError):
+        MovimientoStock.registrar(medicamento.id, 'salida', -3)
+    with pytest.raises(ValueError):
+        MovimientoStock.registrar(medicamento.id, 'ajuste', 0)
+
+    movimiento = MovimientoStock.query.first()
+    movimiento.cantidad = 500
+    with pytest.raises(ValueError):
+        db.session.commit()
+    db.session.rollback()
+
+
+def test_salidas_concurrentes_nunca_dejan_saldo_negativo(en_paralelo, medicamento):
+    medicamento_id = medicamento.id
+
+    def despachar():
+        movimiento = MovimientoStock.registrar(medicamento_id, 'salida', 1)
+        if movimiento is None:
+            db.session.rollback()
+            return False
+        db.session.commit()
+        return True
+
+    resultados, errores = en_paralelo([despachar] * HILOS)
+
+    assert errores == []
+    assert resultados.count(True) == 20 and resultados.count(False) == HILOS - 20
+    db.session.expire_all()
+    assert db.session.get(Medicamento, medicamento_id).cantidad_stock == 0
+    assert _suma_kardex(medicamento_id) == 0
+    saldos = [s for (s,) in db.session.query(MovimientoStock.saldo).filter_by(tipo='salida')]
+    assert sorted(saldos) == list(range(20))  # cada salida vio el saldo de la anterior
+
+
+def test_entradas_y_salidas_concurrentes_sin_actualizaciones_perdidas(en_paralelo, medicamento):
+    medicamento_id = medicamento.id
+
+    def mover(tipo, cantidad):
+        def tarea():
+            MovimientoStock.registrar(medicamento_id, tipo, cantidad)
+            db.session.commit()
+        return tarea
+
+    _, errores = en_paralelo([mover('entrada', 3)] * (HILOS // 2) + [mover('salida', 1)] * (HILOS // 2))
+
+    assert errores == []
+    db.session.expire_all()
+    esperado = 20 + 3 * (HILOS // 2) - HILOS // 2
+    assert db.session.get(Medicamento, medicamento_id).cantidad_stock == esperado == _suma_kardex(medicamento_id)
+
+
+def test_rutas_crear_editar_y_movimientos(client, auth_login, medicamento):
+    respuesta = client.post(f'/medicamentos/{medicamento.id}/editar', data={
+        'nombre': 'Paracetamol 500', 'cantidad_stock': 999, 'unidad_medida': 'cajas',
+        'stock_minimo': 5, 'requiere_receta': 1
+    })
+    assert respuesta.status_code == 302
+    db.session.expire_all()
+    assert medicamento.nombre == 'Paracetamol 500' and medicamento.cantidad_stock == 20
+
+    client.post(f'/medicamentos/{medicamento.id}/movimientos', data={'tipo': 'salida', 'cantidad': 25})
+    html = client.get(f'/medicamentos/{medicamento.id}').get_data(as_text=True)
+    assert 'Stock insuficiente' in html
+
+    client.post(f'/medicamentos/{medicamento.id}/movimientos', data={'tipo': 'salida', 'cantidad': 5, 'motivo': 'Pediatría'})
+    db.session.expire_all()
+    assert medicamento.cantidad_stock == 15
+    assert 'Pediatría' in client.get(f'/medicamentos/{medicamento.id}').get_data(as_text=True)
+
+    client.post('/medicamentos/nuevo', data={
+        'nombre': 'Loratadina', 'cantidad_stock': 12, 'unidad_medida': 'unidades',
+        'stock_minimo': 5, 'requiere_receta': 0
+    })
+    nuevo = Medicamento.query.filter_by(nombre='Loratadina').one()
+    assert nuevo.cantidad_stock == 12
+    assert [(m.tipo, m.saldo) for m in nuevo.movimientos] == [('entrada', 12)]
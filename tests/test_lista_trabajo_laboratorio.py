@@ -0,0 +1,129 @@
+"""
+Tests para la lista de trabajo del laboratorio, sus contadores y el flujo SSE
+Sistema SaaS Hospital Uracoa - J&S Software Inteligentes
+"""
+import threading
+import pytest
+from datetime import date, datetime, timedelta
+from sqlalchemy import event
+from saas.extensions import db
+from saas.models import Paciente
+from saas.utils.cache_etiquetas import invalidar_etiquetas
+from saas.laboratorio.models import OrdenLaboratorio
+from saas.laboratorio.trabajo import AvisosLaboratorio, lista_trabajo, contadores_sla, obtener_avisos
+
+
+@pytest.fixture
+def crear_orden(app, auth_login):
+    paciente = Paciente(cedula='V38000001', nombre='Carmen', apellido='Rojas',
+                        fecha_nacimiento=date(1968, 9, 9), sexo='Femenino')
+    db.session.add(paciente)
+    db.session.commit()
+
+    def crear(examenes, minutos, urgente=False, estado='pendiente', tat=None):
+        ahora = datetime.utcnow()
+        orden = OrdenLaboratorio(paciente_id=paciente.id, medico_id=auth_login.id, examenes_solicitados=examenes,
+                                 urgente=urgente, estado=estado, fecha_orden=ahora - timedelta(minutes=minutos))
+        if tat is not None:
+            orden.fecha_resultado = orden.fecha_orden + timedelta(minutes=tat)
+        orden.generar_codigo()
+        db.session.add(orden)
+        db.session.commit()
+        return orden
+
+    crear.paciente = paciente
+    return crear
+
+
+def test_urgentes_primero_y_por_antiguedad(crear_orden):
+    crear_orden('Rutina antigua', 300)
+    crear_orden('Urgente reciente', 5, urgente=True)
+    crear_orden('Rutina reciente', 10)
+    crear_orden('Urgente antigua', 90, urgente=True)
+    crear_orden('En proceso', 20, estado='en_proceso')
+
+    lista = lista_trabajo('pendiente')
+
+    assert [o['examenes'] for o in lista] == ['Urgente antigua', 'Urgente reciente', 'Rutina antigua', 'Rutina reciente']
+    assert [o['vencida'] for o in lista] == [True, False, True, False]
+    assert lista[0]['objetivo'] == 60 and lista[2]['objetivo'] == 240
+    assert [o['examenes'] for o in lista_trabajo('en_proceso')] == ['En proceso']
+
+
+def test_lista_recorre_el_indice_sin_ordenar(crear_orden):
+    crear_orden('Hemograma', 5)
+    sentencias = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM ordenes_laboratorio' in statement:
+            sentencias.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', capturar)
+    try:
+        lista_trabajo('pendiente')
+        contadores_sla()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capturar)
+
+    conexion = db.session.connection()
+    lista, conteo = (
+        str(conexion.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql, parametros).all())
+        for sql, parametros in sentencias[:2]
+    )
+    assert 'idx_ordenes_lab_estado_urgente_fecha' in lista and 'TEMP B-TREE' not in lista
+    assert 'COVERING INDEX idx_ordenes_lab_estado_urgente_fecha' in conteo and 'TEMP B-TREE' not in conteo
+
+
+def test_contadores_sla(crear_orden):
+    crear_orden('Urgente vencida', 75, urgente=True)
+    crear_orden('Rutina en plazo', 30)
+    crear_orden('Rutina vencida', 250, estado='en_proceso')
+    crear_orden('Urgente a tiempo', 50, urgente=True, estado='completada', tat=40)
+    crear_orden('Rutina tarde', 310, estado='completada', tat=300)
+
+    sla = contadores_sla()
+
+    assert sla['activas']['pendiente'] == {'urgentes': 1, 'rutina': 1, 'vencidas': 1}
+    assert sla['activas']['en_proceso'] == {'urgentes': 0, 'rutina': 1, 'vencidas': 1}
+    assert sla['completadas_hoy'] == 2 and sla['dentro_objetivo'] == 1
+    assert sla['cumplimiento'] == 50.0
+    assert sla['tat_promedio'] == 170 and sla['tat_urgentes'] == 40
+
+
+def test_avisos_despiertan_flujos(app):
+    avisos = AvisosLaboratorio()
+    revision = avisos.esperar_cambio(None, timeout=0)
+
+    def notificar_desde_otro_hilo():
+        with app.app_context():
+            avisos.notificar()
+
+    threading.Timer(0.1, notificar_desde_otro_hilo).start()
+    assert avisos.esperar_cambio(revision, timeout=5) == revision + 1
+
+    # Cambio confirmado en otro worker: solo cambia la versión de etiqueta
+    invalidar_etiquetas('ordenes_laboratorio')
+    assert avisos.esperar_cambio(revision + 1, timeout=1) == revision + 2
+
+
+def test_rutas_avisan_y_stream_envia_lista(app, client, crear_orden):
+    avisos = obtener_avisos()
+    revision = avisos.revision
+
+    respuesta = client.post(f'/laboratorio/nueva/{crear_orden.paciente.id}', data={
+        'examenes_solicitados': 'Gases arteriales', 'urgente': 'y', 'estado': 'pendiente'
+    })
+    assert respuesta.status_code == 302
+    assert avisos.revision == revision + 1
+
+    app.config['SSE_DURACION'] = 0.5
+    app.config['SSE_INTERVALO_PING'] = 0.2
+    respuesta = client.get('/laboratorio/stream')
+    cuerpo = respuesta.get_data(as_text=True)
+    assert respuesta.mimetype == 'text/event-stream'
+    assert 'event: trabajo' in cuerpo and 'Gases arteriales' in cuerpo and 'URGENTE' in cuerpo
+
+    datos = client.get('/laboratorio/api/trabajo').get_json()
+    assert datos['pendiente'][0]['examenes'] == 'Gases arteriales' and datos['en_proceso'] == []
+    assert datos['sla']['activas']['pendiente']['urgentes'] == 1
+    assert 'Gases arteriales' in client.get('/laboratorio/trabajo').get_data(as_text=True)
@@ -0,0 +1,104 @@
+"""
+Tests para el puntaje NEWS2 de internados y el tablero de deterioro
+Sistema SaaS Hospital Uracoa - J&S Software Inteligentes
+"""
+import re
+import pytest
+from datetime import date, datetime, timedelta
+from sqlalchemy import event
+from saas.extensions import db
+from saas.models import Paciente
+from saas.internados.models import Cama, Internado, Evolucion
+from saas.utils import signos_vitales
+
+AHORA = datetime(2025, 11, 6, 12, 0)
+
+
+@pytest.fixture
+def internados(app, auth_login):
+    resultado = []
+    for i, sala in enumerate(['Medicina', 'Medicina', 'Cirugía']):
+        cama = Cama(codigo=f'N-{i}', sala=sala, estado='ocupada')
+        paciente = Paciente(cedula=f'V3400000{i}', nombre='Paciente', apellido=f'News{i}',
+                            fecha_nacimiento=date(1940, 2, 2), sexo='M')
+        db.session.add_all([cama, paciente])
+        db.session.flush()
+        internado = Internado(paciente_id=paciente.id, cama_id=cama.id, medico_id=auth_login.id,
+                              fecha_ingreso=AHORA - timedelta(days=2), motivo='Ingreso', diagnostico_inicial='Ingreso')
+        db.session.add(internado)
+        resultado.append(internado)
+    db.session.commit()
+    return resultado
+
+
+def _evolucionar(internado, horas, **signos):
+    db.session.add(Evolucion(internado_id=internado.id, notas='Evolución', fecha=AHORA + timedelta(hours=horas),
+                             **signos))
+    db.session.commit()
+
+
+def test_puntaje_news2():
+    signos = {'frecuencia_respiratoria': 22, 'saturacion': 93, 'presion_sistolica': 105,
+              'frecuencia_cardiaca': 115, 'temperatura': 38.5}
+    assert signos_vitales.news2(signos) == (2 + 2 + 1 + 2 + 1, 2)
+    assert signos_vitales.news2({'frecuencia_respiratoria': 16, 'saturacion': 97}) == (0, 0)
+    assert signos_vitales.news2({'temperatura': 34.8}) == (3, 3)
+    assert signos_vitales.news2({'temperatura': None}) == (None, None)
+
+    assert signos_vitales.riesgo_news2(8, 2)[0] == 'Alto'
+    assert signos_vitales.riesgo_news2(5, 2)[0] == 'Medio'
+    assert signos_vitales.riesgo_news2(3, 3)[0] == 'Bajo-medio'
+    assert signos_vitales.riesgo_news2(3, 1)[0] == 'Bajo'
+    assert signos_vitales.riesgo_news2(None)[0] == 'Sin datos'
+
+
+def test_lote_y_fila_coinciden():
+    columnas = {'frecuencia_respiratoria': [8, 12, 25, None], 'saturacion': [91, 96, 94, None],
+                'temperatura': [35.0, 36.1, 39.1, None]}
+    puntaje, maximo, medidos = signos_vitales.news2_lote(columnas)
+    assert list(puntaje) == [3 + 3 + 3, 0, 3 + 1 + 2, 0]
+    assert list(maximo) == [3, 0, 3, 0]
+    assert list(medidos) == [3, 3, 3, 0]
+
+
+def test_evolucion_actualiza_ultimo_puntaje(internados):
+    internado = internados[0]
+
+    _evolucionar(internado, 0, frecuencia_respiratoria=26, saturacion=90, temperatura=39.5)
+    db.session.refresh(internado)
+    assert (internado.news2_puntaje, internado.news2_maximo) == (8, 3)
+
+    # Una evolución sin signos no borra el puntaje; una atrasada no lo pisa
+    _evolucionar(internado, 2)
+    _evolucionar(internado, -5, frecuencia_respiratoria=16, saturacion=98)
+    db.session.refresh(internado)
+    assert internado.news2_puntaje == 8 and internado.news2_fecha == AHORA
+
+    _evolucionar(internado, 6, frecuencia_respiratoria=16, saturacion=98, temperatura=37.0)
+    db.session.refresh(internado)
+    assert internado.news2_puntaje == 0 and internado.riesgo_news2 == ('Bajo', 'success')
+
+
+def test_tablero_ordenado_en_una_consulta(client, internados):
+    _evolucionar(internados[0], 0, saturacion=95)                         # 1
+    _evolucionar(internados[2], 0, frecuencia_respiratoria=26, saturacion=90)  # 6
+
+    sentencias = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        if 'internados_registro' in statement:
+            sentencias.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', capturar)
+    try:
+        html = client.get('/internados/deterioro').get_data(as_text=True)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capturar)
+
+    orden = re.findall(r'Paciente (News\d)', html)
+    assert orden == ['News2', 'News0', 'News1']
+    assert 'Medio' in html and 'Sin datos' in html
+    assert len([sql for sql in sentencias if 'news2_puntaje DESC' in sql]) == 1
+
+    html = client.get('/internados/deterioro?sala=Medicina').get_data(as_text=True)
+    assert re.findall(r'Paciente (News\d)', html) == ['News0', 'News1']
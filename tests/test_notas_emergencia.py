@@ -0,0 +1,75 @@
+"""
+Tests para las notas de seguimiento de emergencias
+Sistema SaaS Hospital Uracoa - J&S Software Inteligentes
+"""
+import pytest
+from datetime import datetime
+from sqlalchemy import event
+from saas.extensions import db
+from saas.emergencias.models import Emergencia, NotaEmergencia
+from saas.utils.notas_clinicas import separar_notas, unir_notas
+
+
+@pytest.fixture
+def emergencia(app):
+    emergencia = Emergencia(tipo='otra', triage_nivel=3, descripcion='Dolor abdominal',
+                            estado='en_triaje', hora_ingreso=datetime.utcnow())
+    db.session.add(emergencia)
+    db.session.commit()
+    return emergencia
+
+
+def test_separar_texto_acumulado():
+    inicio = datetime(2025, 11, 6, 8, 20)
+    texto = 'Suero fisiológico\n\n[2025-11-06 09:15]\nAnalgesia IV\n\n[2025-11-06 10:40]\nOmeprazol'
+
+    notas = separar_notas(texto, inicio)
+
+    assert notas == [
+        (inicio, 'Suero fisiológico'),
+        (datetime(2025, 11, 6, 9, 15), 'Analgesia IV'),
+        (datetime(2025, 11, 6, 10, 40), 'Omeprazol'),
+    ]
+    assert unir_notas(notas) == texto
+    assert separar_notas(None, inicio) == [] and unir_notas([]) is None
+
+
+def test_cambiar_estado_inserta_notas(client, auth_login, emergencia):
+    client.post(f'/emergencias/{emergencia.id}/estado', data={
+        'estado': 'en_atencion', 'tratamiento': 'Analgesia IV', 'observaciones': 'Paciente estable'
+    })
+    client.post(f'/emergencias/{emergencia.id}/estado', data={
+        'estado': 'en_atencion', 'tratamiento': 'Omeprazol'
+    })
+
+    notas = NotaEmergencia.query.filter_by(emergencia_id=emergencia.id).order_by(NotaEmergencia.id).all()
+    assert [(n.tipo, n.texto) for n in notas] == [
+        ('estado', 'En Triaje → En Atención'),
+        ('tratamiento', 'Analgesia IV'),
+        ('observacion', 'Paciente estable'),
+        ('tratamiento', 'Omeprazol'),
+    ]
+    assert all(n.usuario_id == auth_login.id for n in notas)
+
+    # El texto acumulado ya no crece
+    db.session.expire_all()
+    assert db.session.get(Emergencia, emergencia.id).tratamiento is None
+
+    html = client.get(f'/emergencias/{emergencia.id}').get_data(as_text=True)
+    assert 'Seguimiento' in html and 'Omeprazol' in html and 'Paciente estable' in html
+
+
+def test_listado_no_carga_texto_historico(app, emergencia):
+    sentencias = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+
+    db.session.expire_all()
+    event.listen(db.engine, 'before_cursor_execute', capturar)
+    try:
+        Emergencia.query.all()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capturar)
+
+    assert 'tratamiento' not in sentencias[-1] and 'observaciones' not in sentencias[-1]
@@ -0,0 +1,104 @@
+"""
+Tests para la paginación por keyset de los listados
+Sistema SaaS Hospital Uracoa - J&S Software Inteligentes
+"""
+import pytest
+from datetime import date, datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from saas.extensions import db
+from saas.models import Paciente
+from saas.utils.paginacion import paginar_keyset, codificar_cursor, decodificar_cursor
+
+
+@pytest.fixture
+def pacientes_paginados(app):
+    """25 pacientes; varios comparten fecha_registro para probar el desempate por id"""
+    base = datetime(2025, 1, 1, 8, 0)
+    for i in range(25):
+        db.session.add(Paciente(
+            cedula=f'V2000{i:04d}', nombre=f'Paciente{i}', apellido='Prueba',
+            fecha_nacimiento=date(1990, 1, 1), sexo='Femenino', activo=True,
+            fecha_registro=base + timedelta(hours=i // 3)
+        ))
+    db.session.commit()
+    return [Paciente.fecha_registro.desc(), Paciente.id.desc()]
+
+
+def _ids(pagina):
+    return [p.id for p in pagina.items]
+
+
+def test_recorrido_completo_sin_repetir(app, pacientes_paginados):
+    """Siguiente -> siguiente recorre todas las filas una sola vez y en orden"""
+    vistos = []
+    cursor = None
+    while True:
+        pagina = paginar_keyset(Paciente.query, pacientes_paginados, cursor=cursor, per_page=10)
+        vistos.extend(_ids(pagina))
+        if not pagina.has_next:
+            break
+        cursor = pagina.next_cursor
+
+    esperado = [p.id for p in Paciente.query.order_by(*pacientes_paginados)]
+    assert vistos == esperado
+    assert len(vistos) == 25
+
+
+def test_volver_a_la_pagina_anterior(app, pacientes_paginados):
+    """El cursor 'anterior' devuelve exactamente la página previa"""
+    primera = paginar_keyset(Paciente.query, pacientes_paginados, per_page=10)
+    segunda = paginar_keyset(Paciente.query, pacientes_paginados,
+                             cursor=primera.next_cursor, per_page=10)
+    de_vuelta = paginar_keyset(Paciente.query, pacientes_paginados,
+                               cursor=segunda.prev_cursor, per_page=10)
+
+    assert not primera.has_prev
+    assert segunda.has_prev and segunda.has_next
+    assert _ids(de_vuelta) == _ids(primera)
+    assert not de_vuelta.has_prev
+
+
+def test_cursor_invalido_vuelve_al_inicio(app, pacientes_paginados):
+    """Un cursor manipulado no produce error: se muestra la primera página"""
+    pagina = paginar_keyset(Paciente.query, pacientes_paginados, cursor='no-es-un-cursor', per_page=10)
+
+    assert _ids(pagina) == _ids(paginar_keyset(Paciente.query, pacientes_paginados, per_page=10))
+
+
+def test_cursor_conserva_fechas():
+    valores = [datetime(2025, 3, 4, 5, 6, 7), 42]
+
+    assert decodificar_cursor(codificar_cursor(valores, 'p')) == (valores, 'p')
+
+
+def test_columna_de_orden_no_admite_null(app):
+    """Una fila con fecha_registro NULL quedaría fuera del seek: la BD la rechaza"""
+    with pytest.raises(IntegrityError):
+        db.session.execute(Paciente.__table__.insert().values(
+            cedula='V29999999', nombre='Sin', apellido='Fecha', fecha_nacimiento=date(1990, 1, 1),
+            sexo='Femenino', fecha_registro=None
+        ))
+    db.session.rollback()
+
+
+def test_total_opcional(app, pacientes_paginados):
+    sin_total = paginar_keyset(Paciente.query, pacientes_paginados, per_page=10)
+    con_total = paginar_keyset(Paciente.query, pacientes_paginados, per_page=10, contar='exacto')
+
+    assert sin_total.total is None
+    assert con_total.total == 25
+
+
+def test_listado_pacientes_con_cursor(client, auth_login, pacientes_paginados):
+    """La vista acepta ?cursor= y muestra el enlace a la siguiente página"""
+    auth_login.rol = 'admin'
+    db.session.commit()
+
+    respuesta = client.get('/pacientes')
+    assert respuesta.status_code == 200
+    assert b'cursor=' in respuesta.data
+
+    pagina = paginar_keyset(Paciente.query, pacientes_paginados, per_page=20)
+    respuesta = client.get(f'/pacientes?cursor={pagina.next_cursor}')
+    assert respuesta.status_code == 200
+    assert b'Paciente0' in respuesta.data
@@ -0,0 +1,125 @@
+"""
+Tests para el censo de medianoche y los reportes de estancia de internados
+Sistema SaaS Hospital Uracoa - J&S Software Inteligentes
+"""
+import pytest
+from datetime import date, datetime
+from saas.extensions import db
+from saas.models import Paciente
+from saas.internados.models import Cama, CensoCamasDia, Internado
+from saas.internados.reportes import registrar_censo, ocupacion_historica, estancia_por
+
+DIA = date(2025, 11, 4)
+HOY = date(2025, 11, 5)  # El censo de DIA se corre pasada su medianoche
+
+# (sala, estado de la cama, diagnóstico, ingreso UTC, alta UTC)
+INTERNACIONES = [
+    ('Pediatría', 'libre', 'Neumonía', datetime(2025, 11, 1, 13), datetime(2025, 11, 4, 13)),
+    ('Pediatría', 'libre', 'neumonía ', datetime(2025, 11, 3, 13), datetime(2025, 11, 4, 19)),
+    ('Pediatría', 'ocupada', 'Deshidratación', datetime(2025, 11, 4, 15), None),
+    ('Medicina', 'ocupada', 'Neumonía', datetime(2025, 10, 30, 13), None),
+]
+
+
+@pytest.fixture
+def internaciones(app, auth_login):
+    for i, (sala, estado, diagnostico, ingreso, alta) in enumerate(INTERNACIONES):
+        cama = Cama(codigo=f'R-{i}', sala=sala, estado=estado)
+        paciente = Paciente(cedula=f'V3200000{i}', nombre='Paciente', apellido=f'R{i}',
+                            fecha_nacimiento=date(2018, 5, 5), sexo='M')
+        db.session.add_all([cama, paciente])
+        db.session.flush()
+        db.session.add(Internado(paciente_id=paciente.id, cama_id=cama.id, medico_id=auth_login.id,
+                                 fecha_ingreso=ingreso, fecha_alta=alta, estado='alta' if alta else 'activo',
+                                 tipo_alta='medica' if alta else None,
+                                 motivo='Ingreso', diagnostico_inicial=diagnostico))
+    db.session.add(Cama(codigo='R-M', sala='Medicina', estado='mantenimiento'))
+    db.session.commit()
+
+
+def _por_sala(filas):
+    return {fila['sala']: fila for fila in filas}
+
+
+def test_registrar_censo_idempotente(internaciones):
+    assert registrar_censo(DIA, hoy=HOY) == 2
+    assert registrar_censo(DIA, hoy=HOY) == 2
+
+    censo = {fila.sala: fila for fila in CensoCamasDia.query.filter_by(fecha=DIA)}
+    assert len(censo) == 2
+    pediatria = censo['Pediatría']
+    assert (pediatria.total, pediatria.libre, pediatria.ocupada) == (3, 2, 1)
+    assert (pediatria.ingresos, pediatria.altas) == (1, 2)
+    assert pediatria.dias_estancia == pytest.approx(3 + 1.25, abs=0.01)
+    assert (censo['Medicina'].ocupada, censo['Medicina'].mantenimiento) == (1, 1)
+
+
+def test_censo_atrasado_conserva_camas(internaciones, auth_login):
+    registrar_censo(DIA, hoy=HOY)
+    # Días después: las camas cambiaron y se carga un ingreso de DIA olvidado
+    Cama.query.update({'estado': 'libre'})
+    cama = Cama.query.filter_by(codigo='R-M').one()
+    paciente = Paciente(cedula='V32000099', nombre='Paciente', apellido='Tardío',
+                        fecha_nacimiento=date(2018, 5, 5), sexo='M')
+    db.session.add(paciente)
+    db.session.flush()
+    db.session.add(Internado(paciente_id=paciente.id, cama_id=cama.id, medico_id=auth_login.id,
+                             fecha_ingreso=datetime(2025, 11, 4, 16), estado='activo',
+                             motivo='Ingreso', diagnostico_inicial='Neumonía'))
+    db.session.commit()
+
+    assert registrar_censo(DIA, hoy=date(2025, 11, 20)) == 2
+
+    medicina = CensoCamasDia.query.filter_by(fecha=DIA, sala='Medicina').one()
+    assert (medicina.ocupada, medicina.mantenimiento, medicina.libre) == (1, 1, 0)
+    assert medicina.ingresos == 1
+    # Un día sin censo guardado no se inventa
+    assert registrar_censo(date(2025, 11, 1), hoy=date(2025, 11, 20)) == 0
+    with pytest.raises(ValueError):
+        registrar_censo(date(2025, 11, 21), hoy=date(2025, 11, 20))
+
+
+def test_ocupacion_historica(internaciones):
+    registrar_censo(DIA, hoy=HOY)
+    db.session.add(CensoCamasDia(fecha=date(2025, 11, 5), sala='Pediatría', total=3, libre=0, ocupada=3,
+                                 mantenimiento=0, ingresos=2, altas=0, dias_estancia=0))
+    db.session.commit()
+
+    reporte = ocupacion_historica(DIA, date(2025, 11, 5))
+    pediatria = _por_sala(reporte['salas'])['Pediatría']
+
+    assert reporte['dias_censados'] == 2
+    assert pediatria['paciente_dias'] == 4 and pediatria['cama_dias'] == 6
+    assert pediatria['ocupacion'] == pytest.approx(66.7)
+    assert pediatria['estancia_promedio'] == pytest.approx(2.1)
+    assert [fila['fecha'] for fila in reporte['serie']] == ['2025-11-04', '2025-11-05']
+
+    solo_medicina = ocupacion_historica(DIA, date(2025, 11, 5), 'Medicina')
+    assert [fila['sala'] for fila in solo_medicina['salas']] == ['Medicina']
+
+
+def test_estancia_por_diagnostico_y_sala(internaciones):
+    por_diagnostico = estancia_por('diagnostico', DIA, DIA)
+    assert por_diagnostico == [
+        {'grupo': 'neumonía', 'n': 2, 'promedio': 2.1, 'minimo': 1.2, 'maximo': 3.0},
+    ]
+
+    por_sala = estancia_por('sala', date(2025, 11, 1), DIA)
+    assert [(fila['grupo'], fila['n']) for fila in por_sala] == [('Pediatría', 2)]
+
+    with pytest.raises(ValueError):
+        estancia_por('medico', DIA, DIA)
+
+
+def test_api_reportes(client, internaciones):
+    registrar_censo(DIA, hoy=HOY)
+
+    datos = client.get('/internados/api/ocupacion?desde=2025-11-01&hasta=2025-11-30').get_json()
+    assert datos['ok'] and datos['dias_censados'] == 1
+    assert _por_sala(datos['salas'])['Medicina']['ocupacion'] == 50.0
+
+    datos = client.get('/internados/api/estancia?desde=2025-11-01&hasta=2025-11-30&agrupar=tipo_alta').get_json()
+    assert datos['grupos'][0]['grupo'] == 'medica' and datos['grupos'][0]['n'] == 2
+
+    assert client.get('/internados/api/estancia?agrupar=medico').status_code == 400
+    assert client.get('/internados/api/ocupacion?desde=2025-12-01&hasta=2025-11-01').status_code == 400
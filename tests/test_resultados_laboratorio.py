@@ -0,0 +1,124 @@
+"""
+Tests para el catálogo de exámenes y la carga de resultados por panel
+Sistema SaaS Hospital Uracoa - J&S Software Inteligentes
+"""
+import pytest
+from datetime import date
+from sqlalchemy import event, text
+from saas.extensions import db
+from saas.models import Paciente
+from saas.laboratorio.models import OrdenLaboratorio, ResultadoLaboratorio, ExamenLaboratorio
+
+CATALOGO = [
+    ('HB', 'Hemoglobina', 'numerico', 'g/dL', 12.0, 16.0),
+    ('GLU', 'Glicemia', 'numerico', 'mg/dL', 70.0, 100.0),
+    ('CREA', 'Creatinina', 'numerico', 'mg/dL', 0.6, 1.2),
+    ('COL', 'Colesterol total', 'numerico', 'mg/dL', None, 200.0),
+    ('ORINA', 'Examen de orina', 'texto', None, None, None),
+]
+
+
+@pytest.fixture
+def orden(app, auth_login):
+    db.session.add_all([
+        ExamenLaboratorio(codigo=codigo, nombre=nombre, tipo=tipo, unidad=unidad, ref_min=minimo, ref_max=maximo)
+        for codigo, nombre, tipo, unidad, minimo, maximo in CATALOGO
+    ])
+    paciente = Paciente(cedula='V36000001', nombre='Luisa', apellido='Brito',
+                        fecha_nacimiento=date(1990, 6, 6), sexo='Femenino')
+    db.session.add(paciente)
+    db.session.flush()
+    orden = OrdenLaboratorio(paciente_id=paciente.id, medico_id=auth_login.id, examenes_solicitados='Perfil')
+    orden.generar_codigo()
+    db.session.add(orden)
+    db.session.commit()
+    return orden
+
+
+def _panel(client, orden, resultados, **extra):
+    return client.post(f'/laboratorio/{orden.id}/resultados', json={'resultados': resultados, **extra})
+
+
+def test_clasificacion_y_rango():
+    glicemia = ExamenLaboratorio(codigo='GLU', nombre='Glicemia', unidad='mg/dL', ref_min=70, ref_max=100)
+    assert [glicemia.clasificar(v) for v in (65, 70, 100, 130, None)] == ['bajo', 'normal', 'normal', 'alto', None]
+    assert glicemia.rango_referencia == '70–100 mg/dL'
+    assert ExamenLaboratorio(codigo='COL', nombre='Col', ref_max=200).rango_referencia == '< 200'
+    assert ExamenLaboratorio(codigo='X', nombre='X').clasificar(5) is None
+
+
+def test_panel_en_un_solo_insert(client, orden):
+    inserts = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('INSERT INTO resultados_laboratorio'):
+            inserts.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', capturar)
+    try:
+        respuesta = _panel(client, orden, [
+            {'codigo': 'hb', 'valor': '10,5'},
+            {'codigo': 'GLU', 'valor': 130},
+            {'codigo': 'CREA', 'valor': 0.9},
+            {'codigo': 'ORINA', 'resultado': 'Negativo', 'observaciones': 'Muestra matutina'},
+        ])
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capturar)
+
+    datos = respuesta.get_json()
+    assert respuesta.status_code == 201
+    assert datos['creados'] == 4 and datos['estado'] == 'en_proceso'
+    assert datos['fuera_de_rango'] == ['Hemoglobina', 'Glicemia']
+    assert len(inserts) == 1
+
+    resultados = {r.examen: r for r in ResultadoLaboratorio.query.filter_by(orden_id=orden.id)}
+    assert resultados['Hemoglobina'].valor == 10.5 and resultados['Hemoglobina'].bandera == 'bajo'
+    assert resultados['Glicemia'].resultado == '130 mg/dL'
+    assert resultados['Glicemia'].valor_referencia == '70–100 mg/dL'
+    assert resultados['Examen de orina'].valor is None and resultados['Examen de orina'].resultado == 'Negativo'
+    assert all(r.paciente_id == orden.paciente_id for r in resultados.values())
+
+    html = client.get(f'/laboratorio/{orden.id}').get_data(as_text=True)
+    assert 'Alto' in html and 'Bajo' in html
+
+
+def test_panel_invalido_no_inserta_nada(client, orden):
+    respuesta = _panel(client, orden, [
+        {'codigo': 'GLU', 'valor': 95},
+        {'codigo': 'TSH', 'valor': 2.1},
+        {'codigo': 'HB', 'valor': 'alto'},
+        {'codigo': 'GLU', 'valor': 90},
+        {'codigo': 'ORINA'},
+        {'codigo': 'CREA', 'valor': 'nan'},
+        {'codigo': 'COL', 'valor': '-inf'},
+    ])
+
+    assert respuesta.status_code == 400
+    assert [e['indice'] for e in respuesta.get_json()['errores']] == [1, 2, 3, 4, 5, 6]
+    assert ResultadoLaboratorio.query.count() == 0
+    assert _panel(client, orden, []).status_code == 400
+
+
+def test_completar_orden(client, orden):
+    _panel(client, orden, [{'codigo': 'COL', 'valor': 250}], completar=True)
+    db.session.refresh(orden)
+    assert orden.estado == 'completada' and orden.fecha_resultado is not None
+    assert ResultadoLaboratorio.query.one().bandera == 'alto'
+
+
+def test_tendencia_por_paciente_y_examen(client, orden, auth_login):
+    for valor in (180, 140):
+        _panel(client, orden, [{'codigo': 'GLU', 'valor': valor}])
+
+    datos = client.get(f'/laboratorio/api/pacientes/{orden.paciente_id}/examenes/glu').get_json()
+    assert datos['valor'] == [180, 140] and datos['bandera'] == ['alto', 'alto']
+    assert datos['unidad'] == 'mg/dL' and datos['ref_max'] == 100
+
+    examen_id = ExamenLaboratorio.query.filter_by(codigo='GLU').one().id
+    plan = db.session.execute(text(
+        'EXPLAIN QUERY PLAN SELECT fecha, valor FROM resultados_laboratorio '
+        'WHERE paciente_id = :p AND examen_id = :e ORDER BY fecha'
+    ), {'p': orden.paciente_id, 'e': examen_id}).all()
+    assert 'idx_resultados_lab_paciente_examen_fecha' in str(plan)
+
+    assert client.get(f'/laboratorio/api/pacientes/{orden.paciente_id}/examenes/NOEXISTE').status_code == 404
@@ -0,0 +1,90 @@
+"""
+Tests para la asignación atómica de números de turno (contadores_turno)
+Sistema SaaS Hospital Uracoa - J&S Software Inteligentes
+"""
+import pytest
+from datetime import date, datetime
+from unittest.mock import patch
+from saas.extensions import db
+from saas.models import Paciente, Usuario
+from saas.consultas.models import Consulta, ContadorTurno, LIMITE_POR_TURNO
+from saas.utils.fechas import hoy_local
+
+
+@pytest.fixture
+def medico_y_paciente(app):
+    medico = Usuario(username='dr_turnos', email='turnos@hospital.com', nombre='Luis',
+                     apellido='Rondón', rol='medico', activo=True)
+    medico.set_password('x')
+    paciente = Paciente(cedula='V20202020', nombre='Carmen', apellido='Salazar',
+                        fecha_nacimiento=date(1979, 8, 8), sexo='Femenino')
+    db.session.add_all([medico, paciente])
+    db.session.commit()
+    return medico.id, paciente.id
+
+
+def _registrar(medico_id, paciente_id):
+    consulta = Consulta(paciente_id=paciente_id, medico_id=medico_id,
+                        fecha_hora=datetime.utcnow(), motivo='Control')
+    consulta.asignar_turno_y_numero()
+    db.session.add(consulta)
+    db.session.commit()
+    return consulta.numero_consulta
+
+
+def test_contador_entrega_consecutivos_y_respeta_limite(app):
+    dia = date(2025, 11, 6)
+
+    numeros = [ContadorTurno.tomar_numero(dia, 'mañana', limite=3) for _ in range(4)]
+
+    assert numeros == [1, 2, 3, None]
+    assert ContadorTurno.actual(dia, 'mañana') == 3
+    assert ContadorTurno.actual(dia, 'tarde') is None
+    assert ContadorTurno.tomar_numero(dia, 'tarde', limite=3) == 1
+
+
+def test_contador_parte_de_consultas_existentes(app, medico_y_paciente):
+    """Consultas registradas antes de existir la fila del contador"""
+    medico_id, paciente_id = medico_y_paciente
+    for numero in (1, 2):
+        db.session.add(Consulta(paciente_id=paciente_id, medico_id=medico_id, motivo='Previa',
+                                fecha_hora=datetime.utcnow(), turno='tarde',
+                                numero_consulta=numero))
+    db.session.commit()
+
+    assert ContadorTurno.tomar_numero(hoy_local(), 'tarde') == 3
+
+
+def test_rollback_libera_el_numero(app):
+    dia = date(2025, 11, 6)
+    db.session.commit()
+
+    ContadorTurno.tomar_numero(dia, 'mañana')
+    db.session.rollback()
+
+    assert ContadorTurno.tomar_numero(dia, 'mañana') == 1
+
+
+@patch('saas.consultas.models.Consulta.detectar_turno_actual', return_value='mañana')
+def test_registro_concurrente_no_repite_ni_excede(_detectar, en_paralelo, medico_y_paciente):
+    """Muchas recepciones a la vez contra un mismo turno"""
+    medico_id, paciente_id = medico_y_paciente
+    trabajadores = 40
+
+    def recepcion():
+        try:
+            return _registrar(medico_id, paciente_id)
+        except ValueError as e:
+            db.session.rollback()
+            return str(e)
+
+    resultados, errores = en_paralelo([recepcion] * trabajadores)
+    numeros = [r for r in resultados if isinstance(r, int)]
+    rechazos = [r for r in resultados if isinstance(r, str)]
+
+    assert errores == []
+    assert sorted(numeros) == list(range(1, LIMITE_POR_TURNO + 1))
+    assert len(rechazos) == trabajadores - LIMITE_POR_TURNO
+    assert all('Límite de 20 consultas' in mensaje for mensaje in rechazos)
+    assert Consulta.query.filter_by(turno='mañana').count() == LIMITE_POR_TURNO
+    assert ContadorTurno.actual(hoy_local(), 'mañana') == LIMITE_POR_TURNO
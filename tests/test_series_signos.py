@@ -0,0 +1,93 @@
+"""
+Tests para las series de signos vitales por paciente
+Sistema SaaS Hospital Uracoa - J&S Software Inteligentes
+"""
+import pytest
+import numpy as np
+from datetime import date, datetime, timedelta
+from saas.extensions import db
+from saas.models import Paciente
+from saas.consultas.models import Consulta
+from saas.emergencias.models import Emergencia
+from saas.internados.models import Cama, Internado, Evolucion
+from saas.utils.series_signos import lttb, serie_paciente
+
+INICIO = datetime(2025, 11, 1, 12, 0)
+EVOLUCIONES = 60
+
+
+@pytest.fixture
+def paciente(app, auth_login):
+    paciente = Paciente(cedula='V33000001', nombre='Paciente', apellido='Serie',
+                        fecha_nacimiento=date(1950, 1, 1), sexo='F')
+    cama = Cama(codigo='S-1', sala='Sala S', estado='ocupada')
+    db.session.add_all([paciente, cama])
+    db.session.flush()
+
+    db.session.add(Consulta(paciente_id=paciente.id, medico_id=auth_login.id, motivo='Control',
+                            fecha_hora=INICIO - timedelta(days=2), turno='mañana', numero_consulta=1,
+                            temperatura=36.8, presion_sistolica=130, presion_diastolica=85, saturacion=97))
+    db.session.add(Emergencia(paciente_id=paciente.id, tipo='respiratoria', triage_nivel=2, descripcion='Disnea',
+                              hora_ingreso=INICIO - timedelta(hours=3), presion_arterial='150/95',
+                              presion_sistolica=150, presion_diastolica=95, temperatura=38.4, saturacion=89))
+    internado = Internado(paciente_id=paciente.id, cama_id=cama.id, medico_id=auth_login.id,
+                          fecha_ingreso=INICIO, motivo='Neumonía', diagnostico_inicial='Neumonía')
+    db.session.add(internado)
+    db.session.flush()
+    for i in range(EVOLUCIONES):
+        db.session.add(Evolucion(internado_id=internado.id, notas='Evolución', usuario_id=auth_login.id,
+                                 fecha=INICIO + timedelta(hours=6 * i),
+                                 temperatura=40.1 if i == 30 else 37.0, frecuencia_respiratoria=20))
+    db.session.commit()
+    return paciente
+
+
+def test_lttb_conserva_extremos_y_picos():
+    x = np.arange(1000, dtype=float)
+    y = np.zeros(1000)
+    y[500] = 100
+
+    elegidos = lttb(x, y, 50)
+
+    assert len(elegidos) == 50
+    assert elegidos[0] == 0 and elegidos[-1] == 999
+    assert 500 in elegidos
+    assert np.all(np.diff(elegidos) > 0)
+    assert list(lttb(x[:10], y[:10], 50)) == list(range(10))
+
+
+def test_serie_une_los_tres_origenes(paciente):
+    datos = serie_paciente(paciente.id)
+    temperatura = datos['series']['temperatura']
+
+    assert datos['total'] == EVOLUCIONES + 2
+    assert temperatura['origen'][:3] == ['consulta', 'emergencia', 'evolucion']
+    assert temperatura['valor'][:2] == [36.8, 38.4]
+    assert temperatura['fecha'][0] == (INICIO - timedelta(days=2)).isoformat()
+    assert datos['series']['presion_sistolica']['valor'] == [130, 150]
+    assert set(datos['series']['frecuencia_respiratoria']['origen']) == {'evolucion'}
+
+
+def test_serie_reducida_mantiene_la_fiebre(paciente):
+    datos = serie_paciente(paciente.id, puntos=10)
+    temperatura = datos['series']['temperatura']
+
+    assert len(temperatura['valor']) == 10
+    assert 40.1 in temperatura['valor']
+    assert temperatura['fecha'] == sorted(temperatura['fecha'])
+
+
+def test_api_signos(client, paciente):
+    respuesta = client.get(f'/api/pacientes/{paciente.id}/signos?puntos=5&campos=temperatura,saturacion'
+                           '&desde=2025-11-01')
+    datos = respuesta.get_json()
+
+    assert respuesta.status_code == 200 and datos['ok']
+    assert set(datos['series']) == {'temperatura', 'saturacion'}
+    assert datos['total'] == EVOLUCIONES + 1  # la consulta del 30/10 queda fuera
+    assert len(datos['series']['temperatura']['valor']) == 5
+    assert datos['series']['saturacion']['valor'] == [89]
+
+    assert client.get(f'/api/pacientes/{paciente.id}/signos?campos=glucosa').status_code == 400
+    assert client.get(f'/api/pacientes/{paciente.id}/signos?puntos=1').status_code == 400
+    assert client.get('/api/pacientes/999999/signos').status_code == 404
@@ -0,0 +1,114 @@
+"""
+Tests para el motor vectorizado de reglas de signos vitales
+Sistema SaaS Hospital Uracoa - J&S Software Inteligentes
+"""
+import time
+import random
+import numpy as np
+import pytest
+from saas.consultas.models import Consulta
+from saas.emergencias.models import Emergencia
+from saas.internados.models import Evolucion
+from saas.utils import signos_vitales
+from saas.utils.signos_vitales import (ALERTA_FIEBRE, ALERTA_HIPOXEMIA, ALERTA_SISTOLICA,
+                                       ALERTA_DIASTOLICA, ALERTA_TAQUICARDIA)
+
+
+def _signos_aleatorios(generador):
+    def valor(minimo, maximo, decimales=0):
+        if generador.random() < 0.15:
+            return None
+        return round(generador.uniform(minimo, maximo), decimales) if decimales else generador.randint(minimo, maximo)
+
+    return {
+        'temperatura': valor(35, 42, 1),
+        'presion_sistolica': valor(80, 200),
+        'presion_diastolica': valor(40, 130),
+        'frecuencia_cardiaca': valor(35, 160),
+        'saturacion': valor(75, 100),
+        'peso': valor(40, 140, 1),
+        'altura': valor(140, 200),
+    }
+
+
+def test_lote_y_fila_dan_el_mismo_resultado():
+    generador = random.Random(2025)
+    filas = [_signos_aleatorios(generador) for _ in range(2000)]
+    columnas = {campo: [fila[campo] for fila in filas] for campo in signos_vitales.CAMPOS}
+
+    alertas, severidad = signos_vitales.evaluar_lote(columnas)
+    errores = signos_vitales.validar_lote(columnas)
+
+    for i, fila in enumerate(filas):
+        assert signos_vitales.evaluar(fila) == (alertas[i], severidad[i])
+        if errores[i]:
+            with pytest.raises(ValueError):
+                signos_vitales.validar(fila)
+        else:
+            signos_vitales.validar(fila)
+
+
+def test_hipoxemia_es_critica_por_si_sola():
+    alertas, severidad = signos_vitales.evaluar({'saturacion': 90})
+
+    assert alertas == ALERTA_HIPOXEMIA
+    assert signos_vitales.nivel_severidad(severidad) == ('Alta', 'danger')
+    assert signos_vitales.evaluar({'saturacion': 92}) == (0, 0)
+    # 0 o None = no medido
+    assert signos_vitales.evaluar({'saturacion': 0, 'temperatura': None}) == (0, 0)
+
+
+def test_validacion_mismos_mensajes_en_el_formulario():
+    consulta = Consulta(presion_sistolica=110, presion_diastolica=120)
+    with pytest.raises(ValueError, match='diastólica debe ser menor'):
+        consulta.validar_antes_guardar()
+
+    consulta = Consulta(peso=300, altura=150)
+    with pytest.raises(ValueError, match='IMC fuera de rango'):
+        consulta.validar_antes_guardar()
+
+    Consulta(presion_sistolica=120, presion_diastolica=80, peso=70, altura=170).validar_antes_guardar()
+
+
+def test_mismo_motor_para_los_tres_modelos():
+    consulta = Consulta(temperatura=38.6, saturacion=95)
+    evolucion = Evolucion(temperatura=37.0, presion_sistolica=150, frecuencia_cardiaca=110)
+    emergencia = Emergencia(presion_arterial='185/125', saturacion=88)
+
+    alertas, severidad = signos_vitales.evaluar_registros([consulta, evolucion, emergencia])
+
+    assert list(alertas) == [
+        ALERTA_FIEBRE,
+        ALERTA_SISTOLICA | ALERTA_TAQUICARDIA,
+        ALERTA_SISTOLICA | ALERTA_DIASTOLICA | ALERTA_HIPOXEMIA,
+    ]
+    assert list(severidad) == [2, 3, 3 + 3 + 5]
+    assert [a['tipo'] for a in emergencia.alertas_detalle] == ['hipertension', 'hipertension', 'hipoxemia']
+    assert evolucion.alertas_detalle[0]['mensaje'] == 'Presión sistólica elevada: 150 mmHg'
+
+
+def test_presion_en_texto_invalida_no_alerta():
+    assert signos_vitales.separar_presion('120/80') == (120, 80)
+    assert signos_vitales.separar_presion('alta') == (None, None)
+    assert signos_vitales.separar_presion(None) == (None, None)
+
+
+def test_lote_grande_en_milisegundos():
+    generador = np.random.default_rng(7)
+    n = 100_000
+    columnas = {
+        'temperatura': generador.uniform(35, 42, n),
+        'presion_sistolica': generador.integers(80, 200, n),
+        'presion_diastolica': generador.integers(40, 130, n),
+        'frecuencia_cardiaca': generador.integers(35, 160, n),
+        'saturacion': generador.integers(75, 100, n),
+        'peso': generador.uniform(40, 140, n),
+        'altura': generador.uniform(140, 200, n),
+    }
+
+    inicio = time.perf_counter()
+    alertas, severidad = signos_vitales.evaluar_lote(columnas)
+    transcurrido = time.perf_counter() - inicio
+
+    assert alertas.shape == severidad.shape == (n,)
+    assert transcurrido < 1.0
@@ -0,0 +1,110 @@
+"""
+Tests para los tiempos de espera y estancia de emergencias
+Sistema SaaS Hospital Uracoa - J&S Software Inteligentes
+"""
+import pytest
+import numpy as np
+from datetime import date, datetime, timedelta
+from saas.extensions import db
+from saas.emergencias.models import Emergencia, TiempoEmergenciaDia
+from saas.emergencias.tiempos import consolidar_dias, percentil_histograma, resumen_tiempos
+
+DIA = date(2025, 11, 6)
+
+# (nivel, tipo, minutos de espera, minutos hasta el alta)
+CASOS = [
+    (2, 'cardiaca', 5, 90),
+    (2, 'cardiaca', 10, 120),
+    (2, 'accidente', 20, 200),
+    (2, 'accidente', 40, None),
+    (3, 'otra', 60, 75),
+]
+
+
+@pytest.fixture
+def emergencias(app):
+    # 09:00 hora local = 13:00 UTC
+    ingreso = datetime(2025, 11, 6, 13, 0)
+    for nivel, tipo, espera, estancia in CASOS:
+        db.session.add(Emergencia(
+            tipo=tipo, triage_nivel=nivel, descripcion='Caso', estado='alta' if estancia else 'en_atencion',
+            hora_ingreso=ingreso, hora_atencion=ingreso + timedelta(minutes=espera),
+            hora_alta=ingreso + timedelta(minutes=estancia) if estancia else None,
+        ))
+    # Sin atender: no cuenta para la espera
+    db.session.add(Emergencia(tipo='otra', triage_nivel=4, descripcion='Caso', hora_ingreso=ingreso))
+    db.session.commit()
+
+
+def _por_grupo(grupos):
+    return {fila['grupo']: fila for fila in grupos}
+
+
+def test_percentiles_exactos(emergencias):
+    fuente, grupos = resumen_tiempos(DIA, DIA, 'triage_nivel', fuente='vivo')
+    nivel_2 = _por_grupo(grupos)[2]
+
+    esperas = [5, 10, 20, 40]
+    assert fuente == 'vivo'
+    assert nivel_2['espera']['n'] == 4
+    assert nivel_2['espera']['mediana'] == pytest.approx(np.percentile(esperas, 50), abs=0.1)
+    assert nivel_2['espera']['p90'] == pytest.approx(np.percentile(esperas, 90), abs=0.1)
+    assert nivel_2['espera']['max'] == pytest.approx(40, abs=0.1)
+    assert nivel_2['estancia']['n'] == 3
+    assert 4 not in _por_grupo(grupos)
+
+
+def test_agrupar_por_hora_local(emergencias):
+    _, grupos = resumen_tiempos(DIA, DIA, 'hora', fuente='vivo')
+    assert [fila['grupo'] for fila in grupos] == [9]
+    assert grupos[0]['espera']['n'] == 5
+
+
+def test_resumen_diario_idempotente(emergencias):
+    escritas = consolidar_dias(DIA, DIA)
+    assert escritas == TiempoEmergenciaDia.query.count() > 0
+    assert consolidar_dias(DIA, DIA) == escritas
+    assert TiempoEmergenciaDia.query.count() == escritas
+
+    _, vivo = resumen_tiempos(DIA, DIA, 'tipo', fuente='vivo')
+    _, resumen = resumen_tiempos(DIA, DIA, 'tipo', fuente='resumen')
+    for tipo, fila in _por_grupo(resumen).items():
+        exacto = _por_grupo(vivo)[tipo]
+        assert fila['espera']['n'] == exacto['espera']['n']
+        assert fila['espera']['max'] == pytest.approx(exacto['espera']['max'], abs=0.1)
+        assert fila['espera']['promedio'] == pytest.approx(exacto['espera']['promedio'], abs=0.1)
+
+
+def test_resumen_lee_dias_sin_consolidar(emergencias):
+    """Un día pasado que nunca se consolidó no queda en cero"""
+    ingreso = datetime(2025, 11, 8, 13, 0)
+    db.session.add(Emergencia(tipo='otra', triage_nivel=3, descripcion='Caso', estado='en_atencion',
+                              hora_ingreso=ingreso, hora_atencion=ingreso + timedelta(minutes=30)))
+    db.session.commit()
+    consolidar_dias(DIA, DIA)  # solo el primer día
+
+    hasta = DIA + timedelta(days=3)
+    _, vivo = resumen_tiempos(DIA, hasta, 'triage_nivel', fuente='vivo')
+    _, resumen = resumen_tiempos(DIA, hasta, 'triage_nivel', fuente='resumen')
+    assert {f['grupo']: f['espera']['n'] for f in resumen} == {f['grupo']: f['espera']['n'] for f in vivo}
+    assert _por_grupo(resumen)[3]['espera']['n'] == 2
+
+
+def test_percentil_histograma_acotado_por_maximo():
+    # 10 casos en [0, 5) y 10 en [60, 90) con máximo real 70
+    cubetas = [(0, 10, 4.0), (7, 10, 70.0)]
+    assert percentil_histograma(cubetas, 0.5) == pytest.approx(4.0)
+    assert 60 <= percentil_histograma(cubetas, 0.9) <= 70
+    assert percentil_histograma([], 0.5) is None
+
+
+def test_api_tiempos(client, auth_login, emergencias):
+    respuesta = client.get('/emergencias/api/tiempos?desde=2025-11-01&hasta=2025-11-06&agrupar=tipo')
+    datos = respuesta.get_json()
+
+    assert respuesta.status_code == 200 and datos['ok']
+    assert datos['fuente'] == 'vivo'
+    assert {fila['grupo'] for fila in datos['grupos']} == {'cardiaca', 'accidente', 'otra'}
+
+    assert client.get('/emergencias/api/tiempos?agrupar=medico').status_code == 400
+    assert client.get('/emergencias/api/tiempos?desde=2025-11-10&hasta=2025-11-01').status_code == 400